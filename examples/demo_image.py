@@ -8,7 +8,8 @@ try:
 except:
     raise ImportError, 'SciPy is required for this demo.'
 
-from nlpy.krylov.linop import SimpleLinearOperator
+from nlpy.krylov.linop import SimpleLinearOperator, IdentityOperator
+from nlpy.krylov.linop import BlockLinearOperator
 from nlpy.optimize.solvers import LSQRFramework
 from nlpy.krylov.minres import Minres
 from math import sqrt
@@ -70,21 +71,20 @@ class Image1DMinres(Image1D):
 class Image1DMinresAug(Image1D):
 
     def __init__(self, n=80, sig=.05, err=2, **kwargs):
-        Image1D.__init__(self, n, sig, err, **kwargs)
         self.reg = kwargs.get('reg',1.0e-3)
+        Image1D.__init__(self, n, sig, err, **kwargs)
 
     def setsolver(self):
+        # The augmented operator [ I  K' ; K  -reg I ].
         n = self.n
-        op = SimpleLinearOperator(n, n, self.matvec, symmetric=True)
+        I = IdentityOperator(n)
+        K = SimpleLinearOperator(n, n,
+                                 lambda u: np.asarray(u * self.K.T)[0],
+                                 matvec_transp=lambda u: \
+                                               np.asarray(u * self.K)[0])
+        op = BlockLinearOperator([[I, K.T], [-self.reg * I]], symmetric=True)
         self.solver = Minres(op, check=True, show=True)
 
-    def matvec(self, x):
-        "y <- Ax"
-        (m,n) = self.K.shape ; y = np.empty(n+m)
-        y[:m] = x[:m] + np.asarray(x[m:] * self.K)[0]
-        y[m:] = np.asarray(x[:m] * self.K.T)[0] - self.reg * x[m:]
-        return y
-
     def deblur(self, **kwargs):
         "Deblur image with specified solver"
         b = np.zeros(2*self.n)
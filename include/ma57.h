@@ -82,6 +82,7 @@ Ma57_Data *Ma57_Initialize( int nz, int n, FILE *logfile );
 int  Ma57_Analyze( Ma57_Data *ma57 );
 int  Ma57_Factorize( Ma57_Data *ma57, double A[] );
 int  Ma57_Solve( Ma57_Data *ma57, double x[] );
+int  Ma57_SolveMany( Ma57_Data *ma57, int nrhs, double x[] );
 int  Ma57_Refine( Ma57_Data *ma57, double x[], double rhs[], double A[],
                   int maxitref, int job );
 void Ma57_Finalize(      Ma57_Data *ma57 );
@@ -8,6 +8,23 @@ class LinearOperator:
     A linear operator is a linear mapping x -> A(x) such that the size of the
     input vector x is `nargin` and the size of the output is `nargout`. It can
     be visualized as a matrix of shape (`nargout`, `nargin`).
+
+    Linear operators may be combined with `+`, `-`, multiplication by a
+    scalar and multiplication by another operator, and arranged in blocks
+    with :class:`BlockLinearOperator` and
+    :class:`BlockDiagonalLinearOperator`. The result is a new operator that
+    is evaluated lazily: no matrix is formed and the product with a vector
+    only computes the products of the operands with that vector. The
+    transpose of a combination is available as its attribute `T` when the
+    operands have a transpose.
+
+    The product with a two-dimensional array of shape (`nargin`, k), with
+    `*` or :meth:`matmat`, returns the (`nargout`, k) array of the products
+    with its columns. Subclasses implement the product with a vector in
+    :meth:`_apply` and may implement the product with several vectors at once
+    in :meth:`_apply_many`, which otherwise loops over the columns, and the
+    product into a given vector in :meth:`_apply_into`, which otherwise
+    copies the product.
     """
 
     def __init__(self, nargin, nargout, **kwargs):
@@ -72,7 +89,126 @@ class LinearOperator:
 
 
     def __mul__(self, x):
-        raise NotImplementedError, 'Please subclass to implement __mul__.'
+        if isinstance(x, LinearOperator):
+            return ComposedLinearOperator([self, x])
+        if np.isscalar(x):
+            return SumLinearOperator([(x, self)])
+        if np.ndim(x) == 2:
+            return self.matmat(x)
+        return self._apply(x)
+
+
+    def matmat(self, X):
+        """
+        Return the product of the operator with the array `X` of shape
+        (`nargin`, k), i.e., the array of shape (`nargout`, k) whose columns
+        are the products of the operator with the columns of `X`.
+        """
+        X = np.asarray(X)
+        if X.ndim != 2 or X.shape[0] != self.nargin:
+            msg = 'Input has shape ' + str(X.shape)
+            msg += ' instead of (%d, k)' % self.nargin
+            raise ValueError, msg
+        return self._apply_many(X)
+
+
+    def dot(self, x, out=None):
+        """
+        Return the product of the operator with the vector `x`. If `out` is
+        given, the product is stored into it and `out` is returned. Products
+        with sparse matrices, diagonal operators and their combinations are
+        then computed directly into `out`, using work vectors allocated once
+        by each operator, so that no vector is allocated.
+        """
+        if out is None: return self * x
+        return self._apply_into(x, out)
+
+
+    def __rmul__(self, x):
+        if np.isscalar(x):
+            return SumLinearOperator([(x, self)])
+        return NotImplemented
+
+
+    def __add__(self, other):
+        return SumLinearOperator([(1.0, self), (1.0, other)])
+
+
+    def __sub__(self, other):
+        return SumLinearOperator([(1.0, self), (-1.0, other)])
+
+
+    def __neg__(self):
+        return SumLinearOperator([(-1.0, self)])
+
+
+    def _apply(self, x):
+        raise NotImplementedError, 'Please subclass to implement _apply.'
+
+
+    def _apply_into(self, x, out):
+        out[:] = self._apply(x)
+        return out
+
+
+    def _apply_many(self, X):
+        # One product per column. The columns are copied to contiguous rows.
+        Y = np.empty((self.nargout, X.shape[1]))
+        for (j, x) in enumerate(np.ascontiguousarray(X.T)):
+            Y[:, j] = self._apply(x)
+        return Y
+
+
+
+# Largest number of elements of the temporary array formed by matmat products
+# of coordinate matrices, about 8 MB. Wider arrays are processed in blocks of
+# columns.
+_matmat_block = 1 << 20
+
+
+class _CoordProduct:
+    """
+    The pattern of the matrix with `nrow` rows whose elements are given in
+    coordinate format by `(irow, jcol)`, sorted by row once for all. If `sym`
+    is `True`, the elements of one triangle only are given and those of the
+    other triangle are added. The product of the matrix with an array `X` is
+    then, for each row of the result, a single reduction over a contiguous
+    block of scaled rows of `X`, and all columns of `X` are processed in the
+    same pass over the matrix. The values of the elements are given to each
+    product, in the order of `(irow, jcol)`, so that they may change from one
+    product to the next.
+    """
+
+    def __init__(self, nrow, irow, jcol, sym=False):
+        self.off = None
+        if sym:
+            self.off = np.flatnonzero(irow != jcol)
+            (irow, jcol) = (np.concatenate((irow, jcol[self.off])),
+                            np.concatenate((jcol, irow[self.off])))
+        self.order = np.argsort(irow, kind='mergesort')
+        rows = irow[self.order]
+        self.nrow = nrow
+        self.jcol = jcol[self.order]
+        new_row = np.ones(rows.size, dtype=bool)
+        new_row[1:] = rows[1:] != rows[:-1]
+        self.start = np.flatnonzero(new_row)
+        self.rows = rows[self.start]
+        self.block = max(1, _matmat_block // max(1, rows.size))
+
+    def matmat(self, val, X):
+        """
+        Return the product of the matrix whose elements have values `val`
+        with the two-dimensional array X.
+        """
+        Y = np.zeros((self.nrow, X.shape[1]))
+        if self.rows.size == 0: return Y
+        if self.off is not None: val = np.concatenate((val, val[self.off]))
+        val = val[self.order, np.newaxis]
+        for j in xrange(0, X.shape[1], self.block):
+            cols = slice(j, j + self.block)
+            P = val * X[self.jcol, cols]
+            Y[self.rows, cols] = np.add.reduceat(P, self.start, axis=0)
+        return Y
 
 
 
@@ -80,6 +216,11 @@ class SimpleLinearOperator(LinearOperator):
     """
     A linear operator constructed from a matvec and (possibly) a matvec_transp
     function.
+
+    The keywords `matmat` and `matmat_transp` may give functions computing
+    the products of the operator and of its transpose with the columns of a
+    two-dimensional array at once. By default, :meth:`matmat` calls `matvec`
+    once per column.
     """
 
     def __init__(self, nargin, nargout, matvec,
@@ -88,8 +229,14 @@ class SimpleLinearOperator(LinearOperator):
         self.symmetric = symmetric
         self.transposed = kwargs.get('transposed', False)
         transpose_of = kwargs.get('transpose_of', None)
+        matmat = kwargs.get('matmat', None)
+        matmat_transp = kwargs.get('matmat_transp', None)
 
         self.matvec = matvec
+        self._apply = self._matvec
+        if matmat is not None:
+            self.matmat_fun = matmat
+            self._apply_many = self._matmat
 
         if symmetric:
             self.T = self
@@ -100,6 +247,8 @@ class SimpleLinearOperator(LinearOperator):
                     self.T = SimpleLinearOperator(nargout, nargin,
                                                   matvec_transp,
                                                   matvec_transp=matvec,
+                                                  matmat=matmat_transp,
+                                                  matmat_transp=matmat,
                                                   transposed=not self.transposed,
                                                   transpose_of=self,
                                                   logger=kwargs.get('logger',None))
@@ -114,13 +263,39 @@ class SimpleLinearOperator(LinearOperator):
                     msg += ' Got ' + str(transpose_of.__class__)
                     raise ValueError, msg
 
-    def __mul__(self, x):
+    def _matvec(self, x):
         if self.transposed:
             self.nMatvecTransp += 1
         else:
             self.nMatvec += 1
         return self.matvec(x)
 
+    def _matmat(self, X):
+        if self.transposed:
+            self.nMatvecTransp += X.shape[1]
+        else:
+            self.nMatvec += X.shape[1]
+        return self.matmat_fun(X)
+
+
+
+class JacobianOperator(SimpleLinearOperator):
+    """
+    The Jacobian of the constraints of a nonlinear program `nlp` at `x` as a
+    linear operator. Products with the operator and its transpose are
+    obtained from `nlp.jprod` and `nlp.jtprod` so that the Jacobian is never
+    assembled. The point `x` is copied on construction.
+    """
+
+    def __init__(self, nlp, x, **kwargs):
+        self.nlp = nlp
+        self.x = x.copy()
+        SimpleLinearOperator.__init__(self, nlp.n, nlp.m,
+                                      lambda v: self.nlp.jprod(self.x, v),
+                                      matvec_transp=lambda w: \
+                                                 self.nlp.jtprod(self.x, w),
+                                      **kwargs)
+
 
 
 class PysparseLinearOperator(LinearOperator):
@@ -128,6 +303,14 @@ class PysparseLinearOperator(LinearOperator):
     A linear operator constructed from any object implementing either `__mul__`
     or `matvec` and either `__rmul__` or `matvec_transp`, such as a `ll_mat`
     object or a `PysparseMatrix` object.
+
+    If the object also implements `find`, as sparse matrices do, the product
+    with a two-dimensional array multiplies the matrix with all the columns
+    in a single pass over its elements instead of one sparse matrix-vector
+    product per column. The elements are sorted on the first such product
+    and the sort order is reused afterwards as long as the sparsity pattern
+    of the matrix is unchanged. The values are read again at each product,
+    so that the matrix may be updated in place.
     """
 
     def __init__(self, A, symmetric=False, **kwargs):
@@ -136,6 +319,7 @@ class PysparseLinearOperator(LinearOperator):
         self.symmetric = symmetric
         self.transposed = kwargs.get('transposed', False)
         transpose_of = kwargs.get('transpose_of', None)
+        self._products = {}    # Sort orders of the elements used by matmat
 
         if self.transposed:
 
@@ -144,7 +328,9 @@ class PysparseLinearOperator(LinearOperator):
             #if hasattr(A, '__rmul__'):
             #    self.__mul__ = A.__rmul__
             #else:
-            self.__mul__ = self._rmul
+            self._apply = self._rmul
+            self._apply_many = self._rmul_many
+            self._apply_into = self._rmul_into
 
         else:
 
@@ -152,7 +338,9 @@ class PysparseLinearOperator(LinearOperator):
             #if hasattr(A, '__mul__'):
             #    self.__mul__ = A.__mul__
             #else:
-            self.__mul__ = self._mul
+            self._apply = self._mul
+            self._apply_many = self._mul_many
+            self._apply_into = self._mul_into
 
         if self.logger is not None:
             self.logger.info('New linop has transposed='+str(self.transposed))
@@ -213,8 +401,445 @@ class PysparseLinearOperator(LinearOperator):
         return ATy
 
 
-# It would be much better if we could add and multiply linear operators.
-# In the meantime, here is a patch.
+    def _mul_into(self, x, out):
+        A = getattr(self.A, 'matrix', self.A)
+        if not hasattr(A, 'matvec'):
+            return LinearOperator._apply_into(self, x, out)
+        if self.transposed:
+            self.nMatvecTransp += 1
+        else:
+            self.nMatvec += 1
+        A.matvec(x, out)
+        return out
+
+
+    def _rmul_into(self, y, out):
+        A = getattr(self.A, 'matrix', self.A)
+        if not hasattr(A, 'matvec_transp'):
+            return LinearOperator._apply_into(self, y, out)
+        if self.transposed:
+            self.nMatvec += 1
+        else:
+            self.nMatvecTransp += 1
+        A.matvec_transp(y, out)
+        return out
+
+
+    def _coord_product(self, transp):
+        # Return the pair (product, val), where `val` holds the current
+        # values of the elements of A and `product` their pattern, or that of
+        # the transpose of A if `transp` is True, sorted for matmat products
+        # with both triangles of symmetric matrices. Return None if A does
+        # not implement find(). The pattern is sorted again only if it
+        # changed since the last call.
+        A = getattr(self.A, 'matrix', self.A)
+        if not hasattr(A, 'find'): return None
+        (val, irow, jcol) = A.find()
+        val = np.asarray(val, dtype=np.float)
+        (product, pirow, pjcol) = self._products.get(transp, (None,) * 3)
+        if product is None or not (np.array_equal(irow, pirow) and
+                                   np.array_equal(jcol, pjcol)):
+            rows = np.asarray(irow, dtype=np.intp)
+            cols = np.asarray(jcol, dtype=np.intp)
+            if transp: (rows, cols) = (cols, rows)
+            product = _CoordProduct(self.nargout, rows, cols,
+                                    sym=getattr(A, 'issym', False))
+            self._products[transp] = (product, irow, jcol)
+        return (product, val)
+
+
+    def _mul_many(self, X):
+        coord = self._coord_product(False)
+        if coord is None:
+            return LinearOperator._apply_many(self, X)
+        if self.transposed:
+            self.nMatvecTransp += X.shape[1]
+        else:
+            self.nMatvec += X.shape[1]
+        (product, val) = coord
+        return product.matmat(val, X)
+
+
+    def _rmul_many(self, Y):
+        coord = self._coord_product(True)
+        if coord is None:
+            return LinearOperator._apply_many(self, Y)
+        if self.transposed:
+            self.nMatvec += Y.shape[1]
+        else:
+            self.nMatvecTransp += Y.shape[1]
+        (product, val) = coord
+        return product.matmat(val, Y)
+
+
+class IdentityOperator(LinearOperator):
+    "The identity operator of order `n`."
+
+    def __init__(self, n, **kwargs):
+        LinearOperator.__init__(self, n, n, **kwargs)
+        self.symmetric = True
+        self.T = self
+
+    def _apply(self, x):
+        self.nMatvec += 1
+        return x.copy()
+
+    def _apply_into(self, x, out):
+        self.nMatvec += 1
+        out[:] = x
+        return out
+
+    def _apply_many(self, X):
+        self.nMatvec += X.shape[1]
+        return X.copy()
+
+
+
+class DiagonalOperator(LinearOperator):
+    "The diagonal operator whose diagonal elements are those of `diag`."
+
+    def __init__(self, diag, **kwargs):
+        self.diag = np.asarray(diag)
+        n = self.diag.shape[0]
+        LinearOperator.__init__(self, n, n, **kwargs)
+        self.symmetric = True
+        self.T = self
+
+    def _apply(self, x):
+        self.nMatvec += 1
+        return self.diag * x
+
+    def _apply_into(self, x, out):
+        self.nMatvec += 1
+        return np.multiply(self.diag, x, out)
+
+    def _apply_many(self, X):
+        self.nMatvec += X.shape[1]
+        return self.diag[:, np.newaxis] * X
+
+
+
+def _transposes(ops):
+    "Return the transposes of `ops`, or `None` if one of them is missing."
+    T = [getattr(op, 'T', None) for op in ops]
+    if None in T: return None
+    return T
+
+
+class SumLinearOperator(LinearOperator):
+    """
+    The linear combination of the operators `ops[k][1]` with coefficients
+    `ops[k][0]`, given as a list of pairs. Nested linear combinations are
+    flattened so that a product with a vector allocates its result and uses
+    a single work vector, allocated once, whatever the number of terms.
+    Operators are usually combined with `+`, `-` and `*` rather than by
+    instantiating this class directly.
+    """
+
+    def __init__(self, ops, **kwargs):
+        terms = []
+        for (alpha, op) in ops:
+            if not isinstance(op, LinearOperator):
+                raise ValueError, 'Can only combine linear operators'
+            if isinstance(op, SumLinearOperator):
+                terms.extend([(alpha * beta, A) for (beta, A) in op.terms])
+            else:
+                terms.append((alpha, op))
+        (nargout, nargin) = terms[0][1].shape
+        for (alpha, op) in terms:
+            if op.shape != (nargout, nargin):
+                raise ValueError, 'Cannot combine operators of shapes ' + \
+                    str(terms[0][1].shape) + ' and ' + str(op.shape)
+        LinearOperator.__init__(self, nargin, nargout, **kwargs)
+        self.terms = terms
+        self.symmetric = all([getattr(op, 'symmetric', False)
+                              for (alpha, op) in terms])
+        self._work = np.empty(nargout)
+
+        transpose_of = kwargs.get('transpose_of', None)
+        if self.symmetric:
+            self.T = self
+        elif transpose_of is not None:
+            self.T = transpose_of
+        else:
+            T = _transposes([op for (alpha, op) in terms])
+            if T is None:
+                self.T = None
+            else:
+                coefs = [alpha for (alpha, op) in terms]
+                self.T = SumLinearOperator(zip(coefs, T), transpose_of=self)
+
+    def _apply(self, x):
+        self.nMatvec += 1
+        (alpha, op) = self.terms[0]
+        y = np.multiply(op * x, alpha)
+        for (alpha, op) in self.terms[1:]:
+            if alpha == 1.0:
+                y += op * x
+            else:
+                np.multiply(op * x, alpha, self._work)
+                y += self._work
+        return y
+
+    def _apply_into(self, x, out):
+        self.nMatvec += 1
+        (alpha, op) = self.terms[0]
+        op.dot(x, out=out)
+        if alpha != 1.0: out *= alpha
+        for (alpha, op) in self.terms[1:]:
+            op.dot(x, out=self._work)
+            if alpha != 1.0: self._work *= alpha
+            out += self._work
+        return out
+
+    def _apply_many(self, X):
+        self.nMatvec += X.shape[1]
+        (alpha, op) = self.terms[0]
+        Y = np.multiply(op.matmat(X), alpha)
+        for (alpha, op) in self.terms[1:]:
+            if alpha == 1.0:
+                Y += op.matmat(X)
+            else:
+                Y += alpha * op.matmat(X)
+        return Y
+
+
+
+class ComposedLinearOperator(LinearOperator):
+    """
+    The product `ops[0] * ops[1] * ... * ops[-1]` of the operators in the
+    list `ops`, applied from right to left. Nested products are flattened.
+    Operators are usually multiplied with `*` rather than by instantiating
+    this class directly.
+    """
+
+    def __init__(self, ops, **kwargs):
+        factors = []
+        for op in ops:
+            if isinstance(op, ComposedLinearOperator):
+                factors.extend(op.factors)
+            else:
+                factors.append(op)
+        for k in xrange(len(factors)-1):
+            if factors[k].nargin != factors[k+1].nargout:
+                raise ValueError, 'Cannot multiply operators of shapes ' + \
+                    str(factors[k].shape) + ' and ' + str(factors[k+1].shape)
+        LinearOperator.__init__(self, factors[-1].nargin, factors[0].nargout,
+                                **kwargs)
+        self.factors = factors
+        self.symmetric = False
+        self._bufs = None
+
+        transpose_of = kwargs.get('transpose_of', None)
+        if transpose_of is not None:
+            self.T = transpose_of
+        else:
+            T = _transposes(factors)
+            if T is None:
+                self.T = None
+            else:
+                T.reverse()
+                self.T = ComposedLinearOperator(T, transpose_of=self)
+
+    def _apply(self, x):
+        self.nMatvec += 1
+        y = x
+        for op in reversed(self.factors):
+            y = op * y
+        return y
+
+    def _apply_into(self, x, out):
+        # Intermediate products are stored into work vectors allocated on
+        # the first call.
+        self.nMatvec += 1
+        if self._bufs is None:
+            self._bufs = [np.empty(op.nargout) for op in self.factors[1:]]
+        y = x
+        for k in xrange(len(self.factors)-1, 0, -1):
+            y = self.factors[k].dot(y, out=self._bufs[k-1])
+        return self.factors[0].dot(y, out=out)
+
+    def _apply_many(self, X):
+        self.nMatvec += X.shape[1]
+        Y = X
+        for op in reversed(self.factors):
+            Y = op.matmat(Y)
+        return Y
+
+
+
+class BlockLinearOperator(LinearOperator):
+    """
+    A linear operator defined by blocks, given as a list of rows, each row
+    being a list of linear operators. All blocks of a row must have the same
+    number of rows and all blocks of a column the same number of columns.
+    A block may be `None` to indicate a zero block, provided each row and
+    each column has at least one nonzero block.
+
+    If `symmetric` is `True`, only the blocks on and above the diagonal are
+    given: `blocks[i]` lists the blocks (i,i), (i,i+1), ... and the block
+    (j,i) is the transpose of the block (i,j). For instance, the saddle-point
+    operator
+
+    |    [ H   J' ]
+    |    [ J  -D  ]
+
+    is obtained as ``BlockLinearOperator([[H, J.T], [-D]], symmetric=True)``.
+
+    The product with a vector allocates its result only. The products of
+    the blocks with the pieces of the vector, which are views, are
+    accumulated in place into the pieces of the result.
+    """
+
+    def __init__(self, blocks, symmetric=False, **kwargs):
+        if symmetric:
+            nb = len(blocks)
+            full = [[None] * nb for i in xrange(nb)]
+            for i in xrange(nb):
+                if len(blocks[i]) != nb - i:
+                    raise ValueError, 'Row %d must have %d blocks' % (i, nb-i)
+                for j in xrange(i, nb):
+                    full[i][j] = blocks[i][j-i]
+                    if j > i and full[i][j] is not None:
+                        if getattr(full[i][j], 'T', None) is None:
+                            raise ValueError, 'Off-diagonal blocks must ' + \
+                                'have a transpose'
+                        full[j][i] = full[i][j].T
+            blocks = full
+
+        nrow = [None] * len(blocks) ; ncol = [None] * len(blocks[0])
+        for (i, row) in enumerate(blocks):
+            if len(row) != len(ncol):
+                raise ValueError, 'Rows must have the same number of blocks'
+            for (j, op) in enumerate(row):
+                if op is None: continue
+                for (sizes, k, s) in [(nrow, i, op.nargout),
+                                      (ncol, j, op.nargin)]:
+                    if sizes[k] is None:
+                        sizes[k] = s
+                    elif sizes[k] != s:
+                        raise ValueError, 'Incompatible block (%d,%d)' % (i,j)
+        if None in nrow or None in ncol:
+            raise ValueError, 'Each block row and column must be nonzero'
+
+        self.rowptr = np.concatenate(([0], np.cumsum(nrow))).astype(int)
+        self.colptr = np.concatenate(([0], np.cumsum(ncol))).astype(int)
+        LinearOperator.__init__(self, self.colptr[-1], self.rowptr[-1],
+                                **kwargs)
+        self.blocks = blocks
+        self.symmetric = symmetric
+        self._work = np.empty(max(nrow))
+
+        transpose_of = kwargs.get('transpose_of', None)
+        if symmetric:
+            self.T = self
+        elif transpose_of is not None:
+            self.T = transpose_of
+        else:
+            ops = [op for row in blocks for op in row if op is not None]
+            if _transposes(ops) is None:
+                self.T = None
+            else:
+                Tblocks = [[None if row[j] is None else row[j].T
+                            for row in blocks] for j in xrange(len(ncol))]
+                self.T = BlockLinearOperator(Tblocks, transpose_of=self)
+
+    def _apply(self, x):
+        self.nMatvec += 1
+        rp = self.rowptr ; cp = self.colptr
+        y = np.zeros(self.nargout)
+        for (i, row) in enumerate(self.blocks):
+            yi = y[rp[i]:rp[i+1]]
+            for (j, op) in enumerate(row):
+                if op is not None:
+                    yi += op * x[cp[j]:cp[j+1]]
+        return y
+
+    def _apply_into(self, x, out):
+        self.nMatvec += 1
+        rp = self.rowptr ; cp = self.colptr
+        for (i, row) in enumerate(self.blocks):
+            yi = out[rp[i]:rp[i+1]]
+            work = self._work[:rp[i+1]-rp[i]]
+            first = True
+            for (j, op) in enumerate(row):
+                if op is None: continue
+                if first:
+                    op.dot(x[cp[j]:cp[j+1]], out=yi)
+                    first = False
+                else:
+                    op.dot(x[cp[j]:cp[j+1]], out=work)
+                    yi += work
+        return out
+
+    def _apply_many(self, X):
+        self.nMatvec += X.shape[1]
+        rp = self.rowptr ; cp = self.colptr
+        Y = np.zeros((self.nargout, X.shape[1]))
+        for (i, row) in enumerate(self.blocks):
+            Yi = Y[rp[i]:rp[i+1]]
+            for (j, op) in enumerate(row):
+                if op is not None:
+                    Yi += op.matmat(X[cp[j]:cp[j+1]])
+        return Y
+
+
+
+class BlockDiagonalLinearOperator(LinearOperator):
+    """
+    The block-diagonal linear operator whose diagonal blocks are the linear
+    operators in the list `blocks`. The product with a vector allocates its
+    result only.
+    """
+
+    def __init__(self, blocks, **kwargs):
+        nrow = [op.nargout for op in blocks]
+        ncol = [op.nargin for op in blocks]
+        self.rowptr = np.concatenate(([0], np.cumsum(nrow))).astype(int)
+        self.colptr = np.concatenate(([0], np.cumsum(ncol))).astype(int)
+        LinearOperator.__init__(self, self.colptr[-1], self.rowptr[-1],
+                                **kwargs)
+        self.blocks = blocks
+        self.symmetric = all([getattr(op, 'symmetric', False)
+                              for op in blocks])
+
+        transpose_of = kwargs.get('transpose_of', None)
+        if self.symmetric:
+            self.T = self
+        elif transpose_of is not None:
+            self.T = transpose_of
+        else:
+            T = _transposes(blocks)
+            if T is None:
+                self.T = None
+            else:
+                self.T = BlockDiagonalLinearOperator(T, transpose_of=self)
+
+    def _apply(self, x):
+        self.nMatvec += 1
+        rp = self.rowptr ; cp = self.colptr
+        y = np.empty(self.nargout)
+        for (i, op) in enumerate(self.blocks):
+            y[rp[i]:rp[i+1]] = op * x[cp[i]:cp[i+1]]
+        return y
+
+    def _apply_into(self, x, out):
+        self.nMatvec += 1
+        rp = self.rowptr ; cp = self.colptr
+        for (i, op) in enumerate(self.blocks):
+            op.dot(x[cp[i]:cp[i+1]], out=out[rp[i]:rp[i+1]])
+        return out
+
+    def _apply_many(self, X):
+        self.nMatvec += X.shape[1]
+        rp = self.rowptr ; cp = self.colptr
+        Y = np.empty((self.nargout, X.shape[1]))
+        for (i, op) in enumerate(self.blocks):
+            Y[rp[i]:rp[i+1]] = op.matmat(X[cp[i]:cp[i+1]])
+        return Y
+
+
+
 class SquaredLinearOperator(LinearOperator):
     """
     Given a linear operator ``A``, build the linear operator ``A.T * A``. If
@@ -245,10 +870,15 @@ class SquaredLinearOperator(LinearOperator):
         else:
             self.A = PysparseLinearOperator(A, transposed=False)
         self.symmetric = True
+        self._work = None
         if self.transposed:
-            self.__mul__ = self._rmul
+            self._apply = self._rmul
+            self._apply_many = self._rmul_many
+            self._apply_into = self._rmul_into
         else:
-            self.__mul__ = self._mul
+            self._apply = self._mul
+            self._apply_many = self._mul_many
+            self._apply_into = self._mul_into
         if self.logger is not None:
             self.logger.info('New squared operator with shape '+str(self.shape))
         self.T = self
@@ -264,6 +894,28 @@ class SquaredLinearOperator(LinearOperator):
         return self.A * (self.A.T * x)
 
 
+    def _mul_into(self, x, out):
+        self.nMatvec += 1
+        if self._work is None: self._work = np.empty(self.A.nargout)
+        return self.A.T.dot(self.A.dot(x, out=self._work), out=out)
+
+
+    def _rmul_into(self, x, out):
+        self.nMatvecTransp += 1
+        if self._work is None: self._work = np.empty(self.A.nargin)
+        return self.A.dot(self.A.T.dot(x, out=self._work), out=out)
+
+
+    def _mul_many(self, X):
+        self.nMatvec += X.shape[1]
+        return self.A.T.matmat(self.A.matmat(X))
+
+
+    def _rmul_many(self, X):
+        self.nMatvecTransp += X.shape[1]
+        return self.A.matmat(self.A.T.matmat(X))
+
+
 
 if __name__ == '__main__':
     from pysparse.sparse.pysparseMatrix import PysparseMatrix as sp
@@ -312,6 +964,7 @@ if __name__ == '__main__':
     print 'op.T.T is op : ', (op.T.T is op)
     print
     print 'Solving a constrained least-squares problem with LSQR:'
+    op = JacobianOperator(nlp, nlp.x0)
     lsqr = LSQRFramework(op)
     lsqr.solve(np.random.random(nlp.m), show=True)
     print
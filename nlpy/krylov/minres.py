@@ -13,8 +13,13 @@ available at http://www.stanford.edu/group/SOL/software/minres.htm.
 .. moduleauthor:: D. Orban <dominique.orban@gerad.ca>
 """
 
-from numpy import zeros, dot, empty
+from numpy import dot, empty
 from math import sqrt
+import numpy
+from pysparse.sparse.pysparseMatrix import PysparseMatrix
+from nlpy.linalg.sils import Sils
+from nlpy.krylov.linop import SimpleLinearOperator
+from nlpy.krylov.workspace import KrylovWorkspace, axpy, matvec
 
 class Minres:
     """
@@ -39,6 +44,15 @@ class Minres:
         itnlim    maximum number of iterations                         (5n)
         rtol      relative stopping tolerance                          (1.0e-12)
 
+    The keyword `workspace` of the constructor may give a `KrylovWorkspace`
+    holding the vectors of the method, to be reused by successive solves.
+    Products with A are stored into a work vector and the Lanczos vectors
+    are updated in place, so that iterations allocate no vector, except for
+    products with A or with the preconditioner that do not support an output
+    argument. The solution `x` then is a work vector, overwritten by the next
+    solve that uses the same workspace. Without a workspace, `Minres` uses a
+    private one and `x` is a copy, left unchanged by subsequent solves.
+
     If precon is given, it must define a positive-definite preconditioner
     M = C*C'. The precon operator must be such that
 
@@ -78,6 +92,8 @@ class Minres:
 
         self.A = A
         self.x = None
+        self.workspace = kwargs.get('workspace', None)
+        self._own_workspace = self.workspace is None
 
         #  Initialize
         self.first = 'Enter minres.   '
@@ -117,7 +133,9 @@ class Minres:
 
         A = self.A
         n = b.shape[0]
-        x = zeros(n)
+        if self.workspace is None: self.workspace = KrylovWorkspace(n)
+        ws = self.workspace
+        x = ws.zeros('x', n)
 
         # Read keyword arguments
         precon = kwargs.get('precon', None)
@@ -145,11 +163,12 @@ class Minres:
         # y  =  beta1 P' v1,  where  P = C**(-1).
         # v is really P' v1.
         #------------------------------------------------------------------
-        r1 = b
+        r1 = ws.get('r1', n) ; r1[:] = b
+        yA = ws.get('y', n)         # Products with A are stored into yA.
         if precon is not None:
             y = precon(b)
         else:
-            y = b.copy()
+            y = yA ; y[:] = b
         beta1 = dot(b,y)
 
         #  Test for an indefinite preconditioner.
@@ -200,9 +219,11 @@ class Minres:
         qrnorm = beta1;   phibar = beta1;   rhs1   = beta1;   Arnorm = 0.0
         rhs2   = 0.0;     tnorm2 = 0.0;     ynorm2 = 0.0
         cs     = -1.0;    sn     = 0.0
-        w  = zeros(n)
-        w2 = zeros(n)
-        r2 = r1.copy()
+        w  = ws.zeros('w', n)
+        w1 = ws.get('w1', n)
+        w2 = ws.zeros('w2', n)
+        r2 = ws.get('r2', n) ; r2[:] = r1
+        v = ws.get('v', n) ; work = ws.get('work', n)
 
         if show:
             print ' '*2
@@ -231,18 +252,19 @@ class Minres:
                 # .... more description needed.
                 # -------------------------------------------------------------
                 s = 1.0/beta                # Normalize previous vector (in y).
-                v = s*y                     # v = vk if P = I
+                numpy.multiply(y, s, v)     # v = vk if P = I
 
-                y = A * v   #self.applyA(v,y)
-                y -= shift*v  #y = (- shift)*v + y
+                y = matvec(A, v, yA)        # y = A * v
+                if shift != 0.0:
+                    axpy(-shift, v, y, work)  # y = (- shift)*v + y
 
                 if itn >= 2:
-                    y = y - (beta/oldb)*r1
+                    axpy(-beta/oldb, r1, y, work)
 
                 alfa = dot(v,y)           # alphak
-                y    = (- alfa/beta)*r2 + y
-                r1   = r2.copy()
-                r2   = y.copy()
+                axpy(-alfa/beta, r2, y, work)
+                (r1, r2) = (r2, r1)         # r1 = r2
+                r2[:] = y                   # r2 = y
                 if precon is not None: y = precon(r2)
                 oldb   = beta               # oldb = betak
                 beta   = dot(r2,y)          # beta = betak+1^2
@@ -288,10 +310,12 @@ class Minres:
                 # Update  x.
 
                 denom = 1.0/gamma
-                w1    = w2.copy()
-                w2    = w.copy()
-                w     = (v - oldeps*w1 - delta*w2) * denom
-                x    += phi*w  #x     = x  +  phi*w
+                (w1, w2, w) = (w2, w, w1)   # Rotate the buffers: w1 = w2,
+                numpy.multiply(w1, -oldeps, w)  # w2 = w and w is free.
+                axpy(-delta, w2, w, work)
+                w    += v
+                w    *= denom               # w = (v-oldeps*w1-delta*w2)*denom
+                axpy(phi, w, x, work)       # x = x + phi*w
 
                 # Go round again.
 
@@ -375,7 +399,8 @@ class Minres:
             print last+' Arnorm  =  %12.4e' % Arnorm
             print last+self.msg[istop+1]
 
-        self.x = x
+        # A private workspace is reused by the next solve: copy the solution.
+        self.x = x.copy() if self._own_workspace else x
         self.istop = istop
         self.itn = itn
         self.rnorm = rnorm
@@ -388,3 +413,134 @@ class Minres:
     # -----------------------------------------------------------------------
     # End function minres
     # -----------------------------------------------------------------------
+
+
+class MinresContext(Sils):
+    """
+    A context with the interface of the factorizations of :mod:`nlpy.linalg`
+    that solves symmetric systems with Minres instead of factorizing them.
+    It is meant as a fallback when a factorization would exceed the memory
+    available, see :class:`nlpy.linalg.sils.FactorizationMemoryError`, since
+    it only stores the matrix and a few vectors.
+
+    The preconditioner is the diagonal matrix whose elements are the absolute
+    values of the diagonal elements of the matrix, or 1 when those vanish.
+    This preconditioner is positive definite, as required by Minres, and is
+    effective on symmetric quasi-definite matrices with a dominant diagonal,
+    such as the regularized systems of interior-point methods.
+
+    No inertia is computed: :attr:`neig` remains 0 and the matrix is assumed
+    to have full rank.
+
+    Optional keyword arguments are:
+
+        rtol      relative stopping tolerance of Minres          (1.0e-10)
+        itnlim    maximum number of Minres iterations per solve  (5n)
+
+    Example:
+
+    >>> K = MinresContext(A)
+    >>> K.solve(rhs)
+    >>> print K.x, K.residual
+    """
+
+    def __init__(self, A, factorize=True, **kwargs):
+        if isinstance(A, PysparseMatrix):
+            thisA = A.matrix
+        else:
+            thisA = A
+
+        Sils.__init__(self, thisA, **kwargs)
+        self.rtol = kwargs.get('rtol', 1.0e-10)
+        self.itnlim = kwargs.get('itnlim', 5 * self.n)
+        self.nMinresIter = 0   # Total number of Minres iterations
+        self.workspace = KrylovWorkspace(self.n)  # Shared by all solves
+        self.factorized = False
+        if factorize: self.factorize(thisA)
+        return
+
+    def factorize(self, A):
+        """
+        Record the matrix A and its diagonal preconditioner. No factorization
+        takes place.
+        """
+        if isinstance(A, PysparseMatrix):
+            thisA = A.matrix
+        else:
+            thisA = A
+
+        self.A = thisA
+        (val, irow, jcol) = thisA.find()
+        diag = empty(self.n) ; diag.fill(1.0)
+        ii = (irow == jcol)
+        diag[irow[ii]] = abs(val[ii])
+        diag[diag == 0.0] = 1.0
+        self.diag = diag
+        self.rank = self.n
+        self.isFullRank = True
+        self.factorized = True
+        self.nfact += 1
+        return
+
+    def _matvec(self, x):
+        y = empty(self.n)
+        self.A.matvec(x, y)
+        return y
+
+    def _solve_one(self, b):
+        op = SimpleLinearOperator(self.n, self.n, self._matvec,
+                                  symmetric=True)
+        K = Minres(op, workspace=self.workspace)
+        K.solve(numpy.array(b, dtype=numpy.float),
+                precon=lambda y: y / self.diag, show=False,
+                rtol=self.rtol, itnlim=self.itnlim)
+        self.nMinresIter += K.itn
+        return K.x
+
+    def solve(self, b, get_resid=True, **kwargs):
+        """
+        solve(b) solves the linear system of equations Ax = b with Minres.
+        The solution will be found in self.x and residual in self.residual.
+
+        If b is an (n, k) array, the k systems are solved one after the other
+        and the (n, k) solution is returned. The residuals are then stored in
+        self.residuals and the keywords `nitref` and `tol` request iterative
+        refinement as in :meth:`refine`.
+        """
+        if numpy.ndim(b) == 2:
+            nitref = kwargs.pop('nitref', 0)
+            X = numpy.empty(b.shape) ; R = numpy.empty(b.shape)
+            for j in xrange(b.shape[1]):
+                X[:,j] = self._solve_one(b[:,j])
+                R[:,j] = b[:,j] - self._matvec(X[:,j])
+                if nitref > 0:
+                    self._refine_column(X[:,j], R[:,j], b[:,j], nitref,
+                                        **kwargs)
+            self.residuals = R
+            return X
+        self.x[:] = self._solve_one(b)
+        if get_resid: self.residual[:] = b - self._matvec(self.x)
+        return None
+
+    def refine(self, b, nitref=3, tol=1.0e-8, **kwargs):
+        """
+        refine(b, tol, nitref) performs iterative refinement if necessary
+        until the scaled residual norm ||b-Ax||/(1+||b||) falls below the
+        threshold 'tol' or until nitref steps are taken. Each step solves
+        for a correction with Minres.
+        """
+        self._refine_column(self.x, self.residual, b, nitref, tol)
+        return None
+
+    def _refine_column(self, x, r, b, nitref, tol=1.0e-8, **kwargs):
+        bnorm = 1.0 + numpy.linalg.norm(b, ord=numpy.inf)
+        r[:] = b - self._matvec(x)
+        for k in xrange(nitref):
+            if numpy.linalg.norm(r, ord=numpy.inf) <= tol * bnorm: break
+            x += self._solve_one(r)
+            r[:] = b - self._matvec(x)
+        return None
+
+    def fetch_perm(self):
+        "No permutation is used: return the identity, with 1-based indices."
+        return range(1, self.n + 1)
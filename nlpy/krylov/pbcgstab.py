@@ -297,6 +297,7 @@ class ProjectedBCGSTAB( ProjectedKrylov ):
             self.rhs[n:] = 0.0
             self.Proj.solve( self.rhs )
             self.v = self.Proj.x[n:].copy()
+            self.ReleaseProjector()
 
         self.t_solve = cputime() - self.t_solve
         self.converged = (nMatvec < self.nMatvecMax)
@@ -11,6 +11,7 @@ truncated preconditioned conjugate gradient algorithm as described in
 
 import numpy as np
 from math import sqrt
+from nlpy.krylov.workspace import KrylovWorkspace, axpy, matvec
 import sys
 
 __docformat__ = 'restructuredtext'
@@ -48,11 +49,23 @@ class TruncatedCG:
         where g0 is the preconditioned norm of the initial gradient (or the
         Euclidian norm if no preconditioner is given), or as soon as the
         iterates cross the boundary of the trust region.
+
+        The keyword `workspace` may give a :class:`KrylovWorkspace` of size n
+        holding the vectors of the method. Giving the same workspace to the
+        solvers of successive subproblems of the same size avoids allocating
+        them again. Products with `H` are stored into a work vector and
+        vectors are updated in place, so that iterations allocate no vector,
+        except for the products with `H` and with the preconditioner that do
+        not support an output argument. The step and the direction `dir`
+        then are work vectors, overwritten by the next solve.
         """
 
         self.H = H
         self.g = g
         self.n = len(g)
+        self.workspace = kwargs.get('workspace', None)
+        if self.workspace is None:
+            self.workspace = KrylovWorkspace(self.n)
 
         self.prefix = 'Pcg: '
         self.name = 'Truncated CG'
@@ -63,6 +76,10 @@ class TruncatedCG:
         self.stepNorm = 0.0
         self.niter = 0
         self.dir = None
+        self.m = None             # Model value, set by resolve()
+        self._path = None         # Directions, steplengths and curvatures
+        self._path_complete = False
+        self._path_status = None
 
         # Formats for display
         self.hd_fmt = ' %-5s  %9s  %8s\n'
@@ -95,6 +112,12 @@ class TruncatedCG:
         sigma /= pp
         return sigma
 
+    def _release_path(self):
+        "Free the directions stored in the workspace by previous solves."
+        k = 1
+        while self.workspace.release('path%d' % k): k += 1
+        self._path = None
+
     def Solve(self, **kwargs):
         """
         Solve the trust-region subproblem.
@@ -106,7 +129,19 @@ class TruncatedCG:
           :abstol:     absolute stopping tolerance (default: 1.0e-8),
           :reltol:     relative stopping tolerance (default: 1.0e-6),
           :maxiter:    maximum number of iterations (default: 2n),
-          :prec:       a user-defined preconditioner.
+          :prec:       a user-defined preconditioner,
+          :store_path: keep the search directions, steplengths and
+                       curvatures, so that :meth:`resolve` can recover the
+                       solution for a smaller radius (default: False),
+          :max_path:   maximum number of directions stored (default: 100).
+
+        The stored directions are vectors of the workspace, one per
+        iteration, reused by subsequent solves. At most `max_path` of them
+        are stored, i.e., `max_path` vectors of size n. When the iterations
+        go on past that number, :meth:`resolve` only recovers steps that
+        reach the boundary along the stored directions, and fails otherwise
+        so that a new solve is performed. A solve that does not store its
+        path frees the directions stored by a previous solve.
         """
 
         radius  = kwargs.get('radius', None)
@@ -115,10 +150,13 @@ class TruncatedCG:
         maxiter = kwargs.get('maxiter', 2*self.n)
         prec    = kwargs.get('prec', lambda v: v)
         debug   = kwargs.get('debug', False)
+        store_path = kwargs.get('store_path', False)
+        max_path = kwargs.get('max_path', 100)
 
         n = self.n
         g = self.g
         H = self.H
+        ws = self.workspace
 
         # Initialization
         y = prec(g)
@@ -133,12 +171,16 @@ class TruncatedCG:
 
         stopTol = max(abstol, reltol * sqrtry)
 
-        s = np.zeros(n) ; snorm2 = 0.0
+        s = ws.zeros('s') ; snorm2 = 0.0
+        Hp = ws.get('Hp') ; work = ws.get('work')
 
         # Initialize r as a copy of g not to alter the original g
-        r = g.copy()                 # r = g + H s0 = g
-        p = -y                       # p = - preconditioned residual
+        r = ws.get('r') ; r[:] = g        # r = g + H s0 = g
+        p = ws.get('p') ; np.negative(y, p)  # p = - preconditioned residual
         k = 0
+        if not store_path: self._release_path()
+        self._path = [] if store_path else None
+        path_truncated = False
 
         onBoundary = False
         infDescent = False
@@ -151,9 +193,18 @@ class TruncatedCG:
                 not onBoundary and not infDescent:
 
             k += 1
-            Hp  = H * p
+            matvec(H, p, Hp)
             pHp = np.dot(p, Hp)
 
+            if store_path and k > max_path:
+                path_truncated = True
+            elif store_path:
+                # Record p, the CG steplength (None if the curvature is not
+                # positive) and the slope and curvature of the model along p.
+                pk = ws.get('path%d' % k) ; pk[:] = p
+                alpha_k = ry/pHp if pHp > 0 else None
+                self._path.append((pk, alpha_k, np.dot(r, p), pHp))
+
             if debug:
                 self._write(self.fmt % (k, ry, pHp))
 
@@ -174,19 +225,19 @@ class TruncatedCG:
 
             if radius is not None and (pHp <= 0 or alpha > sigma):
                 # p leads past the trust-region boundary. Move to the boundary.
-                s += sigma * p
+                axpy(sigma, p, s, work)
                 snorm2 = radius*radius
                 self.status = 'on boundary (sigma = %g)' % sigma
                 onBoundary = True
                 continue
 
             # Move to next iterate.
-            s += alpha * p
-            r += alpha * Hp
+            axpy(alpha, p, s, work)
+            axpy(alpha, Hp, r, work)
             y = prec(r)
             ry_next = np.dot(r, y)
             beta = ry_next/ry
-            p = -y + beta * p
+            p *= beta ; p -= y          # p = -y + beta * p
             ry = ry_next
 
             try:
@@ -211,8 +262,72 @@ class TruncatedCG:
         self.stepNorm = sqrt(snorm2)
         self.onBoundary = onBoundary
         self.infDescent = infDescent
+        self.m = None
+        self._path_complete = not (onBoundary or infDescent or path_truncated)
+        self._path_status = self.status
         return
 
+    def resolve(self, radius):
+        """
+        Recover the solution of the subproblem with the trust-region radius
+        `radius` from the path stored by the last call to :meth:`Solve` with
+        `store_path=True`, without any product with `H`. Typically, `radius`
+        is smaller than the radius of that call, after the step was rejected.
+
+        The conjugate gradient iterates do not depend on the radius until
+        they leave the trust region, so that the result is that of a new
+        call to :meth:`Solve` with the same other arguments: the step is the
+        first point of the path on the boundary, or the final iterate if the
+        path stays within the trust region. The model value at the step, in
+        :attr:`m`, is accumulated along the path from the curvatures stored
+        by :meth:`Solve`.
+
+        Return `True` if the step was recovered, and `False` if the stored
+        path leaves the trust region of the last solve, or ends because
+        `max_path` was reached, without crossing the boundary for `radius`.
+        :meth:`Solve` must then be called again and :attr:`step` is
+        undefined.
+
+        The step recovered is that of the tolerances of the last solve. A
+        caller that tightens the tolerance between the two calls should
+        solve again.
+        """
+        if self._path is None:
+            return False
+        ws = self.workspace
+        s = ws.zeros('s') ; snorm2 = 0.0
+        work = ws.get('work')
+        m = 0.0 ; k = 0
+        onBoundary = False
+
+        for (p, alpha, rp, pHp) in self._path:
+            k += 1
+            sigma = self.to_boundary(s, p, radius, ss=snorm2)
+            if alpha is None or alpha > sigma:
+                axpy(sigma, p, s, work)
+                m += sigma * rp + 0.5 * sigma * sigma * pHp
+                snorm2 = radius*radius
+                self.status = 'on boundary (sigma = %g)' % sigma
+                onBoundary = True
+                break
+            axpy(alpha, p, s, work)
+            m += alpha * rp + 0.5 * alpha * alpha * pHp
+            snorm2 = np.dot(s,s)
+
+        if not onBoundary:
+            if not self._path_complete:
+                return False
+            self.status = self._path_status
+
+        self.step = s
+        self.niter = k
+        self.stepNorm = sqrt(snorm2)
+        self.onBoundary = onBoundary
+        self.infDescent = False
+        self.dir = None
+        self.m = m
+        return True
+
 
 def model_value(H, g, s):
     # Return <g,s> + 1/2 <s,Hs>
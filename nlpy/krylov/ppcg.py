@@ -371,6 +371,7 @@ class ProjectedCG( ProjectedKrylov ):
             self.rhs[n:] = 0.0
             self.Proj.solve( self.rhs )
             self.v = self.Proj.x[n:].copy()
+            self.ReleaseProjector()
 
         self.t_solve = cputime() - self.t_solve
 
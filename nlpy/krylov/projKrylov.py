@@ -47,10 +47,8 @@ import numpy
 from pysparse.sparse import spmatrix   # To assemble the projection matrix
 from pysparse.sparse.pysparseMatrix import PysparseMatrix
 
-try:                            # To compute projections
-    from nlpy.linalg.pyma57 import PyMa57Context as LBLContext
-except:
-    from nlpy.linalg.pyma27 import PyMa27Context as LBLContext
+from nlpy.linalg.backends import LBLContext  # To compute projections
+from nlpy.linalg.cache import cached_factorization, release_factorization
 
 from nlpy.tools import norms
 from nlpy.tools.timing import cputime
@@ -116,6 +114,7 @@ class ProjectedKrylov:
 
         self.Proj = kwargs.get('Proj', None)
         self.factorized = (self.Proj != None) # Factorization already performed
+        self._owns_proj = False       # Proj was obtained by Factorize()
 
         # Initializations
         self.t_fact     = 0.0     # Timing of factorization phase
@@ -156,7 +155,10 @@ class ProjectedKrylov:
                 msg += '(size %-d, nnz = %-d)...\n' %  (P.shape[0],P.nnz)
                 self._write(msg)
         self.t_fact = cputime()
-        self.Proj = LBLContext(P)
+        # The factorization is checked out of the cache for the exclusive use
+        # of this solver until the end of Solve(). See ReleaseProjector().
+        self.Proj = cached_factorization(P, factory=LBLContext)
+        self._owns_proj = True
         self.t_fact = cputime() - self.t_fact
         if self.debug:
                 msg = ' done (%-5.2fs)\n' % self.t_fact
@@ -165,6 +167,23 @@ class ProjectedKrylov:
         return
 
 
+    def ReleaseProjector(self):
+        """
+        Hand the factorization of the projection matrix obtained by
+        :meth:`Factorize` back to the cache of factorizations, so that a
+        later solve with the same constraint matrix and preconditioner may
+        skip the factorization. Subclasses call this method at the end of
+        their `Solve()` method. A factorization given as `Proj` belongs to
+        the caller and is kept.
+        """
+        if self._owns_proj:
+            release_factorization(self.Proj)
+            self.Proj = None
+            self.factorized = False
+            self._owns_proj = False
+        return
+
+
     def CheckAccurate(self):
         """
         Make sure constraints are consistent and residual is satisfactory
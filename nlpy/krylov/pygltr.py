@@ -13,6 +13,11 @@ import sys
 
 __docformat__='restructuredtext'
 
+# GLTR keeps its data in a single Fortran structure, so that only the most
+# recently created context may be restarted. Contexts are numbered in order
+# of creation.
+_last_context = 0
+
 
 class PyGltrContext:
     """
@@ -60,9 +65,16 @@ class PyGltrContext:
     where M       is a preconditioner
           l       is an estimate of the Lagrange multipliers
           Norm()  is the M^{-1}-norm
+
+    After a successful solve, :meth:`resolve` solves the same subproblem
+    with a smaller radius, e.g., after a trust-region step was rejected,
+    from the tridiagonal matrix generated by the Lanczos process. GLTR keeps
+    a single set of internal data, so that only the most recently created
+    context may be resolved.
     """
 
     def __init__(self, g, **kwargs):
+        global _last_context
 
         self.n = g.shape[0]
 
@@ -96,6 +108,10 @@ class PyGltrContext:
         self.nc    = False   # Whether negative curvature was encountered
         self.ierr  = 0       # Return error code
 
+        _last_context += 1
+        self._id = _last_context
+        self._hessprod = None  # Products with H in the last solve
+
     def explicit_solve(self, H):
         """
         Solves the quadratic trust-region subproblem whose data was
@@ -114,6 +130,11 @@ class PyGltrContext:
         done = False
         tmp = numpy.empty(self.n)
 
+        def hessprod(v):
+            H.matvec(v, tmp)
+            return tmp
+        self._hessprod = hessprod
+
         if self.debug:
             sys.stderr.write(' PyGltr.explicit_solve() called with data\n')
             sys.stderr.write('   radius  reltol  abstol  itmax  litmax')
@@ -177,6 +198,7 @@ class PyGltrContext:
         """
 
         done = False
+        self._hessprod = hessprod
 
         if self.debug:
             sys.stderr.write(' PyGltr.implicit_solve() called with data\n')
@@ -223,3 +245,27 @@ class PyGltrContext:
         self.nc = nc
         self.ierr = ierr
         return
+
+    def resolve(self, radius):
+        """
+        Solve the subproblem again with the trust-region radius `radius`,
+        smaller than that of the last solve, which must have succeeded. GLTR
+        restarts from the tridiagonal matrix generated by the Lanczos process
+        of the last solve, whose minimizer subject to the new radius is
+        obtained by a tridiagonal solve. If this minimizer lies on the
+        boundary, GLTR regenerates the Lanczos vectors to form the step,
+        which requires products with H, computed as in the last solve.
+
+        Return `True` if the subproblem was solved again, and `False` if the
+        restart is not possible, either because the last solve failed, or
+        the radius is not smaller, or another context was created since. In
+        that case, a new context must be created.
+        """
+        if self._hessprod is None or self._id != _last_context:
+            return False
+        if not (-2 <= self.ierr <= 0) or not (0 < radius < self.radius):
+            return False
+        self.context.restart(radius)
+        self.radius = radius
+        self.implicit_solve(self._hessprod)
+        return -2 <= self.ierr <= 0
@@ -51,6 +51,8 @@ def configuration(parent_package='',top_path=None):
         extra_info=[blas_info, lapack_info],
         )
 
+    config.add_data_dir('tests')
+
     config.make_config_py()
     return config
 
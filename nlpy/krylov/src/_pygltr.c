@@ -48,6 +48,7 @@ typedef struct PygltrObject {
     int     boundary;        /* Soln thought to be on boundary */
     int     equality;        /* Soln must be on boundary       */
     double  fraction_opt;    /* Acceptable fract of optimality */
+    int     restart;         /* Restart with smaller radius    */
 } PygltrObject;
 
 /* ========================================================================== */
@@ -67,6 +68,7 @@ typedef struct PygltrObject {
 DL_EXPORT( void ) init_pygltr( void );
 static PygltrObject *NewPygltrObject( PyObject *args );
 static PyObject     *Pygltr_solve( PygltrObject *self, PyObject *args );
+static PyObject     *Pygltr_restart( PygltrObject *self, PyObject *args );
 static PyObject     *Pygltr_gltr( PyObject *self, PyObject *args );
 static PyObject     *Pygltr_getattr( PygltrObject *self, char *name );
 static void          Pygltr_dealloc( PygltrObject *self );
@@ -176,6 +178,7 @@ static PygltrObject *NewPygltrObject( PyObject *args ) {
     self->niter  = 0;
     self->nc     = 0;
     self->ierr   = 0;
+    self->restart = 0;
 
     /* Initialize internal GLTR structures */
     /* Since initial = 1, this includes a call to GLTR_initialize() */
@@ -234,6 +237,12 @@ static PyObject *Pygltr_solve( PygltrObject *self, PyObject *args ) {
     self->vector = (double *)a_vector->data;
     exit_loop = 0;
 
+    /* The first call after restart() resumes from the stored tridiagonal */
+    if( self->restart ) {
+        initial = 2;
+        self->restart = 0;
+    }
+
     /* Call solver --- gradient reinitialization will be handled directly */
     while( !exit_loop ) {
         PYGLTR( &(self->n), &(self->f), self->r, self->vector, &(self->radius),
@@ -242,6 +251,7 @@ static PyObject *Pygltr_solve( PygltrObject *self, PyObject *args ) {
                 &(self->boundary), &(self->equality), &(self->fraction_opt),
 	            self->step, &(self->lambda), &(self->snorm),
                 &(self->niter), &(self->nc), &(self->ierr), &initial );
+        initial = 0;
 
         /* See if gradient must be re-initialized */
         if( self->ierr == 5 ) {
@@ -259,11 +269,37 @@ static PyObject *Pygltr_solve( PygltrObject *self, PyObject *args ) {
 
 /* ========================================================================== */
 
+static char Pygltr_restart_Doc[] = "Restart with a smaller trust-region radius";
+
+static PyObject *Pygltr_restart( PygltrObject *self, PyObject *args ) {
+
+    double radius;
+
+    /* The next call to solve() restarts the last successful solve with the
+     * smaller radius given, reusing the Lanczos tridiagonal matrix stored
+     * by GLTR. The step and vector arrays must be those of that solve.
+     */
+    if( !PyArg_ParseTuple( args, "d", &radius ) ) return NULL;
+    if( radius <= 0 || radius >= self->radius ) {
+        PyErr_SetString(PyExc_ValueError,
+                        "PyGLTR: Restart requires a smaller positive radius");
+        return NULL;
+    }
+    self->radius = radius;
+    self->restart = 1;
+
+    Py_INCREF( Py_None );
+    return Py_None;
+}
+
+/* ========================================================================== */
+
 /* This is necessary as Pygltr_gltr takes a PygltrObject* as argument */
 
 static PyMethodDef Pygltr_special_methods[] = {
     { "solve",    (PyCFunction)Pygltr_solve,    METH_VARARGS, Pygltr_solve_Doc    },
     { "reassign", (PyCFunction)Pygltr_reassign, METH_VARARGS, Pygltr_reassign_Doc },
+    { "restart",  (PyCFunction)Pygltr_restart,  METH_VARARGS, Pygltr_restart_Doc  },
     { NULL,    NULL,                      0,            NULL                      }
 };
 
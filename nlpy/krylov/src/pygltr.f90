@@ -23,9 +23,26 @@ Subroutine PyGLTR(N, f, G, VECTOR, radius, stop_relative, stop_absolute, &
   Type(GLTR_control_type), Save :: control
   Type(GLTR_info_type), Save :: info
 
+  ! active is true while Data holds the Lanczos tridiagonal of the last
+  ! successful solve, which allows a restart with a smaller radius.
+  Logical, Save :: active = .False.
+
+  ! Restart with a smaller radius
+  !  initial == 2 when the last solve succeeded and radius was reduced
+  If( initial == 2 ) Then
+     If( .Not. active ) Then
+        ierr = - 99
+        Return
+     End If
+     active = .False.
+     info%status = 4
+  End If
+
   ! Initialization
-  !  initial /= 0 in the initial call only
-  If( initial /= 0 ) Then
+  !  initial == 1 in the initial call only
+  If( initial == 1 ) Then
+     If( active ) Call GLTR_terminate(Data, control, info)
+     active = .False.
      Call GLTR_initialize(Data, control, info)
 
      ! Non-default values come here
@@ -78,13 +95,14 @@ Subroutine PyGLTR(N, f, G, VECTOR, radius, stop_relative, stop_absolute, &
         Return
 
      Case (- 2 : 0)
-        ! Successful return
+        ! Successful return. Data is kept for a restart and released by
+        ! the next initialization.
         niter = info%iter + info%iter_pass2
         !Write(6, *) '   iter_pass1 = ', info%iter, ', iter_pass2 = ', info%iter_pass2
         multiplier = info%multiplier
         nc = info%negative_curvature
         snorm = info%mnormx
-        Call GLTR_terminate(Data, control, info)
+        active = .True.
         Return
 
      Case DEFAULT
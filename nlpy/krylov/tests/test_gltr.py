@@ -0,0 +1,74 @@
+"""
+Tests of the restart of GLTR with a smaller trust-region radius.
+"""
+
+import numpy as np
+from numpy.testing import TestCase, assert_, assert_allclose, \
+                          run_module_suite
+
+try:
+    from nlpy.krylov import pygltr
+    from nlpy.krylov.pygltr import PyGltrContext
+    from nlpy.optimize.tr.trustregion import TrustRegionGLTR
+except ImportError:
+    PyGltrContext = None
+
+
+class GltrResolveTest:
+
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        n = 20
+        E = rng.randn(n, n)
+        self.H = E + E.T                 # Indefinite
+        self.g = rng.randn(n)
+        self.hessprod = lambda v: np.dot(self.H, v)
+
+    def solve(self, radius):
+        G = PyGltrContext(self.g, radius=radius, reltol=1.0e-12,
+                          itmax=10*self.g.size)
+        G.implicit_solve(self.hessprod)
+        return G
+
+    def test_resolve(self):
+        # The restart (initial == 2, info%status = 4 in GLTR) reproduces a
+        # fresh solve with the smaller radius.
+        for radius in [0.5, 0.1]:
+            ref = self.solve(radius)
+            (step, m) = (ref.step.copy(), ref.m)
+            G = self.solve(1.0)
+            assert_(G.resolve(radius))
+            assert_allclose(G.step, step, rtol=1.0e-6, atol=1.0e-10)
+            assert_allclose(G.m, m, rtol=1.0e-8)
+            assert_allclose(np.linalg.norm(G.step), radius, rtol=1.0e-8)
+
+    def test_not_restartable(self):
+        G = self.solve(1.0)
+        assert_(not G.resolve(2.0))      # Radius must decrease
+        self.solve(1.0)                  # GLTR data now belong to another
+        assert_(not G.resolve(0.5))      # context
+
+    def test_lazy_context(self):
+        # The context is created by Solve(), and again only if the options
+        # change.
+        created = pygltr._last_context
+        TR = TrustRegionGLTR(self.g, self.hessprod, reltol=1.0e-12)
+        assert_(TR.gltrSolver is None)
+        TR.Solve(radius=1.0)
+        assert_(pygltr._last_context == created + 1)
+        step = TR.step.copy()
+        TR.Solve(radius=1.0)
+        assert_(pygltr._last_context == created + 1)
+        assert_allclose(TR.step, step)
+        TR.Solve(radius=0.5)
+        assert_(pygltr._last_context == created + 2)
+        assert_allclose(TR.stepNorm, 0.5, rtol=1.0e-8)
+
+
+if PyGltrContext is not None:
+    class TestGltrResolve(GltrResolveTest, TestCase):
+        pass
+
+
+if __name__ == '__main__':
+    run_module_suite()
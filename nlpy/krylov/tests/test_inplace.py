@@ -0,0 +1,141 @@
+"""
+Tests that the in-place iterations of TruncatedCG, Minres and LSQR, with
+operators that write their products into work vectors and with workspaces
+reused across solves, give the results of out-of-place products and fresh
+solves, and of dense solves.
+"""
+
+import numpy as np
+from numpy.testing import TestCase, assert_allclose, run_module_suite
+from pysparse.sparse import spmatrix
+from nlpy.krylov.linop import PysparseLinearOperator, SimpleLinearOperator
+from nlpy.krylov.workspace import KrylovWorkspace
+from nlpy.krylov.pcg import TruncatedCG
+from nlpy.krylov.minres import Minres
+from nlpy.optimize.solvers.lsqr import LSQRFramework
+
+
+def sparse_and_dense(D, sym=False):
+    "Return the dense array D as a ll_mat (or ll_mat_sym) object and D."
+    (m, n) = D.shape
+    if sym:
+        A = spmatrix.ll_mat_sym(n, n*n)
+        (irow, jcol) = np.nonzero(np.tril(D))
+    else:
+        A = spmatrix.ll_mat(m, n, m*n)
+        (irow, jcol) = np.nonzero(D)
+    for (i, j) in zip(irow, jcol):
+        A[int(i), int(j)] = D[i, j]
+    return A
+
+
+def out_of_place(D):
+    "Return an operator whose products with D are allocated at each call."
+    (m, n) = D.shape
+    return SimpleLinearOperator(n, m, lambda x: np.dot(D, x),
+                                matvec_transp=lambda y: np.dot(D.T, y))
+
+
+class InPlaceTest:
+
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        n = 12
+        E = rng.randn(n, n)
+        self.spd = np.dot(E, E.T) + n * np.eye(n)
+        self.sym = E + E.T + np.diag(np.arange(-n/2, n/2) + 0.5)
+        self.rect = rng.randn(n + 5, n)
+        self.b1 = rng.randn(n)
+        self.b2 = rng.randn(n)
+        self.c1 = rng.randn(n + 5)
+        self.c2 = rng.randn(n + 5)
+
+
+class TestTruncatedCG(InPlaceTest, TestCase):
+
+    def solve(self, H, g, workspace=None):
+        CG = TruncatedCG(g, H, workspace=workspace)
+        CG.Solve(reltol=1.0e-12)
+        return CG.step.copy()
+
+    def test_inplace(self):
+        H = PysparseLinearOperator(sparse_and_dense(self.spd, sym=True),
+                                   symmetric=True)
+        s = self.solve(H, self.b1)
+        assert_allclose(s, self.solve(out_of_place(self.spd), self.b1),
+                        rtol=1.0e-10)
+        assert_allclose(s, -np.linalg.solve(self.spd, self.b1),
+                        rtol=1.0e-8)
+
+    def test_workspace(self):
+        H = out_of_place(self.spd)
+        ws = KrylovWorkspace(self.b1.size)
+        self.solve(H, self.b1, workspace=ws)
+        assert_allclose(self.solve(H, self.b2, workspace=ws),
+                        self.solve(H, self.b2), rtol=1.0e-12)
+
+
+class TestMinres(InPlaceTest, TestCase):
+
+    def solve(self, A, b, workspace=None):
+        K = Minres(A, workspace=workspace)
+        K.solve(b, show=False, rtol=1.0e-14)
+        return K.x.copy()
+
+    def test_inplace(self):
+        A = PysparseLinearOperator(sparse_and_dense(self.sym, sym=True),
+                                   symmetric=True)
+        x = self.solve(A, self.b1)
+        assert_allclose(x, self.solve(out_of_place(self.sym), self.b1),
+                        rtol=1.0e-10)
+        assert_allclose(x, np.linalg.solve(self.sym, self.b1), rtol=1.0e-8)
+
+    def test_workspace(self):
+        A = out_of_place(self.sym)
+        ws = KrylovWorkspace(self.b1.size)
+        self.solve(A, self.b1, workspace=ws)
+        assert_allclose(self.solve(A, self.b2, workspace=ws),
+                        self.solve(A, self.b2), rtol=1.0e-12)
+
+    def test_private_workspace(self):
+        # Without a workspace, a second solve leaves the first solution.
+        K = Minres(out_of_place(self.sym))
+        K.solve(self.b1, show=False, rtol=1.0e-14) ; x1 = K.x
+        K.solve(self.b2, show=False, rtol=1.0e-14)
+        assert_allclose(x1, np.linalg.solve(self.sym, self.b1), rtol=1.0e-8)
+
+
+class TestLSQR(InPlaceTest, TestCase):
+
+    def solve(self, A, b, workspace=None):
+        LSQR = LSQRFramework(A, workspace=workspace)
+        LSQR.solve(b, itnlim=100, atol=1.0e-14, btol=1.0e-14)
+        return LSQR.x.copy()
+
+    def test_inplace(self):
+        A = PysparseLinearOperator(sparse_and_dense(self.rect))
+        x = self.solve(A, self.c1)
+        assert_allclose(x, self.solve(out_of_place(self.rect), self.c1),
+                        rtol=1.0e-10)
+        assert_allclose(x, np.linalg.lstsq(self.rect, self.c1)[0],
+                        rtol=1.0e-8)
+
+    def test_workspace(self):
+        A = out_of_place(self.rect)
+        ws = KrylovWorkspace(self.b1.size)
+        self.solve(A, self.c1, workspace=ws)
+        assert_allclose(self.solve(A, self.c2, workspace=ws),
+                        self.solve(A, self.c2), rtol=1.0e-12)
+
+    def test_private_workspace(self):
+        # Without a workspace, a second solve leaves the first solution.
+        LSQR = LSQRFramework(out_of_place(self.rect))
+        LSQR.solve(self.c1, itnlim=100, atol=1.0e-14, btol=1.0e-14)
+        x1 = LSQR.x
+        LSQR.solve(self.c2, itnlim=100, atol=1.0e-14, btol=1.0e-14)
+        assert_allclose(x1, np.linalg.lstsq(self.rect, self.c1)[0],
+                        rtol=1.0e-8)
+
+
+if __name__ == '__main__':
+    run_module_suite()
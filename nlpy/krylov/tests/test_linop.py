@@ -0,0 +1,220 @@
+"""
+Tests of the algebra of linear operators and of their products with several
+vectors.
+"""
+
+import numpy as np
+from numpy.testing import TestCase, assert_, assert_allclose, assert_equal, \
+                          assert_raises, run_module_suite
+from pysparse.sparse import spmatrix
+import nlpy.krylov.linop as linop
+from nlpy.krylov.linop import PysparseLinearOperator, SquaredLinearOperator
+from nlpy.krylov.linop import SimpleLinearOperator, IdentityOperator, \
+                              DiagonalOperator, BlockLinearOperator, \
+                              BlockDiagonalLinearOperator
+
+
+def random_matrix(m, n, density=0.3, sym=False, seed=0):
+    "Return a random sparse matrix in ll_mat or ll_mat_sym format."
+    rng = np.random.RandomState(seed)
+    if sym:
+        A = spmatrix.ll_mat_sym(n, n*n)
+    else:
+        A = spmatrix.ll_mat(m, n, m*n)
+    for i in range(m):
+        for j in range(n):
+            if sym and j > i: continue
+            if i == j or rng.rand() < density:
+                A[i,j] = rng.randn()
+    return A
+
+
+def to_dense(A):
+    "Return the ll_mat or ll_mat_sym A as a dense array."
+    (val, irow, jcol) = A.find()
+    D = np.zeros(A.shape)
+    D[irow, jcol] = val
+    if A.issym: D[jcol, irow] = val
+    return D
+
+
+def dense_operator(D):
+    "Return the dense array D as a SimpleLinearOperator with a transpose."
+    return SimpleLinearOperator(D.shape[1], D.shape[0],
+                                lambda v: np.dot(D, v),
+                                matvec_transp=lambda w: np.dot(D.T, w))
+
+
+def columnwise(op, X):
+    "Return the products of op with the columns of X, one at a time."
+    return np.column_stack([op * X[:, j] for j in range(X.shape[1])])
+
+
+class TestMatmat(TestCase):
+
+    def setUp(self):
+        rng = np.random.RandomState(1)
+        self.X = rng.randn(9, 5)
+        self.Y = rng.randn(7, 5)
+
+    def test_general(self):
+        op = PysparseLinearOperator(random_matrix(7, 9))
+        assert_allclose(op * self.X, columnwise(op, self.X), rtol=1.0e-12)
+        assert_allclose(op.T * self.Y, columnwise(op.T, self.Y),
+                        rtol=1.0e-12)
+
+    def test_symmetric(self):
+        op = PysparseLinearOperator(random_matrix(9, 9, sym=True),
+                                    symmetric=True)
+        assert_allclose(op * self.X, columnwise(op, self.X), rtol=1.0e-12)
+
+    def test_repeated(self):
+        # The sort order is computed once and reused.
+        op = PysparseLinearOperator(random_matrix(7, 9))
+        expected = columnwise(op, self.X)
+        for k in range(3):
+            assert_allclose(op * self.X, expected, rtol=1.0e-12)
+        assert_equal(len(op._products), 1)
+
+    def test_updated_in_place(self):
+        # Changes to the values and to the pattern of the matrix are seen.
+        A = random_matrix(9, 9, sym=True)
+        op = PysparseLinearOperator(A, symmetric=True)
+        op * self.X
+        product = op._products[False][0]
+        for i in range(9):
+            A[i,i] = A[i,i] + 10.0
+        assert_allclose(op * self.X, columnwise(op, self.X), rtol=1.0e-12)
+        assert_allclose(op * self.X[:, [0]], (op * self.X[:, 0])[:, None],
+                        rtol=1.0e-12)
+        assert_(op._products[False][0] is product)
+        A[8,0] = 1.0 - A[8,0]       # May add an element.
+        A[5,2] = 0.0 ; A[5,2] = 3.0
+        assert_allclose(op * self.X, columnwise(op, self.X), rtol=1.0e-12)
+        G = random_matrix(7, 9)
+        opG = PysparseLinearOperator(G)
+        opG.T * self.Y
+        G.scale(2.0)
+        assert_allclose(opG.T * self.Y, columnwise(opG.T, self.Y),
+                        rtol=1.0e-12)
+
+    def test_blocks(self):
+        # Arrays too wide for a single pass are processed in column blocks.
+        block = linop._matmat_block
+        linop._matmat_block = 20
+        try:
+            op = PysparseLinearOperator(random_matrix(7, 9))
+            X = np.random.RandomState(2).randn(9, 13)
+            assert_allclose(op * X, columnwise(op, X), rtol=1.0e-12)
+        finally:
+            linop._matmat_block = block
+
+    def test_empty_rows(self):
+        A = spmatrix.ll_mat(4, 3, 2)
+        A[1,2] = 2.0 ; A[3,0] = -1.0
+        op = PysparseLinearOperator(A)
+        X = np.arange(6.0).reshape(3, 2)
+        assert_allclose(op * X, columnwise(op, X))
+
+    def test_squared(self):
+        op = SquaredLinearOperator(random_matrix(7, 9))
+        assert_allclose(op * self.X, columnwise(op, self.X), rtol=1.0e-12)
+
+
+class TestAlgebra(TestCase):
+    """
+    Each combination of operators is compared with the dense matrix it
+    represents. Sparse operands exercise the products into a given vector,
+    dense operands the default ones.
+    """
+
+    def setUp(self):
+        self.As = random_matrix(4, 6, seed=3)         # Sparse 4 x 6
+        self.A = to_dense(self.As)
+        self.B = np.random.RandomState(4).randn(4, 6)  # Dense 4 x 6
+        self.C = np.random.RandomState(5).randn(6, 3)
+        self.Hs = random_matrix(6, 6, sym=True, seed=6)
+        self.H = to_dense(self.Hs)
+        self.d = np.random.RandomState(7).randn(4)
+
+    def check(self, op, M):
+        "Compare op, op.T and their products into a vector with M and M'."
+        (m, n) = M.shape
+        assert_equal(op.shape, (m, n))
+        rng = np.random.RandomState(8)
+        x = rng.randn(n) ; y = rng.randn(m)
+        assert_allclose(op * x, np.dot(M, x), rtol=1.0e-12, atol=1.0e-12)
+        out = np.empty(m)
+        assert_(op.dot(x, out=out) is out)
+        assert_allclose(out, np.dot(M, x), rtol=1.0e-12, atol=1.0e-12)
+        X = rng.randn(n, 3)
+        assert_allclose(op * X, np.dot(M, X), rtol=1.0e-12, atol=1.0e-12)
+        assert_(op.T is not None)
+        assert_equal(op.T.shape, (n, m))
+        assert_allclose(op.T * y, np.dot(M.T, y), rtol=1.0e-12,
+                        atol=1.0e-12)
+        out = np.empty(n)
+        assert_(op.T.dot(y, out=out) is out)
+        assert_allclose(out, np.dot(M.T, y), rtol=1.0e-12, atol=1.0e-12)
+        assert_(op.T.T is op)
+
+    def test_identity(self):
+        self.check(IdentityOperator(5), np.eye(5))
+
+    def test_diagonal(self):
+        self.check(DiagonalOperator(self.d), np.diag(self.d))
+
+    def test_sum(self):
+        A = PysparseLinearOperator(self.As) ; B = dense_operator(self.B)
+        self.check(A + B, self.A + self.B)
+        self.check(A - 2.0 * B, self.A - 2.0 * self.B)
+        self.check(-A, -self.A)
+        self.check(A * 3.0 + (B - A), 2.0 * self.A + self.B)
+
+    def test_composed(self):
+        A = PysparseLinearOperator(self.As) ; C = dense_operator(self.C)
+        D = DiagonalOperator(self.d)
+        self.check(A * C, np.dot(self.A, self.C))
+        self.check(D * A * C, np.dot(np.diag(self.d), np.dot(self.A, self.C)))
+        self.check(A.T * D, np.dot(self.A.T, np.diag(self.d)))
+        self.check(A.T * A + 0.5 * IdentityOperator(6),
+                   np.dot(self.A.T, self.A) + 0.5 * np.eye(6))
+
+    def test_block(self):
+        # Non-square blocks and a zero block.
+        A = PysparseLinearOperator(self.As) ; C = dense_operator(self.C)
+        D = DiagonalOperator(self.d)
+        op = BlockLinearOperator([[A, D], [C.T, None]])
+        M = np.zeros((7, 10))
+        M[:4, :6] = self.A ; M[:4, 6:] = np.diag(self.d)
+        M[4:, :6] = self.C.T
+        self.check(op, M)
+        self.check(op.T * op, np.dot(M.T, M))
+
+    def test_block_symmetric(self):
+        # The saddle-point operator [H A'; A -D] of examples/demo_image.py.
+        H = PysparseLinearOperator(self.Hs, symmetric=True)
+        A = dense_operator(self.B) ; D = DiagonalOperator(self.d)
+        op = BlockLinearOperator([[H, A.T], [-D]], symmetric=True)
+        M = np.zeros((10, 10))
+        M[:6, :6] = self.H ; M[:6, 6:] = self.B.T ; M[6:, :6] = self.B
+        M[6:, 6:] = -np.diag(self.d)
+        self.check(op, M)
+        assert_(op.symmetric)
+
+    def test_block_diagonal(self):
+        A = PysparseLinearOperator(self.As) ; C = dense_operator(self.C)
+        op = BlockDiagonalLinearOperator([A, C, IdentityOperator(2)])
+        M = np.zeros((12, 11))
+        M[:4, :6] = self.A ; M[4:10, 6:9] = self.C ; M[10:, 9:] = np.eye(2)
+        self.check(op, M)
+
+    def test_incompatible(self):
+        A = PysparseLinearOperator(self.As) ; C = dense_operator(self.C)
+        assert_raises(ValueError, lambda: A + C)
+        assert_raises(ValueError, lambda: C * A)
+        assert_raises(ValueError, BlockLinearOperator, [[A], [C]])
+
+
+if __name__ == '__main__':
+    run_module_suite()
@@ -0,0 +1,84 @@
+"""
+Tests of the recovery of truncated conjugate gradient steps for smaller
+trust-region radii.
+"""
+
+import numpy as np
+from numpy.testing import TestCase, assert_, assert_equal, assert_allclose, \
+                          run_module_suite
+from nlpy.krylov.linop import SimpleLinearOperator
+from nlpy.krylov.pcg import TruncatedCG
+from nlpy.krylov.workspace import KrylovWorkspace
+
+
+class TestResolve(TestCase):
+
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        n = 20
+        E = rng.randn(n, n)
+        self.D = np.dot(E, E.T) + np.eye(n)
+        self.H = SimpleLinearOperator(n, n, lambda v: np.dot(self.D, v),
+                                      symmetric=True)
+        self.g = rng.randn(n)
+        # Norm of the Newton step, reached when the radius is large.
+        self.newton = np.linalg.norm(np.linalg.solve(self.D, self.g))
+
+    def fresh(self, radius):
+        CG = TruncatedCG(self.g, self.H)
+        CG.Solve(radius=radius, reltol=1.0e-10)
+        return CG
+
+    def stored(self, radius, **kwargs):
+        CG = TruncatedCG(self.g, self.H)
+        CG.Solve(radius=radius, reltol=1.0e-10, store_path=True, **kwargs)
+        return CG
+
+    def check(self, CG, radius):
+        ref = self.fresh(radius)
+        assert_allclose(CG.step, ref.step, rtol=1.0e-10, atol=1.0e-12)
+        assert_equal(CG.onBoundary, ref.onBoundary)
+        assert_equal(CG.niter, ref.niter)
+        m = np.dot(self.g, ref.step) + 0.5 * np.dot(ref.step,
+                                                    self.H * ref.step)
+        assert_allclose(CG.m, m, rtol=1.0e-10)
+
+    def test_boundary(self):
+        CG = self.stored(0.9 * self.newton)
+        for radius in [0.5, 0.1, 0.01]:
+            assert_(CG.resolve(radius * self.newton))
+            self.check(CG, radius * self.newton)
+
+    def test_interior(self):
+        # Radius large enough for the step to stay inside.
+        CG = self.stored(10 * self.newton)
+        assert_(CG.resolve(5 * self.newton))
+        self.check(CG, 5 * self.newton)
+
+    def test_max_path(self):
+        radius = 0.9 * self.newton
+        CG = self.stored(radius, max_path=2)
+        assert_(self.fresh(radius).niter > 2)
+        # Steps reached along the stored directions are recovered.
+        small = 1.0e-3 * self.newton
+        assert_(self.fresh(small).niter <= 2)
+        assert_(CG.resolve(small))
+        self.check(CG, small)
+        # Other steps require a new solve.
+        assert_(not CG.resolve(radius))
+
+    def test_release_path(self):
+        ws = KrylovWorkspace(self.g.size)
+        CG = TruncatedCG(self.g, self.H, workspace=ws)
+        CG.Solve(radius=0.9 * self.newton, reltol=1.0e-10, store_path=True)
+        stored = ws.nbytes()
+        assert_(stored > 4 * self.g.nbytes)
+        # A solve that does not store its path frees the stored directions.
+        CG = TruncatedCG(self.g, self.H, workspace=ws)
+        CG.Solve(radius=0.9 * self.newton, reltol=1.0e-10)
+        assert_equal(ws.nbytes(), stored - CG.niter * self.g.nbytes)
+        assert_(not CG.resolve(0.5 * self.newton))
+
+
+if __name__ == '__main__':
+    run_module_suite()
@@ -0,0 +1,69 @@
+"""
+Tests of the reuse of the factorization of the projection matrix across
+projected conjugate gradient solves.
+"""
+
+import numpy as np
+from numpy.testing import TestCase, assert_, assert_equal, assert_allclose, \
+                          run_module_suite
+from pysparse.sparse import spmatrix
+from nlpy.krylov.linop import SimpleLinearOperator
+from nlpy.krylov.ppcg import ProjectedCG
+from nlpy.linalg.cache import factorization_cache
+
+
+class TestProjectorReuse(TestCase):
+
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        (self.n, self.m) = (n, m) = (8, 3)
+        E = rng.randn(n, n)
+        self.D = np.dot(E, E.T) + np.eye(n)
+        self.H = SimpleLinearOperator(n, n, lambda v: np.dot(self.D, v),
+                                      symmetric=True)
+        self.Ad = rng.randn(m, n)
+        self.A = spmatrix.ll_mat(m, n, m*n)
+        for i in range(m):
+            for j in range(n):
+                self.A[i,j] = self.Ad[i,j]
+        # The budget is kept in bytes and set in megabytes.
+        self.budget = factorization_cache.budget / (1024.0 * 1024.0)
+        factorization_cache.clear()
+        factorization_cache.set_budget(16)
+        factorization_cache.reset_stats()
+
+    def tearDown(self):
+        factorization_cache.clear()
+        factorization_cache.set_budget(self.budget)
+        factorization_cache.reset_stats()
+
+    def solve(self, c):
+        ppcg = ProjectedCG(c, self.H, A=self.A, reltol=1.0e-12)
+        ppcg.Solve()
+        # The factorization is handed back to the cache.
+        assert_(ppcg.Proj is None)
+        return ppcg
+
+    def check(self, c, x):
+        # x solves min c'x + x'Dx/2 subject to Ax = 0.
+        n = self.n ; m = self.m
+        K = np.zeros((n+m, n+m))
+        K[:n,:n] = self.D ; K[n:,:n] = self.Ad ; K[:n,n:] = self.Ad.T
+        rhs = np.concatenate((-c, np.zeros(m)))
+        assert_allclose(x, np.linalg.solve(K, rhs)[:n], atol=1.0e-8)
+
+    def test_second_solve_reuses_factorization(self):
+        rng = np.random.RandomState(1)
+        c1 = rng.randn(self.n) ; c2 = rng.randn(self.n)
+        self.check(c1, self.solve(c1).x)
+        self.check(c2, self.solve(c2).x)
+        stats = factorization_cache.stats()
+        assert_equal(stats['misses'], 1)
+        assert_equal(stats['hits'], 1)
+        assert_equal(stats['entries'], 1)
+        entry = factorization_cache._entries.values()[0]
+        assert_equal(entry.context.nfact, 1)
+
+
+if __name__ == '__main__':
+    run_module_suite()
@@ -0,0 +1,99 @@
+"""
+Work vectors that iterative solvers reuse from one solve to the next, and
+vector updates performed in place, without temporary arrays.
+
+A solver given a :class:`KrylovWorkspace` takes all the vectors it needs
+from it. They are allocated the first time they are requested and reused by
+all subsequent solves, so that a sequence of solves of the same size, such
+as the trust-region subproblems of successive iterations of
+:class:`TrunkFramework`, allocates no vector after the first one. Within a
+solve, products with the operator are stored into work vectors with
+:func:`matvec` and vector updates are performed with :func:`axpy` and the
+in-place operators of NumPy.
+
+Vectors returned by a solver that uses a workspace, such as its step or its
+solution, are work vectors themselves and are overwritten by the next solve
+that uses the same workspace. They must be copied to be kept. A workspace
+should therefore not be shared by two solvers whose results are needed at
+the same time.
+
+.. moduleauthor:: D. Orban <dominique.orban@gerad.ca>
+"""
+
+__docformat__ = 'restructuredtext'
+
+import numpy as np
+from nlpy.krylov.linop import LinearOperator
+
+
+class KrylovWorkspace:
+    """
+    `ws = KrylovWorkspace(n)`
+
+    A set of named work vectors, of length `n` unless another size is
+    requested. See the documentation of the :mod:`workspace` module.
+    """
+
+    def __init__(self, n):
+        self.n = n
+        self._vectors = {}
+
+    def get(self, name, size=None):
+        """
+        Return the work vector named `name`, of length `size` (default: `n`).
+        It is allocated on the first request, or if its size changed, and
+        its contents are those left by the previous solve.
+        """
+        if size is None: size = self.n
+        v = self._vectors.get(name, None)
+        if v is None or v.shape[0] != size:
+            v = np.empty(size)
+            self._vectors[name] = v
+        return v
+
+    def zeros(self, name, size=None):
+        "Return the work vector named `name`, set to zero."
+        v = self.get(name, size)
+        v.fill(0.0)
+        return v
+
+    def release(self, name):
+        """
+        Free the work vector named `name`. Return `True` if it was allocated
+        and `False` otherwise.
+        """
+        return self._vectors.pop(name, None) is not None
+
+    def nbytes(self):
+        "Return the storage used by the work vectors, in bytes."
+        return sum([v.nbytes for v in self._vectors.values()])
+
+
+def axpy(a, x, y, work):
+    """
+    Overwrite `y` with `a*x + y` and return `y`. The vector `work`, of the
+    same size as `x`, is overwritten with `a*x`, which would otherwise be
+    allocated as a temporary.
+    """
+    np.multiply(x, a, work)
+    y += work
+    return y
+
+
+def matvec(A, x, out):
+    """
+    Store the product of `A` with the vector `x` into `out` and return `out`.
+    Linear operators, `ll_mat` and `PysparseMatrix` objects and NumPy arrays
+    write the product directly into `out`. Any other object implementing
+    `__mul__` allocates the product, which is then copied into `out`.
+    """
+    if isinstance(A, LinearOperator):
+        return A.dot(x, out=out)
+    if isinstance(A, np.ndarray):
+        return np.dot(A, x, out)
+    thisA = getattr(A, 'matrix', A)
+    if hasattr(thisA, 'matvec'):
+        thisA.matvec(x, out)
+        return out
+    out[:] = A * x
+    return out
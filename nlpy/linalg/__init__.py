@@ -1,9 +1,22 @@
 """
-Python interface to some symmetric HSL solvers.
+Python interface to some symmetric HSL solvers, a NumPy implementation of
+the LDL^T factorization for use when those are not available, and a dense
+factorization for small matrices.
 """
 
-from sils   import *
-from pyma27 import *
-from pyma57 import *
+from sils     import *
+from ordering import *
+from pyldl    import *
+from pydense  import *
+from backends import *
+from cache    import *
+try:
+    from pyma27 import *
+except ImportError:
+    pass
+try:
+    from pyma57 import *
+except ImportError:
+    pass
 
 __all__ = filter(lambda s:not s.startswith('_'), dir())
@@ -0,0 +1,128 @@
+"""
+A registry of the factorizations of symmetric matrices available in NLPy,
+and a factory that chooses among them according to the size and density of
+the matrix.
+
+All backends are subclasses of :class:`Sils` and report the number of
+negative eigenvalues, the rank and whether the matrix has full rank in their
+attributes :attr:`neig`, :attr:`rank` and :attr:`isFullRank`.
+
+Example:
+
+>>> from nlpy.linalg.backends import LBLContext
+>>> LBL = LBLContext(K, sqd=True)          # Chooses a backend for K
+>>> LBL = LBLContext(K, backend='ma27')    # Uses PyMa27Context
+"""
+
+__docformat__ = 'restructuredtext'
+
+from collections import OrderedDict
+from sils import FactorizationMemoryError
+
+# Registered backends: name -> (module, class name).
+_backends = OrderedDict()
+
+# Sparse backends, in order of preference.
+sparse_backends = ['ma57', 'ma27', 'ldl']
+
+# Matrices of order at most dense_size, and matrices of order at most
+# dense_max whose density is at least dense_density, are factorized with the
+# 'dense' backend.
+dense_size = 300
+dense_max = 2000
+dense_density = 0.2
+
+
+def register_backend(name, module, cls):
+    """
+    Register the :class:`Sils` subclass named `cls` of the module named
+    `module` under `name`. The module is only imported when the backend is
+    requested, so that backends may depend on optional packages.
+    """
+    _backends[name] = (module, cls)
+    return
+
+
+register_backend('ma57', 'nlpy.linalg.pyma57', 'PyMa57Context')
+register_backend('ma27', 'nlpy.linalg.pyma27', 'PyMa27Context')
+register_backend('ldl', 'nlpy.linalg.pyldl', 'PyLDLContext')
+register_backend('dense', 'nlpy.linalg.pydense', 'PyDenseContext')
+
+
+def get_backend(name):
+    """
+    Return the :class:`Sils` subclass registered under `name`. Raise
+    `ValueError` if there is no such backend and `ImportError` if it is not
+    available.
+    """
+    if name not in _backends:
+        raise ValueError, 'Unknown backend %s' % name
+    (module, cls) = _backends[name]
+    return getattr(__import__(module, fromlist=[cls]), cls)
+
+
+def available_backends():
+    "Return the names of the backends that can be used."
+    names = []
+    for name in _backends:
+        try:
+            get_backend(name)
+            names.append(name)
+        except ImportError:
+            pass
+    return names
+
+
+def sparse_backend():
+    "Return the name of the preferred available sparse backend."
+    for name in sparse_backends:
+        try:
+            get_backend(name)
+            return name
+        except ImportError:
+            pass
+    raise ImportError, 'No sparse factorization available'
+
+
+def select_backend(n, nnz, **kwargs):
+    """
+    Return the name of the backend best suited to a symmetric matrix of
+    order `n` with `nnz` elements in its lower triangle. The thresholds
+    `dense_size`, `dense_max` and `dense_density` may be given as keywords
+    to override the module defaults.
+    """
+    size = kwargs.get('dense_size', dense_size)
+    nmax = kwargs.get('dense_max', dense_max)
+    density = kwargs.get('dense_density', dense_density)
+    if n <= size:
+        return 'dense'
+    if n <= nmax and (2.0 * nnz - n) >= density * n * n:
+        return 'dense'
+    return sparse_backend()
+
+
+def LBLContext(A, factorize=True, **kwargs):
+    """
+    Return a factorization context for the symmetric matrix `A`, given in
+    ll_mat or PysparseMatrix format. The keyword `backend` is the name of a
+    registered backend or 'auto' (the default), in which case the backend is
+    chosen by :func:`select_backend`. The other keywords are passed to
+    :func:`select_backend` and to the constructor of the backend, which
+    ignores those it does not use.
+
+    If the keyword `memory_limit` is given and the dense backend chosen
+    automatically would exceed it, the preferred sparse backend is used
+    instead. Other backends raise :class:`FactorizationMemoryError`.
+    """
+    backend = kwargs.pop('backend', 'auto')
+    auto = (backend == 'auto')
+    if auto:
+        thisA = getattr(A, 'matrix', A)
+        backend = select_backend(thisA.shape[0], thisA.nnz, **kwargs)
+    for key in ['dense_size', 'dense_max', 'dense_density']:
+        kwargs.pop(key, None)
+    try:
+        return get_backend(backend)(A, factorize=factorize, **kwargs)
+    except FactorizationMemoryError:
+        if not (auto and backend == 'dense'): raise
+    return get_backend(sparse_backend())(A, factorize=factorize, **kwargs)
@@ -0,0 +1,232 @@
+"""
+A process-wide cache of factorizations of symmetric matrices.
+
+Factorizations are looked up by a hash of the sparsity pattern of the matrix
+and by a hash of the values of its elements. When both match, the cached
+factorization is returned as is. When only the pattern matches, the cached
+context is refactorized, reusing its symbolic analysis. Otherwise, a new
+context is created. The least recently used factorizations are evicted when
+the storage they occupy exceeds a budget.
+
+A context returned by the cache is checked out for the exclusive use of the
+caller: it is removed from the cache until the caller hands it back with
+:meth:`FactorizationCache.release`, after which the caller must no longer use
+it. Two solvers never share a context, even when their matrices have the same
+sparsity pattern. Contexts that are never released are simply not cached.
+
+The process-wide cache has a budget of zero by default, so that no factors are
+retained for callers that did not ask for caching. Caching is enabled by
+giving it a budget, e.g., ``factorization_cache.set_budget(256)``.
+"""
+
+__docformat__ = 'restructuredtext'
+
+import hashlib
+import weakref
+from collections import OrderedDict
+import numpy
+from pysparse.sparse.pysparseMatrix import PysparseMatrix
+
+
+def _default_factory():
+    "Return the factory choosing a backend for each matrix."
+    from nlpy.linalg.backends import LBLContext
+    return LBLContext
+
+
+def factor_size(context):
+    """
+    Return an estimate of the storage occupied by the factors held in
+    `context`, in bytes.
+    """
+    if getattr(context, 'memForecast', 0) > 0:    # Analyze-phase forecast
+        return context.memForecast
+    if hasattr(context, 'nRealFact'):             # MA57
+        return 8 * context.nRealFact + 4 * context.nIntFact
+    if hasattr(context, 'rwords'):                # MA27
+        return 8 * context.rwords + 4 * context.iwords
+    return 12 * getattr(context, 'nzFact', context.n)
+
+
+class _CacheEntry:
+
+    def __init__(self, context, pattern_key, value_key):
+        self.context = context
+        self.pattern_key = pattern_key
+        self.value_key = value_key
+        self.nbytes = factor_size(context)
+
+
+class FactorizationCache:
+    """
+    A cache of factorizations with least-recently-used eviction.
+
+    :keywords:
+
+        :budget:   storage allowed for cached factors, in megabytes
+                   (default: 256). Contexts that are checked out do not
+                   count against the budget.
+        :factory:  the Sils subclass, or the function, used to create new
+                   contexts (default: :func:`nlpy.linalg.backends.LBLContext`,
+                   which chooses a backend according to the matrix).
+
+    Example:
+
+    >>> cache = FactorizationCache(budget=64)
+    >>> LBL = cache.get(A, sqd=True)
+    >>> LBL.solve(rhs)
+    >>> cache.release(LBL)             # LBL must no longer be used
+    """
+
+    def __init__(self, budget=256, factory=None):
+        self.factory = factory
+        self._entries = OrderedDict()
+        # Contexts that are checked out are only weakly referenced so that
+        # those never released are freed with their owner.
+        self._checked_out = weakref.WeakKeyDictionary()
+        self.nbytes = 0
+        self.reset_stats()
+        self.set_budget(budget)
+
+    def set_budget(self, budget):
+        """
+        Set the storage allowed for cached factors to `budget` megabytes,
+        evicting factorizations if necessary. A budget of zero disables
+        caching.
+        """
+        self.budget = int(budget * 1024 * 1024)
+        self._evict()
+        return
+
+    def reset_stats(self):
+        "Reset the counters reported by :meth:`stats`."
+        self.hits = 0            # Lookups that reused a factorization
+        self.symbolic_hits = 0   # Lookups that reused a symbolic analysis
+        self.misses = 0          # Lookups that created a new context
+        self.evictions = 0       # Factorizations evicted from the cache
+        return
+
+    def stats(self):
+        "Return a dictionary of statistics on the use of the cache."
+        return {'hits': self.hits, 'symbolic_hits': self.symbolic_hits,
+                'misses': self.misses, 'evictions': self.evictions,
+                'entries': len(self._entries), 'nbytes': self.nbytes,
+                'budget': self.budget}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        "Evict all factorizations. Checked-out contexts are unaffected."
+        self._entries.clear()
+        self.nbytes = 0
+        return
+
+    def _evict(self):
+        "Evict least recently used factorizations until within budget."
+        while self.nbytes > self.budget and self._entries:
+            (key, old) = self._entries.popitem(last=False)
+            self.nbytes -= old.nbytes
+            self.evictions += 1
+        return
+
+    def _keys(self, A, factory, kwargs):
+        (val, irow, jcol) = A.find()
+        h = hashlib.sha1()
+        h.update(repr((factory.__name__, A.shape, A.issym)))
+        for (key, value) in sorted(kwargs.items()):
+            # Arrays, e.g., pivot orders, are hashed in full.
+            if isinstance(value, (numpy.ndarray, list, tuple)):
+                value = numpy.ascontiguousarray(value).tostring()
+            h.update(repr((key, value)))
+        h.update(numpy.ascontiguousarray(irow).tostring())
+        h.update(numpy.ascontiguousarray(jcol).tostring())
+        pattern_key = h.hexdigest()
+        value_key = hashlib.sha1(
+            numpy.ascontiguousarray(val).tostring()).hexdigest()
+        return (pattern_key, value_key)
+
+    def get(self, A, **kwargs):
+        """
+        Return a factorization of the symmetric matrix `A`, given in ll_mat
+        or PysparseMatrix format. The keyword `factory` overrides the
+        factory given to the constructor of the cache. Other keyword
+        arguments are passed to the constructor of new contexts, e.g.,
+        `sqd=True`. The factory and the keyword arguments are part of the key
+        of the factorization.
+
+        The context returned is checked out: it belongs to the caller, who
+        may refactorize it freely, until it is handed back with
+        :meth:`release`.
+        """
+        if isinstance(A, PysparseMatrix):
+            thisA = A.matrix
+        else:
+            thisA = A
+
+        factory = kwargs.pop('factory', None) or self.factory or \
+                  _default_factory()
+        (pattern_key, value_key) = self._keys(thisA, factory, kwargs)
+        entry = self._entries.pop(pattern_key, None)
+
+        if entry is not None:
+            self.nbytes -= entry.nbytes
+            context = entry.context
+            if entry.value_key == value_key:
+                self.hits += 1
+            else:
+                self.symbolic_hits += 1
+                context.factorize(thisA)
+        else:
+            self.misses += 1
+            context = factory(thisA, **kwargs)
+
+        self._checked_out[context] = (pattern_key, value_key, context.nfact)
+        return context
+
+    def release(self, context):
+        """
+        Hand back a context obtained from :meth:`get`. It is cached if the
+        budget allows it and must no longer be used by the caller. Contexts
+        that were not obtained from this cache are ignored.
+        """
+        try:
+            (pattern_key, value_key, nfact) = self._checked_out.pop(context)
+        except (KeyError, TypeError):
+            return
+        if context.nfact != nfact:
+            # The caller refactorized the context with values unknown to
+            # the cache. Only its symbolic analysis may be reused.
+            value_key = None
+        entry = _CacheEntry(context, pattern_key, value_key)
+        if entry.nbytes > self.budget:
+            self.evictions += 1
+            return
+        old = self._entries.pop(entry.pattern_key, None)
+        if old is not None:
+            self.nbytes -= old.nbytes
+        self._entries[entry.pattern_key] = entry
+        self.nbytes += entry.nbytes
+        self._evict()
+        return
+
+
+# The cache shared by all solvers in the process. Disabled until given a
+# budget.
+factorization_cache = FactorizationCache(budget=0)
+
+
+def cached_factorization(A, **kwargs):
+    """
+    Return a factorization of `A` obtained from the process-wide cache. See
+    :meth:`FactorizationCache.get`.
+    """
+    return factorization_cache.get(A, **kwargs)
+
+
+def release_factorization(context):
+    """
+    Hand back a context obtained from :func:`cached_factorization` to the
+    process-wide cache. See :meth:`FactorizationCache.release`.
+    """
+    return factorization_cache.release(context)
@@ -0,0 +1,392 @@
+"""
+Fill-reducing orderings of sparse symmetric matrices.
+
+Orderings are returned as integer arrays `p` such that row and column `k` of
+the permuted matrix are row and column `p[k]` of the original matrix. The
+sparsity pattern of a symmetric matrix is given by the row and column indices
+of the elements of its lower (or upper) triangle; diagonal elements are
+ignored.
+
+.. moduleauthor:: D. Orban <dominique.orban@gerad.ca>
+"""
+
+__docformat__ = 'restructuredtext'
+
+import hashlib
+from collections import OrderedDict, deque
+import numpy as np
+
+
+def adjacency(n, irow, jcol):
+    """
+    Return the adjacency structure `(ptr, ind)` of the graph of the
+    symmetric matrix of order `n` with off-diagonal elements in positions
+    `(irow[k], jcol[k])`. The neighbours of node `i` are
+    `ind[ptr[i]:ptr[i+1]]`, sorted in increasing order and without
+    duplicates.
+    """
+    irow = np.asarray(irow, dtype=np.intp)
+    jcol = np.asarray(jcol, dtype=np.intp)
+    off = irow != jcol
+    rows = np.concatenate((irow[off], jcol[off]))
+    cols = np.concatenate((jcol[off], irow[off]))
+    if rows.size > 0:
+        # Sort by row, then by column, and remove duplicates.
+        key = rows * n + cols
+        key = np.unique(key)
+        rows = key // n ; cols = key % n
+    ptr = np.zeros(n + 1, dtype=np.intp)
+    ptr[1:] = np.cumsum(np.bincount(rows, minlength=n))
+    return (ptr, cols)
+
+
+def _cholmod_amd(n, irow, jcol):
+    """
+    Compute an approximate minimum degree ordering with the compiled AMD of
+    CHOLMOD, through the `scikit-sparse` package. Return `None` if it is not
+    available.
+    """
+    try:
+        from sksparse.cholmod import analyze
+        import scipy.sparse
+    except ImportError:
+        return None
+    (ptr, ind) = adjacency(n, irow, jcol)
+    # Only the pattern is analyzed. The diagonal is added so that the
+    # symbolic factorization is defined.
+    rows = np.concatenate((np.repeat(np.arange(n), np.diff(ptr)),
+                           np.arange(n)))
+    cols = np.concatenate((ind, np.arange(n)))
+    A = scipy.sparse.csc_matrix((np.ones(rows.size), (rows, cols)),
+                                shape=(n, n))
+    factor = analyze(A, mode='simplicial', ordering_method='amd')
+    return np.asarray(factor.P(), dtype=np.intp)
+
+
+def have_compiled_amd():
+    "Return `True` if the compiled AMD of CHOLMOD is available."
+    try:
+        import sksparse.cholmod
+    except ImportError:
+        return False
+    return True
+
+
+def amd(n, irow, jcol, dense=10.0, compiled=True):
+    """
+    Compute an approximate minimum degree ordering of the symmetric matrix
+    of order `n` whose sparsity pattern is given by `irow` and `jcol`.
+
+    If the `scikit-sparse` package is installed, and unless `compiled` is
+    `False`, the ordering is computed by the compiled AMD of CHOLMOD.
+    Otherwise, the pure Python version described below is used. Its loop
+    over the eliminations and its set operations make it suitable for
+    small and medium matrices only: its cost grows with the size of the
+    elements formed, and it already takes over half a second on a 5-point
+    Laplacian of order 10,000. See :func:`default_ordering`.
+
+    The elimination is simulated on the quotient graph. Eliminated nodes
+    become elements that absorb the elements adjacent to them. Degrees are
+    replaced by the upper bounds of Amestoy, Davis and Duff, which are
+    updated at a cost proportional to the size of the new element. Nodes of
+    degree larger than `dense` times the square root of `n` are removed
+    from the graph at the start and ordered last.
+
+    :keywords:
+
+        :dense:    threshold for the detection of dense rows in the Python
+                   version (default: 10). Set to `None` to disable the
+                   detection.
+        :compiled: use the compiled AMD of CHOLMOD if it is available
+                   (default: `True`).
+
+    Reference: P. R. Amestoy, T. A. Davis and I. S. Duff, *An Approximate
+    Minimum Degree Ordering Algorithm*, SIAM Journal on Matrix Analysis and
+    Applications, 17(4), pp. 886--905, 1996.
+    """
+    if compiled:
+        perm = _cholmod_amd(n, irow, jcol)
+        if perm is not None: return perm
+
+    (ptr, ind) = adjacency(n, irow, jcol)
+    degree = np.diff(ptr)
+
+    # Set dense nodes aside.
+    if dense is not None and n > 16:
+        isdense = degree > max(16, dense * np.sqrt(n))
+    else:
+        isdense = np.zeros(n, dtype=bool)
+    dense_nodes = np.flatnonzero(isdense)
+
+    # Quotient graph: variables adjacent to each variable, elements adjacent
+    # to each variable and variables in each element.
+    adj = [set(ind[ptr[i]:ptr[i+1]][~isdense[ind[ptr[i]:ptr[i+1]]]])
+           for i in xrange(n)]
+    elems = [set() for i in xrange(n)]
+    members = {}
+    deg = [len(adj[i]) for i in xrange(n)]
+    nleft = n - dense_nodes.size
+
+    # Degree lists.
+    buckets = {}
+    for i in xrange(n):
+        if not isdense[i]: buckets.setdefault(deg[i], set()).add(i)
+    mindeg = 0
+
+    perm = np.empty(n, dtype=np.intp)
+    k = 0
+    while k < nleft:
+
+        # Select a variable of minimum approximate degree.
+        while mindeg not in buckets or not buckets[mindeg]: mindeg += 1
+        p = buckets[mindeg].pop()
+        perm[k] = p ; k += 1
+
+        # Form the new element Lp and absorb the elements adjacent to p.
+        Lp = set(adj[p])
+        for e in elems[p]:
+            Lp |= members.pop(e)
+        Lp.discard(p)
+        absorbed = elems[p]
+        adj[p] = None ; elems[p] = None
+        members[p] = Lp
+
+        # Compute |Le \ Lp| for each element e adjacent to a variable of Lp.
+        w = {}
+        for i in Lp:
+            elems[i] -= absorbed
+            for e in elems[i]:
+                w[e] = w.get(e, len(members[e])) - 1
+
+        # Update the quotient graph and the approximate degrees.
+        nLp = len(Lp)
+        for i in Lp:
+            adj[i] -= Lp
+            adj[i].discard(p)
+            elems[i].add(p)
+            d = len(adj[i]) + nLp - 1
+            for e in elems[i]:
+                if e != p: d += w[e]
+            d = min(d, deg[i] + nLp - 1, nleft - k - 1)
+            buckets[deg[i]].discard(i)
+            deg[i] = d
+            buckets.setdefault(d, set()).add(i)
+            if d < mindeg: mindeg = d
+
+    perm[k:] = dense_nodes
+    return perm
+
+
+def _bfs_levels(root, ptr, ind, mark, stamp):
+    """
+    Return the nodes reached by a breadth-first search from `root` and the
+    number of levels of the search. Visited nodes are marked with `stamp`.
+    """
+    mark[root] = stamp
+    order = [root] ; level = [root] ; nlevels = 1
+    while True:
+        nxt = []
+        for i in level:
+            for j in ind[ptr[i]:ptr[i+1]]:
+                if mark[j] != stamp:
+                    mark[j] = stamp
+                    nxt.append(j)
+        if not nxt: break
+        order.extend(nxt) ; level = nxt ; nlevels += 1
+    return (order, level, nlevels)
+
+
+def rcm(n, irow, jcol):
+    """
+    Compute a reverse Cuthill-McKee ordering of the symmetric matrix of
+    order `n` whose sparsity pattern is given by `irow` and `jcol`. The
+    ordering reduces the bandwidth and the profile of the matrix rather than
+    the fill of its factors. Each connected component is numbered by a
+    breadth-first search started from a pseudo-peripheral node, visiting
+    neighbours by increasing degree.
+
+    Reference: A. George and J. W. H. Liu, *Computer Solution of Large
+    Sparse Positive Definite Systems*, Prentice-Hall, 1981.
+    """
+    (ptr, ind) = adjacency(n, irow, jcol)
+    degree = np.diff(ptr)
+    mark = -np.ones(n, dtype=np.intp)
+    visited = np.zeros(n, dtype=bool)
+    perm = np.empty(n, dtype=np.intp)
+    k = 0 ; stamp = 0
+
+    for start in np.argsort(degree, kind='mergesort'):
+        if visited[start]: continue
+
+        # Find a pseudo-peripheral node of the component of start.
+        root = start
+        (comp, last, nlevels) = _bfs_levels(root, ptr, ind, mark, stamp)
+        while True:
+            stamp += 1
+            cand = min(last, key=lambda i: degree[i])
+            (c, l, nl) = _bfs_levels(cand, ptr, ind, mark, stamp)
+            if nl <= nlevels: break
+            (root, last, nlevels) = (cand, l, nl)
+        stamp += 1
+
+        # Cuthill-McKee numbering of the component.
+        visited[root] = True
+        queue = deque([root])
+        first = k
+        while queue:
+            i = queue.popleft()
+            perm[k] = i ; k += 1
+            nbrs = ind[ptr[i]:ptr[i+1]]
+            nbrs = nbrs[~visited[nbrs]]
+            nbrs = nbrs[np.argsort(degree[nbrs], kind='mergesort')]
+            visited[nbrs] = True
+            queue.extend(nbrs)
+        perm[first:k] = perm[first:k][::-1]
+    return perm
+
+
+def nested_dissection(n, irow, jcol):
+    """
+    Compute a nested dissection ordering of the symmetric matrix of order
+    `n` whose sparsity pattern is given by `irow` and `jcol` with METIS.
+    This ordering usually produces sparser factors than minimum degree
+    orderings on matrices arising from discretizations in two or three
+    dimensions.
+
+    This function requires the `pymetis` package and raises `ImportError`
+    if it is not available.
+    """
+    import pymetis
+    (ptr, ind) = adjacency(n, irow, jcol)
+    (perm, iperm) = pymetis.nested_dissection(xadj=list(ptr),
+                                              adjncy=list(ind))
+    return np.asarray(perm, dtype=np.intp)
+
+
+def natural(n, irow, jcol):
+    "Return the identity permutation of order `n`."
+    return np.arange(n, dtype=np.intp)
+
+
+# Orderings by name.
+orderings = {'amd': amd,
+             'rcm': rcm,
+             'metis': nested_dissection,
+             'natural': natural}
+
+
+class OrderingCache:
+    """
+    A cache of orderings keyed on the method name and the sparsity pattern,
+    with least-recently-used eviction. Orderings of matrices whose values
+    change but whose pattern does not, as in interior-point methods, are
+    computed once.
+
+    :keywords:
+
+        :size:  maximum number of orderings kept (default: 32).
+    """
+
+    def __init__(self, size=32):
+        self.size = size
+        self._entries = OrderedDict()
+        self.reset_stats()
+
+    def reset_stats(self):
+        "Reset the counters reported by :meth:`stats`."
+        self.hits = 0
+        self.misses = 0
+        return
+
+    def stats(self):
+        "Return a dictionary of statistics on the use of the cache."
+        return {'hits': self.hits, 'misses': self.misses,
+                'entries': len(self._entries), 'size': self.size}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        "Remove all orderings."
+        self._entries.clear()
+        return
+
+    def _key(self, method, n, irow, jcol):
+        h = hashlib.sha1()
+        h.update(repr((method, n)))
+        h.update(np.ascontiguousarray(irow, dtype=np.intp).tostring())
+        h.update(np.ascontiguousarray(jcol, dtype=np.intp).tostring())
+        return h.hexdigest()
+
+    def get(self, method, n, irow, jcol):
+        """
+        Return the ordering computed by the method named `method`, one of
+        the keys of :data:`orderings`, for the given sparsity pattern.
+        """
+        if method not in orderings:
+            raise ValueError, 'Unknown ordering %s' % method
+        key = self._key(method, n, irow, jcol)
+        perm = self._entries.pop(key, None)
+        if perm is None:
+            self.misses += 1
+            perm = orderings[method](n, irow, jcol)
+        else:
+            self.hits += 1
+        self._entries[key] = perm
+        while len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+        return perm.copy()
+
+
+# The cache shared by all contexts in the process.
+ordering_cache = OrderingCache()
+
+
+def fill_reducing_ordering(n, irow, jcol, method='amd', cache=True):
+    """
+    Return the ordering of the symmetric matrix of order `n` whose sparsity
+    pattern is given by `irow` and `jcol` computed by the method named
+    `method`: 'amd', 'metis' (nested dissection), 'rcm' or 'natural'. If
+    `method` is 'metis' and METIS is not available, AMD is used instead.
+    Unless `cache` is `False`, orderings are looked up in and stored into
+    the process-wide ordering cache.
+    """
+    if method == 'metis':
+        try:
+            import pymetis
+        except ImportError:
+            method = 'amd'
+    if cache:
+        return ordering_cache.get(method, n, irow, jcol)
+    if method not in orderings:
+        raise ValueError, 'Unknown ordering %s' % method
+    return orderings[method](n, irow, jcol)
+
+
+# Largest order for which the Python AMD is the default ordering.
+python_amd_max = 20000
+
+
+def default_ordering(n):
+    """
+    Return the name of the ordering used by default for a matrix of order
+    `n` by factorizations that require one, such as
+    :class:`PyLDLContext`: 'amd' if the compiled AMD is available or if `n`
+    is at most :data:`python_amd_max`, and otherwise 'metis' if METIS is
+    available, or 'rcm', whose cost is proportional to the number of
+    nonzeros but which produces more fill.
+    """
+    if n <= python_amd_max or have_compiled_amd():
+        return 'amd'
+    try:
+        import pymetis
+    except ImportError:
+        return 'rcm'
+    return 'metis'
+
+
+def inverse_permutation(p):
+    "Return the inverse of the permutation `p`."
+    pinv = np.empty(p.size, dtype=np.intp)
+    pinv[p] = np.arange(p.size)
+    return pinv
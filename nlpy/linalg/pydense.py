@@ -0,0 +1,321 @@
+"""
+PyDense: Dense factorization of small or dense symmetric matrices with
+LAPACK, avoiding the overhead of sparse solvers on such matrices.
+"""
+
+import numpy
+from pysparse.sparse.pysparseMatrix import PysparseMatrix
+from sils import Sils
+from pyldl import NumPyFactor
+
+try:
+    from scipy.linalg import cho_factor, cho_solve, ldl, solve_triangular
+    _have_scipy = True
+except ImportError:
+    _have_scipy = False
+
+__docformat__ = 'restructuredtext'
+
+
+class _DenseFactor(NumPyFactor):
+    """
+    Dense factorization of the symmetric matrix `A`, given as a two-
+    dimensional array. If `cholesky` is `True`, a Cholesky factorization
+    (LAPACK potrf) is attempted first. If it fails, or if `cholesky` is
+    `False`, a Bunch-Kaufman factorization (LAPACK sytrf) is computed.
+    Without SciPy, which provides the interface to those LAPACK routines, an
+    eigenvalue decomposition (LAPACK syevd) is used instead.
+
+    Once a Cholesky factorization has failed, it is not attempted again:
+    matrices refactorized with the same context are usually of the same kind.
+
+    The solve and refinement methods are those of :class:`NumPyFactor`.
+    """
+
+    def __init__(self, n, pivtol, cholesky=True):
+        self.n = n
+        self.pivtol = pivtol
+        self.cholesky = cholesky
+        self.A = None
+        self.kind = None
+        self.perm = numpy.arange(n)
+        self.n2x2pivots = 0
+        self.neig = 0
+        self.rank = 0
+
+    def factorize(self, A):
+        n = self.n
+        self.A = A
+        anorm = max(1.0, numpy.max(numpy.abs(A))) if A.size else 1.0
+        tiny = self.pivtol * anorm
+        self.perm = numpy.arange(n)
+        self.n2x2pivots = 0
+
+        if _have_scipy:
+            if self.cholesky:
+                try:
+                    self._chol = cho_factor(A, lower=True, check_finite=False)
+                    self.kind = 'cholesky'
+                    self.neig = 0
+                    pivots = numpy.diag(self._chol[0])**2
+                    self.rank = n - int(numpy.sum(pivots <= tiny))
+                    return
+                except numpy.linalg.LinAlgError:
+                    self.cholesky = False
+
+            # Bunch-Kaufman factorization A = Q L D L^T Q^T. D is block
+            # diagonal and is stored as the tridiagonal matrix of its
+            # inverse. Singular blocks have a zero inverse, as in MA27.
+            (lu, D, perm) = ldl(A, lower=True, check_finite=False)
+            self.kind = 'ldl'
+            self.perm = perm
+            self._L = lu[perm]
+            a = numpy.diag(D).copy()
+            e = numpy.diag(D, -1).copy() if n > 1 else numpy.zeros(0)
+            start = numpy.flatnonzero(e)
+            one = numpy.ones(n, dtype=bool)
+            one[start] = False ; one[start+1] = False
+            p = a[start] ; q = a[start+1] ; r = e[start]
+            half = numpy.sqrt(0.25 * (p - q)**2 + r**2)
+            eigs = numpy.concatenate((a[one], 0.5 * (p + q) - half,
+                                      0.5 * (p + q) + half))
+            self.n2x2pivots = start.size
+            self.neig = int(numpy.sum(eigs < -tiny))
+            self.rank = int(numpy.sum(numpy.abs(eigs) > tiny))
+
+            self._dinv = numpy.zeros(n)
+            self._einv = numpy.zeros(max(n-1, 0))
+            nonsing = one & (numpy.abs(a) > tiny)
+            self._dinv[nonsing] = 1.0 / a[nonsing]
+            det = p * q - r * r
+            ok = numpy.abs(det) > tiny * tiny
+            s = start[ok]
+            self._dinv[s] = q[ok] / det[ok]
+            self._dinv[s+1] = p[ok] / det[ok]
+            self._einv[s] = -r[ok] / det[ok]
+            return
+
+        (eigs, V) = numpy.linalg.eigh(A)
+        self.kind = 'eig'
+        self._V = V
+        self._einv = numpy.zeros(n)
+        nonsing = numpy.abs(eigs) > tiny
+        self._einv[nonsing] = 1.0 / eigs[nonsing]
+        self.neig = int(numpy.sum(eigs < -tiny))
+        self.rank = int(numpy.sum(nonsing))
+        return
+
+    def _solve(self, B):
+        "Overwrite the (n, k) array B with the solution of AX = B."
+        if self.kind == 'cholesky':
+            B[:, :] = cho_solve(self._chol, B, check_finite=False)
+        elif self.kind == 'ldl':
+            perm = self.perm
+            Y = solve_triangular(self._L, B[perm, :], lower=True,
+                                 unit_diagonal=True, check_finite=False)
+            Z = self._dinv[:, numpy.newaxis] * Y
+            Z[:-1, :] += self._einv[:, numpy.newaxis] * Y[1:, :]
+            Z[1:, :] += self._einv[:, numpy.newaxis] * Y[:-1, :]
+            B[perm, :] = solve_triangular(self._L, Z, lower=True, trans='T',
+                                          unit_diagonal=True,
+                                          check_finite=False)
+        else:
+            V = self._V
+            B[:, :] = numpy.dot(V, self._einv[:, numpy.newaxis] *
+                                numpy.dot(V.T, B))
+        return
+
+    def matvec(self, X):
+        "Return AX for the (n, k) array X."
+        return numpy.dot(self.A, X)
+
+
+class PyDenseContext( Sils ):
+
+    def __init__( self, A, factorize=True, **kwargs ):
+        """
+        Create a PyDenseContext object representing a context to solve
+        the square symmetric linear system of equations
+
+            A x = b.
+
+        A should be given in ll_mat format and should be symmetric. It is
+        converted to a dense array and factorized with LAPACK. The interface
+        is that of PyMa27Context and PyMa57Context. On small matrices, and
+        on matrices that are nearly dense, this is faster than the sparse
+        factorizations, whose analyze phase and data structures then cost
+        more than they save.
+
+        Unless A is declared sqd, a Cholesky factorization is attempted
+        first, which succeeds if A is positive definite. Otherwise, the
+        Bunch-Kaufman factorization
+
+            P^T A P = L B L^T
+
+        is computed, where L is unit lower triangular and B is block diagonal
+        with 1x1 and 2x2 blocks. The LAPACK routines are called through SciPy.
+        If SciPy is not available, an eigenvalue decomposition of A is used.
+        Once a Cholesky factorization has failed, it is no longer attempted
+        when A is refactorized.
+
+        :attr:`neig` is the number of negative eigenvalues of A and
+        :attr:`rank` is the number of its eigenvalues, or of the eigenvalues
+        of B, whose magnitude exceeds `pivtol` times the largest element of
+        A. Singular pivots are ignored during the solve, as in MA27.
+
+        Currently accepted keyword arguments are:
+
+           sqd     Flag indicating symmetric quasi-definite matrix
+                   (default: False). If True, no Cholesky factorization
+                   is attempted.
+           pivtol  Relative threshold for zero pivots (default: 1.0e-15)
+           memory_limit  Storage allowed for the matrix and its factors, in
+                   megabytes (default: None). See Sils.
+
+        Example:
+            from nlpy.linalg.pydense import PyDenseContext
+            from nlpy.tools import norms
+            P = PyDenseContext( A )
+            P.solve( rhs, get_resid = True )
+            print norms.norm2( P.residual )
+        """
+
+        if isinstance(A, PysparseMatrix):
+            thisA = A.matrix
+        else:
+            thisA = A
+
+        Sils.__init__( self, thisA, **kwargs )
+
+        # The matrix and its factors are stored as n x n arrays.
+        n = self.n
+        self._set_forecast( n * n, n, 16 * n * n, n**3 / 3.0 )
+
+        self.context = _DenseFactor( self.n, kwargs.get('pivtol', 1.0e-15),
+                                     cholesky=not self.sqd )
+        self._M = numpy.zeros( (self.n, self.n) )
+
+        # Statistics on A
+        self.nzFact = self.n * (self.n + 1) / 2  # Nonzeros in factors
+        self.n2x2pivots = 0  # 2x2 pivots used
+        self.neig = 0        # Negative eigenvalues detected
+        self.rank = 0
+        self.isFullRank = False
+
+        self.factorized = False
+        if factorize: self.factorize( thisA )
+        return
+
+    def _factorize( self ):
+        self.context.factorize( self._M )
+        self.n2x2pivots = self.context.n2x2pivots
+        self.neig = self.context.neig
+        self.rank = self.context.rank
+        self.isFullRank = (self.rank == self.n)
+        self.factorized = True
+        self.nfact += 1
+        return
+
+    def factorize( self, A ):
+        "Perform the numerical factorization of A."
+        if isinstance(A, PysparseMatrix):
+            thisA = A.matrix
+        else:
+            thisA = A
+
+        (val, irow, jcol) = thisA.find()
+        irow = numpy.asarray( irow, dtype=numpy.intp )
+        jcol = numpy.asarray( jcol, dtype=numpy.intp )
+        M = self._M
+        M[:, :] = 0.0
+        M[irow, jcol] = val
+        M[jcol, irow] = val
+        self._factorize()
+        return
+
+    def element_positions( self, irow, jcol ):
+        """
+        Return the positions of the elements (irow[k], jcol[k]), to be given
+        to :meth:`factorize_elements`, as a (2, k) array of indices.
+        Positions of several sets of elements may be concatenated along the
+        last axis.
+        """
+        return numpy.array( [irow, jcol], dtype=numpy.intp )
+
+    def diagonal_positions( self, rows ):
+        """
+        Return the positions of the diagonal elements (i,i), for i in `rows`,
+        to be given to :meth:`factorize_diagonal`.
+        """
+        return self.element_positions( rows, rows )
+
+    def factorize_elements( self, pos, values ):
+        """
+        Overwrite the elements of the last matrix factorized found in
+        positions `pos`, as returned by :meth:`element_positions`, and their
+        symmetric counterparts with `values` and factorize the updated
+        matrix.
+        """
+        self._M[pos[0], pos[1]] = values
+        self._M[pos[1], pos[0]] = values
+        self._factorize()
+        return
+
+    def factorize_diagonal( self, pos, values ):
+        """
+        Overwrite the diagonal elements of the last matrix factorized found
+        in positions `pos`, as returned by :meth:`diagonal_positions`, with
+        `values` and factorize the updated matrix.
+        """
+        self.factorize_elements( pos, values )
+        return
+
+    def solve( self, b, get_resid = True, **kwargs ):
+        """
+        solve(b) solves the linear system of equations Ax = b.
+        The solution will be found in self.x and residual in
+        self.residual.
+
+        If b is an (n, k) array, the k systems are solved and the (n, k)
+        solution is returned. See Sils._solve_multiple() for the keywords
+        controlling residuals and iterative refinement.
+        """
+        if not self.factorized:
+            raise ValueError, 'Matrix must be factorized before solving'
+        if numpy.ndim( b ) == 2:
+            return self._solve_multiple( b, get_resid, **kwargs )
+        self.context.solve( numpy.asarray( b, dtype=numpy.float ), self.x,
+                            self.residual, get_resid )
+        return None
+
+    def refine( self, b, nitref = 3, tol = 1.0e-8, **kwargs ):
+        """
+        refine( b, tol, nitref ) performs iterative refinement if necessary
+        until the scaled residual norm ||b-Ax||/(1+||b||) falls below the
+        threshold 'tol' or until nitref steps are taken.
+        Make sure you have called solve() with the same right-hand
+        side b before calling refine().
+        The residual vector self.residual will be updated to reflect
+        the updated approximate solution.
+
+        By default, tol = 1.0e-8 and nitref = 3.
+        """
+        self.context.refine( self.x, self.residual, b, tol, nitref )
+        return None
+
+    def _refine_column( self, x, r, b, nitref, tol = 1.0e-8, **kwargs ):
+        self.context.refine( x, r, b, tol, nitref )
+        return None
+
+    def fetch_perm( self ):
+        """
+        fetch_perm() returns the permutation vector p used
+        to compute the factorization of A. Rows and columns
+        were permuted so that
+
+              P^T  A P = L  B  L^T
+
+        where i-th row of P is the p(i)-th row of the
+        identity matrix. Indices are 1-based, as in PyMa27Context.
+        """
+        return list( self.context.perm + 1 )
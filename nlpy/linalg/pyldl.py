@@ -0,0 +1,423 @@
+"""
+PyLDL: Sparse LDL^T factorization of symmetric quasi-definite matrices
+written with NumPy only, for use when the HSL solvers are not available.
+"""
+
+import numpy
+from pysparse.sparse.pysparseMatrix import PysparseMatrix
+from sils import Sils
+from ordering import default_ordering, inverse_permutation
+
+__docformat__ = 'restructuredtext'
+
+
+class NumPyFactor:
+    """
+    Base class of the factorizations computed with NumPy, which play the
+    role of the compiled contexts of the HSL solvers. Subclasses implement
+    :meth:`_solve`, which overwrites an `(n, k)` array B with the solution of
+    AX = B, and :meth:`matvec`, which returns AX. Solves with residuals and
+    iterative refinement are implemented here.
+    """
+
+    def _solve(self, B):
+        "Must be subclassed."
+        raise NotImplementedError
+
+    def matvec(self, X):
+        "Must be subclassed."
+        raise NotImplementedError
+
+    def solve_many(self, B, X, R, get_resid):
+        "Solve AX = B. Residuals are stored in R if `get_resid` is `True`."
+        X[:, :] = B
+        self._solve(X)
+        if get_resid: R[:, :] = B - self.matvec(X)
+        return
+
+    def solve(self, b, x, r, get_resid):
+        "Solve Ax = b. The residual is stored in r if `get_resid` is `True`."
+        self.solve_many(b[:, numpy.newaxis], x[:, numpy.newaxis],
+                        r[:, numpy.newaxis], get_resid)
+        return
+
+    def refine(self, x, r, b, tol, nitref):
+        """
+        Perform iterative refinement on x until the scaled residual norm
+        ||b-Ax||/(1+||b||) falls below `tol` or `nitref` steps are taken.
+        """
+        bnorm = 1.0 + numpy.linalg.norm(b, ord=numpy.inf)
+        r[:] = b - self.matvec(x[:, numpy.newaxis])[:, 0]
+        dx = numpy.empty(self.n) ; dr = numpy.empty(self.n)
+        for k in xrange(nitref):
+            if numpy.linalg.norm(r, ord=numpy.inf) <= tol * bnorm: break
+            self.solve(r, dx, dr, False)
+            x += dx
+            r[:] = b - self.matvec(x[:, numpy.newaxis])[:, 0]
+        return
+
+
+class _LDLFactor(NumPyFactor):
+    """
+    Symbolic and numerical LDL^T factorization of the symmetric matrix given
+    by the elements `(val, irow, jcol)` of its lower triangle. The symbolic
+    phase is performed once, in the constructor, and reused by
+    :meth:`factorize` as long as the sparsity pattern is unchanged.
+    """
+
+    def __init__(self, n, irow, jcol, perm, pivtol, regpiv):
+        self.n = n
+        self.irow = irow.copy()
+        self.jcol = jcol.copy()
+        self.perm = perm
+        self.pivtol = pivtol
+        self.regpiv = regpiv
+        self._symbolic()
+        self.d = numpy.zeros(n)
+        self.Lx = numpy.zeros(self.Li.size)
+        self._work = numpy.zeros(n)
+        self.val = None
+        self.neig = 0
+        self.rank = 0
+
+    def _symbolic(self):
+        n = self.n
+        pinv = inverse_permutation(self.perm)
+
+        # Lower triangle of the permuted matrix. The position of each element
+        # in the column-compressed storage is kept in `_amap`.
+        pi = pinv[self.irow] ; pj = pinv[self.jcol]
+        rows = numpy.maximum(pi, pj) ; cols = numpy.minimum(pi, pj)
+        diag = rows == cols
+        self._dmap = numpy.flatnonzero(diag)
+        self._didx = rows[diag]
+        off = numpy.flatnonzero(~diag)
+        rows = rows[off] ; cols = cols[off]
+        order = numpy.lexsort((rows, cols))
+        self._amap = off[order]
+        self.Ai = rows[order]
+        self.Ap = numpy.zeros(n+1, dtype=numpy.intp)
+        self.Ap[1:] = numpy.cumsum(numpy.bincount(cols, minlength=n))
+
+        # Same elements by rows: row i holds the columns j < i.
+        order = numpy.lexsort((cols, rows))
+        Aj = cols[order]
+        Arp = numpy.zeros(n+1, dtype=numpy.intp)
+        Arp[1:] = numpy.cumsum(numpy.bincount(rows, minlength=n))
+
+        # Elimination tree, with path compression.
+        parent = -numpy.ones(n, dtype=numpy.intp)
+        ancestor = -numpy.ones(n, dtype=numpy.intp)
+        for i in xrange(n):
+            for j in Aj[Arp[i]:Arp[i+1]]:
+                while j != -1 and j < i:
+                    jnext = ancestor[j]
+                    ancestor[j] = i
+                    if jnext == -1: parent[j] = i
+                    j = jnext
+        self.parent = parent
+
+        # Pattern of each row of L: the nodes reached from the pattern of
+        # row i of A by climbing the elimination tree.
+        mark = -numpy.ones(n, dtype=numpy.intp)
+        Ri = [] ; Rcount = numpy.zeros(n, dtype=numpy.intp)
+        for i in xrange(n):
+            mark[i] = i
+            for j in Aj[Arp[i]:Arp[i+1]]:
+                while mark[j] != i:
+                    mark[j] = i
+                    Ri.append(j)
+                    Rcount[i] += 1
+                    j = parent[j]
+        self.Ri = numpy.array(Ri, dtype=numpy.intp)
+        self.Rp = numpy.zeros(n+1, dtype=numpy.intp)
+        self.Rp[1:] = numpy.cumsum(Rcount)
+
+        # Pattern of each column of L, with rows in increasing order.
+        Rrow = numpy.repeat(numpy.arange(n), Rcount)
+        order = numpy.argsort(self.Ri, kind='mergesort')
+        self.Li = Rrow[order]
+        self.Lp = numpy.zeros(n+1, dtype=numpy.intp)
+        self.Lp[1:] = numpy.cumsum(numpy.bincount(self.Ri, minlength=n))
+        return
+
+    def check_pattern(self, irow, jcol):
+        "Raise `ValueError` if the pattern differs from the analyzed one."
+        if not (numpy.array_equal(irow, self.irow) and
+                numpy.array_equal(jcol, self.jcol)):
+            raise ValueError, 'Sparsity pattern has changed since analysis'
+        return
+
+    def factorize(self, val):
+        """
+        Numerical factorization, column by column. Column j of L is computed
+        from column j of A and the columns k of L such that L[j,k] is nonzero,
+        which are given by the pattern of row j of L. Updates from all those
+        columns are applied in a single vectorized operation.
+        """
+        n = self.n
+        self.val = val.copy()
+        Ax = val[self._amap]
+        Ad = numpy.zeros(n)
+        Ad[self._didx] = val[self._dmap]
+        Ai = self.Ai ; Ap = self.Ap
+        Li = self.Li ; Lp = self.Lp ; Lx = self.Lx
+        Ri = self.Ri ; Rp = self.Rp
+        d = self.d ; x = self._work
+        nxt = Lp[:-1].copy()   # Position of next row to visit in each column
+
+        anorm = max(1.0, numpy.max(numpy.abs(val))) if val.size else 1.0
+        tiny = self.pivtol * anorm
+        delta = self.regpiv * anorm
+        nreg = 0
+
+        for j in xrange(n):
+            x[Ai[Ap[j]:Ap[j+1]]] = Ax[Ap[j]:Ap[j+1]]
+            dj = Ad[j]
+            ks = Ri[Rp[j]:Rp[j+1]]
+            if ks.size > 0:
+                pos = nxt[ks]
+                nxt[ks] += 1
+                ljk = Lx[pos]
+                coef = ljk * d[ks]
+                dj -= numpy.dot(ljk, coef)
+
+                # Gather the remaining entries of the columns ks of L.
+                start = pos + 1
+                lens = Lp[ks+1] - start
+                total = lens.sum()
+                if total > 0:
+                    offs = numpy.cumsum(lens) - lens
+                    idx = numpy.repeat(start - offs, lens) + \
+                          numpy.arange(total)
+                    numpy.subtract.at(x, Li[idx],
+                                      Lx[idx] * numpy.repeat(coef, lens))
+
+            # Static pivoting: tiny pivots are replaced by +/- delta.
+            if abs(dj) <= tiny:
+                nreg += 1
+                if dj != 0.0:
+                    dj = numpy.copysign(delta, dj)
+                elif Ad[j] != 0.0:
+                    dj = numpy.copysign(delta, Ad[j])
+                else:
+                    dj = delta
+            d[j] = dj
+            rows = Li[Lp[j]:Lp[j+1]]
+            Lx[Lp[j]:Lp[j+1]] = x[rows] / dj
+            x[rows] = 0.0
+
+        self.neig = int(numpy.sum(d < 0))
+        self.rank = n - nreg
+        return
+
+    def _solve(self, B):
+        "Overwrite the (n, k) array B with the solution of AX = B."
+        Li = self.Li ; Lp = self.Lp ; Lx = self.Lx
+        Y = B[self.perm, :]
+        for j in xrange(self.n):
+            if Lp[j+1] > Lp[j]:
+                Y[Li[Lp[j]:Lp[j+1]], :] -= numpy.outer(Lx[Lp[j]:Lp[j+1]],
+                                                       Y[j, :])
+        Y /= self.d[:, numpy.newaxis]
+        for j in xrange(self.n-1, -1, -1):
+            if Lp[j+1] > Lp[j]:
+                Y[j, :] -= numpy.dot(Lx[Lp[j]:Lp[j+1]],
+                                     Y[Li[Lp[j]:Lp[j+1]], :])
+        B[self.perm, :] = Y
+        return
+
+    def matvec(self, X):
+        "Return AX for the (n, k) array X."
+        val = self.val[:, numpy.newaxis]
+        irow = self.irow ; jcol = self.jcol
+        AX = numpy.zeros(X.shape)
+        numpy.add.at(AX, irow, val * X[jcol, :])
+        off = irow != jcol
+        numpy.add.at(AX, jcol[off], val[off] * X[irow[off], :])
+        return AX
+
+
+class PyLDLContext( Sils ):
+
+    def __init__( self, A, factorize=True, **kwargs ):
+        """
+        Create a PyLDLContext object representing a context to solve
+        the square symmetric linear system of equations
+
+            A x = b.
+
+        A should be given in ll_mat format and should be symmetric. The
+        interface is that of PyMa27Context and PyMa57Context so that this
+        class may be used in their place when the HSL solvers are not
+        available. It is implemented with NumPy only.
+
+        The factorization computed is
+
+            P^T A P = L D L^T
+
+        where P is a fill-reducing permutation, L is unit lower triangular
+        and D is diagonal. No pivoting is performed during the numerical
+        factorization, so that A should be symmetric quasi-definite (sqd),
+        i.e., of the form
+
+            [ E  Gt ]
+            [ G  -F ]
+
+        where both E and F are positive definite. Positive definite and
+        negative definite matrices are sqd. For other matrices, the
+        factorization may be unstable or break down.
+
+        The ordering and the symbolic factorization are computed when the
+        context is created and reused by :meth:`factorize`. Pivots whose
+        magnitude falls below `pivtol` times the largest element of A are
+        replaced by `regpiv` times the same quantity, with the same sign.
+        Each such pivot decreases :attr:`rank` by one so that
+        :attr:`isFullRank` signals matrices that are numerically singular.
+        :attr:`neig` is the number of negative pivots.
+
+        Currently accepted keyword arguments are:
+
+           sqd       Flag indicating a sqd matrix (default: True)
+           ordering  'amd', 'metis', 'rcm', 'natural' or a permutation
+                     array (default: given by default_ordering(n), i.e.,
+                     'amd' unless n is large and the compiled AMD is not
+                     available). See nlpy.linalg.ordering.
+           pivtol    Relative threshold for tiny pivots (default: 1.0e-15)
+           regpiv    Relative value of regularized pivots (default: 1.0e-8)
+           memory_limit  Storage allowed for the factors, in megabytes
+                     (default: None). See Sils. The limit is checked after
+                     the symbolic factorization, whose storage is that of
+                     the sparsity pattern of the factors.
+
+        Example:
+            from nlpy.linalg.pyldl import PyLDLContext
+            from nlpy.tools import norms
+            P = PyLDLContext( A )
+            P.solve( rhs, get_resid = True )
+            print norms.norm2( P.residual )
+        """
+
+        if isinstance(A, PysparseMatrix):
+            thisA = A.matrix
+        else:
+            thisA = A
+
+        kwargs.setdefault('sqd', True)
+        Sils.__init__( self, thisA, **kwargs )
+
+        (val, irow, jcol) = self._lower( thisA )
+        ordering = kwargs.get('ordering', None)
+        if ordering is None: ordering = default_ordering( self.n )
+        perm = self._pivot_order( irow, jcol, ordering )
+
+        self.context = _LDLFactor( self.n, irow, jcol, perm,
+                                   kwargs.get('pivtol', 1.0e-15),
+                                   kwargs.get('regpiv', 1.0e-8) )
+
+        # Forecasts. Column j of L with c nonzeros costs c divisions and
+        # c (c + 1) / 2 multiply-adds.
+        nzL = self.context.Li.size
+        c = numpy.diff( self.context.Lp )
+        self._set_forecast( nzL + self.n, nzL + self.n + 1,
+                            16 * (nzL + self.n),
+                            float( numpy.sum( c * (c + 2) ) ) )
+
+        # Statistics on A
+        self.nzFact = nzL + self.n  # Nonzeros in factors
+        self.n2x2pivots = 0  # 2x2 pivots used
+        self.neig = 0        # Negative eigenvalues detected
+        self.rank = 0
+        self.isFullRank = False
+
+        self.factorized = False
+        if factorize: self._factorize( val, irow, jcol )
+        return
+
+    def _lower( self, A ):
+        "Return the elements of the lower triangle of A."
+        (val, irow, jcol) = A.find()
+        irow = numpy.asarray( irow, dtype=numpy.intp )
+        jcol = numpy.asarray( jcol, dtype=numpy.intp )
+        if not A.issym:
+            lower = irow >= jcol
+            (val, irow, jcol) = (val[lower], irow[lower], jcol[lower])
+        return (numpy.asarray( val, dtype=numpy.float ), irow, jcol)
+
+    def _factorize( self, val, irow, jcol ):
+        self.context.check_pattern( irow, jcol )
+        self.context.factorize( val )
+        self.neig = self.context.neig
+        self.rank = self.context.rank
+        self.isFullRank = (self.rank == self.n)
+        self.factorized = True
+        self.nfact += 1
+        return
+
+    def factorize( self, A ):
+        """
+        Perform numerical factorization of A. The ordering and symbolic
+        factorization computed when the context was created are reused.
+
+        The values of the elements of the matrix may have been altered since
+        the analyze phase but the sparsity pattern must not have changed.
+        Otherwise, a `ValueError` is raised.
+        """
+        if isinstance(A, PysparseMatrix):
+            thisA = A.matrix
+        else:
+            thisA = A
+
+        self._factorize( *self._lower( thisA ) )
+        return
+
+    def solve( self, b, get_resid = True, **kwargs ):
+        """
+        solve(b) solves the linear system of equations Ax = b.
+        The solution will be found in self.x and residual in
+        self.residual.
+
+        If b is an (n, k) array, the k systems are solved and the (n, k)
+        solution is returned. See Sils._solve_multiple() for the keywords
+        controlling residuals and iterative refinement.
+        """
+        if not self.factorized:
+            raise ValueError, 'Matrix must be factorized before solving'
+        if numpy.ndim( b ) == 2:
+            return self._solve_multiple( b, get_resid, **kwargs )
+        self.context.solve( numpy.asarray( b, dtype=numpy.float ), self.x,
+                            self.residual, get_resid )
+        return None
+
+    def refine( self, b, nitref = 3, tol = 1.0e-8, **kwargs ):
+        """
+        refine( b, tol, nitref ) performs iterative refinement if necessary
+        until the scaled residual norm ||b-Ax||/(1+||b||) falls below the
+        threshold 'tol' or until nitref steps are taken.
+        Make sure you have called solve() with the same right-hand
+        side b before calling refine().
+        The residual vector self.residual will be updated to reflect
+        the updated approximate solution.
+
+        By default, tol = 1.0e-8 and nitref = 3.
+        """
+        self.context.refine( self.x, self.residual, b, tol, nitref )
+        return None
+
+    def _refine_column( self, x, r, b, nitref, tol = 1.0e-8, **kwargs ):
+        self.context.refine( x, r, b, tol, nitref )
+        return None
+
+    def fetch_perm( self ):
+        """
+        fetch_perm() returns the permutation vector p used
+        to compute the factorization of A. Rows and columns
+        were permuted so that
+
+              P^T  A P = L  D  L^T
+
+        where i-th row of P is the p(i)-th row of the
+        identity matrix, L is unit lower triangular and
+        D is diagonal. Indices are 1-based, as in PyMa27Context.
+        """
+        return list( self.context.perm + 1 )
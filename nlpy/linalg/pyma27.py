@@ -10,7 +10,7 @@ from nlpy.linalg import _pyma27
 
 class PyMa27Context( Sils ):
 
-    def __init__( self, A, **kwargs ):
+    def __init__( self, A, factorize=True, **kwargs ):
         """
         Create a PyMa27Context object representing a context to solve
         the square symmetric linear system of equations
@@ -20,6 +20,8 @@ class PyMa27Context( Sils ):
         A should be given in ll_mat format and should be symmetric.
         The system will first be analyzed and factorized, for later
         solution. Residuals will be computed dynamically if requested.
+        If `factorize` is `False`, only the analyze phase is performed and
+        :meth:`factorize` must be called before solving.
 
         The factorization is a multi-frontal variant of the Bunch-Parlett
         factorization, i.e.
@@ -43,7 +45,14 @@ class PyMa27Context( Sils ):
 
         Currently accepted keyword arguments are:
 
-           sqd  Flag indicating symmetric quasi-definite matrix (default: False)
+           sqd       Flag indicating symmetric quasi-definite matrix
+                     (default: False)
+           ordering  Pivot order: None to let MA27 choose, the name of an
+                     ordering ('amd', 'metis', 'rcm' or 'natural') or a
+                     permutation of 0-based indices (default: None). See
+                     nlpy.linalg.ordering.
+           memory_limit  Storage allowed for the factorization, in megabytes
+                     (default: None). See Sils.
 
         Example:
             from nlpy.linalg import pyma27
@@ -76,19 +85,59 @@ class PyMa27Context( Sils ):
         self.L = spmatrix.ll_mat( self.n, self.n, 0 )
         self.B = spmatrix.ll_mat_sym( self.n, 0 )
 
-        # Analyze and factorize matrix
-        self.context = _pyma27.factor( thisA, self.sqd )
+        # Pivot order, if not chosen by MA27
+        (val, irow, jcol) = thisA.find()
+        perm = self._pivot_order( irow, jcol, kwargs.get('ordering', None) )
+
+        # Analyze matrix and check the storage forecast before factorizing.
+        # The factors are allocated from NRLNEC, which allows compresses.
+        self.factorized = False
+        self.context = _pyma27.analyze( thisA, self.sqd, perm )
+        (nrltot, nirtot, nrlnec, nirnec, nrladu, niradu,
+         ops) = self.context.forecast()
+        self._set_forecast( nrladu, niradu, 8 * nrlnec + 4 * nirnec, ops )
+        if factorize: self.factorize( thisA )
+        return
+
+    def _update_stats( self ):
         (self.rwords, self.iwords, self.ncomp, self.nrcomp, self.nicomp,
          self.n2x2pivots, self.neig, self.rank) = self.context.stats()
-
         self.isFullRank = (self.rank == self.n)
+        self.factorized = True
+        self.nfact += 1
+        return
+
+    def factorize( self, A ):
+        """
+        Perform numerical factorization of A. The ordering and symbolic
+        analysis computed when the context was created are reused, as is the
+        workspace, so that only the numerical factorization takes place.
 
-    def solve( self, b, get_resid = True ):
+        The values of the elements of the matrix may have been altered since
+        the analyze phase but the sparsity pattern must not have changed.
+        Otherwise, a `ValueError` is raised.
+        """
+        if isinstance(A, PysparseMatrix):
+            thisA = A.matrix
+        else:
+            thisA = A
+
+        self.context.factorize( thisA )
+        self._update_stats()
+        return
+
+    def solve( self, b, get_resid = True, **kwargs ):
         """
         solve(b) solves the linear system of equations Ax = b.
         The solution will be found in self.x and residual in
         self.residual.
+
+        If b is an (n, k) array, the k systems are solved and the (n, k)
+        solution is returned. See Sils._solve_multiple() for the keywords
+        controlling residuals and iterative refinement.
         """
+        if numpy.ndim( b ) == 2:
+            return self._solve_multiple( b, get_resid, **kwargs )
         self.context.ma27( b, self.x, self.residual, get_resid )
         return None
 
@@ -107,6 +156,11 @@ class PyMa27Context( Sils ):
         self.context.refine( self.x, self.residual, b, tol, nitref )
         return None
 
+    def _refine_column( self, x, r, b, nitref, tol = 1.0e-8, **kwargs ):
+        # MA27 refinement overwrites the right-hand side.
+        self.context.refine( x, r, b.copy(), tol, nitref )
+        return None
+
     def fetch_perm( self ):
         """
         fetch_perm() returns the permutation vector p used
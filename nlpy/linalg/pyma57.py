@@ -42,7 +42,14 @@ class PyMa57Context( Sils ):
 
         Currently accepted keyword arguments are:
 
-           sqd  Flag indicating symmetric quasi-definite matrix (default: False)
+           sqd       Flag indicating symmetric quasi-definite matrix
+                     (default: False)
+           ordering  Pivot order: None to let MA57 choose, the name of an
+                     ordering ('amd', 'metis', 'rcm' or 'natural') or a
+                     permutation of 0-based indices (default: None). See
+                     nlpy.linalg.ordering.
+           memory_limit  Storage allowed for the factorization, in megabytes
+                     (default: None). See Sils.
 
         Example:
 
@@ -96,8 +103,15 @@ class PyMa57Context( Sils ):
         #self.L = spmatrix.ll_mat( self.n, self.n, 0 )
         #self.B = spmatrix.ll_mat_sym( self.n, 0 )
 
-        # Analyze and factorize matrix
-        self.context = _pyma57.analyze( thisA, self.sqd )
+        # Pivot order, if not chosen by MA57
+        (val, irow, jcol) = thisA.find()
+        perm = self._pivot_order( irow, jcol, kwargs.get('ordering', None) )
+
+        # Analyze matrix and check the storage forecast before factorizing
+        self.context = _pyma57.analyze( thisA, self.sqd, perm )
+        (nreal, nint, self.frontForecast, lfact, lifact,
+         flops) = self.context.forecast()
+        self._set_forecast( nreal, nint, 8 * lfact + 4 * lifact, flops )
         self.factorized = False
         if factorize: self.factorize(thisA)
         return
@@ -118,7 +132,12 @@ class PyMa57Context( Sils ):
             thisA = A
 
         self.context.factorize(thisA)
+        self._update_stats()
+        return
+
+    def _update_stats(self):
         self.factorized = True
+        self.nfact += 1
 
         (self.nzFact, self.nRealFact, self.nIntFact, self.front,
          self.n2x2pivots, self.neig, self.rank) = self.context.stats()
@@ -126,12 +145,75 @@ class PyMa57Context( Sils ):
         self.isFullRank = (self.rank == self.n)
         return
 
-    def solve( self, b, get_resid = True ):
+    def element_positions(self, irow, jcol):
+        """
+        Return the positions of the elements (irow[k], jcol[k]) in the array
+        of values of the matrix held by the context. Elements of the upper
+        triangle are mapped to their symmetric counterpart. These positions
+        do not change as long as the context exists and may be given to
+        :meth:`factorize_elements`. Positions of several sets of elements
+        may be concatenated along the last axis. A `ValueError` is raised if
+        some of the elements requested are not part of the sparsity pattern
+        of the matrix.
+        """
+        (ri, rj) = self.context.coord()
+        keys = numpy.maximum(ri, rj) * self.n + numpy.minimum(ri, rj)
+        order = numpy.argsort(keys, kind='mergesort') ; keys = keys[order]
+        irow = numpy.asarray(irow, dtype=numpy.int)
+        jcol = numpy.asarray(jcol, dtype=numpy.int)
+        wanted = numpy.maximum(irow, jcol) * self.n + numpy.minimum(irow, jcol)
+        k = numpy.searchsorted(keys, wanted)
+        found = k < keys.size
+        found[found] = keys[k[found]] == wanted[found]
+        if not numpy.all(found):
+            raise ValueError, 'Element missing from sparsity pattern'
+        return order[k]
+
+    def diagonal_positions(self, rows):
+        """
+        Return the positions of the diagonal elements (i,i), for i in `rows`,
+        in the array of values of the matrix held by the context. See
+        :meth:`element_positions`.
+        """
+        return self.element_positions(rows, rows)
+
+    def factorize_elements(self, pos, values):
+        """
+        Overwrite the elements of the matrix held by the context found in
+        positions `pos`, as returned by :meth:`element_positions`, with
+        `values` and factorize the updated matrix. The other elements of the
+        matrix are those of the last matrix given to :meth:`factorize`. They
+        are neither copied nor converted again, which makes this method
+        cheaper than :meth:`factorize` when only some elements change, as in
+        interior-point methods.
+        """
+        self.context.values()[pos] = values
+        self.context.refactorize()
+        self._update_stats()
+        return
+
+    def factorize_diagonal(self, pos, values):
+        """
+        Overwrite the diagonal elements in positions `pos`, as returned by
+        :meth:`diagonal_positions`, with `values` and factorize the updated
+        matrix. See :meth:`factorize_elements`.
+        """
+        self.factorize_elements(pos, values)
+        return
+
+    def solve( self, b, get_resid = True, **kwargs ):
         """
         solve(b) solves the linear system of equations Ax = b.
         The solution will be found in self.x and residual in
         self.residual.
+
+        If b is an (n, k) array, the k systems are solved in a single call to
+        MA57, which then uses Level-3 BLAS, and the (n, k) solution is
+        returned. See Sils._solve_multiple() for the keywords controlling
+        residuals and iterative refinement.
         """
+        if numpy.ndim( b ) == 2:
+            return self._solve_multiple( b, get_resid, **kwargs )
         self.context.ma57( b, self.x, self.residual, get_resid )
         return None
 
@@ -153,6 +235,10 @@ class PyMa57Context( Sils ):
          self.relRes) = self.context.refine(self.x, self.residual, b, nitref)
         return None
 
+    def _refine_column( self, x, r, b, nitref, **kwargs ):
+        self.context.refine( x, r, b, nitref )
+        return None
+
     def fetch_perm( self ):
         """
         fetch_perm() returns the permutation vector p used
@@ -1,7 +1,12 @@
 """
-Python interface to some HSL scaling routines.
+Row and column scaling of sparse matrices, and Python interface to some HSL
+scaling routines.
 """
 
-from scaling import *
+from equilibration import *
+try:
+    from scaling import *
+except ImportError:             # MC29 is not available.
+    pass
 
 __all__ = filter(lambda s:not s.startswith('_'), dir())
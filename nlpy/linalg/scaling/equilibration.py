@@ -0,0 +1,139 @@
+"""
+Row and column equilibration of sparse matrices given in coordinate format.
+
+All functions take the dimensions `m` and `n` of a matrix A and the arrays
+`(values, irow, jcol)` of its elements, as returned by the `find()` method of
+sparse matrices, and return a pair `(row_scale, col_scale)` of positive
+scaling factors such that the elements of the scaled matrix are::
+
+    values[k] / (row_scale[irow[k]] * col_scale[jcol[k]])
+
+i.e., the scaled matrix is R^{-1} A C^{-1} with R = diag(row_scale) and
+C = diag(col_scale). Empty rows and columns receive a scaling factor of 1.
+The input arrays are not modified. Use :func:`apply_scaling` to obtain the
+scaled values.
+
+.. moduleauthor:: D. Orban <dominique.orban@gerad.ca>
+"""
+
+__docformat__ = 'restructuredtext'
+
+import numpy as np
+
+
+def _max_by_index(absval, index, size):
+    "Return the largest element of `absval` for each value of `index`."
+    vmax = np.zeros(size)
+    np.maximum.at(vmax, index, absval)
+    return vmax
+
+
+def _min_by_index(absval, index, size):
+    "Return the smallest element of `absval` for each value of `index`."
+    vmin = np.empty(size) ; vmin.fill(np.inf)
+    np.minimum.at(vmin, index, absval)
+    return vmin
+
+
+def _fix(scale):
+    """
+    Replace zero, infinite and NaN factors, which indicate empty rows or
+    columns. The product of the smallest and largest elements of an empty
+    row is that of `inf` and 0.
+    """
+    scale[(scale == 0.0) | ~np.isfinite(scale)] = 1.0
+    return scale
+
+
+def apply_scaling(values, irow, jcol, row_scale, col_scale):
+    "Return the values of the scaled matrix R^{-1} A C^{-1}."
+    return values / (row_scale[irow] * col_scale[jcol])
+
+
+def max_scaling(m, n, values, irow, jcol):
+    """
+    Divide every row by its largest element in absolute value, and then every
+    column of the resulting matrix by its largest element in absolute value.
+    Upon return, all elements of the scaled matrix are at most 1 in absolute
+    value and every nonempty row and column has an element equal to 1.
+    """
+    absval = np.abs(values)
+    row_scale = _fix(_max_by_index(absval, irow, m))
+    absval = absval / row_scale[irow]
+    col_scale = _fix(_max_by_index(absval, jcol, n))
+    return (row_scale, col_scale)
+
+
+def ruiz_scaling(m, n, values, irow, jcol, tol=1.0e-2, maxiter=20):
+    """
+    Iterative equilibration in the infinity norm. At each iteration, every row
+    and every column is divided by the square root of its largest element in
+    absolute value. Iterations stop when all the row and column maxima of the
+    scaled matrix lie within `tol` of 1 or after `maxiter` iterations.
+
+    Reference: D. Ruiz, *A Scaling Algorithm to Equilibrate Both Rows and
+    Columns Norms in Matrices*, Technical Report RAL-TR-2001-034, Rutherford
+    Appleton Laboratory, 2001.
+    """
+    row_scale = np.ones(m) ; col_scale = np.ones(n)
+    absval = np.abs(values)
+    for k in xrange(maxiter):
+        rmax = _fix(_max_by_index(absval, irow, m))
+        cmax = _fix(_max_by_index(absval, jcol, n))
+        if max(np.max(np.abs(1 - rmax)) if m else 0.0,
+               np.max(np.abs(1 - cmax)) if n else 0.0) <= tol:
+            break
+        dr = np.sqrt(rmax) ; dc = np.sqrt(cmax)
+        row_scale *= dr ; col_scale *= dc
+        absval /= dr[irow] * dc[jcol]
+    return (row_scale, col_scale)
+
+
+def geometric_scaling(m, n, values, irow, jcol, tol=1.0e-1, maxiter=8):
+    """
+    Iterative geometric-mean scaling. At each iteration, every row and then
+    every column is divided by the square root of the product of its smallest
+    and largest elements in absolute value. This reduces the spread of the
+    magnitudes of the elements, as does the least-squares scaling of MC29,
+    of which it is a cheap substitute. Iterations stop when the ratio of the
+    largest to the smallest element of the scaled matrix decreases by less
+    than a fraction `tol` or after `maxiter` iterations.
+    """
+    row_scale = np.ones(m) ; col_scale = np.ones(n)
+    absval = np.abs(values)
+    nz = absval > 0
+    absval = absval[nz] ; irow = irow[nz] ; jcol = jcol[nz]
+    if absval.size == 0: return (row_scale, col_scale)
+
+    ratio = np.max(absval) / np.min(absval)
+    for k in xrange(maxiter):
+        with np.errstate(invalid='ignore'):
+            dr = _fix(np.sqrt(_min_by_index(absval, irow, m) *
+                              _max_by_index(absval, irow, m)))
+        absval /= dr[irow]
+        with np.errstate(invalid='ignore'):
+            dc = _fix(np.sqrt(_min_by_index(absval, jcol, n) *
+                              _max_by_index(absval, jcol, n)))
+        absval /= dc[jcol]
+        row_scale *= dr ; col_scale *= dc
+        new_ratio = np.max(absval) / np.min(absval)
+        if new_ratio > (1 - tol) * ratio: break
+        ratio = new_ratio
+    return (row_scale, col_scale)
+
+
+# Scaling methods by name.
+methods = {'max': max_scaling,
+           'ruiz': ruiz_scaling,
+           'geometric': geometric_scaling}
+
+
+def equilibrate(method, m, n, values, irow, jcol, **kwargs):
+    """
+    Compute row and column scaling factors with the method named `method`,
+    one of 'max', 'ruiz' or 'geometric'. Keyword arguments are passed to the
+    corresponding function.
+    """
+    if method not in methods:
+        raise ValueError, 'Unknown scaling method %s' % method
+    return methods[method](m, n, values, irow, jcol, **kwargs)
@@ -109,6 +109,7 @@ def configuration(parent_package='',top_path=None):
     )
 
     config.add_subpackage('scaling')
+    config.add_data_dir('tests')
 
     config.make_config_py()
     return config
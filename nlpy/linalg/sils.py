@@ -5,11 +5,49 @@ from the Harwell Subroutine Library (http://hsl.rl.ac.uk).
 """
 
 import numpy
+from ordering import fill_reducing_ordering
+
+
+class FactorizationMemoryError(MemoryError):
+    """
+    Raised before the numerical factorization of a matrix when the storage
+    forecast by the analyze phase exceeds the memory limit of the context.
+    The attributes `required` and `limit` are expressed in bytes.
+    """
+
+    def __init__(self, required, limit):
+        self.required = required
+        self.limit = limit
+        MemoryError.__init__(self, 'Factorization requires %d bytes but the '
+                             'memory limit is %d bytes' % (required, limit))
+
 
 class Sils:
     """
     Abstract class for the factorization and solution of symmetric indefinite
     systems of linear equations. The methods of this class must be overridden.
+
+    Subclasses solve for a single right-hand side `b`, with solution and
+    residual written to :attr:`x` and :attr:`residual`, or for several
+    right-hand sides given as the columns of an `(n, k)` array `B`, in which
+    case the `(n, k)` solution is returned. See :meth:`_solve_multiple`.
+
+    Thread safety: the MA57 extension releases the global interpreter lock
+    during the analyze, factorize, solve and refine phases. The MA57 sources
+    it is built with keep no state in COMMON blocks, so that independent
+    contexts may be used simultaneously from several threads, e.g., in a
+    thread pool. The MA27 sources keep state in COMMON blocks and the MA27
+    extension holds the lock throughout, so that MA27 calls are serialized.
+    A given context must not be used by several threads at the same time:
+    its factors, solution and residual would be overwritten.
+
+    Memory: the storage and the number of operations required by the
+    numerical factorization are forecast by the analyze phase and stored in
+    :attr:`nRealFactForecast`, :attr:`nIntFactForecast`, :attr:`memForecast`
+    (in bytes) and :attr:`flopsForecast` before the matrix is factorized.
+    If the keyword `memory_limit`, in megabytes, is given to the constructor
+    and the forecast storage exceeds it, :class:`FactorizationMemoryError`
+    is raised instead of factorizing.
     """
 
     def __init__(self, A, **kwargs):
@@ -22,6 +60,66 @@ class Sils:
         self.residual = numpy.zeros(self.n)
 
         self.context = None
+        self.nfact = 0         # Number of numerical factorizations performed
+
+        # Inertia and rank, set by each factorization
+        self.neig = 0          # Number of negative eigenvalues
+        self.rank = 0
+        self.isFullRank = False
+
+        # Forecasts of the analyze phase
+        self.memory_limit = kwargs.get('memory_limit', None)
+        self.nRealFactForecast = 0  # Reals in factors
+        self.nIntFactForecast = 0   # Integers in factors
+        self.memForecast = 0        # Bytes required by the factorization
+        self.flopsForecast = 0.0    # Operations of the factorization
+
+    def _set_forecast(self, nreal, nint, nbytes, flops):
+        """
+        Record the forecasts of the analyze phase and raise
+        :class:`FactorizationMemoryError` if the storage required exceeds the
+        memory limit.
+        """
+        self.nRealFactForecast = nreal
+        self.nIntFactForecast = nint
+        self.memForecast = nbytes
+        self.flopsForecast = flops
+        if self.memory_limit is not None:
+            limit = int(self.memory_limit * 1024 * 1024)
+            if nbytes > limit:
+                raise FactorizationMemoryError(nbytes, limit)
+        return
+
+    def _pivot_order(self, irow, jcol, ordering):
+        """
+        Return the pivot order requested by `ordering` for the matrix whose
+        sparsity pattern is given by `irow` and `jcol`, as an array of
+        0-based indices. `ordering` is `None`, in which case `None` is
+        returned and the solver chooses its own ordering, the name of a
+        method accepted by :func:`nlpy.linalg.ordering.fill_reducing_ordering`
+        or a permutation. Computed orderings are cached by sparsity pattern.
+
+        Entry k of the pivot order is the index of the k-th pivot. The HSL
+        solvers expect the inverse permutation, which their extensions
+        compute from it.
+        """
+        if ordering is None: return None
+        if isinstance(ordering, str):
+            return fill_reducing_ordering(self.n, irow, jcol, method=ordering)
+        perm = numpy.asarray(ordering, dtype=numpy.intp)
+        if perm.shape != (self.n,):
+            raise ValueError, 'Pivot order must have length %d' % self.n
+        if not numpy.array_equal(numpy.sort(perm), numpy.arange(self.n)):
+            raise ValueError, 'Pivot order must be a permutation'
+        return perm
+
+    def factorize(self, A):
+        """
+        Must be subclassed. Perform the numerical factorization of `A`, whose
+        sparsity pattern must be that of the matrix given to the constructor,
+        reusing the symbolic analysis.
+        """
+        raise NotImplementedError
 
     def solve(self, b, get_resid=True):
         """
@@ -35,6 +133,38 @@ class Sils:
         """
         raise NotImplementedError
 
+    def _refine_column(self, x, r, b, nitref, **kwargs):
+        """
+        Must be subclassed. Perform iterative refinement on the solution `x`
+        of the system with right-hand side `b` and update `x` and the residual
+        `r` in place.
+        """
+        raise NotImplementedError
+
+    def _solve_multiple(self, B, get_resid=True, **kwargs):
+        """
+        Solve AX = B, where B is an `(n, k)` array, using the current
+        factorization and return the `(n, k)` solution X. All right-hand
+        sides are passed to the factorization in a single call.
+
+        If `get_resid` is `True`, the residuals B - AX are stored as the
+        columns of the `(n, k)` array :attr:`residuals`. If the keyword
+        `nitref` is positive, iterative refinement is performed on each
+        column, as in :meth:`refine`, and the residuals are updated. Other
+        keywords, e.g., `tol`, are passed to :meth:`refine`. The attributes
+        :attr:`x` and :attr:`residual` are left untouched.
+        """
+        nitref = kwargs.pop('nitref', 0)
+        B = numpy.asfortranarray(B, dtype=numpy.float)
+        X = numpy.empty(B.shape, order='F')
+        R = numpy.zeros(B.shape, order='F')
+        self.context.solve_many(B, X, R, get_resid or nitref > 0)
+        if nitref > 0:
+            for j in range(B.shape[1]):
+                self._refine_column(X[:,j], R[:,j], B[:,j], nitref, **kwargs)
+        if get_resid or nitref > 0: self.residuals = R
+        return X
+
     def fetch_perm(self):
         """
         Must be subclassed.
@@ -27,6 +27,11 @@
 
 #define  SYMMETRIC 1  /* for SpMatrix_NewLLMatObject() */
 
+/* The MA27 sources built with this module (ma27ad.f and fd05ad.f) keep
+ * state in COMMON blocks. Calls to MA27 are therefore not reentrant and are
+ * made without releasing the global interpreter lock, which serializes them.
+ */
+
 /* ========================================================================== */
 
 /*
@@ -41,6 +46,10 @@ typedef struct Pyma27Object {
     PyObject_VAR_HEAD
     Ma27_Data  *data;
     double     *a;
+    double      pivtol;     /* Initial pivot tolerance */
+    char        factorized; /* A numerical factorization is available */
+    int         forecast[6];/* Storage forecast by the analyze phase */
+    double      ops;        /* Operation count forecast by the analyze phase */
 } Pyma27Object;
 
 #define Pyma27Object_Check(v)  ((v)->ob_type == &Pyma27Type)
@@ -49,14 +58,23 @@ typedef struct Pyma27Object {
 
 DL_EXPORT( void ) init_pyma27( void );
 static PyObject     *Pyma27_ma27(       Pyma27Object *self,  PyObject *args );
+static PyObject     *Pyma27_solve_many( Pyma27Object *self,  PyObject *args );
 static PyObject     *Pyma27_refine(     Pyma27Object *self,  PyObject *args );
 static PyObject     *Pyma27_factor(     PyObject     *self,  PyObject *args );
+static PyObject     *Pyma27_analyze(    PyObject     *self,  PyObject *args );
+static PyObject     *Pyma27_factorize(  Pyma27Object *self,  PyObject *args );
 static void          Pyma27_dealloc(    Pyma27Object *self                  );
 static PyObject     *Pyma27_getattr(    Pyma27Object *self,  char *name     );
 static PyObject     *Pyma27_Stats(      Pyma27Object *self,  PyObject *args );
+static PyObject     *Pyma27_Forecast(   Pyma27Object *self,  PyObject *args );
 static PyObject     *Pyma27_fetch_perm( Pyma27Object *self                  );
 static PyObject     *Pyma27_fetch_lb(   Pyma27Object *self,  PyObject *args );
-static Pyma27Object *NewPyma27Object(   LLMatObject  *llmat, PyObject *sqd  );
+static PyArrayObject *Get_Pivot_Order( PyObject *perm, int n );
+static Pyma27Object *NewPyma27Object(   LLMatObject  *llmat, PyObject *sqd,
+                                        int factorize, int *perm            );
+static Pyma27Object *Pyma27_New(        LLMatObject  *llmat, PyObject *sqd,
+                                        int factorize, PyObject *perm       );
+static int           Pyma27_Refactor(   Pyma27Object *self                  );
 extern PyObject *newCSRMatObject(int dim[], int nnz);
 void coord2csr( int n, int nz, int *irow, int *jcol, double *val,
                 int *iptr, int *jind, double *xval );
@@ -69,23 +87,96 @@ void coord2csr( int n, int nz, int *irow, int *jcol, double *val,
 
 /* ========================================================================== */
 
+/*
+ * Check that array a holds doubles, has shape (n, nrhs) and is stored by
+ * columns, so that column j starts at position j*n.
+ */
+
+static int Check_Multiple_RHS( PyArrayObject *a, int n, int nrhs ) {
+
+    if( a->descr->type_num != NPY_DOUBLE || a->nd != 2 ||
+        a->dimensions[0] != n || a->dimensions[1] != nrhs ||
+        !PyArray_CHKFLAGS( a, NPY_F_CONTIGUOUS ) ) {
+        PyErr_SetString( PyExc_ValueError,
+            "Expected Fortran-ordered array of doubles of shape (n, nrhs)" );
+        return 0;
+    }
+    return 1;
+}
+
+/* ========================================================================== */
+
+/*
+ * Compute the residuals res = rhs - A x of nrhs systems stored by columns.
+ * Only the lower triangle of A is stored, in coordinate format with 1-based
+ * indices irn and jcn.
+ */
+
+static void Compute_Residuals( int n, int nz, int *irn, int *jcn, double *a,
+                               int nrhs, double *x, double *rhs,
+                               double *res ) {
+
+    int     i, j, k, col;
+    double *xc, *rc;
+
+    cblas_dcopy( n * nrhs, rhs, 1, res, 1 );
+    for( col = 0; col < nrhs; col++ ) {
+        xc = x + col * n;
+        rc = res + col * n;
+        for( k = 0; k < nz; k++ ) {
+            i = irn[k] - 1;  /* Fortran indexing */
+            j = jcn[k] - 1;
+            rc[i] -= a[k] * xc[j];
+            if( i != j ) rc[j] -= a[k] * xc[i];
+        }
+    }
+    return;
+}
+
+
+
+/*
+ * Convert the pivot order perm, a sequence of n 0-based indices, to a
+ * contiguous array of ints. Return NULL with an exception set if perm is
+ * invalid.
+ */
+
+static PyArrayObject *Get_Pivot_Order( PyObject *perm, int n ) {
+
+    PyArrayObject *a_perm;
+
+    a_perm = (PyArrayObject *)PyArray_ContiguousFromObject( perm, NPY_INT,
+                                                            1, 1 );
+    if( a_perm == NULL ) return NULL;
+    if( a_perm->dimensions[0] != n ) {
+        PyErr_SetString( PyExc_ValueError, "Pivot order must have length n" );
+        Py_DECREF( a_perm );
+        return NULL;
+    }
+    return a_perm;
+}
+
+/* ========================================================================== */
 
-static Pyma27Object *NewPyma27Object( LLMatObject *llmat, PyObject *sqd ) {
+static Pyma27Object *NewPyma27Object( LLMatObject *llmat, PyObject *sqd,
+                                      int factorize, int *perm ) {
 
     Pyma27Object *self;
     int          n  = llmat->dim[0],
                  nz = llmat->nnz;;
     int          i, k, elem;
-    int          error;
+    int          error, iflag = 0;  // iflag = 0: automatic pivot choice
 
     /* Create new instance of object */
     if( !(self = PyObject_New( Pyma27Object, &Pyma27Type ) ) )
         return NULL; //PyErr_NoMemory( );
 
     self->data = Ma27_Initialize( nz, n, NULL );
+    self->factorized = 0;
 
     /* Set pivot-for-stability threshold is matrix is SQD */
     if( sqd == Py_True ) self->data->cntl[0] = 1.0e-15;
+    self->pivtol = self->data->cntl[0];
 
     /* Keep a copy of matrix in a in case memory needs to be adjusted */
     /* Array a is never altered; we work with factors */
@@ -104,18 +195,74 @@ static Pyma27Object *NewPyma27Object( LLMatObject *llmat, PyObject *sqd ) {
         }
     }
 
-    /* Analyze */
-    error = Ma27_Analyze( self->data, 0 ); // iflag = 0: automatic pivot choice
+    /* Use the pivot order supplied, if any. Variable perm[i] is the i-th
+     * pivot, whereas MA27 expects IKEEP(I,1) to hold the position of
+     * variable I in the pivot order: pass the inverse permutation. */
+    if( perm != NULL ) {
+        for( i = 0; i < n; i++ ) self->data->ikeep[perm[i]] = i + 1;
+        iflag = 1;
+    }
+
+    /* Analyze. The pivot sequence and workspace are kept in self->data
+     * and are reused by all subsequent factorizations. */
+    error = Ma27_Analyze( self->data, iflag );
     if( error ) {
         fprintf( stderr, " Error return code from Analyze: %-d\n", error );
         return NULL; //Py_None; // ----- ADJUST ----- ?
     }
 
+    /* Keep the forecasts INFO(3:8), which the factorization overwrites */
+    for( i = 0; i < 6; i++ ) self->forecast[i] = self->data->info[2+i];
+    self->ops = self->data->ops;
+
     /* Factorize */
+    if( factorize && Pyma27_Refactor( self ) ) return NULL;
+
+    return self;
+}
+
+/* ========================================================================== */
+
+/*
+ * Create a new Pyma27Object. If perm is not None, it gives the pivot order
+ * as a sequence of 0-based indices and MA27 does not compute its own.
+ */
+
+static Pyma27Object *Pyma27_New( LLMatObject *llmat, PyObject *sqd,
+                                 int factorize, PyObject *perm ) {
+
+    Pyma27Object  *rv;
+    PyArrayObject *a_perm = NULL;
+
+    if( perm != Py_None ) {
+        a_perm = Get_Pivot_Order( perm, llmat->dim[0] );
+        if( a_perm == NULL ) return NULL;
+    }
+    rv = NewPyma27Object( llmat, sqd, factorize,
+                          a_perm ? (int *)a_perm->data : NULL );
+    Py_XDECREF( a_perm );
+    return rv;
+}
+
+/* ========================================================================== */
+
+/*
+ * Perform the numerical factorization of the matrix whose values are in
+ * self->a using the pivot sequence computed by the analyze phase. The pivot
+ * tolerance is reset to its initial value so that every factorization
+ * starts from the same settings.
+ */
+
+static int Pyma27_Refactor( Pyma27Object *self ) {
+
+    int error;
+
+    self->data->cntl[0] = self->pivtol;
     error = Ma27_Factorize( self->data, self->a );
     if( error ) {
         fprintf( stderr, " Error return code from Factorize: %-d\n", error );
-        return NULL; //Py_None; // ----- ADJUST ----- ?
+        self->factorized = 0;
+        return error;
     }
 
     /* Find out if matrix was rank deficient */
@@ -125,8 +272,55 @@ static Pyma27Object *NewPyma27Object( LLMatObject *llmat, PyObject *sqd ) {
         self->data->rankdef = 1;
         self->data->rank = self->data->info[1];
     }
+    self->factorized = 1;
+    return 0;
+}
 
-    return self;
+/* ========================================================================== */
+
+static char Pyma27_factorize_Doc[] = "Factorize matrix with same sparsity pattern as analyzed matrix";
+
+static PyObject *Pyma27_factorize( Pyma27Object *self, PyObject *args ) {
+
+    PyObject    *mat;
+    LLMatObject *llmat;
+    int          i, k, elem;
+
+    if( !PyArg_ParseTuple( args, "O!:factorize", &LLMatType, &mat ) )
+        return NULL;
+    llmat = (LLMatObject *)mat;
+
+    /* The sparsity pattern must be that of the analyzed matrix */
+    if( llmat->dim[0] != self->data->n || llmat->nnz != self->data->nz ) {
+        PyErr_SetString( PyExc_ValueError,
+                         "Sparsity pattern differs from analyzed matrix" );
+        return NULL;
+    }
+
+    /* Gather values in the order used during the analyze phase */
+    elem = 0;
+    for( i = 0; i < self->data->n; i++ ) {
+        k = llmat->root[i];
+        while( k != -1 ) {
+            if( self->data->irn[ elem ] != i + 1 ||
+                self->data->icn[ elem ] != llmat->col[k] + 1 ) {
+                PyErr_SetString( PyExc_ValueError,
+                              "Sparsity pattern differs from analyzed matrix" );
+                return NULL;
+            }
+            self->a[ elem ] = llmat->val[k];
+            k = llmat->link[k];
+            elem++;
+        }
+    }
+
+    if( Pyma27_Refactor( self ) ) {
+        PyErr_SetString( PyExc_RuntimeError, "Factorization failed" );
+        return NULL;
+    }
+
+    Py_INCREF( Py_None );
+    return Py_None;
 }
 
 /* ========================================================================== */
@@ -299,13 +493,9 @@ static PyObject *Pyma27_ma27( Pyma27Object *self, PyObject *args ) {
 
     /* Solve */
     error = Ma27_Solve( self->data, x );
-    if( error ) {
-        fprintf( stderr, " Error return code from Solve: %-d\n", error );
-        return NULL;
-    }
 
     /* Compute residual r = rhs - Ax */
-    if( comp_resid ) {
+    if( !error && comp_resid ) {
         self->data->residual = (double *)a_res->data;
         cblas_dcopy( self->data->n, rhs, 1, self->data->residual, 1 );
         for( k = 0; k < self->data->nz; k++ ) {
@@ -317,6 +507,60 @@ static PyObject *Pyma27_ma27( Pyma27Object *self, PyObject *args ) {
         }
     }
 
+    if( error ) {
+        fprintf( stderr, " Error return code from Solve: %-d\n", error );
+        return NULL;
+    }
+
+    Py_INCREF( Py_None );
+    return Py_None;
+}
+
+/* ========================================================================== */
+
+static char Pyma27_solve_many_Doc[] = "Solve AX=B for several right-hand sides";
+
+static PyObject *Pyma27_solve_many( Pyma27Object *self, PyObject *args ) {
+
+    PyArrayObject *a_x, *a_rhs, *a_res;
+    double        *x;
+    int            n = self->data->n, nrhs, col;
+    int            error, comp_resid;
+
+    /* Right-hand sides, solutions and residuals are (n, nrhs) arrays */
+    if( !PyArg_ParseTuple( args,
+                           "O!O!O!i:solve_many",
+                           &PyArray_Type, &a_rhs,
+                           &PyArray_Type, &a_x,
+                           &PyArray_Type, &a_res, &comp_resid ) ) return NULL;
+
+    if( a_rhs->nd != 2 ) {
+        PyErr_SetString( PyExc_ValueError, "Right-hand side must be 2-D" );
+        return NULL;
+    }
+    nrhs = a_rhs->dimensions[1];
+    if( !Check_Multiple_RHS( a_rhs, n, nrhs ) ) return NULL;
+    if( !Check_Multiple_RHS( a_x,   n, nrhs ) ) return NULL;
+    if( !Check_Multiple_RHS( a_res, n, nrhs ) ) return NULL;
+
+    /* MA27 handles one right-hand side at a time */
+    x = (double *)a_x->data;
+    error = 0;
+    cblas_dcopy( n * nrhs, (double *)a_rhs->data, 1, x, 1 );
+    for( col = 0; col < nrhs && !error; col++ )
+        error = Ma27_Solve( self->data, x + col * n );
+
+    if( !error && comp_resid )
+        Compute_Residuals( n, self->data->nz, self->data->irn,
+                           self->data->icn, self->a, nrhs, x,
+                           (double *)a_rhs->data, (double *)a_res->data );
+
+    if( error ) {
+        PyErr_Format( PyExc_RuntimeError,
+                      "Error return code from Solve: %d", error );
+        return NULL;
+    }
+
     Py_INCREF( Py_None );
     return Py_None;
 }
@@ -349,6 +593,34 @@ static PyObject *Pyma27_Stats( Pyma27Object *self, PyObject *args ) {
 
 /* ========================================================================== */
 
+static char Pyma27_Forecast_Doc[] = "Obtain forecasts of the analyze phase";
+
+static PyObject *Pyma27_Forecast( Pyma27Object *self, PyObject *args ) {
+
+    /* Return the forecasts of the analyze phase, available before the
+     * numerical factorization, in the order of the MA27AD INFO array:
+     * INFO(3) = NRLTOT = # real    words needed by the factorization
+     *                    without data compresses,
+     * INFO(4) = NIRTOT = # integer   "     "     "  "       "
+     * INFO(5) = NRLNEC = # real    words needed by the factorization if
+     *                    data compresses are allowed,
+     * INFO(6) = NIRNEC = # integer   "     "     "  "       "
+     * INFO(7) = NRLADU = # real    words needed to hold the factors,
+     * INFO(8) = NIRADU = # integer   "     "     "  "    "     "
+     * ops     = # operations of the factorization.
+     */
+
+    return Py_BuildValue( "iiiiiid", self->forecast[0],
+                                     self->forecast[1],
+                                     self->forecast[2],
+                                     self->forecast[3],
+                                     self->forecast[4],
+                                     self->forecast[5],
+                                     self->ops );
+}
+
+/* ========================================================================== */
+
 static char Pyma27_refine_Doc[] = "Perform iterative refinements";
 
 static PyObject *Pyma27_refine( Pyma27Object *self, PyObject *args ) {
@@ -394,12 +666,18 @@ static PyObject *Pyma27_refine( Pyma27Object *self, PyObject *args ) {
 static PyMethodDef Pyma27_special_methods[] = {
   { "ma27",      (PyCFunction)Pyma27_ma27,
     METH_VARARGS, Pyma27_ma27_Doc       },
+  { "factorize", (PyCFunction)Pyma27_factorize,
+    METH_VARARGS, Pyma27_factorize_Doc  },
+  { "solve_many",(PyCFunction)Pyma27_solve_many,
+    METH_VARARGS, Pyma27_solve_many_Doc },
   { "fetchperm", (PyCFunction)Pyma27_fetch_perm,
     METH_VARARGS, Pyma27_fetch_perm_Doc },
   { "fetchlb",   (PyCFunction)Pyma27_fetch_lb,
     METH_VARARGS, Pyma27_fetch_lb_Doc   },
   { "stats",     (PyCFunction)Pyma27_Stats,
     METH_VARARGS, Pyma27_Stats_Doc      },
+  { "forecast",  (PyCFunction)Pyma27_Forecast,
+    METH_VARARGS, Pyma27_Forecast_Doc   },
   { "refine",    (PyCFunction)Pyma27_refine,
     METH_VARARGS, Pyma27_refine_Doc     },
   { NULL,        NULL,
@@ -417,13 +695,37 @@ static PyObject *Pyma27_factor( PyObject *self, PyObject *args ) {
     Pyma27Object  *rv;                    /* Return value */
     PyObject      *mat;                   /* Input matrix */
     PyObject      *sqd;                   /* SQD matrix flag */
+    PyObject      *perm = Py_None;        /* Pivot order (optional) */
 
     /* Read input matrix and limited memory factor */
-    if( !PyArg_ParseTuple( args, "OO:factor", &mat, &sqd ) )
+    if( !PyArg_ParseTuple( args, "OO|O:factor", &mat, &sqd, &perm ) )
         return NULL;
 
     /* Spawn new Pyma27 Object, containing matrix factors */
-    rv = NewPyma27Object( (LLMatObject *)mat, sqd );
+    rv = Pyma27_New( (LLMatObject *)mat, sqd, 1, perm );
+    if( rv == NULL ) return NULL;
+
+    return (PyObject *)rv;
+}
+
+/* ========================================================================== */
+
+static char Pyma27_analyze_Doc[] = "Analyze input matrix";
+
+static PyObject *Pyma27_analyze( PyObject *self, PyObject *args ) {
+
+    /* Input must be the lower triangle of a symmetric matrix */
+
+    Pyma27Object  *rv;                    /* Return value */
+    PyObject      *mat;                   /* Input matrix */
+    PyObject      *sqd;                   /* SQD matrix flag */
+    PyObject      *perm = Py_None;        /* Pivot order (optional) */
+
+    if( !PyArg_ParseTuple( args, "OO|O:analyze", &mat, &sqd, &perm ) )
+        return NULL;
+
+    /* Spawn new Pyma27 Object, containing the symbolic factorization */
+    rv = Pyma27_New( (LLMatObject *)mat, sqd, 0, perm );
     if( rv == NULL ) return NULL;
 
     return (PyObject *)rv;
@@ -472,6 +774,7 @@ static PyTypeObject Pyma27Type = {
 
 static PyMethodDef Pyma27Methods[] = {
     { "factor",  Pyma27_factor,  METH_VARARGS, Pyma27_factor_Doc  },
+    { "analyze", Pyma27_analyze, METH_VARARGS, Pyma27_analyze_Doc },
     { NULL,     NULL,            0,            NULL               }
 };
 
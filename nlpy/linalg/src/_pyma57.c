@@ -41,6 +41,9 @@ typedef struct Pyma57Object {
   PyObject_VAR_HEAD
   Ma57_Data  *data;
   double     *a;
+  int         factorized;
+  int         forecast[5];  /* Storage forecast by the analyze phase */
+  double      flops;        /* Operations forecast by the analyze phase */
 } Pyma57Object;
 
 #define Pyma57Object_Check(v)  ((v)->ob_type == &Pyma57Type)
@@ -49,15 +52,22 @@ typedef struct Pyma57Object {
 
 DL_EXPORT( void ) init_pyma57( void );
 static PyObject     *Pyma57_ma57(       Pyma57Object *self,  PyObject *args );
+static PyObject     *Pyma57_solve_many( Pyma57Object *self,  PyObject *args );
 static PyObject     *Pyma57_factorize(  Pyma57Object *self,  PyObject *args );
+static PyObject     *Pyma57_refactorize(Pyma57Object *self,  PyObject *args );
+static PyObject     *Pyma57_values(     Pyma57Object *self,  PyObject *args );
+static PyObject     *Pyma57_coord(      Pyma57Object *self,  PyObject *args );
 static PyObject     *Pyma57_refine(     Pyma57Object *self,  PyObject *args );
 static PyObject     *Pyma57_analyze(    PyObject     *self,  PyObject *args );
 static void          Pyma57_dealloc(    Pyma57Object *self                  );
 static PyObject     *Pyma57_getattr(    Pyma57Object *self,  char *name     );
 static PyObject     *Pyma57_Stats(      Pyma57Object *self,  PyObject *args );
+static PyObject     *Pyma57_Forecast(   Pyma57Object *self,  PyObject *args );
 static PyObject     *Pyma57_fetch_perm( Pyma57Object *self                  );
 //static PyObject     *Pyma57_fetch_lb(   Pyma57Object *self,  PyObject *args );
-static PyObject *NewPyma57Object(   LLMatObject  *llmat, PyObject *sqd  );
+static PyArrayObject *Get_Pivot_Order( PyObject *perm, int n );
+static PyObject *NewPyma57Object(   LLMatObject  *llmat, PyObject *sqd,
+                                    int *perm                           );
 extern PyObject *newCSRMatObject(int dim[], int nnz);
 void coord2csr( int n, int nz, int *irow, int *jcol, double *val,
                 int *iptr, int *jind, double *xval );
@@ -70,8 +80,85 @@ void coord2csr( int n, int nz, int *irow, int *jcol, double *val,
 
 /* ========================================================================== */
 
+/*
+ * Check that array a holds doubles, has shape (n, nrhs) and is stored by
+ * columns, so that column j starts at position j*n.
+ */
+
+static int Check_Multiple_RHS( PyArrayObject *a, int n, int nrhs ) {
+
+  if( a->descr->type_num != NPY_DOUBLE || a->nd != 2 ||
+      a->dimensions[0] != n || a->dimensions[1] != nrhs ||
+      !PyArray_CHKFLAGS( a, NPY_F_CONTIGUOUS ) ) {
+    PyErr_SetString( PyExc_ValueError,
+          "Expected Fortran-ordered array of doubles of shape (n, nrhs)" );
+    return 0;
+  }
+  return 1;
+}
+
+/* ========================================================================== */
+
+/*
+ * Compute the residuals res = rhs - A x of nrhs systems stored by columns.
+ * Only the lower triangle of A is stored, in coordinate format with 1-based
+ * indices irn and jcn.
+ */
 
-static PyObject *NewPyma57Object( LLMatObject *llmat, PyObject *sqd ) {
+static void Compute_Residuals( int n, int nz, int *irn, int *jcn, double *a,
+                               int nrhs, double *x, double *rhs,
+                               double *res ) {
+
+  int     i, j, k, col;
+  double *xc, *rc;
+
+  cblas_dcopy( n * nrhs, rhs, 1, res, 1 );
+  for( col = 0; col < nrhs; col++ ) {
+    xc = x + col * n;
+    rc = res + col * n;
+    for( k = 0; k < nz; k++ ) {
+      i = irn[k] - 1;  /* Fortran indexing */
+      j = jcn[k] - 1;
+      rc[i] -= a[k] * xc[j];
+      if( i != j ) rc[j] -= a[k] * xc[i];
+    }
+  }
+  return;
+}
+
+
+/* ========================================================================== */
+
+/*
+ * Convert the pivot order perm, a sequence of n 0-based indices, to a
+ * contiguous array of ints. Return NULL with an exception set if perm is
+ * invalid.
+ */
+
+static PyArrayObject *Get_Pivot_Order( PyObject *perm, int n ) {
+
+  PyArrayObject *a_perm;
+
+  a_perm = (PyArrayObject *)PyArray_ContiguousFromObject( perm, NPY_INT,
+                                                          1, 1 );
+  if( a_perm == NULL ) return NULL;
+  if( a_perm->dimensions[0] != n ) {
+    PyErr_SetString( PyExc_ValueError, "Pivot order must have length n" );
+    Py_DECREF( a_perm );
+    return NULL;
+  }
+  return a_perm;
+}
+
+/* ========================================================================== */
+
+/*
+ * Create a new Pyma57Object and analyze the matrix. If perm is not NULL, it
+ * gives the pivot order as 0-based indices and MA57 does not compute its own.
+ */
+
+static PyObject *NewPyma57Object( LLMatObject *llmat, PyObject *sqd,
+                                  int *perm ) {
 
   Pyma57Object *self;
   int           n  = llmat->dim[0],
@@ -86,6 +173,12 @@ static PyObject *NewPyma57Object( LLMatObject *llmat, PyObject *sqd ) {
   }
 
   self->data = Ma57_Initialize( nz, n, NULL );
+  self->factorized = 0;
+
+  /* The values of the matrix are kept in self->a, where they may be updated
+   * in place before refactorizing. They are also used to compute residuals. */
+  self->a = (double *)NLPy_Calloc( nz, sizeof(double) );
+  if( self->a == NULL ) return PyErr_NoMemory();
 
   /* Set pivot-for-stability threshold is matrix is SQD */
   if( sqd == Py_True ) {
@@ -102,18 +195,36 @@ static PyObject *NewPyma57Object( LLMatObject *llmat, PyObject *sqd ) {
     while( k != -1 ) {
       self->data->irn[ elem ] = i + 1;
       self->data->jcn[ elem ] = llmat->col[k] + 1;
-      //self->a[ elem ] = llmat->val[k];
+      self->a[ elem ] = llmat->val[k];
       k = llmat->link[k];
       elem++;
     }
   }
 
+  /* Use the pivot order supplied, if any. Variable perm[i] is the i-th
+   * pivot, whereas MA57 expects KEEP(I) to hold the position of variable I
+   * in the pivot order: pass the inverse permutation. */
+  if( perm != NULL ) {
+    self->data->icntl[5] = 1;
+    for( i = 0; i < n; i++ ) self->data->keep[perm[i]] = i + 1;
+  }
+
   /* Analyze */
+  Py_BEGIN_ALLOW_THREADS
   error = Ma57_Analyze( self->data );
+  Py_END_ALLOW_THREADS
   if( error ) {
     fprintf( stderr, " Error return code from Analyze: %-d\n", error );
     return NULL;
   }
+
+  /* Keep the forecasts, which the factorization overwrites */
+  self->forecast[0] = self->data->info[4];
+  self->forecast[1] = self->data->info[5];
+  self->forecast[2] = self->data->info[6];
+  self->forecast[3] = self->data->info[8];
+  self->forecast[4] = self->data->info[9];
+  self->flops = self->data->rinfo[0] + self->data->rinfo[1];
   return (PyObject *)self;
 }
 
@@ -127,19 +238,21 @@ static PyObject *Pyma57_factorize( Pyma57Object *self, PyObject *args ) {
   LLMatObject *llmat;
   int          n, nz;
   int          i, k, elem;
-  int          error;
 
   /* See if input matrix has changed since analyze phase */
-  if( !PyArg_ParseTuple( args, "O:factorize", &mat ) ) return NULL;
+  if( !PyArg_ParseTuple( args, "O!:factorize", &LLMatType, &mat ) )
+    return NULL;
 
   llmat = (LLMatObject *)mat;
   n  = llmat->dim[0];
   nz = llmat->nnz;
+  if( n != self->data->n || nz != self->data->nz ) {
+    PyErr_SetString( PyExc_ValueError,
+                     "Sparsity pattern differs from analyzed matrix" );
+    return NULL;
+  }
 
-  /* Make temporary copy of matrix. Is there a way to avoid this?  */
-  self->a = (double *)NLPy_Calloc( nz, sizeof(double) );
-  if( self->a == NULL ) return PyErr_NoMemory();
-
+  /* Copy the values of the matrix into self->a */
   elem = 0;
   for( i = 0; i < n; i++ ) {
     k = llmat->root[i];
@@ -150,12 +263,26 @@ static PyObject *Pyma57_factorize( Pyma57Object *self, PyObject *args ) {
     }
   }
 
-  /* Factorize */
+  return Pyma57_refactorize( self, NULL );
+}
+
+/* ========================================================================== */
+
+static char Pyma57_refactorize_Doc[] = "Factorize matrix held in context";
+
+static PyObject *Pyma57_refactorize( Pyma57Object *self, PyObject *args ) {
+
+  int error;
+
+  /* Factorize the values currently stored in self->a */
+  Py_BEGIN_ALLOW_THREADS
   error = Ma57_Factorize( self->data, self->a );
+  Py_END_ALLOW_THREADS
   if( error ) {
     fprintf( stderr, " Error return code from Factorize: %-d\n", error );
     return NULL;
   }
+  self->factorized = 1;
 
   /* Find out if matrix was rank deficient */
   self->data->rank = self->data->info[24];
@@ -167,6 +294,53 @@ static PyObject *Pyma57_factorize( Pyma57Object *self, PyObject *args ) {
 
 /* ========================================================================== */
 
+static char Pyma57_values_Doc[] = "Array of values of matrix held in context";
+
+static PyObject *Pyma57_values( Pyma57Object *self, PyObject *args ) {
+
+  PyArrayObject *a_val;
+  npy_intp       nz = self->data->nz;
+
+  /* The array shares its data with the context, which it keeps alive */
+  a_val = (PyArrayObject *)PyArray_SimpleNewFromData( 1, &nz, NPY_DOUBLE,
+                                                      (void *)self->a );
+  if( a_val == NULL ) return NULL;
+  Py_INCREF( self );
+  a_val->base = (PyObject *)self;
+  return (PyObject *)a_val;
+}
+
+/* ========================================================================== */
+
+static char Pyma57_coord_Doc[] = "Row and column indices of matrix elements";
+
+static PyObject *Pyma57_coord( Pyma57Object *self, PyObject *args ) {
+
+  PyArrayObject *a_irow, *a_jcol;
+  npy_intp       nz = self->data->nz;
+  long          *irow, *jcol;
+  int            k;
+
+  a_irow = (PyArrayObject *)PyArray_SimpleNew( 1, &nz, NPY_LONG );
+  a_jcol = (PyArrayObject *)PyArray_SimpleNew( 1, &nz, NPY_LONG );
+  if( a_irow == NULL || a_jcol == NULL ) {
+    Py_XDECREF( a_irow );
+    Py_XDECREF( a_jcol );
+    return NULL;
+  }
+
+  /* Return 0-based indices, in the order of the elements of self->a */
+  irow = (long *)a_irow->data;
+  jcol = (long *)a_jcol->data;
+  for( k = 0; k < nz; k++ ) {
+    irow[k] = self->data->irn[k] - 1;
+    jcol[k] = self->data->jcn[k] - 1;
+  }
+  return Py_BuildValue( "NN", a_irow, a_jcol );
+}
+
+/* ========================================================================== */
+
 static char Pyma57_fetch_perm_Doc[] = "Fetch variables permutation computed by MA57";
 
 static PyObject *Pyma57_fetch_perm( Pyma57Object *self ) {
@@ -272,7 +446,7 @@ static PyObject *Pyma57_ma57( Pyma57Object *self, PyObject *args ) {
   PyArrayObject *a_x, *a_rhs, *a_res;
   PyObject      *get_resid;
   double        *x, *rhs;
-  int            error;
+  int            error, comp_resid;
 
   /* We read a right-hand side and a solution */
   if( !PyArg_ParseTuple( args,
@@ -298,12 +472,15 @@ static PyObject *Pyma57_ma57( Pyma57Object *self, PyObject *args ) {
   x = (double *)a_x->data;
   self->data->residual = (double *)a_res->data;
 
-  if( get_resid == Py_True )  /* Solve and compute residual r = rhs - Ax */
+  comp_resid = (get_resid == Py_True);
+  Py_BEGIN_ALLOW_THREADS
+  if( comp_resid )  /* Solve and compute residual r = rhs - Ax */
     error = Ma57_Refine( self->data, x, rhs, self->a, 1, 0 );
   else {            /* Just solve */
     cblas_dcopy( self->data->n, rhs, 1, x, 1 ); // x<- rhs ; will be overwritten
     error = Ma57_Solve( self->data, x );
   }
+  Py_END_ALLOW_THREADS
 
   if( error ) {
     fprintf( stderr, " Error return code from Solve: %-d\n", error );
@@ -316,6 +493,58 @@ static PyObject *Pyma57_ma57( Pyma57Object *self, PyObject *args ) {
 
 /* ========================================================================== */
 
+static char Pyma57_solve_many_Doc[] = "Solve AX=B for several right-hand sides";
+
+static PyObject *Pyma57_solve_many( Pyma57Object *self, PyObject *args ) {
+
+  PyArrayObject *a_x, *a_rhs, *a_res;
+  double        *x;
+  int            n = self->data->n, nrhs;
+  int            error, comp_resid;
+
+  /* Right-hand sides, solutions and residuals are (n, nrhs) arrays */
+  if( !PyArg_ParseTuple( args,
+                         "O!O!O!i:solve_many",
+                         &PyArray_Type, &a_rhs,
+                         &PyArray_Type, &a_x,
+                         &PyArray_Type, &a_res, &comp_resid ) ) return NULL;
+
+  if( !self->factorized ) {
+    PyErr_SetString( PyExc_RuntimeError, "Matrix has not been factorized" );
+    return NULL;
+  }
+  if( a_rhs->nd != 2 ) {
+    PyErr_SetString( PyExc_ValueError, "Right-hand side must be 2-D" );
+    return NULL;
+  }
+  nrhs = a_rhs->dimensions[1];
+  if( !Check_Multiple_RHS( a_rhs, n, nrhs ) ) return NULL;
+  if( !Check_Multiple_RHS( a_x,   n, nrhs ) ) return NULL;
+  if( !Check_Multiple_RHS( a_res, n, nrhs ) ) return NULL;
+
+  /* Solve for all right-hand sides in a single call */
+  x = (double *)a_x->data;
+  Py_BEGIN_ALLOW_THREADS
+  cblas_dcopy( n * nrhs, (double *)a_rhs->data, 1, x, 1 );
+  error = Ma57_SolveMany( self->data, nrhs, x );
+  if( !error && comp_resid )
+    Compute_Residuals( n, self->data->nz, self->data->irn, self->data->jcn,
+                       self->a, nrhs, x, (double *)a_rhs->data,
+                       (double *)a_res->data );
+  Py_END_ALLOW_THREADS
+
+  if( error ) {
+    PyErr_Format( PyExc_RuntimeError,
+                  "Error return code from Solve: %d", error );
+    return NULL;
+  }
+
+  Py_INCREF( Py_None );
+  return Py_None;
+}
+
+/* ========================================================================== */
+
 static char Pyma57_Stats_Doc[] = "Obtain statistics on factorization";
 
 static PyObject *Pyma57_Stats( Pyma57Object *self, PyObject *args ) {
@@ -342,6 +571,31 @@ static PyObject *Pyma57_Stats( Pyma57Object *self, PyObject *args ) {
 
 /* ========================================================================== */
 
+static char Pyma57_Forecast_Doc[] = "Obtain forecasts of the analyze phase";
+
+static PyObject *Pyma57_Forecast( Pyma57Object *self, PyObject *args ) {
+
+  /* Return the forecasts of the analyze phase, available before the
+   * numerical factorization:
+   * info[4] = number of entries in factors,
+   * info[5] = number of integers to hold factors,
+   * info[6] = largest front size,
+   * info[8] = storage for real data required by the factorization,
+   * info[9] = storage for int  data required by the factorization,
+   * rinfo[0] + rinfo[1] = operations for assembly and elimination.
+   */
+
+  return Py_BuildValue( "iiiiid",
+                        self->forecast[0],
+                        self->forecast[1],
+                        self->forecast[2],
+                        self->forecast[3],
+                        self->forecast[4],
+                        self->flops );
+}
+
+/* ========================================================================== */
+
 static char Pyma57_refine_Doc[] = "Perform iterative refinements";
 
 static PyObject *Pyma57_refine( Pyma57Object *self, PyObject *args ) {
@@ -374,7 +628,9 @@ static PyObject *Pyma57_refine( Pyma57Object *self, PyObject *args ) {
   rhs = (double *)a_rhs->data;
   self->data->residual = (double *)a_res->data;
 
+  Py_BEGIN_ALLOW_THREADS
   nerror = Ma57_Refine( self->data, x, rhs, self->a, nitref, 2 );
+  Py_END_ALLOW_THREADS
   if( nerror == -10 ) return NULL;
   return Py_BuildValue("dddddddd",
                        self->data->rinfo[10],    // 1st cond number estimate
@@ -396,12 +652,22 @@ static PyMethodDef Pyma57_special_methods[] = {
     METH_VARARGS, Pyma57_ma57_Doc                 },
   { "factorize", (PyCFunction)Pyma57_factorize,
     METH_VARARGS, Pyma57_factorize_Doc            },
+  { "refactorize",(PyCFunction)Pyma57_refactorize,
+    METH_VARARGS, Pyma57_refactorize_Doc          },
+  { "values",    (PyCFunction)Pyma57_values,
+    METH_VARARGS, Pyma57_values_Doc               },
+  { "coord",     (PyCFunction)Pyma57_coord,
+    METH_VARARGS, Pyma57_coord_Doc                },
+  { "solve_many",(PyCFunction)Pyma57_solve_many,
+    METH_VARARGS, Pyma57_solve_many_Doc           },
   { "fetchperm", (PyCFunction)Pyma57_fetch_perm,
     METH_VARARGS, Pyma57_fetch_perm_Doc           },
   //{ "fetchlb",   (PyCFunction)Pyma57_fetch_lb,
   //  METH_VARARGS, Pyma57_fetch_lb_Doc   },
   { "stats",     (PyCFunction)Pyma57_Stats,
     METH_VARARGS, Pyma57_Stats_Doc                },
+  { "forecast",  (PyCFunction)Pyma57_Forecast,
+    METH_VARARGS, Pyma57_Forecast_Doc             },
   { "refine",    (PyCFunction)Pyma57_refine,
     METH_VARARGS, Pyma57_refine_Doc               },
   { NULL,         NULL,
@@ -416,16 +682,25 @@ static PyObject *Pyma57_analyze( PyObject *self, PyObject *args ) {
 
   /* Input must be the lower triangle of a symmetric matrix */
 
-  PyObject  *rv;                    /* Return value */
-  PyObject  *mat;                   /* Input matrix */
-  PyObject  *sqd;                   /* SQD matrix flag */
+  PyObject      *rv;                /* Return value */
+  PyObject      *mat;               /* Input matrix */
+  PyObject      *sqd;               /* SQD matrix flag */
+  PyObject      *perm = Py_None;    /* Pivot order (optional) */
+  PyArrayObject *a_perm = NULL;
 
   /* Read input matrix and limited memory factor */
-  if( !PyArg_ParseTuple( args, "OO:factor", &mat, &sqd ) )
+  if( !PyArg_ParseTuple( args, "OO|O:analyze", &mat, &sqd, &perm ) )
     return NULL;
 
+  if( perm != Py_None ) {
+    a_perm = Get_Pivot_Order( perm, ((LLMatObject *)mat)->dim[0] );
+    if( a_perm == NULL ) return NULL;
+  }
+
   /* Spawn new Pyma57 Object, containing matrix symbolic factors */
-  rv = NewPyma57Object( (LLMatObject *)mat, sqd );
+  rv = NewPyma57Object( (LLMatObject *)mat, sqd,
+                        a_perm ? (int *)a_perm->data : NULL );
+  Py_XDECREF( a_perm );
   if( rv == NULL ) return NULL;
 
   return rv;
@@ -112,14 +112,15 @@ cblas_dnrm_infty( const int N, const double *X, const int incX ) {
         int finished = 0, error;
         double pTol, new_pTol = PIV_MIN;
         LOGMSG( " MA27 :: Factorizing..." );
-        
-        /* Copy A into factors. */
-        cblas_dcopy( ma27->nz, A, 1, ma27->factors, 1 );
 
         /* Unpack data structure and call MA27BD */
         while( !finished ) {
             LOGMSG( " calling ma27bd... " );
 
+            /* Copy A into factors. MA27BD overwrites them, so this must be
+             * done again whenever the factorization is restarted. */
+            cblas_dcopy( ma27->nz, A, 1, ma27->factors, 1 );
+
             MA27BD( &(ma27->n), &(ma27->nz), ma27->irn, ma27->icn,
                     ma27->factors, &(ma27->la), ma27->iw, &(ma27->liw),
                     ma27->ikeep, &(ma27->nsteps), &(ma27->maxfrt),
@@ -156,10 +157,6 @@ cblas_dnrm_infty( const int N, const double *X, const int incX ) {
             }
             else {
                 error = Process_Error_Code( ma27, error );
-                if( error == -4 ) {
-                    /* Must re-initialize factors */
-                    cblas_dcopy( ma27->nz, A, 1, ma27->factors, 1 );
-                }
                 if( error != -3 && error != -4 ) return error;
             }
         }
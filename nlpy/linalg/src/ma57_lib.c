@@ -182,6 +182,20 @@ extern "C" {   /* To prevent C++ compilers from mangling symbols */
 #endif
 #define __FUNCT__ "Ma57_Solve"
   int Ma57_Solve( Ma57_Data *ma57, double x[] ) {
+    return Ma57_SolveMany( ma57, 1, x );
+  }
+
+  /* ================================================================= */
+
+#ifdef  __FUNCT__
+#undef  __FUNCT__
+#endif
+#define __FUNCT__ "Ma57_SolveMany"
+  int Ma57_SolveMany( Ma57_Data *ma57, int nrhs, double x[] ) {
+
+    /* The nrhs right-hand sides are stored by columns in x, with leading
+     * dimension n, and are overwritten by the solutions. All are solved in
+     * a single call to MA57CD, which then uses Level-3 BLAS. */
 
     int finished = 0, error;
 
@@ -189,10 +203,12 @@ extern "C" {   /* To prevent C++ compilers from mangling symbols */
 
     ma57->job = 1;
     ma57->lrhs = ma57->n;
-    ma57->nrhs = 1;
-    ma57->lwork = ma57->n * ma57->nrhs;
-    if( !ma57->work )
+    ma57->nrhs = nrhs;
+    if( !ma57->work || ma57->lwork < ma57->n * nrhs ) {
+      NLPy_Free( ma57->work );
+      ma57->lwork = ma57->n * nrhs;
       ma57->work = (double *)NLPy_Calloc( ma57->lwork, sizeof(double) );
+    }
 
     while( !finished ) {
       LOGMSG( "\n         calling ma57cd... " );
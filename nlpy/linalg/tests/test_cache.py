@@ -0,0 +1,72 @@
+"""
+Tests of the cache of factorizations.
+"""
+
+import numpy as np
+from numpy.testing import TestCase, assert_, assert_equal, run_module_suite
+from pysparse.sparse import spmatrix
+from nlpy.linalg.pyldl import PyLDLContext
+from nlpy.linalg.cache import FactorizationCache
+
+
+def tridiagonal(n, d=4.0):
+    "Return the tridiagonal matrix with d on the diagonal and -1 elsewhere."
+    A = spmatrix.ll_mat_sym(n, 2*n)
+    for i in range(n):
+        A[i,i] = d
+    for i in range(n-1):
+        A[i+1,i] = -1.0
+    return A
+
+
+class TestFactorizationCache(TestCase):
+
+    def setUp(self):
+        self.A = tridiagonal(10)
+        self.cache = FactorizationCache(budget=1, factory=PyLDLContext)
+
+    def test_exclusive(self):
+        # Two callers never share a context.
+        P1 = self.cache.get(self.A)
+        P2 = self.cache.get(self.A)
+        assert_(P1 is not P2)
+        assert_equal(self.cache.stats()['misses'], 2)
+        assert_equal(len(self.cache), 0)
+
+    def test_release(self):
+        P1 = self.cache.get(self.A)
+        self.cache.release(P1)
+        assert_equal(len(self.cache), 1)
+        P2 = self.cache.get(self.A)
+        assert_(P2 is P1)
+        assert_equal(self.cache.hits, 1)
+        assert_equal(len(self.cache), 0)
+
+    def test_refactorized(self):
+        # A context refactorized by its owner only shares its analysis.
+        P1 = self.cache.get(self.A)
+        P1.factorize(tridiagonal(10, d=8.0))
+        self.cache.release(P1)
+        P2 = self.cache.get(self.A)
+        assert_(P2 is P1)
+        assert_equal(self.cache.symbolic_hits, 1)
+        b = np.ones(10)
+        P2.solve(b)
+        assert_(np.linalg.norm(P2.residual) < 1.0e-10)
+
+    def test_disabled(self):
+        # With no budget, released contexts are not retained.
+        cache = FactorizationCache(budget=0, factory=PyLDLContext)
+        P = cache.get(self.A)
+        cache.release(P)
+        assert_equal(len(cache), 0)
+        assert_equal(cache.nbytes, 0)
+
+    def test_foreign(self):
+        # Contexts that do not come from the cache are ignored.
+        self.cache.release(PyLDLContext(self.A))
+        assert_equal(len(self.cache), 0)
+
+
+if __name__ == '__main__':
+    run_module_suite()
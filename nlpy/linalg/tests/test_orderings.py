@@ -0,0 +1,110 @@
+"""
+Tests that the fill-reducing orderings reduce the fill of the factors
+computed by each backend.
+"""
+
+import numpy as np
+from numpy.testing import TestCase, assert_, run_module_suite
+from pysparse.sparse import spmatrix
+from nlpy.linalg.pyldl import PyLDLContext
+from nlpy.linalg import ordering
+
+try:
+    from nlpy.linalg.pyma27 import PyMa27Context
+except ImportError:
+    PyMa27Context = None
+
+try:
+    from nlpy.linalg.pyma57 import PyMa57Context
+except ImportError:
+    PyMa57Context = None
+
+
+def arrowhead(n):
+    """
+    Return the positive definite arrowhead matrix of order n whose first row
+    and column are dense. Its factors are dense in the natural order and have
+    no fill when the first variable is eliminated last.
+    """
+    A = spmatrix.ll_mat_sym(n, 2*n)
+    A[0,0] = float(n)
+    for i in range(1, n):
+        A[i,i] = 2.0
+        A[i,0] = 1.0
+    return A
+
+
+class OrderingTest:
+
+    context = None
+
+    def setUp(self):
+        self.n = 40
+        self.A = arrowhead(self.n)
+        self.b = np.ones(self.n)
+
+    def fill(self, ordering):
+        "Return the forecast number of reals in the factors."
+        P = self.context(self.A, ordering=ordering)
+        P.solve(self.b)
+        assert_(np.linalg.norm(P.residual) < 1.0e-10)
+        return P.nRealFactForecast
+
+    def test_amd_reduces_fill(self):
+        assert_(self.fill('amd') < self.fill('natural'))
+
+    def test_explicit_order(self):
+        # Eliminating the dense variable last produces no fill.
+        perm = np.arange(1, self.n + 1) % self.n
+        assert_(self.fill(perm) < self.fill('natural'))
+        assert_(self.fill(perm) <= self.fill('amd'))
+
+
+class TestDefaultOrdering(TestCase):
+
+    def setUp(self):
+        self.python_amd_max = ordering.python_amd_max
+
+    def tearDown(self):
+        ordering.python_amd_max = self.python_amd_max
+
+    def test_python_amd(self):
+        A = arrowhead(40)
+        (val, irow, jcol) = A.find()
+        perm = ordering.amd(40, irow, jcol, compiled=False)
+        assert_(0 in perm[-2:])          # The hub is among the last pivots.
+        assert_(np.all(np.sort(perm) == np.arange(40)))
+
+    def test_large_matrices(self):
+        assert_(ordering.default_ordering(40) == 'amd')
+        ordering.python_amd_max = 10
+        if ordering.have_compiled_amd():
+            expected = 'amd'
+        else:
+            try:
+                import pymetis
+                expected = 'metis'
+            except ImportError:
+                expected = 'rcm'
+        assert_(ordering.default_ordering(40) == expected)
+        P = PyLDLContext(arrowhead(40))
+        P.solve(np.ones(40))
+        assert_(np.linalg.norm(P.residual) < 1.0e-10)
+
+
+class TestPyLDLOrderings(OrderingTest, TestCase):
+    context = PyLDLContext
+
+
+if PyMa27Context is not None:
+    class TestMa27Orderings(OrderingTest, TestCase):
+        context = PyMa27Context
+
+
+if PyMa57Context is not None:
+    class TestMa57Orderings(OrderingTest, TestCase):
+        context = PyMa57Context
+
+
+if __name__ == '__main__':
+    run_module_suite()
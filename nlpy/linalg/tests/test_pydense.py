@@ -0,0 +1,52 @@
+"""
+Tests of the in-place update of the dense factorization of symmetric
+quasi-definite matrices.
+"""
+
+import numpy as np
+from numpy.testing import TestCase, assert_allclose, run_module_suite
+from pysparse.sparse import spmatrix
+from nlpy.linalg.pydense import PyDenseContext
+
+
+class TestPyDenseElements(TestCase):
+
+    def setUp(self):
+        # K = [I  A'; A  -I] with a dense A of size 3 x 5.
+        (self.n, self.m) = (5, 3)
+        rng = np.random.RandomState(1)
+        self.A = rng.rand(self.m, self.n)
+        self.b = rng.rand(self.n + self.m)
+        self.col_scale = 1.0 + rng.rand(self.n)
+        n, m = self.n, self.m
+        K = spmatrix.ll_mat_sym(n + m, n + m + m * n)
+        for i in xrange(n):
+            K[i, i] = 1.0
+        for i in xrange(m):
+            K[n + i, n + i] = -1.0
+            for j in xrange(n):
+                K[n + i, j] = self.A[i, j]
+        self.K = K
+
+    def test_factorize_elements(self):
+        # Update the diagonal and the scaled A block in place, as the
+        # stabilized LP solver does, and compare with a direct solve.
+        n, m = self.n, self.m
+        LBL = PyDenseContext(self.K, sqd=True)
+        (irow, jcol) = np.nonzero(self.A)
+        pos = np.concatenate((LBL.diagonal_positions(np.arange(n + m)),
+                              LBL.element_positions(irow + n, jcol)), axis=-1)
+        AC = self.A / self.col_scale
+        values = np.concatenate((-2.0 * np.ones(n), 3.0 * np.ones(m),
+                                 AC[irow, jcol]))
+        LBL.factorize_elements(pos, values)
+
+        M = np.zeros((n + m, n + m))
+        M[:n, :n] = -2.0 * np.eye(n) ; M[n:, n:] = 3.0 * np.eye(m)
+        M[n:, :n] = AC ; M[:n, n:] = AC.T
+        LBL.solve(self.b)
+        assert_allclose(LBL.x, np.linalg.solve(M, self.b), rtol=1.0e-10)
+
+
+if __name__ == '__main__':
+    run_module_suite()
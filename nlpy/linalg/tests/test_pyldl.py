@@ -0,0 +1,85 @@
+"""
+Tests of the NumPy LDL^T factorization of symmetric quasi-definite matrices.
+"""
+
+import numpy as np
+from numpy.testing import TestCase, assert_, assert_equal, assert_allclose, \
+                          run_module_suite
+from pysparse.sparse import spmatrix
+from nlpy.linalg.pyldl import PyLDLContext
+from nlpy.linalg.backends import LBLContext
+
+
+def sqd_matrix(nx, ny, scale=1.0, seed=0):
+    """
+    Return a sparse sqd matrix [E G'; G -F] of order nx+ny in ll_mat_sym
+    format, and the same matrix as a dense array. The sparsity pattern only
+    depends on `seed`. All values are multiplied by `scale`.
+    """
+    rng = np.random.RandomState(seed)
+    n = nx + ny
+    K = np.zeros((n, n))
+    E = rng.rand(nx, nx) * (rng.rand(nx, nx) < 0.3)
+    K[:nx, :nx] = E + E.T + nx * np.eye(nx)
+    G = 1.0 + rng.rand(ny, nx) * (rng.rand(ny, nx) < 0.3)
+    K[nx:, :nx] = G ; K[:nx, nx:] = G.T
+    K[nx:, nx:] = -np.diag(1.0 + rng.rand(ny))
+    K *= scale
+    (irow, jcol) = np.nonzero(np.tril(K))
+    A = spmatrix.ll_mat_sym(n, irow.size)
+    A.put(K[irow, jcol], irow, jcol)
+    return (A, K)
+
+
+class TestPyLDL(TestCase):
+
+    def setUp(self):
+        (self.nx, self.ny) = (12, 7)
+        (self.A, self.K) = sqd_matrix(self.nx, self.ny)
+        self.b = np.arange(1.0, self.nx + self.ny + 1.0)
+
+    def test_solve(self):
+        for ordering in ['natural', 'amd', 'rcm']:
+            P = PyLDLContext(self.A, ordering=ordering)
+            P.solve(self.b)
+            assert_allclose(P.x, np.linalg.solve(self.K, self.b),
+                            rtol=1.0e-10)
+            assert_(np.linalg.norm(P.residual) <= 1.0e-10 *
+                    np.linalg.norm(self.b))
+
+    def test_inertia(self):
+        P = PyLDLContext(self.A)
+        assert_equal(P.neig, self.ny)
+        assert_equal(P.rank, self.nx + self.ny)
+        assert_(P.isFullRank)
+
+    def test_refactorize(self):
+        # Same pattern, different values: the symbolic analysis is reused.
+        P = PyLDLContext(self.A)
+        (A2, K2) = sqd_matrix(self.nx, self.ny, scale=2.0)
+        P.factorize(A2)
+        P.solve(self.b)
+        assert_equal(P.nfact, 2)
+        assert_allclose(P.x, np.linalg.solve(K2, self.b), rtol=1.0e-10)
+
+    def test_pattern_change(self):
+        P = PyLDLContext(self.A)
+        (A2, K2) = sqd_matrix(self.nx, self.ny, seed=1)
+        self.assertRaises(ValueError, P.factorize, A2)
+
+    def test_multiple_rhs(self):
+        P = PyLDLContext(self.A)
+        B = np.outer(self.b, [1.0, -2.0, 0.5])
+        X = P.solve(B)
+        assert_allclose(X, np.linalg.solve(self.K, B), rtol=1.0e-10)
+
+    def test_backend(self):
+        # The NumPy factorization is the backend used without HSL.
+        P = LBLContext(self.A, sqd=True, backend='ldl')
+        assert_(isinstance(P, PyLDLContext))
+        P.solve(self.b)
+        assert_allclose(P.x, np.linalg.solve(self.K, self.b), rtol=1.0e-10)
+
+
+if __name__ == '__main__':
+    run_module_suite()
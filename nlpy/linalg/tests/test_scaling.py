@@ -0,0 +1,115 @@
+"""
+Tests of the row and column equilibration of sparse matrices given in
+coordinate format.
+"""
+
+import numpy as np
+from numpy.testing import TestCase, assert_, assert_allclose, assert_equal, \
+                          assert_raises, run_module_suite
+from nlpy.linalg.scaling.equilibration import apply_scaling, equilibrate, \
+                                              geometric_scaling, ruiz_scaling
+
+
+def coord(D):
+    "Return the dense array D in coordinate format (values, irow, jcol)."
+    (irow, jcol) = np.nonzero(D)
+    return (D[irow, jcol], irow, jcol)
+
+
+def scaled(D, row_scale, col_scale):
+    "Return the dense scaled matrix R^{-1} D C^{-1}."
+    return D / np.outer(row_scale, col_scale)
+
+
+def row_col_max(D):
+    "Return the largest element in absolute value of each row and column."
+    return (np.max(np.abs(D), axis=1), np.max(np.abs(D), axis=0))
+
+
+class TestEquilibration(TestCase):
+
+    def setUp(self):
+        # A well-scaled matrix B, with elements between 1 and 2 in absolute
+        # value, whose rows and columns are multiplied by factors between
+        # 1.0e-4 and 1.0e+4.
+        rng = np.random.RandomState(0)
+        n = 6
+        B = (1 + rng.rand(n, n)) * np.sign(rng.randn(n, n))
+        self.r = 10.0**rng.uniform(-4, 4, n)
+        self.c = 10.0**rng.uniform(-4, 4, n)
+        self.A = np.outer(self.r, self.c) * B
+        self.b = rng.randn(n)
+
+    def test_ruiz_converges(self):
+        (m, n) = self.A.shape
+        (val, irow, jcol) = coord(self.A)
+        dev = []
+        for maxiter in [1, 5, 50]:
+            (R, C) = ruiz_scaling(m, n, val, irow, jcol, tol=1.0e-8,
+                                  maxiter=maxiter)
+            (rmax, cmax) = row_col_max(scaled(self.A, R, C))
+            dev.append(max(np.max(np.abs(1 - rmax)),
+                           np.max(np.abs(1 - cmax))))
+        assert_(dev[0] > dev[1] > dev[2])
+        assert_(dev[2] <= 1.0e-8)
+
+    def test_geometric_reduces_spread(self):
+        (m, n) = self.A.shape
+        (val, irow, jcol) = coord(self.A)
+        (R, C) = geometric_scaling(m, n, val, irow, jcol)
+        S = np.abs(scaled(self.A, R, C))
+        # The spread of B is at most 2.
+        assert_(np.max(S) / np.min(S) <= 4.0)
+        (rmax, cmax) = row_col_max(S)
+        assert_(np.all(rmax >= 1.0/4) and np.all(rmax <= 4.0))
+        assert_(np.all(cmax >= 1.0/4) and np.all(cmax <= 4.0))
+
+    def test_geometric_rank_one(self):
+        # The scaled matrix of a positive rank-one matrix has unit elements.
+        (m, n) = self.A.shape
+        (val, irow, jcol) = coord(np.outer(self.r, self.c))
+        (R, C) = geometric_scaling(m, n, val, irow, jcol)
+        assert_allclose(apply_scaling(val, irow, jcol, R, C), 1.0,
+                        rtol=1.0e-10)
+
+    def test_unscale(self):
+        (m, n) = self.A.shape
+        (val, irow, jcol) = coord(self.A)
+        x = np.linalg.solve(self.A, self.b)
+        for method in ['max', 'ruiz', 'geometric']:
+            (R, C) = equilibrate(method, m, n, val, irow, jcol)
+            sval = apply_scaling(val, irow, jcol, R, C)
+            assert_allclose(sval * R[irow] * C[jcol], val, rtol=1.0e-12)
+            # Solve R^{-1} A C^{-1} y = R^{-1} b and recover x = C^{-1} y.
+            S = np.zeros((m, n)) ; S[irow, jcol] = sval
+            y = np.linalg.solve(S, self.b / R)
+            assert_allclose(y / C, x, rtol=1.0e-8)
+
+    def test_empty_rows_and_columns(self):
+        D = np.array([[2.0,  0.0, 0.0, -8.0],
+                      [0.0,  0.0, 0.0,  0.0],
+                      [0.5,  4.0, 0.0,  0.0]])
+        (m, n) = D.shape
+        (val, irow, jcol) = coord(D)
+        for method in ['max', 'ruiz', 'geometric']:
+            (R, C) = equilibrate(method, m, n, val, irow, jcol)
+            assert_equal(R[1], 1.0)
+            assert_equal(C[2], 1.0)
+            assert_(np.all(np.isfinite(R)) and np.all(R > 0))
+            assert_(np.all(np.isfinite(C)) and np.all(C > 0))
+            (rmax, cmax) = row_col_max(scaled(D, R, C))
+            assert_(np.all(rmax[[0, 2]] > 0) and np.all(cmax[[0, 1, 3]] > 0))
+        # A matrix without nonzero elements is left unscaled.
+        for method in ['max', 'ruiz', 'geometric']:
+            (R, C) = equilibrate(method, m, n, np.zeros(2), np.array([0, 2]),
+                                 np.array([1, 3]))
+            assert_equal(R, np.ones(m))
+            assert_equal(C, np.ones(n))
+
+    def test_unknown_method(self):
+        assert_raises(ValueError, equilibrate, 'mc29', 1, 1, np.ones(1),
+                      np.zeros(1, dtype=np.int), np.zeros(1, dtype=np.int))
+
+
+if __name__ == '__main__':
+    run_module_suite()
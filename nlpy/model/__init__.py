@@ -2,9 +2,12 @@
 NLPy Modeling Facilities.
 """
 
+from cache    import *
 from nlp      import *
+from snapshot import *
 from amplpy   import *
 from noisynlp import *
 from slacks   import *
+from qp       import *
 
 __all__ = filter(lambda s:not s.startswith('_'), dir())
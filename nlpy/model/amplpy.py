@@ -6,8 +6,9 @@ Python interface to the AMPL modeling language
 """
 
 import numpy as np
-from nlpy.model.nlp import NLPModel, KKTresidual
+from nlpy.model.nlp import NLPModel, KKTresidual, _classify_bounds
 from nlpy.model import _amplpy
+from nlpy.model.snapshot import ModelSnapshot
 from pysparse.sparse.pysparseMatrix import PysparseMatrix as sp
 from nlpy.tools import sparse_vector_class as sv
 import tempfile, os
@@ -79,6 +80,24 @@ class AmplModel(NLPModel):
     If only the `.mod` file is available, set the positional parameter
     `neednl` to `True` so AMPL generates the `nl` file, as in
     `AmplModel('elec.mod', data='elec.dat', neednl=True)`.
+
+    Each instance owns its own AMPL Solver Library (ASL) structure, so that
+    several models may be held and evaluated in the same process. The ASL
+    structure is released by :meth:`close` or when the instance is garbage
+    collected.
+
+    Evaluations of :meth:`obj`, :meth:`grad`, :meth:`cons`, :meth:`jac` and
+    :meth:`hess` may be cached by passing the keyword `cache` with the number
+    of points to remember, e.g., `AmplModel('elec', cache=4)`. See
+    :meth:`NLPModel.enable_cache`.
+
+    The static data of the model, i.e., dimensions, initial guesses, bounds,
+    constraint types and sparsity patterns, may be read from an on-disk
+    snapshot keyed on the contents of the `nl` file by passing the keyword
+    `snapshot`. Set it to `True` to use the default snapshot directory, or
+    to the name of a directory. The snapshot is created on first use. When
+    it is found, the ASL structure is only built by the first evaluation.
+    See :class:`nlpy.model.snapshot.ModelSnapshot`.
     """
 
     def __init__(self, model, **kwargs):
@@ -91,97 +110,111 @@ class AmplModel(NLPModel):
             template = GenTemplate(model, data, opts)
             writestub(template)
 
-        # Initialize the ampl module
-        try:
-            if model[-4:] == '.mod': model = model[:-4]
-            _amplpy.ampl_init(model)
-        except:
-            raise ValueError, 'Cannot initialize model %s' % model
+        if model[-4:] == '.mod': model = model[:-4]
 
         # Store problem name
         self.name = model
 
-        # Get basic info on problem
-        self.minimize = (_amplpy.obj_type() == 0)
-        (self.n, self.m) = _amplpy.get_dim()  # nvar and ncon
-        self.x0   = _amplpy.get_x0()          # initial primal estimate
-        self.pi0  = _amplpy.get_pi0()         # initial dual estimate
-        self.Lvar = _amplpy.get_Lvar()        # lower bounds on variables
-        self.Uvar = _amplpy.get_Uvar()        # upper bounds on variables
-        self.Lcon = _amplpy.get_Lcon()        # lower bounds on constraints
-        self.Ucon = _amplpy.get_Ucon()        # upper bounds on constraints
-        (self.lin, self.nln, self.net) = _amplpy.get_CType() # Constraint types
-        self.nlin = len(self.lin)           # number of linear    constraints
-        self.nnln = len(self.nln)           #    ...    nonlinear   ...
-        self.nnet = len(self.net)           #    ...    network     ...
-
-        # Get sparsity info
-        self.nnzj = _amplpy.get_nnzj()        # number of nonzeros in Jacobian
-        self.nnzh = _amplpy.get_nnzh()        #                       Hessian
+        # Get basic info on problem, from a snapshot if one is available.
+        snap = None
+        snapshot = kwargs.get('snapshot', False)
+        if snapshot:
+            directory = snapshot if isinstance(snapshot, basestring) else None
+            try:
+                snap = ModelSnapshot(model, directory=directory)
+            except (IOError, OSError):
+                raise ValueError, 'Cannot initialize model %s' % model
+
+        if snap is not None and snap.exists():
+            # The ASL structure is only needed to evaluate functions. It is
+            # built by __getattr__ on first use.
+            data = snap.load()
+            self.minimize = data['minimize']
+            (self.n, self.m) = (data['n'], data['m'])
+            for name in ['x0', 'pi0', 'Lvar', 'Uvar', 'Lcon', 'Ucon',
+                         'lin', 'nln', 'net']:
+                setattr(self, name, data[name])
+            self.nnzj = data['nnzj']
+            self.nnzh = data['nnzh']
+            self._jac_structure = (data['jac_irow'], data['jac_jcol'])
+            self._hess_structure = (data['hess_irow'], data['hess_jcol'])
+        else:
+            # Each instance owns its ASL structure, so several models may be
+            # held at once.
+            self._asl = self._ampl_init()
+            asl = self._asl
+            self.minimize = (_amplpy.obj_type(asl) == 0)
+            (self.n, self.m) = _amplpy.get_dim(asl)  # nvar and ncon
+            self.x0   = _amplpy.get_x0(asl)      # initial primal estimate
+            self.pi0  = _amplpy.get_pi0(asl)     # initial dual estimate
+            self.Lvar = _amplpy.get_Lvar(asl)    # lower bounds on variables
+            self.Uvar = _amplpy.get_Uvar(asl)    # upper bounds on variables
+            self.Lcon = _amplpy.get_Lcon(asl)    # lower bounds on constraints
+            self.Ucon = _amplpy.get_Ucon(asl)    # upper bounds on constraints
+            (lin, nln, net) = _amplpy.get_CType(asl)   # Constraint types
+            self.lin = np.array(lin, dtype=np.intp)
+            self.nln = np.array(nln, dtype=np.intp)
+            self.net = np.array(net, dtype=np.intp)
+
+            # Get sparsity info
+            self.nnzj = _amplpy.get_nnzj(asl)  # number of nonzeros in Jacobian
+            self.nnzh = _amplpy.get_nnzh(asl)  #                       Hessian
+            self._jac_structure = None         # computed on demand
+            self._hess_structure = None
+
+            if snap is not None:
+                (jirow, jjcol) = self.jac_structure()
+                (hirow, hjcol) = self.hess_structure()
+                snap.save({'n': self.n, 'm': self.m, 'minimize': self.minimize,
+                           'x0': self.x0, 'pi0': self.pi0,
+                           'Lvar': self.Lvar, 'Uvar': self.Uvar,
+                           'Lcon': self.Lcon, 'Ucon': self.Ucon,
+                           'lin': self.lin, 'nln': self.nln, 'net': self.net,
+                           'nnzj': self.nnzj, 'nnzh': self.nnzh,
+                           'jac_irow': jirow, 'jac_jcol': jjcol,
+                           'hess_irow': hirow, 'hess_jcol': hjcol})
+
+        self.nlin = self.lin.size           # number of linear    constraints
+        self.nnln = self.nln.size           #    ...    nonlinear   ...
+        self.nnet = self.net.size           #    ...    network     ...
 
         # Initialize local value for Infinity
         self.Infinity = np.inf
         self.negInfinity = - np.inf
 
-        # Maintain lists of indices for each type of constraints:
-        self.rangeC = []    # Range constraints:       cL <= c(x) <= cU
-        self.lowerC = []    # Lower bound constraints: cL <= c(x)
-        self.upperC = []    # Upper bound constraints:       c(x) <= cU
-        self.equalC = []    # Equality constraints:    cL  = c(x)  = cU
-        self.freeC  = []    # "Free" constraints:    -inf <= c(x) <= inf
-
-        for i in range(self.m):
-            if self.Lcon[i] > self.negInfinity and self.Ucon[i] < self.Infinity:
-                if self.Lcon[i] == self.Ucon[i]:
-                    self.equalC.append(i)
-                else:
-                    self.rangeC.append(i)
-            elif self.Lcon[i] > self.negInfinity:
-                self.lowerC.append(i)
-            elif self.Ucon[i] < self.Infinity:
-                self.upperC.append(i)
-            else:
-                # Normally, we should not get here
-                self.freeC.append(i)
-
-        self.nlowerC = len(self.lowerC)
-        self.nrangeC = len(self.rangeC)
-        self.nupperC = len(self.upperC)
-        self.nequalC = len(self.equalC)
-        self.nfreeC  = len(self.freeC )
-
-        self.permC = self.equalC + self.lowerC + self.upperC + self.rangeC
+        # Maintain arrays of indices for each type of constraints:
+        # equalC: Equality constraints:    cL  = c(x)  = cU
+        # rangeC: Range constraints:       cL <= c(x) <= cU
+        # lowerC: Lower bound constraints: cL <= c(x)
+        # upperC: Upper bound constraints:       c(x) <= cU
+        # freeC:  "Free" constraints:    -inf <= c(x) <= inf (should be empty)
+        (self.equalC, self.rangeC, self.lowerC, self.upperC, self.freeC) = \
+            _classify_bounds(self.Lcon, self.Ucon,
+                             self.negInfinity, self.Infinity)
+
+        self.nlowerC = self.lowerC.size
+        self.nrangeC = self.rangeC.size
+        self.nupperC = self.upperC.size
+        self.nequalC = self.equalC.size
+        self.nfreeC  = self.freeC.size
+
+        self.permC = np.concatenate((self.equalC, self.lowerC,
+                                     self.upperC, self.rangeC))
 
         # Proceed similarly with bound constraints
-        self.rangeB = []
-        self.lowerB = []
-        self.upperB = []
-        self.fixedB = []
-        self.freeB  = []
-
-        for i in range(self.n):
-            if self.Lvar[i] > self.negInfinity and self.Uvar[i] < self.Infinity:
-                if self.Lvar[i] == self.Uvar[i]:
-                    self.fixedB.append(i)
-                else:
-                    self.rangeB.append(i)
-            elif self.Lvar[i] > self.negInfinity:
-                self.lowerB.append(i)
-            elif self.Uvar[i] < self.Infinity:
-                self.upperB.append(i)
-            else:
-                # This is a free variable
-                self.freeB.append(i)
-
-        self.nlowerB = len(self.lowerB)
-        self.nrangeB = len(self.rangeB)
-        self.nupperB = len(self.upperB)
-        self.nfixedB = len(self.fixedB)
-        self.nfreeB  = len(self.freeB)
+        (self.fixedB, self.rangeB, self.lowerB, self.upperB, self.freeB) = \
+            _classify_bounds(self.Lvar, self.Uvar,
+                             self.negInfinity, self.Infinity)
+
+        self.nlowerB = self.lowerB.size
+        self.nrangeB = self.rangeB.size
+        self.nupperB = self.upperB.size
+        self.nfixedB = self.fixedB.size
+        self.nfreeB  = self.freeB.size
         self.nbounds = self.n - self.nfreeB
 
-        self.permB = self.fixedB + self.lowerB + self.upperB + \
-            self.rangeB + self.freeB
+        self.permB = np.concatenate((self.fixedB, self.lowerB, self.upperB,
+                                     self.rangeB, self.freeB))
 
         # Define default stopping tolerances
         self.stop_d = 1.0e-5    # Dual feasibility
@@ -202,11 +235,21 @@ class AmplModel(NLPModel):
         self.ceval = 0    #                constraint functions
         self.Jeval = 0    #                           gradients
         self.Jprod = 0    #                matrix-vector products with Jacobian
+        self.cache_hits = 0     # evaluations found in cache
+        self.cache_misses = 0   # evaluations not found in cache
+
+        # Evaluation cache (disabled by default)
+        self.cache = None
+        self._last_x = None     # hash of point of last _move_to()
+        self._point = None      # last point looked up in the cache
+        if kwargs.get('cache', 0) > 0:
+            self.enable_cache(kwargs['cache'])
 
     def ResetCounters(self):
         """
-        Reset the `feval`, `geval`, `Heval`, `Hprod`, `ceval`, `Jeval` and
-        `Jprod` counters of the current instance to zero.
+        Reset the `feval`, `geval`, `Heval`, `Hprod`, `ceval`, `Jeval`,
+        `Jprod`, `cache_hits` and `cache_misses` counters of the current
+        instance to zero.
         """
         self.feval = 0
         self.geval = 0
@@ -215,17 +258,36 @@ class AmplModel(NLPModel):
         self.ceval = 0
         self.Jeval = 0
         self.Jprod = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
         return None
 
+    def _ampl_init(self):
+        "Read the `nl` file and return a new ASL structure."
+        try:
+            return _amplpy.ampl_init(self.name)
+        except:
+            raise ValueError, 'Cannot initialize model %s' % self.name
+
+    def __getattr__(self, name):
+        # Only reached when the model was loaded from a snapshot and the ASL
+        # structure has not been built yet.
+        if name == '_asl':
+            self._asl = self._ampl_init()
+            return self._asl
+        raise AttributeError, name
+
     # Destructor
     def close(self):
-        _amplpy.ampl_shut()
+        if '_asl' in self.__dict__:
+            _amplpy.ampl_shut(self._asl)
+            del self._asl
 
     def writesol(self, x, z, msg):
         """
         Write primal-dual solution and message msg to stub.sol
         """
-        return _amplpy.ampl_sol(x, z, msg)
+        return _amplpy.ampl_sol(self._asl, x, z, msg)
 
 ###############################################################################
 
@@ -437,7 +499,10 @@ class AmplModel(NLPModel):
 
         if self.m > 0:
             dFeas = np.empty(self.n)
-            J = kwargs.get('J', self.jac(x)[self.permC,:])
+            if 'J' in kwargs:
+                J = kwargs['J']
+            else:
+                J = self.jac(x)[self.permC,:]
             J.matvec_transp(-yloc, dFeas)
         else:
             dFeas = np.zeros(self.n)
@@ -451,7 +516,7 @@ class AmplModel(NLPModel):
         objMult = kwargs.get('FJ', 1.0)
 
         if not FJ:
-            g = kwargs.get('g', self.grad(x))
+            g = kwargs['g'] if 'g' in kwargs else self.grad(x)
             if self.minimize:
                 dFeas += g
             else:
@@ -467,7 +532,8 @@ class AmplModel(NLPModel):
             yNorm = np.linalg.norm(y, ord=1)
             dScale += yNorm /len(y)
         if self.m > nequalC:
-            gScale += np.linalg.norm(y[lowerC + upperC + rangeC], ord=1)
+            gScale += np.linalg.norm(y[np.concatenate((lowerC, upperC,
+                                                       rangeC))], ord=1)
             if nrangeC > 0:
                 gScale += np.linalg.norm(y[self.m:], ord=1)
             gScale /= (nlowerC + nupperC + 2*nrangeC)
@@ -534,10 +600,12 @@ class AmplModel(NLPModel):
         Returns a floating-point number. This method changes the sign of the
         objective value if the problem is a maximization problem.
         """
-        f = _amplpy.eval_obj(x)
+        (key, f) = self._cache_lookup('obj', x)
+        if f is not None: return f
+        f = _amplpy.eval_obj(self._asl, x)
         self.feval += 1
-        if not self.minimize: return -f
-        return f
+        if not self.minimize: f = -f
+        return self._cache_store(key, f)
 
     def grad(self, x):
         """
@@ -545,10 +613,29 @@ class AmplModel(NLPModel):
         Returns a Numpy array. This method changes the sign of the objective
         gradient if the problem is a maximization problem.
         """
-        g = _amplpy.grad_obj(x)
+        (key, g) = self._cache_lookup('grad', x)
+        if g is not None: return g
+        g = _amplpy.grad_obj(self._asl, x)
         self.geval += 1
         if not self.minimize: g *= -1
-        return g
+        return self._cache_store(key, g)
+
+    def obj_grad(self, x):
+        """
+        Evaluate objective function value and gradient at x in a single pass
+        through the expression graph. Returns a tuple `(f, g)`. Signs are
+        changed as in :meth:`obj` and :meth:`grad`.
+        """
+        ((fkey, gkey), (f, g)) = self._cache_lookup_many(x, ('obj',),
+                                                         ('grad',))
+        if f is not None: return (f, g)
+        (f, g) = _amplpy.eval_obj_grad(self._asl, x)
+        self.feval += 1
+        self.geval += 1
+        if not self.minimize:
+            f = -f
+            g *= -1
+        return (self._cache_store(fkey, f), self._cache_store(gkey, g))
 
     def sgrad(self, x):
         """
@@ -556,8 +643,9 @@ class AmplModel(NLPModel):
         Returns a sparse vector. This method changes the sign of the objective
         gradient if the problem is a maximization problem.
         """
+        self._forget_point()
         try:
-            sg_dict = _amplpy.eval_sgrad(x)
+            sg_dict = _amplpy.eval_sgrad(self._asl, x)
         except:
             raise RunTimeError, "Failed to fetch sparse gradient of objective"
             return None
@@ -574,7 +662,7 @@ class AmplModel(NLPModel):
         if the problem is a maximization problem.
         """
         try:
-            sc_dict = _amplpy.eval_cost()
+            sc_dict = _amplpy.eval_cost(self._asl)
         except:
             raise RunTimeError, "Failed to fetch sparse cost vector"
             return None
@@ -599,15 +687,17 @@ class AmplModel(NLPModel):
 
         use the `permC` permutation vector.
         """
+        (key, c) = self._cache_lookup('cons', x)
+        if c is not None: return c
         try:
-            c = _amplpy.eval_cons(x)
+            c = _amplpy.eval_cons(self._asl, x)
         except:
             print ' Offending argument : '
             for i in range(self.n):
                 print '%-15.9f ' % x[i]
             return None #c = self.Infinity * np.ones(self.m)
         self.ceval += self.m
-        return c #[self.permC]
+        return self._cache_store(key, c) #[self.permC]
 
     def consPos(self, x):
         """
@@ -645,7 +735,8 @@ class AmplModel(NLPModel):
         Returns a floating-point number.
         """
         self.ceval += 1
-        return _amplpy.eval_ci(i, x)
+        self._forget_point()
+        return _amplpy.eval_ci(self._asl, i, x)
 
     def igrad(self, i, x):
         """
@@ -653,7 +744,8 @@ class AmplModel(NLPModel):
         Returns a Numpy array.
         """
         self.Jeval += 1
-        return _amplpy.eval_gi(i, x)
+        self._forget_point()
+        return _amplpy.eval_gi(self._asl, i, x)
 
     def sigrad(self, i, x):
         """
@@ -661,8 +753,9 @@ class AmplModel(NLPModel):
         Returns a sparse vector representing the sparse gradient
         in coordinate format.
         """
+        self._forget_point()
         try:
-            sci_dict = _amplpy.eval_sgi(i, x)
+            sci_dict = _amplpy.eval_sgi(self._asl, i, x)
         except:
             raise RunTimeError, "Failed to fetch sparse constraint gradient"
             return None
@@ -677,7 +770,7 @@ class AmplModel(NLPModel):
         when problem is a linear programming problem.
         """
         try:
-            sri_dict = _amplpy.eval_row(i)
+            sri_dict = _amplpy.eval_row(self._asl, i)
         except:
             raise RunTimeError, "Failed to fetch sparse row"
             return None
@@ -694,10 +787,10 @@ class AmplModel(NLPModel):
         store_zeros = 1 if store_zeros else 0
         if len(args) == 1:
             if type(args[0]).__name__ == 'll_mat':
-                return _amplpy.eval_A(store_zeros,args[0])
+                return _amplpy.eval_A(self._asl, store_zeros,args[0])
             else:
                 return None
-        return _amplpy.eval_A(store_zeros)
+        return _amplpy.eval_A(self._asl, store_zeros)
 
     def jac(self, x, *args, **kwargs):
         """
@@ -716,13 +809,79 @@ class AmplModel(NLPModel):
         store_zeros = 1 if store_zeros else 0
         if len(args) > 0:
             if type(args[0]).__name__ == 'll_mat':
-                J = _amplpy.eval_J(x, self.mformat, args[0], store_zeros)
+                self._forget_point()
+                J = _amplpy.eval_J(self._asl, x, self.mformat, args[0],
+                                   store_zeros)
             else:
                 return None
-        else:
-            J = _amplpy.eval_J(x, self.mformat, store_zeros)
+            self.Jeval += 1
+            return J
+        (key, J) = self._cache_lookup('jac', x, self.mformat, store_zeros)
+        if J is not None: return J
+        J = _amplpy.eval_J(self._asl, x, self.mformat, store_zeros)
         self.Jeval += 1
-        return J #[self.permC,:]
+        return self._cache_store(key, J) #[self.permC,:]
+
+    def cons_jac(self, x, **kwargs):
+        """
+        Evaluate vector of constraints and sparse Jacobian of constraints at x
+        in a single pass through the expression graph. Returns a tuple
+        `(c, J)`, where `c` is as returned by :meth:`cons` and `J` is as
+        returned by :meth:`jac`.
+        """
+        store_zeros = kwargs.get('store_zeros', False)
+        store_zeros = 1 if store_zeros else 0
+        ((ckey, jkey), (c, J)) = self._cache_lookup_many(
+            x, ('cons',), ('jac', self.mformat, store_zeros))
+        if c is not None: return (c, J)
+        (c, J) = _amplpy.eval_cons_J(self._asl, x, self.mformat, store_zeros)
+        self.ceval += self.m
+        self.Jeval += 1
+        return (self._cache_store(ckey, c), self._cache_store(jkey, J))
+
+    def jac_structure(self):
+        """
+        Return the pair `(irow, jcol)` of integer arrays holding the row and
+        column indices of the `nnzj` nonzero elements of the Jacobian of the
+        constraints. The structure is fixed and is computed only once.
+        """
+        if self._jac_structure is None:
+            self._jac_structure = _amplpy.jac_structure(self._asl)
+        return self._jac_structure
+
+    def jac_values(self, x, out=None):
+        """
+        Evaluate the nonzero elements of the Jacobian of the constraints at x,
+        in the order given by :meth:`jac_structure`. If `out` is given, it
+        must be a contiguous float array of length `nnzj` and is filled in
+        place. Otherwise, a new array is allocated. Return the array of
+        values.
+        """
+        if out is None: out = np.empty(self.nnzj)
+        self._forget_point()
+        _amplpy.jac_values(self._asl, x, out)
+        self.Jeval += 1
+        return out
+
+    def jprod(self, x, v, **kwargs):
+        """
+        Evaluate the matrix-vector product between the Jacobian of the
+        constraints at x and the vector v. The Jacobian is not assembled: the
+        sparse gradient of each constraint is evaluated in turn, so that the
+        memory required is of the order of n + m.
+        """
+        self.Jprod += 1
+        self._forget_point()
+        return _amplpy.J_prod(self._asl, x, v, 0)
+
+    def jtprod(self, x, w, **kwargs):
+        """
+        Evaluate the matrix-vector product between the transpose of the
+        Jacobian of the constraints at x and the vector w. See :meth:`jprod`.
+        """
+        self.Jprod += 1
+        self._forget_point()
+        return _amplpy.J_prod(self._asl, x, w, 1)
 
     def jacPos(self, x, **kwargs):
         """
@@ -779,27 +938,139 @@ class AmplModel(NLPModel):
 
         Note that the sign of the Hessian matrix of the objective function
         appears as if the problem were a minimization problem.
+
+        AMPL evaluates the Hessian at the last point at which the objective
+        or constraints were evaluated. When the evaluation cache is enabled,
+        the objective and constraints are re-evaluated at `x` if necessary.
         """
         obj_weight = kwargs.get('obj_weight', 1.0)
         store_zeros = kwargs.get('store_zeros', False)
         store_zeros = 1 if store_zeros else 0
+        key = None
         if len(args) > 0:
-            if type(args[0]).__name__ == 'll_mat':
-                H = _amplpy.eval_H(x, z, self.mformat, obj_weight, args[0],
-                                      store_zeros)
-            else:
+            if type(args[0]).__name__ != 'll_mat':
                 return None
         else:
-            H = _amplpy.eval_H(x, z, self.mformat, obj_weight, store_zeros)
+            (key, H) = self._cache_lookup('hess', x, z, obj_weight,
+                                          self.mformat, store_zeros)
+            if H is not None: return H
+        if self.cache is not None:
+            self._move_to(x)
+        if len(args) > 0:
+            H = _amplpy.eval_H(self._asl, x, z, self.mformat, obj_weight,
+                               args[0], store_zeros)
+        else:
+            H = _amplpy.eval_H(self._asl, x, z, self.mformat, obj_weight,
+                               store_zeros)
         self.Heval += 1
-        return H
+        return self._cache_store(key, H)
+
+    def enable_cache(self, size=8):
+        """
+        Memoize evaluations as in :meth:`NLPModel.enable_cache`. Evaluations
+        performed while the cache was disabled were not tracked, so the point
+        at which AMPL last evaluated the problem is forgotten.
+        """
+        NLPModel.enable_cache(self, size)
+        self._forget_point()
+        return
 
+    def disable_cache(self):
+        "Discard the evaluation cache and stop caching."
+        NLPModel.disable_cache(self)
+        self._forget_point()
+        return
+
+    def _cache_lookup_many(self, x, *lookups):
+        """
+        Look up evaluations at `x` as in :meth:`NLPModel._cache_lookup_many`
+        and record `x` as the point at which :meth:`hprod` evaluates.
+        """
+        if self.cache is not None:
+            self._point = np.array(x, dtype=np.float)
+        return NLPModel._cache_lookup_many(self, x, *lookups)
+
+    def _cache_store(self, key, value):
+        """
+        Store `value`, just computed by AMPL at the point of `key`, as in
+        :meth:`NLPModel._cache_store`. Unless this point is that of the last
+        :meth:`_move_to`, the objective and constraints may no longer have
+        been last evaluated at the same point. The same holds when caching is
+        disabled and `key` is `None`.
+        """
+        if key is None or key[1] != self._last_x:
+            self._last_x = None
+        return NLPModel._cache_store(self, key, value)
+
+    def _forget_point(self):
+        """
+        Record that AMPL evaluated the problem at a point that bypassed the
+        cache. The next :meth:`_move_to` evaluates the problem again and
+        :meth:`hprod` uses the point of that evaluation.
+        """
+        self._last_x = None
+        self._point = None
+        return
+
+    def _move_to(self, x):
+        """
+        Make sure the last point at which AMPL evaluated the objective and
+        constraints is `x`. Cache hits skip those evaluations, so that the
+        point at which AMPL would evaluate second derivatives may be stale.
+        The hash of `x` is recorded in :attr:`_last_x` and reset to `None` by
+        any evaluation that may have moved AMPL to another point. The point
+        `x` is also the one at which :meth:`hprod` evaluates from now on.
+        """
+        if x is not self._point: self._point = np.array(x, dtype=np.float)
+        xhash = self.cache.hash(x)
+        if xhash == self._last_x: return
+        _amplpy.eval_obj(self._asl, x) ; self.feval += 1
+        if self.m > 0:
+            _amplpy.eval_cons(self._asl, x) ; self.ceval += self.m
+        self._last_x = xhash
+        return
+
+
+    def hess_structure(self):
+        """
+        Return the pair `(irow, jcol)` of integer arrays holding the row and
+        column indices of the `nnzh` nonzero elements of the lower triangle
+        of the Hessian of the Lagrangian. The structure is fixed and is
+        computed only once.
+        """
+        if self._hess_structure is None:
+            self._hess_structure = _amplpy.hess_structure(self._asl)
+        return self._hess_structure
+
+    def hess_values(self, x, z, out=None, **kwargs):
+        """
+        Evaluate the nonzero elements of the lower triangle of the Hessian of
+        the Lagrangian at (x, z), in the order given by
+        :meth:`hess_structure`. If `out` is given, it must be a contiguous
+        float array of length `nnzh` and is filled in place. Otherwise, a new
+        array is allocated. Return the array of values.
+
+        The keyword `obj_weight` and the remarks on the point of evaluation
+        are as in :meth:`hess`.
+        """
+        obj_weight = kwargs.get('obj_weight', 1.0)
+        if self.cache is not None:
+            self._move_to(x)
+        if out is None: out = np.empty(self.nnzh)
+        _amplpy.hess_values(self._asl, z, obj_weight, out)
+        self.Heval += 1
+        return out
 
     def hprod(self, z, v, **kwargs):
         """
         Evaluate matrix-vector product H(x,z) * v.
         Returns a Numpy array.
 
+        If `v` is a two-dimensional array of shape (n, k), the products of
+        H(x,z) with its k columns are returned as an array of the same shape.
+        The Hessian-vector product machinery of the ASL is then initialized
+        once for all columns, which is cheaper than k separate calls.
+
         :keywords:
             :obj_weight: Add a weight to the Hessian of the objective function.
                          By default, the weight is one. Setting it to zero
@@ -808,10 +1079,22 @@ class AmplModel(NLPModel):
 
         Note that the sign of the Hessian matrix of the objective function
         appears as if the problem were a minimization problem.
+
+        AMPL evaluates the product at the last point at which the objective
+        or constraints were evaluated. When the evaluation cache is enabled,
+        the objective and constraints are re-evaluated if necessary at the
+        last point passed to :meth:`obj`, :meth:`cons`, etc., even if their
+        values were found in the cache.
         """
         obj_weight = kwargs.get('obj_weight', 1.0)
+        if self.cache is not None and self._point is not None:
+            self._move_to(self._point)
+        if np.ndim(v) == 2:
+            self.Hprod += v.shape[1]
+            HV = _amplpy.H_prod_many(self._asl, z, v.T, obj_weight)
+            return HV.T
         self.Hprod += 1
-        return _amplpy.H_prod(z, v, obj_weight)
+        return _amplpy.H_prod(self._asl, z, v, obj_weight)
 
     def hiprod(self, i, v, **kwargs):
         """
@@ -820,20 +1103,20 @@ class AmplModel(NLPModel):
         """
         #z = np.zeros(self.m) ; z[i] = -1
         self.Hprod += 1
-        return _amplpy.Hi_prod(i, v)
+        return _amplpy.Hi_prod(self._asl, i, v)
 
     def ghivprod(self, g, v, **kwargs):
         """
         Evaluate the vector of dot products (g, Hi*v) where Hi is the Hessian
         of the i-th constraint.
         """
-        return _amplpy.gHi_prod(g, v)
+        return _amplpy.gHi_prod(self._asl, g, v)
 
     def islp(self):
         """
         Determines whether problem is a linear programming problem.
         """
-        if _amplpy.is_lp():
+        if _amplpy.is_lp(self._asl):
             return True
         else:
             return False
@@ -849,8 +1132,12 @@ class AmplModel(NLPModel):
         check.
 
         See also :meth:`unset_x`.
+
+        Calling this method clears the evaluation cache, if any.
         """
-        return _amplpy.set_x(x)
+        if self.cache is not None:
+            self.cache.clear() ; self._forget_point()
+        return _amplpy.set_x(self._asl, x)
 
     def unset_x(self):
         """
@@ -859,8 +1146,12 @@ class AmplModel(NLPModel):
         last call.
 
         See also :meth:`set_x`.
+
+        Calling this method clears the evaluation cache, if any.
         """
-        return _amplpy.unset_x()
+        if self.cache is not None:
+            self.cache.clear() ; self._forget_point()
+        return _amplpy.unset_x(self._asl)
 
     def display_basic_info(self):
         """
@@ -0,0 +1,83 @@
+"""
+A bounded cache of function evaluations keyed on the point of evaluation.
+
+.. moduleauthor:: D. Orban <dominique.orban@gerad.ca>
+"""
+
+__docformat__ = 'restructuredtext'
+
+import numpy as np
+import hashlib
+from collections import OrderedDict
+
+
+def _copy(value):
+    "Return a copy of value so that callers cannot alter cached data."
+    if isinstance(value, tuple):
+        return tuple([_copy(v) for v in value])
+    if hasattr(value, 'copy'):
+        return value.copy()
+    return value
+
+
+class EvaluationCache:
+    """
+    A least-recently-used cache of evaluations. Entries are keyed on the kind
+    of evaluation (e.g., `'obj'`, `'grad'`), on a hash of the point `x` at
+    which the evaluation took place and on any additional argument that
+    influences the result (e.g., multipliers or the objective weight in the
+    Hessian of the Lagrangian).
+
+    :parameters:
+
+        :size:  maximum number of entries held in the cache (default: 8).
+
+    Values are copied on the way in and on the way out, so that a caller that
+    modifies a returned array in place does not corrupt the cache.
+    """
+
+    def __init__(self, size=8):
+        if size < 1:
+            raise ValueError, 'Cache size must be positive.'
+        self.size = size
+        self._entries = OrderedDict()
+
+    def hash(self, x):
+        "Return a hash of the contents of vector `x`."
+        if x is None: return None
+        return hashlib.sha1(np.ascontiguousarray(x, dtype=np.float)).digest()
+
+    def key(self, kind, x, *args):
+        """
+        Return the key associated to evaluation `kind` at `x`. Additional
+        arguments may be vectors or scalars and are folded into the key.
+        """
+        extra = tuple([self.hash(a) if isinstance(a, np.ndarray) else a \
+                       for a in args])
+        return (kind, self.hash(x)) + extra
+
+    def get(self, key):
+        "Return the value stored under `key`, or `None` on a miss."
+        try:
+            value = self._entries.pop(key)
+        except KeyError:
+            return None
+        self._entries[key] = value     # Mark as most recently used.
+        return _copy(value)
+
+    def put(self, key, value):
+        "Store `value` under `key`, evicting the least recently used entry."
+        if key in self._entries:
+            del self._entries[key]
+        elif len(self._entries) >= self.size:
+            self._entries.popitem(last=False)
+        self._entries[key] = _copy(value)
+        return
+
+    def clear(self):
+        "Remove all entries."
+        self._entries.clear()
+        return
+
+    def __len__(self):
+        return len(self._entries)
@@ -3,6 +3,71 @@
 # nonlinear optimization problem.
 # D. Orban, 2004.
 import numpy as np
+from nlpy.model.cache import EvaluationCache
+
+
+def _classify_bounds(L, U, negInfinity, Infinity):
+    """
+    Classify the components of a vector subject to `L <= v <= U`. Return the
+    tuple `(equal, range, lower, upper, free)` of integer index arrays of the
+    components with two equal finite bounds, two different finite bounds, a
+    finite lower bound only, a finite upper bound only, and no finite bound.
+    Each array is sorted in increasing order.
+    """
+    L = np.asarray(L) ; U = np.asarray(U)
+    hasL = L > negInfinity
+    hasU = U < Infinity
+    both = hasL & hasU
+    equal = both & (L == U)
+    return (np.flatnonzero(equal),
+            np.flatnonzero(both & ~equal),
+            np.flatnonzero(hasL & ~hasU),
+            np.flatnonzero(hasU & ~hasL),
+            np.flatnonzero(~(hasL | hasU)))
+
+
+def _sparse_pattern(A, ncol, lower=False):
+    """
+    Return the tuple `(irow, jcol, keys)` describing the nonzero elements of
+    the sparse matrix `A` with `ncol` columns, sorted by rows and then by
+    columns. The array `keys` holds the sorted linear indices
+    `irow * ncol + jcol`. If `lower` is `True`, only elements of the lower
+    triangle are kept.
+    """
+    (val, irow, jcol) = A.find()
+    irow = np.asarray(irow, dtype=np.intp)
+    jcol = np.asarray(jcol, dtype=np.intp)
+    if lower:
+        keep = irow >= jcol
+        irow = irow[keep] ; jcol = jcol[keep]
+    keys = irow * ncol + jcol
+    order = np.argsort(keys)
+    return (irow[order], jcol[order], keys[order])
+
+
+def _sparse_values(A, pattern, ncol, out, lower=False):
+    """
+    Gather the nonzero elements of the sparse matrix `A` into `out` in the
+    order of `pattern`, as returned by :func:`_sparse_pattern`. Elements of
+    the pattern absent from `A` are set to zero. Raise `ValueError` if `A`
+    has nonzero elements outside of the pattern.
+    """
+    (val, irow, jcol) = A.find()
+    irow = np.asarray(irow, dtype=np.intp)
+    jcol = np.asarray(jcol, dtype=np.intp)
+    if lower:
+        keep = irow >= jcol
+        val = val[keep] ; irow = irow[keep] ; jcol = jcol[keep]
+    keys = pattern[2]
+    akeys = irow * ncol + jcol
+    pos = np.searchsorted(keys, akeys)
+    if akeys.size > 0:
+        if keys.size == 0 or \
+                np.any(keys[np.minimum(pos, keys.size - 1)] != akeys):
+            raise ValueError, 'Matrix has elements outside of its structure.'
+    out[:] = 0.0
+    out[pos] = val
+    return out
 
 
 class KKTresidual:
@@ -84,6 +149,13 @@ class NLPModel:
     Indices of network constraints are found in member :attr:`net`
     (default: empty).
 
+    Evaluations may be cached by passing the keyword `cache` with the number
+    of entries to hold, or later with :meth:`enable_cache`. When the cache is
+    enabled, the counters :attr:`cache_hits` and :attr:`cache_misses` report
+    its effectiveness. Each evaluation method called counts as one hit if its
+    result was found in the cache and one miss otherwise, even if it returns
+    several quantities, such as :meth:`obj_grad`.
+
     If necessary, additional arguments may be passed in kwargs.
     """
 
@@ -136,64 +208,39 @@ class NLPModel:
             self.Ucon = self.Infinity * np.ones(self.m, 'd')
 
         # Default classification of constraints
-        self.lin = []                        # Linear    constraints
-        self.nln = range(self.m)             # Nonlinear constraints
-        self.net = []                        # Network   constraints
-        self.nlin = len(self.lin)            # Number of linear constraints
-        self.nnln = len(self.nln)            # Number of nonlinear constraints
-        self.nnet = len(self.net)            # Number of network constraints
-
-        # Maintain lists of indices for each type of constraints:
-        self.rangeC = []    # Range constraints:       cL <= c(x) <= cU
-        self.lowerC = []    # Lower bound constraints: cL <= c(x)
-        self.upperC = []    # Upper bound constraints:       c(x) <= cU
-        self.equalC = []    # Equality constraints:    cL  = c(x)  = cU
-        self.freeC  = []    # "Free" constraints:    -inf <= c(x) <= inf
-
-        for i in range(self.m):
-            if self.Lcon[i] > self.negInfinity and self.Ucon[i] < self.Infinity:
-                if self.Lcon[i] == self.Ucon[i]:
-                    self.equalC.append(i)
-                else:
-                    self.rangeC.append(i)
-            elif self.Lcon[i] > self.negInfinity:
-                self.lowerC.append(i)
-            elif self.Ucon[i] < self.Infinity:
-                self.upperC.append(i)
-            else:
-                self.freeC.append(i)
-
-        self.nlowerC = len(self.lowerC)   # Number of lower bound constraints
-        self.nrangeC = len(self.rangeC)   # Number of range constraints
-        self.nupperC = len(self.upperC)   # Number of upper bound constraints
-        self.nequalC = len(self.equalC)   # Number of equality constraints
-        self.nfreeC  = len(self.freeC )   # The rest: should be 0
+        self.lin = np.empty(0, dtype=np.intp)  # Linear    constraints
+        self.nln = np.arange(self.m)           # Nonlinear constraints
+        self.net = np.empty(0, dtype=np.intp)  # Network   constraints
+        self.nlin = self.lin.size              # Number of linear constraints
+        self.nnln = self.nln.size              # Number of nonlinear constraints
+        self.nnet = self.net.size              # Number of network constraints
+
+        # Maintain arrays of indices for each type of constraints:
+        # equalC: Equality constraints:    cL  = c(x)  = cU
+        # rangeC: Range constraints:       cL <= c(x) <= cU
+        # lowerC: Lower bound constraints: cL <= c(x)
+        # upperC: Upper bound constraints:       c(x) <= cU
+        # freeC:  "Free" constraints:    -inf <= c(x) <= inf
+        (self.equalC, self.rangeC, self.lowerC, self.upperC, self.freeC) = \
+            _classify_bounds(self.Lcon, self.Ucon,
+                             self.negInfinity, self.Infinity)
+
+        self.nlowerC = self.lowerC.size   # Number of lower bound constraints
+        self.nrangeC = self.rangeC.size   # Number of range constraints
+        self.nupperC = self.upperC.size   # Number of upper bound constraints
+        self.nequalC = self.equalC.size   # Number of equality constraints
+        self.nfreeC  = self.freeC.size    # The rest: should be 0
 
         # Proceed similarly with bound constraints
-        self.rangeB = []
-        self.lowerB = []
-        self.upperB = []
-        self.fixedB = []
-        self.freeB  = []
-
-        for i in range(self.n):
-            if self.Lvar[i] > self.negInfinity and self.Uvar[i] < self.Infinity:
-                if self.Lvar[i] == self.Uvar[i]:
-                    self.fixedB.append(i)
-                else:
-                    self.rangeB.append(i)
-            elif self.Lvar[i] > self.negInfinity:
-                self.lowerB.append(i)
-            elif self.Uvar[i] < self.Infinity:
-                self.upperB.append(i)
-            else:
-                self.freeB.append(i)
-
-        self.nlowerB = len(self.lowerB)
-        self.nrangeB = len(self.rangeB)
-        self.nupperB = len(self.upperB)
-        self.nfixedB = len(self.fixedB)
-        self.nfreeB  = len(self.freeB )
+        (self.fixedB, self.rangeB, self.lowerB, self.upperB, self.freeB) = \
+            _classify_bounds(self.Lvar, self.Uvar,
+                             self.negInfinity, self.Infinity)
+
+        self.nlowerB = self.lowerB.size
+        self.nrangeB = self.rangeB.size
+        self.nupperB = self.upperB.size
+        self.nfixedB = self.fixedB.size
+        self.nfreeB  = self.freeB.size
         self.nbounds = self.n - self.nfreeB
 
         # Define default stopping tolerances
@@ -209,6 +256,17 @@ class NLPModel:
         self.ceval = 0    #                constraint functions
         self.Jeval = 0    #                           gradients
         self.Jprod = 0    #                matrix-vector products with Jacobian
+        self.cache_hits = 0     # evaluations found in cache
+        self.cache_misses = 0   # evaluations not found in cache
+
+        # Evaluation cache (disabled by default)
+        self.cache = None
+        if kwargs.get('cache', 0) > 0:
+            self.enable_cache(kwargs['cache'])
+
+        # Sparsity patterns of Jacobian and Hessian, computed on demand
+        self._jac_pattern = None
+        self._hess_pattern = None
 
     def ResetCounters(self):
         self.feval = 0
@@ -218,8 +276,57 @@ class NLPModel:
         self.ceval = 0
         self.Jeval = 0
         self.Jprod = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
         return None
 
+    def enable_cache(self, size=8):
+        """
+        Memoize evaluations of the objective, constraints and their
+        derivatives at the `size` most recently used points.
+        """
+        self.cache = EvaluationCache(size)
+        return
+
+    def disable_cache(self):
+        "Discard the evaluation cache and stop caching."
+        self.cache = None
+        return
+
+    def _cache_lookup(self, kind, x, *args):
+        """
+        Look up evaluation `kind` at `x` in the cache. Return a pair
+        `(key, value)` where `value` is `None` on a miss. When caching is
+        disabled, `key` is also `None`.
+        """
+        ((key,), (value,)) = self._cache_lookup_many(x, (kind,) + args)
+        return (key, value)
+
+    def _cache_lookup_many(self, x, *lookups):
+        """
+        Look up evaluations at `x` that are computed together, e.g., the
+        objective and its gradient. Each lookup is a tuple `(kind, args...)`
+        as in :meth:`_cache_lookup`. Return a pair `(keys, values)` of tuples.
+        Unless all evaluations are found, all values are `None`, since they
+        are all computed again. This counts as a single hit or miss.
+        """
+        nlookups = len(lookups)
+        if self.cache is None: return ((None,) * nlookups, (None,) * nlookups)
+        keys = tuple([self.cache.key(l[0], x, *l[1:]) for l in lookups])
+        values = tuple([self.cache.get(key) for key in keys])
+        for value in values:
+            if value is None:
+                self.cache_misses += 1
+                return (keys, (None,) * nlookups)
+        self.cache_hits += 1
+        return (keys, values)
+
+    def _cache_store(self, key, value):
+        "Store `value` under `key` if caching is enabled and return `value`."
+        if key is not None:
+            self.cache.put(key, value)
+        return value
+
     # Evaluate optimality residuals
     def OptimalityResiduals(self, x, z, **kwargs):
         raise NotImplementedError, 'This method must be subclassed.'
@@ -239,10 +346,20 @@ class NLPModel:
     def grad(self, x, **kwargs):
         raise NotImplementedError, 'This method must be subclassed.'
 
+    # Evaluate objective function and gradient at x
+    # Subclasses may override this method to evaluate both in a single pass
+    def obj_grad(self, x, **kwargs):
+        return (self.obj(x, **kwargs), self.grad(x, **kwargs))
+
     # Evaluate vector of constraints at x
     def cons(self, x, **kwargs):
         raise NotImplementedError, 'This method must be subclassed.'
 
+    # Evaluate vector of constraints and constraints Jacobian at x
+    # Subclasses may override this method to evaluate both in a single pass
+    def cons_jac(self, x, **kwargs):
+        return (self.cons(x, **kwargs), self.jac(x, **kwargs))
+
     # Evaluate i-th constraint at x
     def icons(self, i, x, **kwargs):
         raise NotImplementedError, 'This method must be subclassed.'
@@ -261,10 +378,94 @@ class NLPModel:
     def jac(self, x, **kwargs):
         raise NotImplementedError, 'This method must be subclassed.'
 
+    # Return sparsity pattern of constraints Jacobian as (irow, jcol)
+    # Subclasses may override this method to avoid assembling the Jacobian
+    def jac_structure(self, **kwargs):
+        """
+        Return the pair `(irow, jcol)` of integer arrays holding the row and
+        column indices of the nonzero elements of the Jacobian of the
+        constraints. By default, the structure is that of :meth:`jac` at
+        :attr:`x0`, computed once. Elements that vanish at :attr:`x0` are
+        not part of it, and :meth:`jac_values` fails if they become nonzero.
+        Subclasses should then override both methods.
+        """
+        if self._jac_pattern is None:
+            self._jac_pattern = _sparse_pattern(self.jac(self.x0), self.n)
+        return self._jac_pattern[:2]
+
+    # Evaluate nonzero elements of constraints Jacobian at x into out
+    # Subclasses may override this method to avoid assembling the Jacobian
+    def jac_values(self, x, out=None, **kwargs):
+        """
+        Evaluate the nonzero elements of the Jacobian of the constraints at
+        x, in the order given by :meth:`jac_structure`. If `out` is given, it
+        is filled in place. By default, the Jacobian is assembled by
+        :meth:`jac`.
+        """
+        (irow, jcol) = self.jac_structure()
+        if out is None: out = np.empty(irow.size)
+        return _sparse_values(self.jac(x, **kwargs), self._jac_pattern,
+                              self.n, out)
+
+    # Evaluate matrix-vector product between
+    # the constraints Jacobian at x and a vector
+    def jprod(self, x, v, **kwargs):
+        raise NotImplementedError, 'This method must be subclassed.'
+
+    # Evaluate matrix-vector product between
+    # the transpose of the constraints Jacobian at x and a vector
+    def jtprod(self, x, w, **kwargs):
+        raise NotImplementedError, 'This method must be subclassed.'
+
     # Evaluate Lagrangian Hessian at (x,z)
     def hess(self, x, z, **kwargs):
         raise NotImplementedError, 'This method must be subclassed.'
 
+    # Return sparsity pattern of lower triangle of Lagrangian Hessian
+    # Subclasses may override this method to avoid assembling the Hessian
+    def hess_structure(self, **kwargs):
+        """
+        Return the pair `(irow, jcol)` of integer arrays holding the row and
+        column indices of the nonzero elements of the lower triangle of the
+        Hessian of the Lagrangian. By default, the structure is that of
+        :meth:`hess` at :attr:`x0` with unit multipliers, computed once. As
+        for :meth:`jac_structure`, elements that vanish there are not part
+        of it, and subclasses should then override both this method and
+        :meth:`hess_values`.
+        """
+        if self._hess_pattern is None:
+            H = self.hess(self.x0, np.ones(self.m))
+            self._hess_pattern = _sparse_pattern(H, self.n, lower=True)
+        return self._hess_pattern[:2]
+
+    # Evaluate nonzero elements of Lagrangian Hessian at (x,z) into out
+    # Subclasses may override this method to avoid assembling the Hessian
+    def hess_values(self, x, z, out=None, **kwargs):
+        """
+        Evaluate the nonzero elements of the lower triangle of the Hessian of
+        the Lagrangian at (x,z), in the order given by :meth:`hess_structure`.
+        If `out` is given, it is filled in place. By default, the Hessian is
+        assembled by :meth:`hess`, to which keyword arguments are passed.
+        """
+        (irow, jcol) = self.hess_structure()
+        if out is None: out = np.empty(irow.size)
+        return _sparse_values(self.hess(x, z, **kwargs), self._hess_pattern,
+                              self.n, out, lower=True)
+
+    # Evaluate all first and second-order information at (x,z)
+    def lagrangian_all(self, x, z, **kwargs):
+        """
+        Evaluate the objective, its gradient, the constraints, their Jacobian
+        and the Hessian of the Lagrangian at (x,z). Return the tuple
+        `(f, g, c, J, H)`. If there are no constraints, `c` and `J` are
+        `None`. Keyword arguments are passed to :meth:`hess`.
+        """
+        (f, g) = self.obj_grad(x)
+        (c, J) = (None, None)
+        if self.m > 0: (c, J) = self.cons_jac(x)
+        H = self.hess(x, z, **kwargs)
+        return (f, g, c, J, H)
+
     # Evaluate matrix-vector product between
     # the Hessian of the Lagrangian and a vector
     def hprod(self, x, z, p, **kwargs):
@@ -34,9 +34,15 @@ class NoisyAmplModel(AmplModel):
         noise = _random_array(self.n)
         return g + self.noise_amplitude * noise
 
+    def obj_grad(self, x):
+        return (self.obj(x), self.grad(x))
+
     def hess(self, x, z, *args):
         raise NotImplementedError, 'Second derivatives are not available!'
 
+    def hess_values(self, x, z, out=None, **kwargs):
+        raise NotImplementedError, 'Second derivatives are not available!'
+
     def hprod(self, z, v):
         raise NotImplementedError, 'Second derivatives are not available!'
 
@@ -101,6 +107,25 @@ class NoisyAmplModel(AmplModel):
         J.addAt(self.noise_amplitude * noise, irow, jcol)
         return J
 
+    def cons_jac(self, x):
+        return (self.cons(x), self.jac(x))
+
+    def jac_values(self, x, out=None):
+        vals = AmplModel.jac_values(self, x, out=out)
+        noise = _random_array(self.nnzj)
+        vals += self.noise_amplitude * noise
+        return vals
+
+    def jprod(self, x, v, **kwargs):
+        Jv = AmplModel.jprod(self, x, v, **kwargs)
+        noise = _random_array(self.m)
+        return Jv + self.noise_amplitude * noise
+
+    def jtprod(self, x, w, **kwargs):
+        JTw = AmplModel.jtprod(self, x, w, **kwargs)
+        noise = _random_array(self.n)
+        return JTw + self.noise_amplitude * noise
+
     def jacPos(self, x):
         J = AmplModel.jacPos(self, x)
         noise = _random_array(J.nnz)
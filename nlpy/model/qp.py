@@ -0,0 +1,474 @@
+"""
+Linear and convex quadratic programs held in NumPy arrays, and a reader for
+problems in MPS and QPS format. Such models do not rely on AMPL, so that
+several of them may coexist in the same process and problems generated in
+memory may be solved without writing them to a file first.
+
+.. moduleauthor:: D. Orban <dominique.orban@gerad.ca>
+"""
+
+__docformat__ = 'restructuredtext'
+
+import numpy as np
+from array import array
+from nlpy.model.nlp import NLPModel
+from nlpy.model.slacks import SlackFormulation, SlackFramework
+from pysparse.sparse.pysparseMatrix import PysparseMatrix as sp
+from pysparse.sparse import spmatrix
+import os
+
+_Infinity = 1.0e+20    # Same value as NLPModel.Infinity
+
+
+def _coord(M, nrow, ncol):
+    """
+    Return the triple `(vals, irow, jcol)` of a matrix given in coordinate
+    format as float and integer arrays. `M` may be `None`, in which case the
+    matrix is empty.
+    """
+    if M is None:
+        return (np.empty(0), np.empty(0, dtype=np.intp),
+                np.empty(0, dtype=np.intp))
+    (vals, irow, jcol) = M
+    vals = np.asarray(vals, dtype=np.float)
+    irow = np.asarray(irow, dtype=np.intp)
+    jcol = np.asarray(jcol, dtype=np.intp)
+    if not (vals.size == irow.size == jcol.size):
+        raise ValueError, 'Inconsistent sizes in coordinate matrix.'
+    if vals.size > 0:
+        if irow.min() < 0 or irow.max() >= nrow or \
+                jcol.min() < 0 or jcol.max() >= ncol:
+            raise ValueError, 'Index out of range in coordinate matrix.'
+    return (vals, irow, jcol)
+
+
+class QPModel(NLPModel):
+    """
+    A quadratic program of the form
+
+        minimize    c0 + c'x + 1/2 x'Qx
+        subject to  Lcon <= Ax <= Ucon,  Lvar <= x <= Uvar,
+
+    whose data is held in NumPy arrays. A linear program is obtained with
+    Q = 0. Instantiate using
+
+    `qp = QPModel(c, A=(vals, irow, jcol), Lcon=..., Ucon=...)`
+
+    :parameters:
+
+        :c:     cost vector. Its length is the number of variables.
+
+    :keywords:
+
+        :c0:    constant term in the objective (default: 0).
+        :A:     constraint matrix in coordinate format, i.e., a tuple
+                `(vals, irow, jcol)` of arrays (default: no constraint).
+        :Q:     lower triangle of the Hessian of the objective in
+                coordinate format (default: Q = 0). Elements of the upper
+                triangle are moved to the lower triangle.
+        :m:     number of constraints (default: the length of `Lcon` or
+                `Ucon` if given, or the number of rows of `A`).
+        :name:  model name (default: 'QP').
+
+    Coordinate matrices must not hold duplicate elements. Other keywords,
+    such as `x0`, `Lvar`, `Uvar`, `Lcon` and `Ucon`, are passed to
+    :class:`NLPModel`. Use :func:`read_mps` to read the data of a problem
+    from a file in MPS or QPS format.
+
+    Products with A and Q are computed from the coordinate arrays without
+    assembling a sparse matrix. Sparse matrices are only built by
+    :meth:`jac`, :meth:`A` and :meth:`hess`.
+    """
+
+    def __init__(self, c, **kwargs):
+
+        c = np.array(c, dtype=np.float)
+        n = c.size
+        A = kwargs.pop('A', None)
+        Q = kwargs.pop('Q', None)
+        m = kwargs.pop('m', None)
+        if m is None:
+            if 'Lcon' in kwargs:
+                m = len(kwargs['Lcon'])
+            elif 'Ucon' in kwargs:
+                m = len(kwargs['Ucon'])
+            elif A is not None and len(A[1]) > 0:
+                m = int(np.max(A[1])) + 1
+            else:
+                m = 0
+        name = kwargs.pop('name', 'QP')
+        c0 = kwargs.pop('c0', 0.0)
+
+        NLPModel.__init__(self, n=n, m=m, name=name, **kwargs)
+
+        # The dimensions of the data are saved since n and m are updated by
+        # subclasses such as SlackQPModel.
+        self._ncol = n ; self._nrow = m
+
+        self.c = c
+        self.c0 = float(c0)
+        (self._aval, self._airow, self._ajcol) = _coord(A, m, n)
+        (qval, qirow, qjcol) = _coord(Q, n, n)
+        self._qval = qval
+        self._qirow = np.maximum(qirow, qjcol)
+        self._qjcol = np.minimum(qirow, qjcol)
+        self._qoff = np.flatnonzero(self._qirow != self._qjcol)
+
+        self.nnzj = self._aval.size
+        self.nnzh = self._qval.size
+
+        # All constraints are linear.
+        self.lin = np.arange(m)
+        self.nln = np.empty(0, dtype=np.intp)
+        self.nlin = m ; self.nnln = 0
+        return
+
+    def close(self):
+        "Provided for compatibility with :class:`AmplModel`."
+        return
+
+    def islp(self):
+        "Return `True` if the problem is a linear program."
+        return self.nnzh == 0
+
+    def _Qprod(self, v):
+        "Return the product of Q with `v`."
+        qi = self._qirow ; qj = self._qjcol ; off = self._qoff
+        Qv = np.bincount(qi, weights=self._qval * v[qj],
+                         minlength=self._ncol)
+        Qv += np.bincount(qj[off], weights=self._qval[off] * v[qi[off]],
+                          minlength=self._ncol)
+        return Qv
+
+    def obj(self, x, **kwargs):
+        "Evaluate the objective function at `x`."
+        self.feval += 1
+        return self.c0 + np.dot(self.c, x) + 0.5 * np.dot(x, self._Qprod(x))
+
+    def grad(self, x, **kwargs):
+        "Evaluate the gradient of the objective function at `x`."
+        self.geval += 1
+        return self.c + self._Qprod(x)
+
+    def obj_grad(self, x, **kwargs):
+        """
+        Evaluate the objective function and its gradient at `x` with a
+        single product with Q. Return a tuple `(f, g)`.
+        """
+        Qx = self._Qprod(x)
+        f = self.c0 + np.dot(self.c, x) + 0.5 * np.dot(x, Qx)
+        Qx += self.c
+        self.feval += 1
+        self.geval += 1
+        return (f, Qx)
+
+    def _Aprod(self, v):
+        "Return the product of A with `v`."
+        return np.bincount(self._airow, weights=self._aval * v[self._ajcol],
+                           minlength=self._nrow)
+
+    def _ATprod(self, w):
+        "Return the product of the transpose of A with `w`."
+        return np.bincount(self._ajcol, weights=self._aval * w[self._airow],
+                           minlength=self._ncol)
+
+    def cons(self, x, **kwargs):
+        "Evaluate the vector of constraints Ax."
+        self.ceval += self._nrow
+        return self._Aprod(x)
+
+    def jprod(self, x, v, **kwargs):
+        "Evaluate the matrix-vector product Av. The argument `x` is ignored."
+        self.Jprod += 1
+        return self._Aprod(v)
+
+    def jtprod(self, x, w, **kwargs):
+        "Evaluate the matrix-vector product A'w. The argument `x` is ignored."
+        self.Jprod += 1
+        return self._ATprod(w)
+
+    def jac_structure(self, **kwargs):
+        """
+        Return the pair `(irow, jcol)` of integer arrays holding the row and
+        column indices of the `nnzj` nonzero elements of A.
+        """
+        return (self._airow, self._ajcol)
+
+    def jac_values(self, x, out=None, **kwargs):
+        """
+        Return the nonzero elements of A in the order given by
+        :meth:`jac_structure`. If `out` is given, it is filled in place.
+        """
+        if out is None: out = np.empty(self.nnzj)
+        out[:] = self._aval
+        self.Jeval += 1
+        return out
+
+    def jac(self, x, **kwargs):
+        "Return the constraint matrix A as a sparse matrix."
+        J = sp(nrow=self._nrow, ncol=self._ncol, sizeHint=self.nnzj)
+        J.put(self._aval, self._airow, self._ajcol)
+        self.Jeval += 1
+        return J
+
+    def A(self, *args, **kwargs):
+        "Return the constraint matrix A as a sparse matrix."
+        return self.jac(self.x0)
+
+    def hess_structure(self, **kwargs):
+        """
+        Return the pair `(irow, jcol)` of integer arrays holding the row and
+        column indices of the `nnzh` nonzero elements of the lower triangle
+        of Q.
+        """
+        return (self._qirow, self._qjcol)
+
+    def hess_values(self, x, z, out=None, **kwargs):
+        """
+        Return the nonzero elements of the lower triangle of the Hessian of
+        the Lagrangian, i.e., `obj_weight` times Q, in the order given by
+        :meth:`hess_structure`. If `out` is given, it is filled in place.
+        """
+        obj_weight = kwargs.get('obj_weight', 1.0)
+        if out is None: out = np.empty(self.nnzh)
+        np.multiply(self._qval, obj_weight, out)
+        self.Heval += 1
+        return out
+
+    def hess(self, x, z, **kwargs):
+        """
+        Return the lower triangle of the Hessian of the Lagrangian as a
+        symmetric sparse matrix. Since constraints are linear, it is Q
+        multiplied by the keyword `obj_weight` (default: 1).
+        """
+        H = spmatrix.ll_mat_sym(self._ncol, self.nnzh)
+        H.put(self.hess_values(x, z, **kwargs), self._qirow, self._qjcol)
+        return H
+
+    def hprod(self, x, z, p, **kwargs):
+        """
+        Evaluate the product of the Hessian of the Lagrangian with `p`, i.e.,
+        `obj_weight` times Qp.
+        """
+        obj_weight = kwargs.get('obj_weight', 1.0)
+        self.Hprod += 1
+        Hp = self._Qprod(p)
+        if obj_weight != 1.0: Hp *= obj_weight
+        return Hp
+
+
+class SlackQPModel( SlackFormulation, QPModel ):
+    """
+    The slack formulation of a :class:`QPModel`. It is accepted by the
+    interior-point solvers in :mod:`nlpy.optimize.solvers.lp` and
+    :mod:`nlpy.optimize.solvers.cqp`. Instantiate using
+
+    `qp = SlackQPModel(c, **kwargs)`
+
+    where `c` and `kwargs` are as for :class:`QPModel`, e.g.,
+
+    `qp = SlackQPModel(**read_mps('afiro.mps'))`.
+
+    See :class:`SlackFormulation` for the layout of the transformed problem.
+    """
+
+    _base = QPModel
+
+    def __init__(self, c, **kwargs):
+        QPModel.__init__(self, c, **kwargs)
+        self._init_slacks()
+        return
+
+
+def is_mps(filename):
+    """
+    Return `True` if `filename` has extension `.mps` or `.qps`, possibly
+    followed by `.gz`.
+    """
+    (root, ext) = os.path.splitext(filename.lower())
+    if ext == '.gz': ext = os.path.splitext(root)[1]
+    return ext in ['.mps', '.qps']
+
+
+def slack_model(problem, **kwargs):
+    """
+    Return the slack formulation of `problem`, which may be a file in MPS or
+    QPS format (see :func:`is_mps`) or the name of an AMPL model. Keyword
+    arguments are passed to the constructor of the model.
+    """
+    if is_mps(problem):
+        data = read_mps(problem)
+        data.update(kwargs)
+        return SlackQPModel(**data)
+    return SlackFramework(problem, **kwargs)
+
+
+def _to_numpy(a, dtype):
+    "Convert an array from the `array` module to a NumPy array."
+    if len(a) == 0: return np.empty(0, dtype=dtype)
+    return np.frombuffer(a, dtype=dtype).copy()
+
+
+def read_mps(filename):
+    """
+    Read a linear or quadratic program in free or fixed MPS format, where
+    names may not contain blanks, and return a dictionary of keyword
+    arguments for :class:`QPModel`, e.g.,
+
+    `qp = QPModel(**read_mps('afiro.mps'))`.
+
+    Quadratic terms are read from a `QUADOBJ` section, which holds the lower
+    triangle of Q, or from a `QMATRIX` or `QSECTION` section, which holds
+    the whole matrix. The file may be compressed with gzip. Integrality
+    markers are ignored. Maximization problems are converted to minimization
+    problems by flipping the sign of the objective.
+
+    The file is read in a single pass. Matrix elements are accumulated into
+    compact typed arrays and converted to NumPy arrays at the end; only the
+    names of rows and columns are held in dictionaries.
+    """
+
+    if filename[-3:] == '.gz':
+        import gzip
+        fp = gzip.open(filename, 'rb')
+    else:
+        fp = open(filename, 'r')
+
+    name = os.path.basename(filename).split('.')[0]
+    minimize = True
+    rows = {}                 # Row name -> index (-1: objective, -2: free)
+    cols = {}                 # Column name -> index
+    rowtype = array('b')      # 0: E, 1: L, 2: G
+    rhs = array('d') ; rng = array('d')
+    cost = array('d') ; c0 = 0.0
+    aval = array('d') ; airow = array('i') ; ajcol = array('i')
+    qval = array('d') ; qirow = array('i') ; qjcol = array('i')
+    Lvar = Uvar = None
+    objrow = None
+    section = None
+    lineno = 0
+
+    try:
+        for line in fp:
+            lineno += 1
+            tok = line.split()
+            if not tok or line[0] == '*': continue
+
+            # Section headers start in the first column.
+            if not line[0].isspace():
+                section = tok[0].upper()
+                if section == 'NAME' and len(tok) > 1:
+                    name = tok[1]
+                elif section == 'OBJSENSE' and len(tok) > 1:
+                    minimize = tok[1].upper() not in ['MAX', 'MAXIMIZE']
+                elif section == 'BOUNDS':
+                    Lvar = np.zeros(len(cols))
+                    Uvar = _Infinity * np.ones(len(cols))
+                elif section == 'ENDATA':
+                    break
+                continue
+
+            if section == 'COLUMNS':
+                if len(tok) > 2 and tok[1].strip('\'"').upper() == 'MARKER':
+                    continue
+                j = cols.get(tok[0])
+                if j is None:
+                    j = len(cost) ; cols[tok[0]] = j ; cost.append(0.0)
+                for k in range(1, len(tok) - 1, 2):
+                    i = rows[tok[k]] ; v = float(tok[k+1])
+                    if i >= 0:
+                        aval.append(v) ; airow.append(i) ; ajcol.append(j)
+                    elif i == -1:
+                        cost[j] += v
+
+            elif section == 'ROWS':
+                t = tok[0].upper()
+                if t == 'N':
+                    if objrow is None:
+                        objrow = tok[1] ; rows[tok[1]] = -1
+                    else:
+                        rows[tok[1]] = -2
+                else:
+                    rows[tok[1]] = len(rowtype)
+                    rowtype.append(['E', 'L', 'G'].index(t))
+                    rhs.append(0.0) ; rng.append(np.nan)
+
+            elif section in ['RHS', 'RANGES']:
+                # The name of the right-hand side or range vector is optional.
+                for k in range(len(tok) % 2, len(tok) - 1, 2):
+                    i = rows[tok[k]] ; v = float(tok[k+1])
+                    if section == 'RANGES':
+                        if i >= 0: rng[i] = v
+                    elif i >= 0:
+                        rhs[i] = v
+                    elif i == -1:
+                        c0 = -v
+
+            elif section == 'BOUNDS':
+                t = tok[0].upper()
+                # The name of the bound vector is optional.
+                if t in ['FR', 'MI', 'PL', 'BV']:
+                    j = cols[tok[2] if len(tok) > 2 else tok[1]]
+                else:
+                    j = cols[tok[-2]] ; v = float(tok[-1])
+                if t == 'UP':
+                    if v < 0 and Lvar[j] == 0.0: Lvar[j] = -_Infinity
+                    Uvar[j] = v
+                elif t in ['LO', 'LI']:
+                    Lvar[j] = v
+                elif t in ['UI', 'SC']:
+                    Uvar[j] = v
+                elif t == 'FX':
+                    Lvar[j] = Uvar[j] = v
+                elif t == 'FR':
+                    Lvar[j] = -_Infinity ; Uvar[j] = _Infinity
+                elif t == 'MI':
+                    Lvar[j] = -_Infinity
+                elif t == 'PL':
+                    Uvar[j] = _Infinity
+                elif t == 'BV':
+                    Lvar[j] = 0.0 ; Uvar[j] = 1.0
+                else:
+                    raise ValueError, 'Unknown bound type %s' % t
+
+            elif section in ['QUADOBJ', 'QMATRIX', 'QSECTION']:
+                i = cols[tok[0]] ; j = cols[tok[1]] ; v = float(tok[2])
+                if section == 'QUADOBJ' or i >= j:
+                    qval.append(v)
+                    qirow.append(max(i, j)) ; qjcol.append(min(i, j))
+
+            elif section == 'OBJSENSE':
+                minimize = tok[0].upper() not in ['MAX', 'MAXIMIZE']
+
+    except (KeyError, ValueError, IndexError):
+        fp.close()
+        raise ValueError, '%s, line %d: invalid entry in section %s' % \
+            (filename, lineno, section)
+    fp.close()
+
+    n = len(cost)
+    if Lvar is None:
+        Lvar = np.zeros(n) ; Uvar = _Infinity * np.ones(n)
+
+    # Assemble constraint bounds from row types, right-hand sides and ranges.
+    rowtype = _to_numpy(rowtype, np.int8)
+    rhs = _to_numpy(rhs, np.float) ; rng = _to_numpy(rng, np.float)
+    E = rowtype == 0 ; L = rowtype == 1 ; G = rowtype == 2
+    Lcon = rhs.copy() ; Ucon = rhs.copy()
+    Lcon[L] = -_Infinity ; Ucon[G] = _Infinity
+    hasR = ~np.isnan(rng) ; rng[~hasR] = 0.0 ; R = np.abs(rng)
+    up = hasR & (G | (E & (rng > 0)))
+    lo = hasR & (L | (E & (rng < 0)))
+    Ucon[up] = rhs[up] + R[up]
+    Lcon[lo] = rhs[lo] - R[lo]
+
+    c = _to_numpy(cost, np.float)
+    Q = (_to_numpy(qval, np.float), _to_numpy(qirow, np.intc),
+         _to_numpy(qjcol, np.intc))
+    if not minimize:
+        c *= -1 ; c0 = -c0 ; Q[0][:] *= -1
+
+    return {'name': name, 'c': c, 'c0': c0, 'm': rowtype.size,
+            'A': (_to_numpy(aval, np.float), _to_numpy(airow, np.intc),
+                  _to_numpy(ajcol, np.intc)),
+            'Q': Q, 'Lvar': Lvar, 'Uvar': Uvar, 'Lcon': Lcon, 'Ucon': Ucon}
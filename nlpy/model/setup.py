@@ -31,6 +31,7 @@ def configuration(parent_package='',top_path=None):
         extra_link_args=[]
         )
 
+    config.add_data_dir('tests')
     config.make_config_py()
     return config
 
@@ -10,11 +10,10 @@ __docformat__ = 'restructuredtext'
 
 import numpy
 from nlpy.model import AmplModel
-from nlpy.tools import List
 from pysparse.sparse.pysparseMatrix import PysparseMatrix as sp
 from pysparse.sparse import spmatrix
 
-class SlackFramework( AmplModel ):
+class SlackFormulation:
     """
     General framework for converting a nonlinear optimization problem to a
     form using slack variables.
@@ -46,15 +45,23 @@ class SlackFramework( AmplModel ):
     This framework initializes the slack variables sL, sU, tL, and tU to
     zero by default.
 
-    Note that the slack framework does not update all members of AmplModel,
-    such as the index set of constraints with an upper bound, etc., but
-    rather performs the evaluations of the constraints for the updated
-    model implicitly.
+    Note that the slack framework does not update all members of the
+    original model, such as the index set of constraints with an upper bound,
+    etc., but rather performs the evaluations of the constraints for the
+    updated model implicitly.
+
+    This class is a mix-in. Concrete slack models derive from it and from
+    the class of the original model, which they store in :attr:`_base`, and
+    call :meth:`_init_slacks` once the original model is initialized. The
+    original model must implement :meth:`obj`, :meth:`obj_grad`,
+    :meth:`cons`, :meth:`jac_structure`, :meth:`jac_values`, :meth:`jprod`
+    and :meth:`jtprod`. See :class:`SlackFramework`.
     """
 
-    def __init__(self, model, **kwargs):
+    _base = None     # Class of the original model
 
-        AmplModel.__init__(self, model, **kwargs)
+    def _init_slacks(self):
+        "Set up the slack formulation of the original model."
 
         # Save number of variables and constraints prior to transformation
         self.original_n = self.n
@@ -86,6 +93,79 @@ class SlackFramework( AmplModel ):
         self.pi0 = numpy.zeros(self.m)
         self.pi0[:self.original_m] = self.original_pi0[:]
 
+        # Precompute index maps used to evaluate constraints and Jacobian
+        self._setup_indices()
+
+        return
+
+    def _setup_indices(self):
+        """
+        Precompute the gather/scatter indices used by :meth:`cons` and
+        :meth:`Bounds`, and the sparsity pattern of the Jacobian of the
+        transformed problem. The constant entries of the Jacobian, i.e., those
+        corresponding to slack variables and bounds, are computed once here.
+        Only the values coming from the Jacobian of the original constraints
+        need to be evaluated afterwards.
+        """
+        on = self.original_n ; om = self.original_m
+        equalC = self.equalC ; lowerC = self.lowerC
+        upperC = self.upperC ; rangeC = self.rangeC ; nrangeC = self.nrangeC
+        lowerB = self.lowerB ; nlowerB = self.nlowerB
+        upperB = self.upperB ; nupperB = self.nupperB
+        rangeB = self.rangeB ; nrangeB = self.nrangeB
+        mc = om + nrangeC              # Number of general constraints
+        nb = self.m - mc               # Number of bound constraints
+        nt = on + self.n_con_low + self.n_con_up  # Index of first t slack
+        self._nt = nt
+
+        # General constraints: c = sign * (c(x)[gather] - rhs) - x[slack].
+        self._cgather = numpy.concatenate((numpy.arange(om), rangeC))
+        self._csign = numpy.ones(mc)
+        self._csign[upperC] = -1.0
+        self._csign[om:] = -1.0
+        self._crhs = numpy.concatenate((self.Lcon, self.Ucon[rangeC]))
+        self._crhs[upperC] = self.Ucon[upperC]
+        self._crhs[equalC] = self.Lcon[equalC]
+        self._crhs[self.freeC] = 0.0   # Free constraints are not shifted
+
+        # Rows in which slack variables sL = [sLL | sLR], sU = [sUU | sUR]
+        # appear, in the order in which these variables are stored.
+        self._srows = numpy.concatenate((lowerC, rangeC, upperC,
+                                         om + numpy.arange(nrangeC)))
+
+        # Bounds: b = sign * (x[gather] - rhs) - t, with t = [tL | tU].
+        self._bgather = numpy.concatenate((lowerB, rangeB, upperB, rangeB))
+        self._bsign = numpy.concatenate((numpy.ones(nlowerB + nrangeB),
+                                         -numpy.ones(nupperB + nrangeB)))
+        self._brhs = numpy.concatenate((self.Lvar[lowerB], self.Lvar[rangeB],
+                                        self.Uvar[upperB], self.Uvar[rangeB]))
+
+        # Jacobian block of general constraints. Entry k of the Jacobian of
+        # the original constraints appears in row irow[k], and again in the
+        # row of the 'upper' side of irow[k] if it is a range constraint.
+        (irow, jcol) = self._base.jac_structure(self)
+        rpos = -numpy.ones(om, dtype=numpy.intp)
+        rpos[rangeC] = numpy.arange(nrangeC)
+        dup = numpy.flatnonzero(rpos[irow] >= 0)
+        self._jsrc = numpy.concatenate((numpy.arange(irow.size), dup))
+        self._jsign = numpy.concatenate((self._csign[irow],
+                                         -numpy.ones(dup.size)))
+        jrows = numpy.concatenate((irow, om + rpos[irow[dup]]))
+        jcols = numpy.concatenate((jcol, jcol[dup]))
+
+        # Constant blocks: slacks on general constraints, bounds and slacks
+        # on bounds.
+        nslacks = self._srows.size
+        brows = mc + numpy.arange(nb)
+        self._jconst = numpy.concatenate((-numpy.ones(nslacks), self._bsign,
+                                          -numpy.ones(nb)))
+        self._jrows = numpy.concatenate((jrows, self._srows, brows, brows))
+        self._jcols = numpy.concatenate((jcols, on + numpy.arange(nslacks),
+                                         self._bgather, nt + numpy.arange(nb)))
+
+        # Storage reused across evaluations.
+        self._ojvals = numpy.empty(irow.size)
+        self._A_values = None
         return
 
     def InitializeSlacks(self, val=0.0, **kwargs):
@@ -103,7 +183,20 @@ class SlackFramework( AmplModel ):
         specialized since the original objective function only depends on a
         subvector of `x`.
         """
-        return AmplModel.obj(self, x[:self.original_n])
+        return self._base.obj(self, x[:self.original_n])
+
+
+    def obj_grad(self, x):
+        """
+        Return the value and gradient of the objective function at `x` in a
+        single evaluation. The gradient has zero components corresponding to
+        slack variables.
+        """
+        on = self.original_n
+        (f, og) = self._base.obj_grad(self, x[:on])
+        g = numpy.zeros(self.n)
+        g[:on] = og
+        return (f, g)
 
 
     def cons(self, x):
@@ -125,149 +218,93 @@ class SlackFramework( AmplModel ):
         4. [ bR ]   linear constraints corresponding to 'upper' side of two-sided
                     bounds
         """
-        n = self.n ; on = self.original_n
-        m = self.m ; om = self.original_m
-        equalC = self.equalC
-        lowerC = self.lowerC ; nlowerC = self.nlowerC
-        upperC = self.upperC ; nupperC = self.nupperC
-        rangeC = self.rangeC ; nrangeC = self.nrangeC
+        on = self.original_n ; mc = self.original_m + self.nrangeC
 
-        mslow = on + self.n_con_low
-        msup  = mslow + self.n_con_up
-        s_low = x[on:mslow]    # len(s_low) = n_con_low
-        s_up  = x[mslow:msup]  # len(s_up)  = n_con_up
-
-        c = numpy.empty(m)
-        c[:om] = AmplModel.cons(self, x[:on])
-        c[om:om+nrangeC] = c[rangeC]
-
-        c[equalC] -= self.Lcon[equalC]
-        c[lowerC] -= self.Lcon[lowerC] ; c[lowerC] -= s_low[:nlowerC]
-
-        c[upperC] -= self.Ucon[upperC] ; c[upperC] *= -1
-        c[upperC] -= s_up[:nupperC]
-
-        c[rangeC] -= self.Lcon[rangeC] ; c[rangeC] -= s_low[nlowerC:]
-
-        c[om:om+nrangeC] -= self.Ucon[rangeC]
-        c[om:om+nrangeC] *= -1
-        c[om:om+nrangeC] -= s_up[nupperC:]
+        c = numpy.empty(self.m)
+        c[:mc] = self._base.cons(self, x[:on])[self._cgather]
+        c[:mc] -= self._crhs
+        c[:mc] *= self._csign
+        c[self._srows] -= x[on:self._nt]   # Slacks on general constraints
 
         # Add linear constraints corresponding to bounds on original problem
-        lowerB = self.lowerB ; nlowerB = self.nlowerB ; Lvar = self.Lvar
-        upperB = self.upperB ; nupperB = self.nupperB ; Uvar = self.Uvar
-        rangeB = self.rangeB ; nrangeB = self.nrangeB
-
-        nt = on + self.n_con_low + self.n_con_up
-        ntlow = nt + self.n_var_low
-        t_low = x[nt:ntlow]
-        t_up  = x[ntlow:]
-
-        b = c[om+nrangeC:]
-
-        b[:nlowerB] = x[lowerB] - Lvar[lowerB] - t_low[:nlowerB]
-        b[nlowerB:nlowerB+nrangeB] = x[rangeB] - Lvar[rangeB] - t_low[nlowerB:]
-        b[nlowerB+nrangeB:nlowerB+nrangeB+nupperB] = Uvar[upperB] - x[upperB] - t_up[:nupperB]
-        b[nlowerB+nrangeB+nupperB:] = Uvar[rangeB] - x[rangeB] - t_up[nupperB:]
-
+        c[mc:] = self.Bounds(x)
         return c
 
     def Bounds(self, x):
         """
         Evaluate the vector of equality constraints corresponding to bounds
-        on the variables in the original problem.
+        on the variables in the original problem. They appear in the order
+        described in :meth:`jac`.
         """
-        lowerB = self.lowerB ; nlowerB = self.nlowerB
-        upperB = self.upperB ; nupperB = self.nupperB
-        rangeB = self.rangeB ; nrangeB = self.nrangeB
-
-        n  = self.n ; on = self.original_n
-        mslow = on + nrangeC + self.n_con_low
-        msup  = mslow + self.n_con_up
-        nt = self.original_n + self.n_con_low + self.n_con_up
-        ntlow = nt + self.n_var_low
-
-        t_low  = x[msup:ntlow]
-        t_up   = x[ntlow:]
-
-        b = numpy.empty(n + nrangeB)
-        b[:n] = x[:]
-        b[n:] = x[rangeB]
-
-        b[lowerB] -= self.Lvar[lowerB] ; b[lowerB] -= t_low[:nlowerB]
-
-        b[upperB] -= self.Uvar[upperB] ; b[upperB] *= -1
-        b[upperB] -= t_up[:nupperB]
-
-        b[rangeB] -= self.Lvar[rangeB] ; b[rangeB] -= t_low[nlowerB:]
-        b[n:]     -= self.Uvar[rangeB] ; b[n:] *= -1
-        b[n:]     -= t_up[nupperB:]
-
+        b = x[self._bgather] - self._brhs
+        b *= self._bsign
+        b -= x[self._nt:]
         return b
 
-    def _jac(self, x, lp=False):
+    def jac_structure(self):
         """
-        Helper method to assemble the Jacobian matrix of the constraints of the
-        transformed problems. See the documentation of :meth:`jac` for more
-        information.
-
-        The positional argument `lp` should be set to `True` only if the problem
-        is known to be a linear program. In this case, the evaluation of the
-        constraint matrix is cheaper and the argument `x` is ignored.
+        Return the pair `(irow, jcol)` of integer arrays holding the row and
+        column indices of the nonzero elements of the Jacobian of the
+        transformed problem. See :meth:`jac` for the ordering of rows and
+        columns.
         """
-        n = self.original_n
-        m = self.original_m
-
-        # List() simply allows operations such as 1 + [2,3] -> [3,4]
-        lowerC = List(self.lowerC) ; nlowerC = self.nlowerC
-        upperC = List(self.upperC) ; nupperC = self.nupperC
-        rangeC = List(self.rangeC) ; nrangeC = self.nrangeC
-        lowerB = List(self.lowerB) ; nlowerB = self.nlowerB
-        upperB = List(self.upperB) ; nupperB = self.nupperB
-        rangeB = List(self.rangeB) ; nrangeB = self.nrangeB
-        nbnds  = nlowerB + nupperB + 2*nrangeB
-        nSlacks = nlowerC + nupperC + 2*nrangeC
-
-        # Initialize sparse Jacobian
-        nnzJ = 2 * self.nnzj + m + nrangeC + nbnds + nrangeB  # Overestimate
-        J = sp(nrow=self.m, ncol=self.n, sizeHint=nnzJ)
-
-        # Insert contribution of general constraints
-        if lp:
-            J[:m,:n] = AmplModel.A(self)
-        else:
-            J[:m,:n] = AmplModel.jac(self,x[:n])
-        J[upperC,:n] *= -1.0               # Flip sign of 'upper' gradients
-        J[m:m+nrangeC,:n] = J[rangeC,:n]  # Append 'upper' side of range const.
-        J[m:m+nrangeC,:n] *= -1.0        # Flip sign of 'upper' range gradients.
-
-        # Create a few index lists
-        rlowerC = List(range(nlowerC)) ; rlowerB = List(range(nlowerB))
-        rupperC = List(range(nupperC)) ; rupperB = List(range(nupperB))
-        rrangeC = List(range(nrangeC)) ; rrangeB = List(range(nrangeB))
-
-        # Insert contribution of slacks on general constraints
-        J.put(-1.0,      lowerC, n + rlowerC)
-        J.put(-1.0,      upperC, n + nlowerC + rupperC)
-        J.put(-1.0,      rangeC, n + nlowerC + nupperC + rrangeC)
-        J.put(-1.0, m + rrangeC, n + nlowerC + nupperC + nrangeC + rrangeC)
-
-        # Insert contribution of bound constraints on the original problem
-        bot  = m+nrangeC ; J.put( 1.0, bot + rlowerB, lowerB)
-        bot += nlowerB   ; J.put( 1.0, bot + rrangeB, rangeB)
-        bot += nrangeB   ; J.put(-1.0, bot + rupperB, upperB)
-        bot += nupperB   ; J.put(-1.0, bot + rrangeB, rangeB)
-
-        # Insert contribution of slacks on the bound constraints
-        bot  = m+nrangeC
-        J.put(-1.0, bot + rlowerB, n + nSlacks + rlowerB)
-        bot += nlowerB
-        J.put(-1.0, bot + rrangeB, n + nSlacks + nlowerB + rrangeB)
-        bot += nrangeB
-        J.put(-1.0, bot + rupperB, n + nSlacks + nlowerB + nrangeB + rupperB)
-        bot += nupperB
-        J.put(-1.0, bot + rrangeB, n+nSlacks+nlowerB+nrangeB+nupperB+rrangeB)
+        return (self._jrows, self._jcols)
 
+    def jac_values(self, x, out=None):
+        """
+        Evaluate the nonzero elements of the Jacobian of the transformed
+        problem at `x`, in the order given by :meth:`jac_structure`. If `out`
+        is given, it is filled in place. Only the values coming from the
+        Jacobian of the original constraints are evaluated; the others are
+        constant.
+        """
+        if out is None: out = numpy.empty(self._jrows.size)
+        nj = self._jsrc.size
+        ojvals = self._base.jac_values(self, x[:self.original_n],
+                                       out=self._ojvals)
+        numpy.take(ojvals, self._jsrc, out=out[:nj])
+        out[:nj] *= self._jsign
+        out[nj:] = self._jconst
+        return out
+
+    def jprod(self, x, v, **kwargs):
+        """
+        Evaluate the matrix-vector product between the Jacobian of the
+        transformed problem at `x` and the vector `v` without assembling the
+        Jacobian. See :meth:`jac` for the layout of the Jacobian.
+        """
+        on = self.original_n ; nt = self._nt
+        mc = self.original_m + self.nrangeC
+        Jv = numpy.empty(self.m)
+        Jv[:mc] = self._base.jprod(self, x[:on], v[:on])[self._cgather]
+        Jv[:mc] *= self._csign
+        Jv[self._srows] -= v[on:nt]
+        Jv[mc:] = self._bsign * v[self._bgather] - v[nt:]
+        return Jv
+
+    def jtprod(self, x, w, **kwargs):
+        """
+        Evaluate the matrix-vector product between the transpose of the
+        Jacobian of the transformed problem at `x` and the vector `w` without
+        assembling the Jacobian. See :meth:`jac` for the layout of the
+        Jacobian.
+        """
+        on = self.original_n ; om = self.original_m ; nt = self._nt
+        mc = om + self.nrangeC
+        wc = w[:mc] * self._csign
+        wc[self.rangeC] += wc[om:]        # Fold 'upper' side of ranges
+        wb = w[mc:] * self._bsign
+        JTw = numpy.empty(self.n)
+        JTw[:on] = self._base.jtprod(self, x[:on], wc[:om])
+        JTw[:on] += numpy.bincount(self._bgather, weights=wb, minlength=on)
+        JTw[on:nt] = -w[self._srows]
+        JTw[nt:] = -w[mc:]
+        return JTw
+
+    def _jac(self, values):
+        "Assemble a sparse Jacobian of the transformed problem from `values`."
+        J = sp(nrow=self.m, ncol=self.n, sizeHint=values.size)
+        J.put(values, self._jrows, self._jcols)
         return J
 
     def jac(self, x):
@@ -305,11 +342,40 @@ class SlackFramework( AmplModel ):
         and where the signs corresponding to 'upper' constraints and upper
         bounds are flipped in the (1,1) and (3,1) blocks.
         """
-        return self._jac(x, lp=False)
+        return self._jac(self.jac_values(x))
+
+    def cons_jac(self, x):
+        """
+        Evaluate the vector of general constraints and their Jacobian for the
+        modified problem. See :meth:`cons` and :meth:`jac`.
+        """
+        return (self.cons(x), self.jac(x))
+
 
     def A(self):
         """
         Return the constraint matrix if the problem is a linear program. See the
-        documentation of :meth:`jac` for more information.
+        documentation of :meth:`jac` for more information. The values of the
+        constraint matrix are evaluated once and reused on subsequent calls.
         """
-        return self._jac(0, lp=True)
+        if self._A_values is None:
+            self._A_values = self.jac_values(self.x0)
+        return self._jac(self._A_values)
+
+
+class SlackFramework( SlackFormulation, AmplModel ):
+    """
+    The slack formulation of an AMPL model. Instantiate using
+
+    `nlp = SlackFramework(model, **kwargs)`
+
+    where `model` and `kwargs` are as for :class:`AmplModel`. See
+    :class:`SlackFormulation` for the layout of the transformed problem.
+    """
+
+    _base = AmplModel
+
+    def __init__(self, model, **kwargs):
+        AmplModel.__init__(self, model, **kwargs)
+        self._init_slacks()
+        return
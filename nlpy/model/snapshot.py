@@ -0,0 +1,144 @@
+"""
+On-disk snapshots of the static data of AMPL models.
+
+A snapshot holds the dimensions, initial guesses, bounds, constraint types and
+the sparsity patterns of the Jacobian and Hessian of a model. It is stored in
+a directory of `.npy` files named after a hash of the contents of the `.nl`
+file, so that it is not used once the `.nl` file is modified, whatever its
+modification time, and may be shared by several processes and by copies of
+the same `.nl` file. The sparsity patterns are memory-mapped on loading.
+
+Hashing the `.nl` file is much cheaper than having the AMPL Solver Library
+parse it. When a snapshot is found, :class:`nlpy.model.amplpy.AmplModel`
+defers the parsing to the first evaluation, and never parses the file if
+the model is only inspected.
+
+.. moduleauthor:: D. Orban <dominique.orban@gerad.ca>
+"""
+
+__docformat__ = 'restructuredtext'
+
+import numpy as np
+import hashlib
+import os
+import shutil
+import tempfile
+
+# Vectors that are read into memory when loading a snapshot.
+_vectors = ['x0', 'pi0', 'Lvar', 'Uvar', 'Lcon', 'Ucon', 'lin', 'nln', 'net']
+
+# Sparsity patterns, memory-mapped when loading a snapshot.
+_patterns = ['jac_irow', 'jac_jcol', 'hess_irow', 'hess_jcol']
+
+# Scalars, stored together. This file is written last and marks a snapshot
+# as complete.
+_scalars = ['n', 'm', 'nnzj', 'nnzh', 'minimize']
+
+
+def nl_file(stub):
+    "Return the name of the `.nl` file corresponding to `stub`."
+    if stub[-3:] == '.nl': return stub
+    return stub + '.nl'
+
+
+def nl_key(stub, blocksize=1 << 20):
+    """
+    Return a key identifying the contents of the `.nl` file of `stub`. It is
+    the hexadecimal sha1 digest of the file, read in blocks of `blocksize`
+    bytes.
+    """
+    sha1 = hashlib.sha1()
+    fp = open(nl_file(stub), 'rb')
+    try:
+        block = fp.read(blocksize)
+        while block:
+            sha1.update(block)
+            block = fp.read(blocksize)
+    finally:
+        fp.close()
+    return sha1.hexdigest()
+
+
+def default_directory():
+    """
+    Return the directory in which snapshots are stored by default. It is
+    given by the environment variable `NLPY_SNAPSHOT_DIR` if set, and is
+    `~/.nlpy/snapshots` otherwise.
+    """
+    return os.environ.get('NLPY_SNAPSHOT_DIR',
+                          os.path.join(os.path.expanduser('~'),
+                                       '.nlpy', 'snapshots'))
+
+
+class ModelSnapshot:
+    """
+    The snapshot of the static data of the model with `.nl` file `stub.nl`.
+
+    :parameters:
+
+        :stub:  name of the model, with or without the `.nl` extension.
+
+    :keywords:
+
+        :directory:  directory in which snapshots are stored (default: the
+                     value returned by :func:`default_directory`).
+
+    Use :meth:`exists` to determine whether a snapshot is available, and
+    :meth:`load` and :meth:`save` to read and write it.
+    """
+
+    def __init__(self, stub, directory=None):
+        if directory is None: directory = default_directory()
+        self.directory = directory
+        self.key = nl_key(stub)
+        self.path = os.path.join(directory, self.key)
+
+    def _file(self, name, path=None):
+        if path is None: path = self.path
+        return os.path.join(path, name + '.npy')
+
+    def exists(self):
+        "Return `True` if a complete snapshot is available."
+        return os.path.isfile(self._file('scalars'))
+
+    def load(self):
+        """
+        Return a dictionary holding the data of the snapshot. Vectors are
+        read into memory and may be modified. Sparsity patterns are
+        memory-mapped read-only.
+        """
+        data = {}
+        scalars = np.load(self._file('scalars'))
+        for (k, name) in enumerate(_scalars):
+            data[name] = int(scalars[k])
+        data['minimize'] = bool(data['minimize'])
+        for name in _vectors:
+            data[name] = np.load(self._file(name))
+        for name in _patterns:
+            data[name] = np.load(self._file(name), mmap_mode='r')
+        return data
+
+    def save(self, data):
+        """
+        Write the snapshot described by the dictionary `data`, which must
+        hold all the entries returned by :meth:`load`. The snapshot is first
+        written to a temporary directory that is then renamed, so that
+        concurrent writers and readers never see an incomplete snapshot.
+        """
+        if not os.path.isdir(self.directory):
+            try:
+                os.makedirs(self.directory)
+            except OSError:
+                if not os.path.isdir(self.directory): raise
+        tmpdir = tempfile.mkdtemp(dir=self.directory)
+        try:
+            for name in _vectors + _patterns:
+                np.save(self._file(name, tmpdir), np.asarray(data[name]))
+            scalars = np.array([int(data[name]) for name in _scalars])
+            np.save(self._file('scalars', tmpdir), scalars)
+            os.rename(tmpdir, self.path)
+        except OSError:
+            # Another process completed the same snapshot first.
+            shutil.rmtree(tmpdir, ignore_errors=True)
+            if not self.exists(): raise
+        return
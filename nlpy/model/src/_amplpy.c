@@ -56,6 +56,7 @@ static PyObject *AmplPy_Get_nnzh(     PyObject *self, PyObject *args);
 static PyObject *AmplPy_Get_ConType(  PyObject *self, PyObject *args);
 static PyObject *AmplPy_Eval_obj(     PyObject *self, PyObject *args);
 static PyObject *AmplPy_Grad_obj(     PyObject *self, PyObject *args);
+static PyObject *AmplPy_Eval_obj_grad(PyObject *self, PyObject *args);
 static PyObject *AmplPy_Eval_cons(    PyObject *self, PyObject *args);
 static PyObject *AmplPy_Eval_ci(      PyObject *self, PyObject *args);
 static PyObject *AmplPy_Eval_gi(      PyObject *self, PyObject *args);
@@ -64,9 +65,19 @@ static PyObject *AmplPy_Eval_sgrad(   PyObject *self, PyObject *args);
 static PyObject *AmplPy_Eval_cost(    PyObject *self, PyObject *args);
 static PyObject *AmplPy_Eval_row(     PyObject *self, PyObject *args);
 static PyObject *AmplPy_Eval_J(       PyObject *self, PyObject *args);
+static PyObject *AmplPy_Eval_cons_J(  PyObject *self, PyObject *args);
+static PyObject *AmplPy_BuildJ(ASL_pfgh *asl, real *x, int coord,
+                               int store_zeros, PyObject *spJac);
 static PyObject *AmplPy_Eval_A(       PyObject *self, PyObject *args);
 static PyObject *AmplPy_Eval_H(       PyObject *self, PyObject *args);
+static PyObject *AmplPy_Jac_Structure(PyObject *self, PyObject *args);
+static PyObject *AmplPy_Jac_Values(   PyObject *self, PyObject *args);
+static PyObject *AmplPy_Hess_Structure(PyObject *self, PyObject *args);
+static PyObject *AmplPy_Hess_Values(  PyObject *self, PyObject *args);
+static int AmplPy_CheckValues(PyArrayObject *a_out, int nnz);
+static PyObject *AmplPy_Jac_Prod(     PyObject *self, PyObject *args);
 static PyObject *AmplPy_Prod_Hv(      PyObject *self, PyObject *args);
+static PyObject *AmplPy_Prod_HV(      PyObject *self, PyObject *args);
 static PyObject *AmplPy_Prod_Hiv(     PyObject *self, PyObject *args);
 static PyObject *AmplPy_Prod_gHiv(    PyObject *self, PyObject *args);
 static PyObject *AmplPy_Get_x0(       PyObject *self, PyObject *args);
@@ -77,16 +88,30 @@ static PyObject *AmplPy_Get_Lcon(     PyObject *self, PyObject *args);
 static PyObject *AmplPy_Get_Ucon(     PyObject *self, PyObject *args);
 static PyObject *AmplPy_IsLP(         PyObject *self, PyObject *args);
 
-static int Ampl_Init(void);
+static int Ampl_Init(ASL_pfgh *asl);
 
 /* Ampl driver specific declarations */
 
 #define CHR (char*)    /* To avoid some warning messages */
-static ASL_pfgh *asl;  /* Main ASL structure */
 
-static FILE *ampl_file  =  NULL;   /* Connection with Ampl nl file */
-static int   ampl_file_open = 0;   /* Number of open files counter */
-static int   ampl_written_sol = 0; /* Indicates whether solution was written */
+/*
+ * Each AmplModel instance owns its ASL structure. The structure is wrapped in
+ * a capsule that is passed as first argument to every module function. The
+ * ASL macros (n_var, n_con, objval, ...) all refer to a variable named `asl`,
+ * which each module function declares locally and fetches from the capsule.
+ */
+#define AMPLPY_CAPSULE_NAME "nlpy.model._amplpy.ASL"
+
+typedef struct AmplPyContext {
+    ASL_pfgh *asl;          /* Main ASL structure, NULL after shut down */
+    int       written_sol;  /* Indicates whether solution was written */
+    int       nnzh;         /* Hessian nonzeros, -1 before sphsetup() */
+} AmplPyContext;
+
+static void           AmplPy_FreeContext(PyObject *capsule);
+static AmplPyContext *AmplPy_GetContext(PyObject *capsule);
+static ASL_pfgh      *AmplPy_GetASL(PyObject *capsule);
+static int            AmplPy_Sphsetup(PyObject *capsule);
 
 /*
  * Keywords must appear in alphabetical order.
@@ -106,17 +131,73 @@ static Option_Info Oinfo = { CHR"amplpy", CHR"AmplPy", CHR"amplpy_options",
 
 /* ========================================================================== */
 
-static char AmplPy_Init_Doc[] = "Read in problem.";
+static void AmplPy_FreeContext(PyObject *capsule) {
 
-static PyObject *AmplPy_Init(PyObject *self, PyObject *args) {
+    /* Release the ASL structure when the capsule is garbage collected. */
+    AmplPyContext *ctx;
 
-    char  **argv;
-    char   *stub;    /* file name containing Ampl problem */
+    ctx = (AmplPyContext *)PyCapsule_GetPointer(capsule, AMPLPY_CAPSULE_NAME);
+    if (!ctx) return;
+    if (ctx->asl) ASL_free((ASL **)(&(ctx->asl)));
+    free(ctx);
+    return;
+}
+
+/* ========================================================================== */
+
+static AmplPyContext *AmplPy_GetContext(PyObject *capsule) {
+
+    AmplPyContext *ctx;
 
-    if (ampl_file_open) {
-        PyErr_SetString(PyExc_ValueError, "A file is already open.");
+    ctx = (AmplPyContext *)PyCapsule_GetPointer(capsule, AMPLPY_CAPSULE_NAME);
+    if (!ctx) return NULL;              /* PyCapsule has set the exception */
+    if (!ctx->asl) {
+        PyErr_SetString(PyExc_ValueError, "AMPL model has been shut down.");
         return NULL;
     }
+    return ctx;
+}
+
+/* ========================================================================== */
+
+static ASL_pfgh *AmplPy_GetASL(PyObject *capsule) {
+
+    /* Fetch the ASL structure of a model and make it the current one. */
+    AmplPyContext *ctx = AmplPy_GetContext(capsule);
+
+    if (!ctx) return NULL;
+    set_cur_ASL((ASL *)(ctx->asl));
+    return ctx->asl;
+}
+
+/* ========================================================================== */
+
+static int AmplPy_Sphsetup(PyObject *capsule) {
+
+    /* Set up the sparse Hessian of a model on the first call and return its
+     * number of nonzeros, or -1 if the model has been shut down. The
+     * symbolic setup is not repeated by subsequent evaluations. */
+    AmplPyContext *ctx = AmplPy_GetContext(capsule);
+    ASL_pfgh *asl;
+
+    if (!ctx) return -1;
+    asl = ctx->asl;
+    if (ctx->nnzh < 0) ctx->nnzh = (int)sphsetup(-1, 1, 1, 1);
+    return ctx->nnzh;
+}
+
+/* ========================================================================== */
+
+static char AmplPy_Init_Doc[] = "Read in problem. Return an ASL handle.";
+
+static PyObject *AmplPy_Init(PyObject *self, PyObject *args) {
+
+    char  **argv;
+    char   *stub;    /* file name containing Ampl problem */
+    FILE   *ampl_file;               /* Connection with Ampl nl file */
+    ASL_pfgh      *asl;              /* Main ASL structure of this model */
+    AmplPyContext *ctx;
+    PyObject      *capsule;
 
     /* Arguments are passed by Python -- need to parse them first */
     /* Suppose for now that only 'stub' was passed ... */
@@ -136,29 +217,48 @@ static PyObject *AmplPy_Init(PyObject *self, PyObject *args) {
     /* Initialize main ASL structure */
     asl  = (ASL_pfgh*)ASL_alloc(ASL_read_pfgh);
     if (!asl) return NULL;
-    if ((stub = getstub(&argv, &Oinfo)) == NULL) return NULL;
+
+    /* Wrap it so it is released along with its owner */
+    if (!(ctx = (AmplPyContext *)malloc(sizeof(AmplPyContext)))) {
+        ASL_free((ASL **)(&asl));
+        return PyErr_NoMemory();
+    }
+    ctx->asl = asl;
+    ctx->written_sol = 0;
+    ctx->nnzh = -1;
+    capsule = PyCapsule_New((void *)ctx, AMPLPY_CAPSULE_NAME,
+                            AmplPy_FreeContext);
+    if (!capsule) {
+        ASL_free((ASL **)(&asl));
+        free(ctx);
+        return NULL;
+    }
+
+    if ((stub = getstub(&argv, &Oinfo)) == NULL) {
+        Py_DECREF(capsule);
+        return NULL;
+    }
     ampl_file = jac0dim(stub, (fint)strlen(stub));
 
     /* Get command-line options */
     getopts(argv, &Oinfo);
 
     /* Allocate and initialize structures to hold problem data */
-    if (Ampl_Init()) return NULL;
+    if (Ampl_Init(asl)) {
+        Py_DECREF(capsule);
+        return NULL;
+    }
 
-    /* Read in ASL structure */
+    /* Read in ASL structure. This closes the nl file. */
     pfgh_read(ampl_file , 0);
 
-    /* Specify that a file is now open */
-    ampl_file_open = 1;
-
-    /* Return to caller */
-    Py_INCREF(Py_None);
-    return Py_None;
+    /* Return handle to caller */
+    return capsule;
 }
 
 /* ========================================================================== */
 
-static int Ampl_Init(void) {
+static int Ampl_Init(ASL_pfgh *asl) {
 
     /* Allocate room to store problem data */
     if (! (X0    = (real *)M1alloc(n_var*sizeof(real)))) return -1;
@@ -181,6 +281,9 @@ static char AmplPy_WriteSolution_Doc[] = "Output solution.";
 static PyObject *AmplPy_WriteSolution(PyObject *self, PyObject *args) {
 
     /* Output solution x and z passed as arguments */
+    PyObject      *py_asl;
+    AmplPyContext *ctx;
+    ASL_pfgh      *asl;
     PyArrayObject *a_x, *a_z;
     char          *msg;
     npy_intp       dim[1];
@@ -188,10 +291,12 @@ static PyObject *AmplPy_WriteSolution(PyObject *self, PyObject *args) {
 
     /* We read the two arrays x and z, and a message */
 
-    if (!PyArg_ParseTuple(args, "O!O!s",
+    if (!PyArg_ParseTuple(args, "OO!O!s", &py_asl,
                &PyArray_Type, &a_x,
                &PyArray_Type, &a_z, &msg))
         return NULL;
+    if (!(ctx = AmplPy_GetContext(py_asl))) return NULL;
+    if (!(asl = AmplPy_GetASL(py_asl))) return NULL;
     if (a_x->descr->type_num != NPY_FLOAT64) return NULL;
     if (a_z->descr->type_num != NPY_FLOAT64) return NULL;
 
@@ -217,7 +322,7 @@ static PyObject *AmplPy_WriteSolution(PyObject *self, PyObject *args) {
     write_sol(CHR msg, x, z, &Oinfo);
 
     /* Indicate that a solution has been written */
-    ampl_written_sol = 1;
+    ctx->written_sol = 1;
 
     Py_INCREF(Py_None);
     return Py_None;
@@ -229,23 +334,22 @@ static char AmplPy_Terminate_Doc[] = "Shut down.";
 
 static PyObject *AmplPy_Terminate(PyObject *self, PyObject *args) {
 
-    /* Free Ampl data structures */
-    //if (X0) free(X0 );
-    //if (LUrhs) free(LUrhs);
-    //if (Uvx) free(Uvx);
-    //if (pi0) free(pi0);
-    //if (Urhsx) free(Urhsx);
-    //if (LUv) free(LUv);
-    ASL_free((ASL **)(&asl));
-  //free(asl);
+    PyObject      *py_asl;
+    AmplPyContext *ctx;
+
+    if (!PyArg_ParseTuple(args, "O", &py_asl)) return NULL;
+    if (!(ctx = AmplPy_GetContext(py_asl))) return NULL;
+
+    /* Free Ampl data structures. The capsule itself is released by
+     * AmplPy_FreeContext() once its owner goes away.
+     */
+    ASL_free((ASL **)(&(ctx->asl)));
+    ctx->asl = NULL;
 
     /* Output a dummy solution if none has been output */
-    //if (!ampl_written_sol)
+    //if (!ctx->written_sol)
     //    write_sol(CHR"Connection closed.", 0, 0, &Oinfo);
 
-    /* Restore open file counter */
-    ampl_file_open  = 0;
-
     /* Return to caller */
     Py_INCREF(Py_None);
     return Py_None;
@@ -258,6 +362,12 @@ static char AmplPy_Get_Obj_Type_Doc[] = "Determine whether problem is a\
 
 static PyObject *AmplPy_Get_Obj_Type(PyObject *self, PyObject *args) {
 
+    PyObject *py_asl;     /* ASL handle of the current model */
+    ASL_pfgh *asl;
+
+    if (!PyArg_ParseTuple(args, "O", &py_asl)) return NULL;
+    if (!(asl = AmplPy_GetASL(py_asl))) return NULL;
+
   /* objtype[0]=0 means that we have a minimization problem. */
   return Py_BuildValue("i", objtype[0]);
 }
@@ -268,6 +378,12 @@ static char AmplPy_Get_Dimension_Doc[] = "Obtain n and m.";
 
 static PyObject *AmplPy_Get_Dimension(PyObject *self, PyObject *args) {
 
+    PyObject *py_asl;     /* ASL handle of the current model */
+    ASL_pfgh *asl;
+
+    if (!PyArg_ParseTuple(args, "O", &py_asl)) return NULL;
+    if (!(asl = AmplPy_GetASL(py_asl))) return NULL;
+
     /* Ampl stores #variables and #constraint in n_var and n_con respectively */
     return Py_BuildValue("ii", n_var, n_con);
 }
@@ -278,6 +394,12 @@ static char AmplPy_Get_nnzj_Doc[] = "Obtain nnzj.";
 
 static PyObject *AmplPy_Get_nnzj(PyObject *self, PyObject *args) {
 
+    PyObject *py_asl;     /* ASL handle of the current model */
+    ASL_pfgh *asl;
+
+    if (!PyArg_ParseTuple(args, "O", &py_asl)) return NULL;
+    if (!(asl = AmplPy_GetASL(py_asl))) return NULL;
+
     /* Ampl stores the #nonzeros in the Jacobian in nzc */
     return Py_BuildValue("i", nzc);
 
@@ -289,10 +411,15 @@ static char AmplPy_Get_nnzh_Doc[] = "Obtain nnzh.";
 
 static PyObject *AmplPy_Get_nnzh(PyObject *self, PyObject *args) {
 
-    int nnzh;
+    PyObject *py_asl;     /* ASL handle of the current model */
+    ASL_pfgh *asl;
+    int       nnzh;
+
+    if (!PyArg_ParseTuple(args, "O", &py_asl)) return NULL;
+    if (!(asl = AmplPy_GetASL(py_asl))) return NULL;
 
     /* sphsetup() returns the #nonzeros in the Hessian of the Lagrangian */
-    nnzh = (int)sphsetup(-1, 1, 1, 1);
+    if ((nnzh = AmplPy_Sphsetup(py_asl)) < 0) return NULL;
     return Py_BuildValue("i", nnzh);
 
 }
@@ -303,9 +430,14 @@ static char AmplPy_Get_ConType_Doc[] = "Obtain indices of each type of constrain
 
 static PyObject *AmplPy_Get_ConType(PyObject *self, PyObject *args) {
 
+    PyObject *py_asl;     /* ASL handle of the current model */
+    ASL_pfgh *asl;
     PyObject *lin, *nln, *net, *item;
     int  i;
 
+    if (!PyArg_ParseTuple(args, "O", &py_asl)) return NULL;
+    if (!(asl = AmplPy_GetASL(py_asl))) return NULL;
+
     /* Prepare lists to hold constraint indices */
     if (!(lin = PyList_New(0))) return NULL;
     if (!(nln = PyList_New(0))) return NULL;
@@ -350,8 +482,14 @@ static char AmplPy_IsLP_Doc[] = "Determines whether problem is an LP";
 
 static PyObject *AmplPy_IsLP(PyObject *self, PyObject *args) {
 
+    PyObject *py_asl;     /* ASL handle of the current model */
+    ASL_pfgh *asl;
+    int       islp = 1;
+
+    if (!PyArg_ParseTuple(args, "O", &py_asl)) return NULL;
+    if (!(asl = AmplPy_GetASL(py_asl))) return NULL;
+
     /* Return 1 if problem is an LP and 0 otherwise */
-    int islp = 1;
     if (nlo || nlc || nlnc) islp = 0;
     return Py_BuildValue("i", islp);
 }
@@ -362,13 +500,20 @@ static char AmplPy_Get_x0_Doc[] = "Obtain initial guess.";
 
 static PyObject *AmplPy_Get_x0(PyObject *self, PyObject *args) {
 
+    PyObject *py_asl;     /* ASL handle of the current model */
+    ASL_pfgh *asl;
+
     /* Fetch initial point, stored in X0 by Ampl */
 
     PyArrayObject *a_x0;  /* Initial point as a Numeric array */
     int i;
-    npy_intp dx0[1] = { n_var };
+    npy_intp dx0[1];
     real *px0;
 
+    if (!PyArg_ParseTuple(args, "O", &py_asl)) return NULL;
+    if (!(asl = AmplPy_GetASL(py_asl))) return NULL;
+    dx0[0] = n_var;
+
     a_x0 = (PyArrayObject *)PyArray_SimpleNew(1, dx0, NPY_FLOAT64);
     if (a_x0 == NULL) return NULL;
     px0  = (real *)a_x0->data;
@@ -384,13 +529,20 @@ static char AmplPy_Get_pi0_Doc[] = "Obtain initial multipliers.";
 
 static PyObject *AmplPy_Get_pi0(PyObject *self, PyObject *args) {
 
+    PyObject *py_asl;     /* ASL handle of the current model */
+    ASL_pfgh *asl;
+
     /* Fetch initial multipliers, stored in pi0 by Ampl */
 
     PyArrayObject *a_pi0;  /* Initial multipliers as a Numeric array */
     int i;
-    npy_intp dpi0[1] = { n_con };
+    npy_intp dpi0[1];
     real *ppi0;
 
+    if (!PyArg_ParseTuple(args, "O", &py_asl)) return NULL;
+    if (!(asl = AmplPy_GetASL(py_asl))) return NULL;
+    dpi0[0] = n_con;
+
     a_pi0 = (PyArrayObject *)PyArray_SimpleNew(1, dpi0, NPY_FLOAT64);
     if (a_pi0 == NULL) return NULL;
     ppi0  = (real *)a_pi0->data;
@@ -406,13 +558,20 @@ static char AmplPy_Get_Lvar_Doc[] = "Obtain lower bounds on x.";
 
 static PyObject *AmplPy_Get_Lvar(PyObject *self, PyObject *args) {
 
+    PyObject *py_asl;     /* ASL handle of the current model */
+    ASL_pfgh *asl;
+
     /* Fetch lower bounds on x, stored in LUv by Ampl */
 
     PyArrayObject *a_luv;  /* Lower bounds as a Numeric array */
     int i;
-    npy_intp dluv[1] = { n_var };
+    npy_intp dluv[1];
     real *pluv;
 
+    if (!PyArg_ParseTuple(args, "O", &py_asl)) return NULL;
+    if (!(asl = AmplPy_GetASL(py_asl))) return NULL;
+    dluv[0] = n_var;
+
     a_luv = (PyArrayObject *)PyArray_SimpleNew(1, dluv, NPY_FLOAT64);
     if (a_luv == NULL) return NULL;
     pluv  = (real *)a_luv->data;
@@ -428,13 +587,20 @@ static char AmplPy_Get_Uvar_Doc[] = "Obtain upper bounds on x.";
 
 static PyObject *AmplPy_Get_Uvar(PyObject *self, PyObject *args) {
 
+    PyObject *py_asl;     /* ASL handle of the current model */
+    ASL_pfgh *asl;
+
     /* Fetch upper bounds on x, stored in Uvx by Ampl */
 
     PyArrayObject *a_uvx;  /* Lower bounds as a Numeric array */
     int i;
-    npy_intp duvx[1] = { n_var };
+    npy_intp duvx[1];
     real *puvx;
 
+    if (!PyArg_ParseTuple(args, "O", &py_asl)) return NULL;
+    if (!(asl = AmplPy_GetASL(py_asl))) return NULL;
+    duvx[0] = n_var;
+
     a_uvx = (PyArrayObject *)PyArray_SimpleNew(1, duvx, NPY_FLOAT64);
     if (a_uvx == NULL) return NULL;
     puvx  = (real *)a_uvx->data;
@@ -450,13 +616,20 @@ static char AmplPy_Get_Lcon_Doc[] = "Obtain constraints lower bounds.";
 
 static PyObject *AmplPy_Get_Lcon(PyObject *self, PyObject *args) {
 
+    PyObject *py_asl;     /* ASL handle of the current model */
+    ASL_pfgh *asl;
+
     /* Fetch lower bounds on constraints, stored in LUrhs by Ampl */
 
     PyArrayObject *a_lurhs;  /* Lower bounds as a Numeric array */
     int i;
-    npy_intp dlurhs[1] = { n_con };
+    npy_intp dlurhs[1];
     real *plurhs;
 
+    if (!PyArg_ParseTuple(args, "O", &py_asl)) return NULL;
+    if (!(asl = AmplPy_GetASL(py_asl))) return NULL;
+    dlurhs[0] = n_con;
+
     a_lurhs = (PyArrayObject *)PyArray_SimpleNew(1, dlurhs, NPY_FLOAT64);
     if (a_lurhs == NULL) return NULL;
     plurhs  = (real *)a_lurhs->data;
@@ -472,13 +645,20 @@ static char AmplPy_Get_Ucon_Doc[] = "Obtain constraints upper bounds.";
 
 static PyObject *AmplPy_Get_Ucon(PyObject *self, PyObject *args) {
 
+    PyObject *py_asl;     /* ASL handle of the current model */
+    ASL_pfgh *asl;
+
     /* Fetch upper bounds on x, stored in Urhsx by Ampl */
 
     PyArrayObject *a_urhsx;  /* Lower bounds as a Numeric array */
     int i;
-    npy_intp durhsx[1] = { n_con };
+    npy_intp durhsx[1];
     real *purhsx;
 
+    if (!PyArg_ParseTuple(args, "O", &py_asl)) return NULL;
+    if (!(asl = AmplPy_GetASL(py_asl))) return NULL;
+    durhsx[0] = n_con;
+
     a_urhsx = (PyArrayObject *)PyArray_SimpleNew(1, durhsx, NPY_FLOAT64);
     if (a_urhsx == NULL) return NULL;
     purhsx  = (real *)a_urhsx->data;
@@ -494,6 +674,9 @@ static char AmplPy_Eval_obj_Doc[] = "Evaluate objective.";
 
 static PyObject *AmplPy_Eval_obj(PyObject *self, PyObject *args) {
 
+    PyObject *py_asl;     /* ASL handle of the current model */
+    ASL_pfgh *asl;
+
     /* Evaluate the objective function at the point x passed as argument.
      * The point x is given in the form of an array.
      * For now, only support single objective.
@@ -506,7 +689,8 @@ static PyObject *AmplPy_Eval_obj(PyObject *self, PyObject *args) {
 
     /* Read a single array */
 
-    if (!PyArg_ParseTuple(args, "O!", &PyArray_Type, &a_x)) return NULL;
+    if (!PyArg_ParseTuple(args, "OO!", &py_asl, &PyArray_Type, &a_x)) return NULL;
+    if (!(asl = AmplPy_GetASL(py_asl))) return NULL;
     if (a_x->descr->type_num != NPY_FLOAT64) return NULL;
 
     if (!a_x) return NULL;                       /* conversion error */
@@ -530,6 +714,9 @@ static char AmplPy_Grad_obj_Doc[] = "Evaluate objective gradient.";
 
 static PyObject *AmplPy_Grad_obj(PyObject *self, PyObject *args) {
 
+    PyObject *py_asl;     /* ASL handle of the current model */
+    ASL_pfgh *asl;
+
   /* Evaluate the objective function gradient at the point x passed as argument.
    * The point x is given in the form of an array.
    * For now, only support single objective.
@@ -538,13 +725,15 @@ static PyObject *AmplPy_Grad_obj(PyObject *self, PyObject *args) {
     PyArrayObject *a_x;   /* Current point as a Numeric Array */
     PyArrayObject *a_g;   /* Gradient of f as a Numeric Array */
     fint nerror = (fint)0;
-    npy_intp dg[1] = { n_var };
+    npy_intp dg[1];
     npy_intp dim[1];
     real *x;
 
     /* Read a single array */
 
-    if (!PyArg_ParseTuple(args, "O!", &PyArray_Type, &a_x)) return NULL;
+    if (!PyArg_ParseTuple(args, "OO!", &py_asl, &PyArray_Type, &a_x)) return NULL;
+    if (!(asl = AmplPy_GetASL(py_asl))) return NULL;
+    dg[0] = n_var;
     if (a_x->descr->type_num != NPY_FLOAT64) return NULL;
 
     if (!a_x) return NULL;                     /* conversion error */
@@ -567,10 +756,63 @@ static PyObject *AmplPy_Grad_obj(PyObject *self, PyObject *args) {
 
 /* ========================================================================== */
 
+static char AmplPy_Eval_obj_grad_Doc[] = "Evaluate objective and its gradient.";
+
+static PyObject *AmplPy_Eval_obj_grad(PyObject *self, PyObject *args) {
+
+    PyObject *py_asl;     /* ASL handle of the current model */
+    ASL_pfgh *asl;
+
+    /* Evaluate the objective function and its gradient at the point x passed
+     * as argument in a single call. The objective is evaluated first so that
+     * objgrd() reuses the expression values computed by objval() at x.
+     * Return the pair (f, g). For now, only support single objective.
+     */
+
+    PyArrayObject *a_x;   /* Current point as a Numeric Array */
+    PyArrayObject *a_g;   /* Gradient of f as a Numeric Array */
+    fint nerror = (fint)0;
+    npy_intp dg[1];
+    npy_intp dim[1];
+    real f, *x;
+
+    if (!PyArg_ParseTuple(args, "OO!", &py_asl, &PyArray_Type, &a_x)) return NULL;
+    if (!(asl = AmplPy_GetASL(py_asl))) return NULL;
+    dg[0] = n_var;
+    if (a_x->descr->type_num != NPY_FLOAT64) return NULL;
+
+    if (!a_x) return NULL;                     /* conversion error */
+    if (a_x->nd != 1) return NULL;       /* x must have 1 dimension */
+    if (a_x->dimensions[0] != n_var) return NULL;  /* and size n_var */
+
+    PyArray_XDECREF(a_x);
+
+    /* Get pointer to contiguous version of x. */
+    PY2C_1DARRAY(a_x, x, dim);
+
+    f = objval(0, x, &nerror);
+    if (nerror) return NULL;
+
+    a_g = (PyArrayObject *)PyArray_SimpleNew(1, dg, NPY_FLOAT64);
+    if (a_g == NULL) return NULL;
+    objgrd(0, x, (real *)a_g->data, &nerror);
+    if (nerror) {
+        Py_DECREF(a_g);
+        return NULL;
+    }
+
+    return Py_BuildValue("dN", f, PyArray_Return( a_g ));
+}
+
+/* ========================================================================== */
+
 static char AmplPy_Eval_cons_Doc[] = "Evaluate constraints.";
 
 static PyObject *AmplPy_Eval_cons(PyObject *self, PyObject *args) {
 
+    PyObject *py_asl;     /* ASL handle of the current model */
+    ASL_pfgh *asl;
+
     /* Evaluate the constraint functions at the point x passed as argument.
      * The point x is given in the form of an array.
      */
@@ -578,13 +820,15 @@ static PyObject *AmplPy_Eval_cons(PyObject *self, PyObject *args) {
     PyArrayObject *a_x;   /* Current point as a Numeric Array */
     PyArrayObject *a_c;   /* Constraint vector as a Numeric Array */
     fint nerror = (fint)0;
-    npy_intp dc[1] = { n_con };
+    npy_intp dc[1];
     npy_intp dim[1];
     real *x;
 
     /* Read a single array */
 
-    if (!PyArg_ParseTuple(args, "O!", &PyArray_Type, &a_x)) return NULL;
+    if (!PyArg_ParseTuple(args, "OO!", &py_asl, &PyArray_Type, &a_x)) return NULL;
+    if (!(asl = AmplPy_GetASL(py_asl))) return NULL;
+    dc[0] = n_con;
     if (a_x->descr->type_num != NPY_FLOAT64) return NULL;
 
     if (!a_x) return NULL;                     /* conversion error */
@@ -613,20 +857,14 @@ static PyObject *AmplPy_Eval_cons(PyObject *self, PyObject *args) {
 
 /* ========================================================================== */
 
-static char AmplPy_Eval_J_Doc[] = "Evaluate sparse constraints Jacobian.";
-
-static PyObject *AmplPy_Eval_J(PyObject *self, PyObject *args) {
+/* Load the constraint Jacobian at x into a new triple (J, irow, icol) if
+ * coord is nonzero, or into a linked-list matrix otherwise. If spJac is not
+ * NULL, it is filled in and None is returned. This helper is shared by
+ * eval_J and eval_cons_J.
+ */
 
-    /* Evaluate the constraint Jacobian at the point x passed as argument.
-     * The point x is given in the form of an array.
-     */
-
-    /* ----------------------------- */
-    PyArrayObject *a_x;                   /* Current point as a Numeric Array */
-    int    coord;     /* Determine whether coordinate or LL format is desired */
-    int    store_zeros;
-    npy_intp dim[1];
-    real *x;
+static PyObject *AmplPy_BuildJ(ASL_pfgh *asl, real *x, int coord,
+                               int store_zeros, PyObject *spJac) {
 
     /* Variables corresponding to coordinate format */
     PyArrayObject *a_J;             /* Constraint Jacobian as a Numeric Array */
@@ -635,10 +873,9 @@ static PyObject *AmplPy_Eval_J(PyObject *self, PyObject *args) {
     long          *pirow, *picol; /* Temporaries for tranfer of irow and icol */
 
     /* Variables corresponding to LL format */
-    PyObject *spJac=NULL;                             /* The sparse Jacobian. */
     real     *J;               /* Constraint Jacobian as returned by jacval() */
     int       irow, jcol;    /* Row and col indices of nonzero Jacobian elems */
-    int       dimJ[2] = {n_con,n_var}; /* Dimensions of sparse Jacobian: m,n. */
+    int       dimJ[2]; /* Dimensions of sparse Jacobian: m,n. */
 
     /* Misc */
     cgrad *cg;                                         /* Jacobian in the DAG */
@@ -646,23 +883,8 @@ static PyObject *AmplPy_Eval_J(PyObject *self, PyObject *args) {
     fint   nerror = (fint)0;                                  /* Error flag   */
     int    PassedJ = 1;         /* Indicates whether matrix was passed or not */
     int    i;                                                   /* Loop index */
-    /* ----------------------------- */
-
-    /* Read an array and an integer, and possibly a Jacobian matrix */
-
-    if (!PyArg_ParseTuple(args, "O!ii|O", &PyArray_Type, &a_x, &coord,
-                                          &store_zeros, &spJac))
-      return NULL;
-    if (a_x->descr->type_num != NPY_FLOAT64) return NULL;
-
-    if (!a_x) return NULL;                     /* conversion error */
-    if (a_x->nd != 1) return NULL;       /* x must have 1 dimension */
-    if (a_x->dimensions[0] != n_var) return NULL;  /* and size n_var */
-
-    PyArray_XDECREF(a_x);
 
-    /* Get pointer to contiguous version of x. */
-    PY2C_1DARRAY(a_x, x, dim);
+    dimJ[0] = n_con; dimJ[1] = n_var;
 
     /* See if sparse matrix was passed as argument */
     if (!spJac) PassedJ = 0;
@@ -732,10 +954,111 @@ static PyObject *AmplPy_Eval_J(PyObject *self, PyObject *args) {
 
 /* ========================================================================== */
 
+static char AmplPy_Eval_J_Doc[] = "Evaluate sparse constraints Jacobian.";
+
+static PyObject *AmplPy_Eval_J(PyObject *self, PyObject *args) {
+
+    PyObject *py_asl;     /* ASL handle of the current model */
+    ASL_pfgh *asl;
+
+    /* Evaluate the constraint Jacobian at the point x passed as argument.
+     * The point x is given in the form of an array.
+     */
+
+    PyArrayObject *a_x;                   /* Current point as a Numeric Array */
+    int    coord;     /* Determine whether coordinate or LL format is desired */
+    int    store_zeros;
+    npy_intp dim[1];
+    real *x;
+    PyObject *spJac=NULL;                             /* The sparse Jacobian. */
+
+    /* Read an array and an integer, and possibly a Jacobian matrix */
+
+    if (!PyArg_ParseTuple(args, "OO!ii|O", &py_asl, &PyArray_Type, &a_x, &coord,
+                                          &store_zeros, &spJac))
+      return NULL;
+    if (!(asl = AmplPy_GetASL(py_asl))) return NULL;
+    if (a_x->descr->type_num != NPY_FLOAT64) return NULL;
+
+    if (!a_x) return NULL;                     /* conversion error */
+    if (a_x->nd != 1) return NULL;       /* x must have 1 dimension */
+    if (a_x->dimensions[0] != n_var) return NULL;  /* and size n_var */
+
+    PyArray_XDECREF(a_x);
+
+    /* Get pointer to contiguous version of x. */
+    PY2C_1DARRAY(a_x, x, dim);
+
+    return AmplPy_BuildJ(asl, x, coord, store_zeros, spJac);
+}
+
+/* ========================================================================== */
+
+static char AmplPy_Eval_cons_J_Doc[] = "Evaluate constraints and their sparse Jacobian.";
+
+static PyObject *AmplPy_Eval_cons_J(PyObject *self, PyObject *args) {
+
+    PyObject *py_asl;     /* ASL handle of the current model */
+    ASL_pfgh *asl;
+
+    /* Evaluate the constraints and their Jacobian at the point x passed as
+     * argument in a single call. The constraints are evaluated first so that
+     * jacval() reuses the expression values computed by conval() at x.
+     * Return the pair (c, J), where J is as returned by eval_J.
+     */
+
+    PyArrayObject *a_x;                   /* Current point as a Numeric Array */
+    PyArrayObject *a_c;             /* Constraint vector as a Numeric Array */
+    PyObject *J;
+    int    coord;     /* Determine whether coordinate or LL format is desired */
+    int    store_zeros;
+    fint   nerror = (fint)0;
+    npy_intp dc[1];
+    npy_intp dim[1];
+    real *x;
+
+    if (!PyArg_ParseTuple(args, "OO!ii", &py_asl, &PyArray_Type, &a_x, &coord,
+                                        &store_zeros))
+      return NULL;
+    if (!(asl = AmplPy_GetASL(py_asl))) return NULL;
+    dc[0] = n_con;
+    if (a_x->descr->type_num != NPY_FLOAT64) return NULL;
+
+    if (!a_x) return NULL;                     /* conversion error */
+    if (a_x->nd != 1) return NULL;       /* x must have 1 dimension */
+    if (a_x->dimensions[0] != n_var) return NULL;  /* and size n_var */
+
+    PyArray_XDECREF(a_x);
+
+    /* Get pointer to contiguous version of x. */
+    PY2C_1DARRAY(a_x, x, dim);
+
+    a_c = (PyArrayObject *)PyArray_SimpleNew(1, dc, NPY_FLOAT64);
+    if (a_c == NULL) return NULL;
+    conval(x, (real *)a_c->data, &nerror);
+    if (nerror) {
+        Py_DECREF(a_c);
+        return NULL;
+    }
+
+    J = AmplPy_BuildJ(asl, x, coord, store_zeros, NULL);
+    if (J == NULL) {
+        Py_DECREF(a_c);
+        return NULL;
+    }
+
+    return Py_BuildValue("NN", PyArray_Return( a_c ), J);
+}
+
+/* ========================================================================== */
+
 static char AmplPy_Eval_ci_Doc[] = "Evaluate i-th constraint.";
 
 static PyObject *AmplPy_Eval_ci(PyObject *self, PyObject *args) {
 
+    PyObject *py_asl;     /* ASL handle of the current model */
+    ASL_pfgh *asl;
+
     /* Evaluate the i-th constraint value at the point x passed as argument.
      * The point x is given in the form of an array.
      */
@@ -749,8 +1072,9 @@ static PyObject *AmplPy_Eval_ci(PyObject *self, PyObject *args) {
 
     /* We read the constraint index and the vector x */
 
-    if (!PyArg_ParseTuple(args, "iO!", &i, &PyArray_Type, &a_x))
+    if (!PyArg_ParseTuple(args, "OiO!", &py_asl, &i, &PyArray_Type, &a_x))
     return NULL;
+    if (!(asl = AmplPy_GetASL(py_asl))) return NULL;
     if (a_x->descr->type_num != NPY_FLOAT64) return NULL;
 
     /* Check whether index i makes sense */
@@ -778,6 +1102,9 @@ static char AmplPy_Eval_gi_Doc[] = "Evaluate i-th constraint gradient.";
 
 static PyObject *AmplPy_Eval_gi(PyObject *self, PyObject *args) {
 
+    PyObject *py_asl;     /* ASL handle of the current model */
+    ASL_pfgh *asl;
+
     /* Evaluate the i-th constraint gradient at the point x passed as argument.
      * The point x is given in the form of an array.
      *
@@ -788,14 +1115,16 @@ static PyObject *AmplPy_Eval_gi(PyObject *self, PyObject *args) {
     int    i;                 /* Loop index */
     fint   nerror = (fint)0;  /* Error flag   */
     PyArrayObject *a_gi;      /* grad ci(x) as a Numeric Array */
-    npy_intp   dgi[1] = { n_var }; /* Dimension descriptor */
+    npy_intp   dgi[1]; /* Dimension descriptor */
     npy_intp   dim[1];
     real *x;
 
     /* We read the constraint index and the vector x */
 
-    if (!PyArg_ParseTuple(args, "iO!", &i, &PyArray_Type, &a_x))
+    if (!PyArg_ParseTuple(args, "OiO!", &py_asl, &i, &PyArray_Type, &a_x))
     return NULL;
+    if (!(asl = AmplPy_GetASL(py_asl))) return NULL;
+    dgi[0] = n_var;
     if (a_x->descr->type_num != NPY_FLOAT64) return NULL;
 
     /* Check whether index i makes sense */
@@ -826,6 +1155,9 @@ static char AmplPy_Eval_cost_Doc[] = "Evaluate sparse cost vector.";
 
 static PyObject *AmplPy_Eval_cost(PyObject *self, PyObject *args) {
 
+    PyObject *py_asl;     /* ASL handle of the current model */
+    ASL_pfgh *asl;
+
     /* Evaluate cost vector as a sparse vector.
      * To be used when problem is a linear program; this will be
      * faster than AmplPy_Eval_sgrad().
@@ -835,6 +1167,9 @@ static PyObject *AmplPy_Eval_cost(PyObject *self, PyObject *args) {
     PyObject *cost;
     PyObject *key, *val;
 
+    if (!PyArg_ParseTuple(args, "O", &py_asl)) return NULL;
+    if (!(asl = AmplPy_GetASL(py_asl))) return NULL;
+
     cost = PyDict_New();
     if (!cost) return NULL;
 
@@ -853,6 +1188,9 @@ static char AmplPy_Eval_sgrad_Doc[] = "Evaluate sparse objective gradient.";
 
 static PyObject *AmplPy_Eval_sgrad(PyObject *self, PyObject *args) {
 
+    PyObject *py_asl;     /* ASL handle of the current model */
+    ASL_pfgh *asl;
+
     /* Evaluate sparse objective gradient at the point x passed as argument.
      * The point x is given in the form of an array.
      * The sparse gradient is returned as a dictionary.
@@ -872,8 +1210,9 @@ static PyObject *AmplPy_Eval_sgrad(PyObject *self, PyObject *args) {
 
     /* We read the constraint index and the vector x */
 
-    if (!PyArg_ParseTuple(args, "O!", &PyArray_Type, &a_x))
+    if (!PyArg_ParseTuple(args, "OO!", &py_asl, &PyArray_Type, &a_x))
     return NULL;
+    if (!(asl = AmplPy_GetASL(py_asl))) return NULL;
     if (a_x->descr->type_num != NPY_FLOAT64) return NULL;
 
     if (!a_x) return NULL;                       /* conversion error */
@@ -916,6 +1255,9 @@ static char AmplPy_Eval_row_Doc[] = "Evaluate i-th row of Jacobian for LPs.";
 
 static PyObject *AmplPy_Eval_row(PyObject *self, PyObject *args) {
 
+    PyObject *py_asl;     /* ASL handle of the current model */
+    ASL_pfgh *asl;
+
     /* Evaluate the i-th constraint gradient as a sparse vector.
      * To be used when problem is a linear programming problem.
      * This will be faster than Eval_sgi().
@@ -927,8 +1269,9 @@ static PyObject *AmplPy_Eval_row(PyObject *self, PyObject *args) {
     int       i;
 
     /* Read constraint index */
-    if (!PyArg_ParseTuple(args, "i", &i))
+    if (!PyArg_ParseTuple(args, "Oi", &py_asl, &i))
     return NULL;
+    if (!(asl = AmplPy_GetASL(py_asl))) return NULL;
 
     /* Check whether index i makes sense */
     if (i < 0 || i >= n_con) return NULL;
@@ -951,14 +1294,19 @@ static char AmplPy_Eval_A_Doc[] = "Evaluate Jacobian for LPs.";
 
 static PyObject *AmplPy_Eval_A(PyObject *self, PyObject *args) {
 
+    PyObject *py_asl;     /* ASL handle of the current model */
+    ASL_pfgh *asl;
+
     long      irow, jcol;
     int       PassedJ = 1, store_zeros, nnzj, i;
     cgrad    *cg;
     PyObject *spJac = NULL;
-    int       dim[2] = {n_con, n_var};
+    int       dim[2];
 
-    if (!PyArg_ParseTuple(args, "i|O", &store_zeros, &spJac))
+    if (!PyArg_ParseTuple(args, "Oi|O", &py_asl, &store_zeros, &spJac))
         return NULL;
+    if (!(asl = AmplPy_GetASL(py_asl))) return NULL;
+    dim[0] = n_con; dim[1] = n_var;
 
     /* See if sparse matrix was passed as argument */
     if (!spJac) PassedJ = 0;
@@ -991,6 +1339,9 @@ static char AmplPy_Eval_sgi_Doc[] = "Evaluate i-th sparse constraint gradient.";
 
 static PyObject *AmplPy_Eval_sgi(PyObject *self, PyObject *args) {
 
+    PyObject *py_asl;     /* ASL handle of the current model */
+    ASL_pfgh *asl;
+
     /* Evaluate the i-th constraint sparse gradient at the point x passed as
      * argument.
      * The point x is given in the form of an array.
@@ -1012,8 +1363,9 @@ static PyObject *AmplPy_Eval_sgi(PyObject *self, PyObject *args) {
 
     /* We read the constraint index and the vector x */
 
-    if (!PyArg_ParseTuple(args, "iO!", &i, &PyArray_Type, &a_x))
+    if (!PyArg_ParseTuple(args, "OiO!", &py_asl, &i, &PyArray_Type, &a_x))
     return NULL;
+    if (!(asl = AmplPy_GetASL(py_asl))) return NULL;
     if (a_x->descr->type_num != NPY_FLOAT64) return NULL;
 
     /* Check whether index i makes sense */
@@ -1066,6 +1418,9 @@ static char AmplPy_Eval_H_Doc[] = "Evaluate sparse upper triangle of Lagrangian
 
 static PyObject *AmplPy_Eval_H(PyObject *self, PyObject *args) {
 
+    PyObject *py_asl;     /* ASL handle of the current model */
+    ASL_pfgh *asl;
+
     /* Evaluate the Hessian of the Lagrangian at the point (x,lambda) passed as
      * argument.
      * The points x and lambda are given in the form of arrays.
@@ -1095,7 +1450,7 @@ static PyObject *AmplPy_Eval_H(PyObject *self, PyObject *args) {
     PyObject *spHess = NULL;                 /* The sparse, symmetric Hessian */
     real     *H;          /* Hessian of the Lagrangian as returned by sphes() */
     //int       jrow, jcol;   /* Row and col indices of nonzero Hessian elems */
-    int       dimH[2] = {n_var, n_var};    /* Dimensions of the sparse Hessian*/
+    int       dimH[2];    /* Dimensions of the sparse Hessian*/
 
     /* Misc */
     real   OW[1];         /* Objective type: support single objective for now */
@@ -1107,11 +1462,13 @@ static PyObject *AmplPy_Eval_H(PyObject *self, PyObject *args) {
 
     /* Read two arrays and an integer */
 
-    if (!PyArg_ParseTuple(args, "O!O!idi|O",
-               &PyArray_Type, &a_x,
+    if (!PyArg_ParseTuple(args, "OO!O!idi|O",
+               &py_asl, &PyArray_Type, &a_x,
                &PyArray_Type, &a_lambda, &coord, &obj_weight,
                &store_zeros, &spHess))
     return NULL;
+    if (!(asl = AmplPy_GetASL(py_asl))) return NULL;
+    dimH[0] = n_var; dimH[1] = n_var;
     if (a_x->descr->type_num != NPY_FLOAT64) return NULL;
     if (a_lambda->descr->type_num != NPY_FLOAT64) return NULL;
 
@@ -1128,7 +1485,7 @@ static PyObject *AmplPy_Eval_H(PyObject *self, PyObject *args) {
     if (!spHess) PassedH = 0;
 
     /* Determine room for Hessian and multiplier sign. */
-    nnzh   = (int)sphsetup(-1, 1, 1, 1);
+    if ((nnzh = AmplPy_Sphsetup(py_asl)) < 0) return NULL;
     OW[0]  = objtype[0] ? -obj_weight : obj_weight;  /* Indicates max/min */
 
     if (coord) { /* Return Hessian in coordinate format */
@@ -1197,20 +1554,299 @@ static PyObject *AmplPy_Eval_H(PyObject *self, PyObject *args) {
 
 /* ========================================================================== */
 
+/* Check that a_out may receive nnz values in place. */
+
+static int AmplPy_CheckValues(PyArrayObject *a_out, int nnz) {
+
+    if (a_out->descr->type_num != NPY_FLOAT64 || a_out->nd != 1 ||
+        !PyArray_ISCONTIGUOUS(a_out) || !PyArray_ISWRITEABLE(a_out)) {
+        PyErr_SetString(PyExc_TypeError,
+                        "output must be a writeable contiguous float64 array");
+        return 0;
+    }
+    if (a_out->dimensions[0] != nnz) {
+        PyErr_SetString(PyExc_ValueError, "output has incorrect size");
+        return 0;
+    }
+    return 1;
+}
+
+/* ========================================================================== */
+
+static char AmplPy_Jac_Structure_Doc[] = "Obtain sparsity pattern of Jacobian.";
+
+static PyObject *AmplPy_Jac_Structure(PyObject *self, PyObject *args) {
+
+    PyObject *py_asl;     /* ASL handle of the current model */
+    ASL_pfgh *asl;
+
+    /* Return the pair (irow, jcol) of row and column indices of the nonzero
+     * elements of the constraint Jacobian, in the order in which jac_values
+     * returns them.
+     */
+
+    PyArrayObject *a_irow, *a_icol;
+    npy_intp       dJ[1];
+    long          *pirow, *picol;
+    cgrad         *cg;
+    int            i;
+
+    if (!PyArg_ParseTuple(args, "O", &py_asl)) return NULL;
+    if (!(asl = AmplPy_GetASL(py_asl))) return NULL;
+    dJ[0] = n_con ? nzc : 0;
+
+    a_irow = (PyArrayObject *)PyArray_SimpleNew(1, dJ, NPY_LONG);
+    if (a_irow == NULL) return NULL;
+    a_icol = (PyArrayObject *)PyArray_SimpleNew(1, dJ, NPY_LONG);
+    if (a_icol == NULL) {
+        Py_DECREF(a_irow);
+        return NULL;
+    }
+    pirow = (long *)a_irow->data;
+    picol = (long *)a_icol->data;
+
+    for (i=0; i<n_con; i++)
+        for (cg = Cgrad[i]; cg; cg = cg->next) {
+            pirow[ cg->goff ] = (long)i;
+            picol[ cg->goff ] = (long)(cg->varno);
+        }
+
+    return Py_BuildValue("NN", PyArray_Return(a_irow), PyArray_Return(a_icol));
+}
+
+/* ========================================================================== */
+
+static char AmplPy_Jac_Values_Doc[] = "Evaluate Jacobian values in place.";
+
+static PyObject *AmplPy_Jac_Values(PyObject *self, PyObject *args) {
+
+    PyObject *py_asl;     /* ASL handle of the current model */
+    ASL_pfgh *asl;
+
+    /* Evaluate the nonzero elements of the constraint Jacobian at x and
+     * store them into the preallocated array passed as argument. Values are
+     * ordered as the indices returned by jac_structure.
+     */
+
+    PyArrayObject *a_x, *a_out;
+    fint nerror = (fint)0;
+    npy_intp dim[1];
+    real *x;
+
+    if (!PyArg_ParseTuple(args, "OO!O!", &py_asl, &PyArray_Type, &a_x,
+                          &PyArray_Type, &a_out))
+        return NULL;
+    if (!(asl = AmplPy_GetASL(py_asl))) return NULL;
+    if (a_x->descr->type_num != NPY_FLOAT64) return NULL;
+    if (a_x->nd != 1) return NULL;       /* x must have 1 dimension */
+    if (a_x->dimensions[0] != n_var) return NULL;  /* and size n_var */
+    if (!AmplPy_CheckValues(a_out, n_con ? nzc : 0)) return NULL;
+
+    PyArray_XDECREF(a_x);
+
+    /* Get pointer to contiguous version of x. */
+    PY2C_1DARRAY(a_x, x, dim);
+
+    if (n_con) {
+        jacval(x, (real *)a_out->data, &nerror);
+        if (nerror) return NULL;
+    }
+
+    Py_INCREF(Py_None);
+    return Py_None;
+}
+
+/* ========================================================================== */
+
+static char AmplPy_Hess_Structure_Doc[] = "Obtain sparsity pattern of Lagrangian Hessian.";
+
+static PyObject *AmplPy_Hess_Structure(PyObject *self, PyObject *args) {
+
+    PyObject *py_asl;     /* ASL handle of the current model */
+    ASL_pfgh *asl;
+
+    /* Return the pair (irow, jcol) of row and column indices of the nonzero
+     * elements of the lower triangle of the Hessian of the Lagrangian, in the
+     * order in which hess_values returns them. Ampl stores the upper
+     * triangle by columns; indices are reversed as in eval_H.
+     */
+
+    PyArrayObject *a_irow, *a_icol;
+    npy_intp       dH[1];
+    long          *pirow, *picol;
+    int            i, j;
+
+    if (!PyArg_ParseTuple(args, "O", &py_asl)) return NULL;
+    if (!(asl = AmplPy_GetASL(py_asl))) return NULL;
+    if ((dH[0] = (npy_intp)AmplPy_Sphsetup(py_asl)) < 0) return NULL;
+
+    a_irow = (PyArrayObject *)PyArray_SimpleNew(1, dH, NPY_LONG);
+    if (a_irow == NULL) return NULL;
+    a_icol = (PyArrayObject *)PyArray_SimpleNew(1, dH, NPY_LONG);
+    if (a_icol == NULL) {
+        Py_DECREF(a_irow);
+        return NULL;
+    }
+    pirow = (long *)a_irow->data;
+    picol = (long *)a_icol->data;
+
+    for (i=0; i<n_var; i++)
+        for (j=sputinfo->hcolstarts[i]; j<sputinfo->hcolstarts[i+1]; j++) {
+            pirow[j] = (long)i;
+            picol[j] = (long)(sputinfo->hrownos[j]);
+        }
+
+    return Py_BuildValue("NN", PyArray_Return(a_irow), PyArray_Return(a_icol));
+}
+
+/* ========================================================================== */
+
+static char AmplPy_Hess_Values_Doc[] = "Evaluate Lagrangian Hessian values in place.";
+
+static PyObject *AmplPy_Hess_Values(PyObject *self, PyObject *args) {
+
+    PyObject *py_asl;     /* ASL handle of the current model */
+    ASL_pfgh *asl;
+
+    /* Evaluate the nonzero elements of the lower triangle of the Hessian of
+     * the Lagrangian with multipliers lambda and store them into the
+     * preallocated array passed as argument. Values are ordered as the
+     * indices returned by hess_structure. As with eval_H, the Hessian is
+     * evaluated at the last point at which f, c or J were evaluated.
+     */
+
+    PyArrayObject *a_lambda, *a_out;
+    real   OW[1];         /* Objective type: support single objective for now */
+    real   obj_weight;
+    int    nnzh;
+    npy_intp dim[1];
+    real *y;
+
+    if (!PyArg_ParseTuple(args, "OO!dO!", &py_asl, &PyArray_Type, &a_lambda,
+                          &obj_weight, &PyArray_Type, &a_out))
+        return NULL;
+    if (!(asl = AmplPy_GetASL(py_asl))) return NULL;
+    if (a_lambda->descr->type_num != NPY_FLOAT64) return NULL;
+    if (a_lambda->nd != 1) return NULL;   /* lambda must have 1 dimension */
+    if (a_lambda->dimensions[0] != n_con) return NULL;  /* and size n_con */
+
+    if ((nnzh = AmplPy_Sphsetup(py_asl)) < 0) return NULL;
+    if (!AmplPy_CheckValues(a_out, nnzh)) return NULL;
+
+    PyArray_XDECREF(a_lambda);
+
+    /* Get pointer to contiguous version of y. */
+    PY2C_1DARRAY(a_lambda, y, dim);
+
+    OW[0] = objtype[0] ? -obj_weight : obj_weight;  /* Indicates max/min */
+    sphes((real *)a_out->data, -1, OW, y);
+
+    Py_INCREF(Py_None);
+    return Py_None;
+}
+
+/* ========================================================================== */
+
+static char AmplPy_Jac_Prod_Doc[] = "Compute product of constraints Jacobian with a vector.";
+
+static PyObject *AmplPy_Jac_Prod(PyObject *self, PyObject *args) {
+
+    PyObject *py_asl;     /* ASL handle of the current model */
+    ASL_pfgh *asl;
+
+    /* Compute J(x)*v, or J(x)'*v if trans is nonzero, where J(x) is the
+     * Jacobian of the constraints at x. The Jacobian is never formed: the
+     * sparse gradient of each constraint is evaluated in turn into a buffer
+     * of size n_var and accumulated into the result.
+     */
+
+    PyArrayObject *a_x, *a_v;  /* Current point and vector as Numeric Arrays */
+    PyArrayObject *a_Jv;       /* Result as a Numeric Array */
+    int       trans;           /* Compute product with transpose */
+    int       congrd_mode_save;
+    fint      nerror = (fint)0;
+    npy_intp  dJv[1];
+    npy_intp  dim[1];
+    real     *x, *v, *Jv, *gi, prod;
+    cgrad    *cg;
+    int       i, j, nv;
+
+    if (!PyArg_ParseTuple(args, "OO!O!i", &py_asl, &PyArray_Type, &a_x,
+                          &PyArray_Type, &a_v, &trans))
+        return NULL;
+    if (!(asl = AmplPy_GetASL(py_asl))) return NULL;
+    nv = trans ? n_con : n_var;
+    dJv[0] = trans ? n_var : n_con;
+    if (a_x->descr->type_num != NPY_FLOAT64) return NULL;
+    if (a_v->descr->type_num != NPY_FLOAT64) return NULL;
+    if (a_x->nd != 1) return NULL;        /* x must have 1 dimension */
+    if (a_x->dimensions[0] != n_var) return NULL;  /* and size n_var */
+    if (a_v->nd != 1) return NULL;        /* v must have 1 dimension */
+    if (a_v->dimensions[0] != nv) return NULL;
+
+    PyArray_XDECREF(a_x);
+    PyArray_XDECREF(a_v);
+
+    /* Get pointers to contiguous versions of x and v. */
+    PY2C_1DARRAY(a_x, x, dim);
+    PY2C_1DARRAY(a_v, v, dim);
+
+    a_Jv = (PyArrayObject *)PyArray_SimpleNew(1, dJv, NPY_FLOAT64);
+    if (a_Jv == NULL) return NULL;
+    Jv = (real *)a_Jv->data;
+    for (j = 0; j < dJv[0]; j++) Jv[j] = 0.0;
+
+    gi = (real *)Malloc(n_var * sizeof(real));
+
+    /* Set sparse format for gradients */
+    congrd_mode_save = asl->i.congrd_mode;
+    asl->i.congrd_mode = 1;
+
+    for (i = 0; i < n_con; i++) {
+        congrd(i, x, gi, &nerror);
+        if (nerror) break;
+        if (trans) {
+            for (cg = Cgrad[i], j = 0; cg; cg = cg->next, j++)
+                Jv[cg->varno] += gi[j] * v[i];
+        } else {
+            for (cg = Cgrad[i], j = 0, prod = 0.0; cg; cg = cg->next, j++)
+                prod += gi[j] * v[cg->varno];
+            Jv[i] = prod;
+        }
+    }
+
+    // Restore gradient mode
+    asl->i.congrd_mode = congrd_mode_save;
+    free(gi);
+
+    if (nerror) {
+        Py_DECREF(a_Jv);
+        return NULL;
+    }
+
+    return Py_BuildValue("N", PyArray_Return( a_Jv ));
+}
+
+/* ========================================================================== */
+
 static char AmplPy_Prod_Hv_Doc[] = "Compute matrix-vector product Hv of Lagrangian Hessian times a vector.";
 
 static PyObject *AmplPy_Prod_Hv(PyObject *self, PyObject *args) {
 
+    PyObject *py_asl;     /* ASL handle of the current model */
+    ASL_pfgh *asl;
+
     PyArrayObject *a_v, *a_lambda, *a_Hv;
     real           OW[1], obj_weight;
     npy_intp       dim[1];
     real *y, *v, *hv;
 
     /* We read the vector v and the multipliers lambda */
-    if (!PyArg_ParseTuple(args, "O!O!d",
-                           &PyArray_Type, &a_lambda, &PyArray_Type, &a_v,
+    if (!PyArg_ParseTuple(args, "OO!O!d",
+                           &py_asl, &PyArray_Type, &a_lambda, &PyArray_Type, &a_v,
                            &obj_weight))
     return NULL;
+    if (!(asl = AmplPy_GetASL(py_asl))) return NULL;
     if (a_v->descr->type_num != NPY_FLOAT64) return NULL;
     if (a_lambda->descr->type_num != NPY_FLOAT64) return NULL;
 
@@ -1248,19 +1884,86 @@ static PyObject *AmplPy_Prod_Hv(PyObject *self, PyObject *args) {
 
 /* ========================================================================== */
 
+static char AmplPy_Prod_HV_Doc[] = "Compute the products of the Lagrangian Hessian with several vectors.";
+
+static PyObject *AmplPy_Prod_HV(PyObject *self, PyObject *args) {
+
+    PyObject *py_asl;     /* ASL handle of the current model */
+    ASL_pfgh *asl;
+
+    /* Compute H*v for each row v of the k x n_var array V and return the
+     * k x n_var array of products. The Hessian-vector product routines are
+     * initialized once for the multipliers lambda, and each product then
+     * costs a single reverse sweep.
+     */
+
+    PyObject      *py_V;
+    PyArrayObject *a_lambda, *a_V, *a_HV;
+    real           OW[1], obj_weight;
+    npy_intp       dim[1], dims[2];
+    real          *y, *v, *hv;
+    int            j, k;
+
+    if (!PyArg_ParseTuple(args, "OO!Od", &py_asl, &PyArray_Type, &a_lambda,
+                          &py_V, &obj_weight))
+        return NULL;
+    if (!(asl = AmplPy_GetASL(py_asl))) return NULL;
+    if (a_lambda->descr->type_num != NPY_FLOAT64) return NULL;
+    if (a_lambda->nd != 1) return NULL;   /* lambda must have 1 dimension */
+    if (a_lambda->dimensions[0] != n_con) return NULL;  /* and size n_con */
+
+    a_V = (PyArrayObject *)PyArray_ContiguousFromObject(py_V, NPY_FLOAT64,
+                                                        2, 2);
+    if (a_V == NULL) return NULL;
+    if (a_V->dimensions[1] != n_var) {
+        Py_DECREF(a_V);
+        PyErr_SetString(PyExc_ValueError, "Vectors must have size n_var");
+        return NULL;
+    }
+    k = (int)a_V->dimensions[0];
+
+    dims[0] = k;
+    dims[1] = n_var;
+    a_HV = (PyArrayObject *)PyArray_SimpleNew(2, dims, NPY_FLOAT64);
+    if (a_HV == NULL) {
+        Py_DECREF(a_V);
+        return NULL;
+    }
+
+    PyArray_XDECREF(a_lambda);
+    PY2C_1DARRAY(a_lambda, y, dim);
+
+    OW[0] = objtype[0] ? -obj_weight : obj_weight;  /* Indicates max/min */
+    hvpinit_ASL((ASL*)asl, ihd_limit, -1, OW, y);
+
+    v  = (real *)a_V->data;
+    hv = (real *)a_HV->data;
+    for (j = 0; j < k; j++)
+        hvcomp(hv + j * n_var, v + j * n_var, -1, OW, y);
+
+    Py_DECREF(a_V);
+    return Py_BuildValue("N", PyArray_Return(a_HV));
+}
+
+/* ========================================================================== */
+
 static char AmplPy_Prod_Hiv_Doc[] = "Compute the product Hi*v of with the i-th constraint Hessian.";
 
 static PyObject *AmplPy_Prod_Hiv( PyObject *self, PyObject *args ) {
 
+    PyObject *py_asl;     /* ASL handle of the current model */
+    ASL_pfgh *asl;
+
     PyArrayObject *a_v, *a_g, *a_Hiv;
     npy_intp       dim[1], dims[1];
     real          *y, *v, *hiv;
     int            i, j;
 
     /* We read the vectors g and v and the multipliers y. */
-    if( !PyArg_ParseTuple( args, "iO!",
-                           &i, &PyArray_Type, &a_v ) )
+    if( !PyArg_ParseTuple( args, "OiO!",
+                           &py_asl, &i, &PyArray_Type, &a_v ) )
     return NULL;
+    if (!(asl = AmplPy_GetASL(py_asl))) return NULL;
     if( a_v->descr->type_num != NPY_FLOAT64 ) return NULL;
 
     if( !a_v ) return NULL;                            /* conversion error */
@@ -1306,15 +2009,19 @@ static char AmplPy_Prod_gHiv_Doc[] = "Compute the vector of dot products (g,Hi*v
 
 static PyObject *AmplPy_Prod_gHiv( PyObject *self, PyObject *args ) {
 
+    PyObject *py_asl;     /* ASL handle of the current model */
+    ASL_pfgh *asl;
+
     PyArrayObject *a_v, *a_g, *a_gHiv;
     npy_intp       dim[1], dims[1];
     real          *y, *v, *g, *hv, *ghiv, prod;
     int            i, j;
 
     /* We read the vectors g and v and the multipliers y. */
-    if( !PyArg_ParseTuple( args, "O!O!",
-                           &PyArray_Type, &a_g, &PyArray_Type, &a_v ) )
+    if( !PyArg_ParseTuple( args, "OO!O!",
+                           &py_asl, &PyArray_Type, &a_g, &PyArray_Type, &a_v ) )
     return NULL;
+    if (!(asl = AmplPy_GetASL(py_asl))) return NULL;
     if( a_g->descr->type_num != NPY_FLOAT64 ) return NULL;
     if( a_v->descr->type_num != NPY_FLOAT64 ) return NULL;
 
@@ -1380,6 +2087,9 @@ static char AmplPy_Set_x_Doc[] = "Declare x as current primal value.";
 
 static PyObject *AmplPy_Set_x(PyObject *self, PyObject *args) {
 
+    PyObject *py_asl;     /* ASL handle of the current model */
+    ASL_pfgh *asl;
+
     /* Call xknown() with given x as argument, to prevent subsequent calls to
      * objval, objgrad, etc., to check whether their argument has changed since
      * the last call. Users must not forget to call Unset_x when they are
@@ -1393,7 +2103,8 @@ static PyObject *AmplPy_Set_x(PyObject *self, PyObject *args) {
 
     /* Read a single array */
 
-    if (!PyArg_ParseTuple(args, "O!", &PyArray_Type, &a_x)) return NULL;
+    if (!PyArg_ParseTuple(args, "OO!", &py_asl, &PyArray_Type, &a_x)) return NULL;
+    if (!(asl = AmplPy_GetASL(py_asl))) return NULL;
     if (a_x->descr->type_num != NPY_FLOAT64) return NULL;
 
     if (!a_x) return NULL;                       /* conversion error */
@@ -1418,6 +2129,12 @@ static char AmplPy_Unset_x_Doc[] = "Release current primal value.";
 
 static PyObject *AmplPy_Unset_x(PyObject *self, PyObject *args) {
 
+    PyObject *py_asl;     /* ASL handle of the current model */
+    ASL_pfgh *asl;
+
+    if (!PyArg_ParseTuple(args, "O", &py_asl)) return NULL;
+    if (!(asl = AmplPy_GetASL(py_asl))) return NULL;
+
     /* Call xunknown() to release current primal value and force subsequent calls
      * to objval, objgrad, etc., to check whether their argument has changed since
      * the last call.
@@ -1455,6 +2172,7 @@ static PyMethodDef AmplPyMethods[] = {
   {"get_Ucon",  AmplPy_Get_Ucon,      METH_VARARGS, AmplPy_Get_Ucon_Doc      },
   {"eval_obj",  AmplPy_Eval_obj,      METH_VARARGS, AmplPy_Eval_obj_Doc      },
   {"grad_obj",  AmplPy_Grad_obj,      METH_VARARGS, AmplPy_Grad_obj_Doc      },
+  {"eval_obj_grad", AmplPy_Eval_obj_grad, METH_VARARGS, AmplPy_Eval_obj_grad_Doc },
   {"eval_cons", AmplPy_Eval_cons,     METH_VARARGS, AmplPy_Eval_cons_Doc     },
   {"eval_ci",   AmplPy_Eval_ci,       METH_VARARGS, AmplPy_Eval_ci_Doc       },
   {"eval_gi",   AmplPy_Eval_gi,       METH_VARARGS, AmplPy_Eval_gi_Doc       },
@@ -1463,9 +2181,16 @@ static PyMethodDef AmplPyMethods[] = {
   {"eval_cost", AmplPy_Eval_cost,     METH_VARARGS, AmplPy_Eval_cost_Doc     },
   {"eval_row",  AmplPy_Eval_row,      METH_VARARGS, AmplPy_Eval_row_Doc      },
   {"eval_J",    AmplPy_Eval_J,        METH_VARARGS, AmplPy_Eval_J_Doc        },
+  {"eval_cons_J", AmplPy_Eval_cons_J, METH_VARARGS, AmplPy_Eval_cons_J_Doc   },
   {"eval_A",    AmplPy_Eval_A,        METH_VARARGS, AmplPy_Eval_A_Doc        },
   {"eval_H",    AmplPy_Eval_H,        METH_VARARGS, AmplPy_Eval_H_Doc        },
+  {"jac_structure",  AmplPy_Jac_Structure,  METH_VARARGS, AmplPy_Jac_Structure_Doc  },
+  {"jac_values",     AmplPy_Jac_Values,     METH_VARARGS, AmplPy_Jac_Values_Doc     },
+  {"hess_structure", AmplPy_Hess_Structure, METH_VARARGS, AmplPy_Hess_Structure_Doc },
+  {"hess_values",    AmplPy_Hess_Values,    METH_VARARGS, AmplPy_Hess_Values_Doc    },
+  {"J_prod",    AmplPy_Jac_Prod,      METH_VARARGS, AmplPy_Jac_Prod_Doc      },
   {"H_prod",    AmplPy_Prod_Hv,       METH_VARARGS, AmplPy_Prod_Hv_Doc       },
+  {"H_prod_many", AmplPy_Prod_HV,     METH_VARARGS, AmplPy_Prod_HV_Doc       },
   {"Hi_prod",   AmplPy_Prod_Hiv,      METH_VARARGS, AmplPy_Prod_Hiv_Doc      },
   {"gHi_prod",  AmplPy_Prod_gHiv,     METH_VARARGS, AmplPy_Prod_gHiv_Doc     },
   {"is_lp",     AmplPy_IsLP,          METH_VARARGS, AmplPy_IsLP_Doc          },
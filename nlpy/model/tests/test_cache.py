@@ -0,0 +1,100 @@
+"""
+Tests of the evaluation cache of :class:`NLPModel`.
+"""
+
+import numpy as np
+from numpy.testing import TestCase, assert_equal, run_module_suite
+from nlpy.model.nlp import NLPModel
+
+
+class Rosenbrock(NLPModel):
+    "The Rosenbrock function, evaluated through the evaluation cache."
+
+    def __init__(self, **kwargs):
+        NLPModel.__init__(self, n=2, m=0, name='Rosenbrock', **kwargs)
+
+    def _f(self, x):
+        return 100.0 * (x[1] - x[0]**2)**2 + (1.0 - x[0])**2
+
+    def _g(self, x):
+        return np.array([-400.0 * x[0] * (x[1] - x[0]**2) - 2.0 * (1.0 - x[0]),
+                         200.0 * (x[1] - x[0]**2)])
+
+    def obj(self, x):
+        (key, f) = self._cache_lookup('obj', x)
+        if f is not None: return f
+        self.feval += 1
+        return self._cache_store(key, self._f(x))
+
+    def grad(self, x):
+        (key, g) = self._cache_lookup('grad', x)
+        if g is not None: return g
+        self.geval += 1
+        return self._cache_store(key, self._g(x))
+
+    def obj_grad(self, x):
+        ((fkey, gkey), (f, g)) = self._cache_lookup_many(x, ('obj',),
+                                                         ('grad',))
+        if f is not None: return (f, g)
+        self.feval += 1
+        self.geval += 1
+        return (self._cache_store(fkey, self._f(x)),
+                self._cache_store(gkey, self._g(x)))
+
+
+class TestEvaluationCache(TestCase):
+
+    def setUp(self):
+        self.x = np.array([-1.2, 1.0])
+
+    def test_one_count_per_lookup(self):
+        nlp = Rosenbrock(cache=4)
+        nlp.obj(self.x)                      # Miss.
+        nlp.obj(self.x)                      # Hit.
+        nlp.grad(self.x)                     # Miss.
+        (f, g) = nlp.obj_grad(self.x)        # Hit: both are cached.
+        assert_equal(nlp.cache_hits, 2)
+        assert_equal(nlp.cache_misses, 2)
+        assert_equal(nlp.feval, 1)
+        assert_equal(nlp.geval, 1)
+        assert_equal(f, nlp._f(self.x))
+        assert_equal(g, nlp._g(self.x))
+
+    def test_partial_hit_is_one_miss(self):
+        nlp = Rosenbrock(cache=4)
+        nlp.obj(self.x)                      # Miss.
+        nlp.obj_grad(self.x)                 # Miss: the gradient is missing.
+        assert_equal(nlp.cache_hits, 0)
+        assert_equal(nlp.cache_misses, 2)
+        assert_equal(nlp.feval, 2)
+        assert_equal(nlp.geval, 1)
+        nlp.grad(self.x)                     # Hit: stored by obj_grad.
+        assert_equal(nlp.cache_hits, 1)
+        assert_equal(nlp.geval, 1)
+
+    def test_eviction(self):
+        nlp = Rosenbrock(cache=1)
+        nlp.obj(self.x)
+        nlp.obj(self.x + 1.0)                # Evicts the first point.
+        nlp.obj(self.x)
+        assert_equal(nlp.cache_hits, 0)
+        assert_equal(nlp.cache_misses, 3)
+        assert_equal(nlp.feval, 3)
+
+    def test_disabled_cache_counts_nothing(self):
+        nlp = Rosenbrock()
+        nlp.obj(self.x) ; nlp.obj(self.x) ; nlp.obj_grad(self.x)
+        assert_equal(nlp.cache_hits, 0)
+        assert_equal(nlp.cache_misses, 0)
+        assert_equal(nlp.feval, 3)
+
+    def test_reset(self):
+        nlp = Rosenbrock(cache=4)
+        nlp.obj(self.x) ; nlp.obj(self.x)
+        nlp.ResetCounters()
+        assert_equal(nlp.cache_hits, 0)
+        assert_equal(nlp.cache_misses, 0)
+
+
+if __name__ == '__main__':
+    run_module_suite()
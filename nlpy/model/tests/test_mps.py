@@ -0,0 +1,165 @@
+"""
+Tests of the reader of problems in MPS format.
+"""
+
+import numpy as np
+from numpy.testing import TestCase, assert_, assert_allclose, assert_equal, \
+                          run_module_suite
+from nlpy.model.qp import QPModel, read_mps
+import gzip
+import os
+import shutil
+import tempfile
+
+inf = 1.0e+20
+
+# One row of each type, with right-hand sides and ranges, one column with
+# each bound type and a maximization objective with a constant term. The
+# second objective row is a free row, which is ignored.
+mps = """\
+* Test problem for read_mps.
+NAME          TESTMPS
+OBJSENSE
+    MAX
+ROWS
+ N  COST
+ E  R1
+ L  R2
+ G  R3
+ E  R4
+ E  R5
+ L  R6
+ G  R7
+ N  FREE
+COLUMNS
+    X1        COST      1.0        R1        1.0
+    X1        R2        2.0
+    X2        COST      -2.0       R3        1.0
+    X2        R4        1.0        R5        1.0
+    X3        R6        1.0        R7        1.0
+    X3        FREE      5.0
+    X4        COST      3.0        R1        1.0
+    X5        R2        1.0
+    X6        R3        -1.0
+    X7        R2        1.0
+RHS
+    RHS       COST      -10.0      R1        4.0
+    RHS       R2        5.0        R3        1.0
+    RHS       R4        2.0        R5        3.0
+    RHS       R6        6.0        R7        7.0
+RANGES
+    RNG       R4        1.5        R5        -2.0
+    RNG       R6        3.0        R7        4.0
+BOUNDS
+ UP BND       X1        4.0
+ LO BND       X2        -1.0
+ UP BND       X2        8.0
+ FX BND       X3        2.5
+ FR BND       X4
+ MI BND       X5
+ UP BND       X5        6.0
+ BV BND       X6
+ UP BND       X7        -3.0
+ENDATA
+"""
+
+
+class TestReadMPS(TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def write(self, contents, name='test.mps'):
+        filename = os.path.join(self.tmpdir, name)
+        fp = gzip.open(filename, 'wb') if name[-3:] == '.gz' \
+             else open(filename, 'w')
+        fp.write(contents)
+        fp.close()
+        return filename
+
+    def check_error(self, contents, lineno, section):
+        filename = self.write(contents)
+        try:
+            read_mps(filename)
+        except ValueError, err:
+            msg = '%s, line %d: invalid entry in section %s' % \
+                (filename, lineno, section)
+            assert_equal(str(err), msg)
+        else:
+            raise AssertionError, 'read_mps did not raise ValueError'
+
+    def check_data(self, data):
+        assert_equal(data['name'], 'TESTMPS')
+        assert_equal(data['m'], 7)
+        # Maximization: the signs of c and c0 are flipped.
+        assert_allclose(data['c'], [-1.0, 2.0, 0.0, -3.0, 0.0, 0.0, 0.0])
+        assert_allclose(data['c0'], -10.0)
+
+        (vals, irow, jcol) = data['A']
+        A = np.zeros((7, 7)) ; A[irow, jcol] = vals
+        expected = np.zeros((7, 7))
+        expected[0, [0, 3]] = 1.0
+        expected[1, [0, 4, 6]] = [2.0, 1.0, 1.0]
+        expected[2, [1, 5]] = [1.0, -1.0]
+        expected[[3, 4], 1] = 1.0
+        expected[[5, 6], 2] = 1.0
+        assert_equal(A, expected)
+        assert_equal(data['Q'][0].size, 0)
+
+        assert_allclose(data['Lcon'], [4.0, -inf, 1.0, 2.0, 1.0, 3.0, 7.0])
+        assert_allclose(data['Ucon'], [4.0, 5.0, inf, 3.5, 3.0, 6.0, 11.0])
+        assert_allclose(data['Lvar'], [0.0, -1.0, 2.5, -inf, -inf, 0.0, -inf])
+        assert_allclose(data['Uvar'], [4.0, 8.0, 2.5, inf, 6.0, 1.0, -3.0])
+
+    def test_read(self):
+        data = read_mps(self.write(mps))
+        self.check_data(data)
+        qp = QPModel(**data)
+        assert_(qp.islp())
+        assert_equal(qp.equalC, [0])
+        assert_equal(qp.upperC, [1])
+        assert_equal(qp.lowerC, [2])
+        assert_equal(qp.rangeC, [3, 4, 5, 6])
+        assert_equal(qp.fixedB, [2])
+        assert_equal(qp.rangeB, [0, 1, 5])
+        assert_equal(qp.upperB, [4, 6])
+        assert_equal(qp.freeB, [3])
+        assert_equal(qp.lowerB.size, 0)
+
+    def test_gzip(self):
+        self.check_data(read_mps(self.write(mps, name='test.mps.gz')))
+
+    def test_objsense_on_header(self):
+        data = read_mps(self.write(mps.replace('OBJSENSE\n    MAX\n',
+                                               'OBJSENSE MIN\n')))
+        assert_allclose(data['c'], [1.0, -2.0, 0.0, 3.0, 0.0, 0.0, 0.0])
+        assert_allclose(data['c0'], 10.0)
+
+    def test_unknown_row_type(self):
+        self.check_error(mps.replace(' G  R7', ' K  R7'), 13, 'ROWS')
+
+    def test_unknown_row(self):
+        self.check_error(mps.replace('X6        R3', 'X6        R9'), 24,
+                         'COLUMNS')
+
+    def test_invalid_value(self):
+        self.check_error(mps.replace('R6        6.0', 'R6        six'), 30,
+                         'RHS')
+
+    def test_missing_value(self):
+        self.check_error(mps.replace('RNG       R6        3.0',
+                                     'RNG       R6'), 33, 'RANGES')
+
+    def test_unknown_bound_type(self):
+        self.check_error(mps.replace(' BV BND', ' XX BND'), 42, 'BOUNDS')
+
+    def test_unknown_column(self):
+        self.check_error(mps.replace('FR BND       X4', 'FR BND       X9'),
+                         39, 'BOUNDS')
+
+
+if __name__ == '__main__':
+    run_module_suite()
@@ -0,0 +1,52 @@
+"""
+Tests of the slack formulation of a model, on a :class:`SlackQPModel`.
+"""
+
+import numpy as np
+from numpy.testing import TestCase, assert_allclose, run_module_suite
+from nlpy.model.qp import SlackQPModel
+
+inf = 1.0e+20
+
+
+class TestSlackCons(TestCase):
+
+    def setUp(self):
+        # One constraint of each kind: equality, lower bound, upper bound,
+        # range and free.
+        A = np.array([[1.0,  1.0],
+                      [1.0, -1.0],
+                      [2.0,  1.0],
+                      [1.0,  2.0],
+                      [3.0,  0.0]])
+        (irow, jcol) = np.nonzero(A)
+        self.A = A
+        self.qp = SlackQPModel(np.ones(2), A=(A[irow, jcol], irow, jcol),
+                               Lcon=np.array([1.0, 0.0, -inf, -1.0, -inf]),
+                               Ucon=np.array([1.0, inf, 4.0, 2.0, inf]))
+
+    def test_cons(self):
+        qp = self.qp
+        assert_allclose([qp.n, qp.m], [6, 6])
+
+        # x = [x1, x2 | sLL, sLR | sUU, sUR]
+        x = np.array([0.5, -2.0, 0.1, 0.2, 0.3, 0.4])
+        Ax = np.dot(self.A, x[:2])
+        expected = np.array([Ax[0] - 1.0,
+                             Ax[1] - 0.0 - x[2],
+                             4.0 - Ax[2] - x[4],
+                             Ax[3] + 1.0 - x[3],
+                             Ax[4],                  # Free: not shifted.
+                             2.0 - Ax[3] - x[5]])
+        assert_allclose(qp.cons(x), expected)
+
+    def test_jac_consistent_with_cons(self):
+        # The constraints are linear: c(x) = c(0) + J x.
+        qp = self.qp
+        x = np.array([0.5, -2.0, 0.1, 0.2, 0.3, 0.4])
+        J = qp.jac(x)
+        assert_allclose(qp.cons(x), qp.cons(np.zeros(qp.n)) + J * x)
+
+
+if __name__ == '__main__':
+    run_module_suite()
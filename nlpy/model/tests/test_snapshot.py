@@ -0,0 +1,94 @@
+"""
+Tests of the on-disk snapshots of static model data.
+"""
+
+import numpy as np
+from numpy.testing import TestCase, assert_equal, run_module_suite
+from nlpy.model.snapshot import ModelSnapshot
+from nlpy.model import amplpy
+import os
+import shutil
+import tempfile
+
+
+class TestModelSnapshot(TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.stub = os.path.join(self.tmpdir, 'model')
+        self.write_nl('g3 1 1 0\n')
+        self.directory = os.path.join(self.tmpdir, 'snapshots')
+        self.data = {'n': 2, 'm': 1, 'minimize': True, 'nnzj': 2, 'nnzh': 1,
+                     'x0': np.array([1.0, 2.0]), 'pi0': np.zeros(1),
+                     'Lvar': np.zeros(2), 'Uvar': np.ones(2),
+                     'Lcon': np.array([-1.0]), 'Ucon': np.array([1.0]),
+                     'lin': np.array([0]), 'nln': np.empty(0, dtype=np.intp),
+                     'net': np.empty(0, dtype=np.intp),
+                     'jac_irow': np.array([0, 0]),
+                     'jac_jcol': np.array([0, 1]),
+                     'hess_irow': np.array([1]), 'hess_jcol': np.array([0])}
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def write_nl(self, contents, mtime=None):
+        fp = open(self.stub + '.nl', 'w')
+        fp.write(contents)
+        fp.close()
+        if mtime is not None: os.utime(self.stub + '.nl', (mtime, mtime))
+
+    def test_round_trip(self):
+        snap = ModelSnapshot(self.stub, directory=self.directory)
+        assert not snap.exists()
+        snap.save(self.data)
+        snap = ModelSnapshot(self.stub + '.nl', directory=self.directory)
+        assert snap.exists()
+        data = snap.load()
+        for (name, value) in self.data.items():
+            assert_equal(data[name], value)
+
+    def test_modified_nl_file(self):
+        self.write_nl('g3 1 1 0\n', mtime=1.0e+9)
+        ModelSnapshot(self.stub, directory=self.directory).save(self.data)
+        self.write_nl('g3 1 1 0 \n', mtime=1.0e+9)       # Same mtime.
+        assert not ModelSnapshot(self.stub, directory=self.directory).exists()
+        self.write_nl('g3 1 2 0\n', mtime=1.0e+9)        # Same size.
+        assert not ModelSnapshot(self.stub, directory=self.directory).exists()
+        # Only the contents matter.
+        self.write_nl('g3 1 1 0\n', mtime=1.0e+9 + 1)
+        assert ModelSnapshot(self.stub, directory=self.directory).exists()
+        shutil.copy(self.stub + '.nl', self.stub + '2.nl')
+        assert ModelSnapshot(self.stub + '2',
+                             directory=self.directory).exists()
+
+    def test_deferred_init(self):
+        # With a snapshot, the model is built without the ASL, which is only
+        # initialized on first use.
+        ModelSnapshot(self.stub, directory=self.directory).save(self.data)
+        calls = []
+
+        class FakeAmplPy:
+            def ampl_init(self, stub):
+                calls.append(stub)
+                return 'asl'
+            def ampl_shut(self, asl):
+                calls.append(asl)
+
+        saved = amplpy._amplpy
+        amplpy._amplpy = FakeAmplPy()
+        try:
+            model = amplpy.AmplModel(self.stub, snapshot=self.directory)
+            assert_equal((model.n, model.m, model.nnzj), (2, 1, 2))
+            assert_equal(model.x0, self.data['x0'])
+            assert_equal(model.jac_structure(), (self.data['jac_irow'],
+                                                 self.data['jac_jcol']))
+            assert_equal(calls, [])
+            assert_equal(model._asl, 'asl')
+            assert_equal(model._asl, 'asl')
+            model.close()
+            assert_equal(calls, [self.stub, 'asl'])
+        finally:
+            amplpy._amplpy = saved
+
+if __name__ == '__main__':
+    run_module_suite()
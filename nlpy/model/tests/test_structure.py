@@ -0,0 +1,85 @@
+"""
+Tests of the default fixed-pattern evaluations of :class:`NLPModel`, which
+are expressed in terms of :meth:`jac` and :meth:`hess`.
+"""
+
+import numpy as np
+from numpy.testing import TestCase, assert_allclose, assert_equal, \
+                          assert_raises, run_module_suite
+from pysparse.sparse import spmatrix
+from nlpy.model.nlp import NLPModel
+
+
+class Quadratic(NLPModel):
+    """
+    Minimize x1^2 x2 + x3 subject to x1 x2 = 1 and x2 + x3 >= 0. Only
+    :meth:`jac` and :meth:`hess` are implemented.
+    """
+
+    def __init__(self, **kwargs):
+        NLPModel.__init__(self, n=3, m=2, name='Quadratic',
+                          x0=np.array([1.0, 2.0, 3.0]), **kwargs)
+
+    def jac(self, x, **kwargs):
+        J = spmatrix.ll_mat(2, 3, 4)
+        J[0,0] = x[1] ; J[0,1] = x[0]
+        J[1,2] = 1.0 ; J[1,1] = 1.0
+        return J
+
+    def dense_hess(self, x, z):
+        return np.array([[2 * x[1],           2 * x[0] - z[0], 0.0],
+                         [2 * x[0] - z[0],    0.0,             0.0],
+                         [0.0,                0.0,             0.0]])
+
+    def hess(self, x, z, **kwargs):
+        H = spmatrix.ll_mat_sym(3, 3)
+        Hd = self.dense_hess(x, z)
+        for (i, j) in [(0, 0), (1, 0)]:
+            if Hd[i,j] != 0.0: H[i,j] = Hd[i,j]
+        return H
+
+
+class TestDefaultStructure(TestCase):
+
+    def setUp(self):
+        self.nlp = Quadratic()
+        self.x = np.array([-1.0, 0.5, 4.0])
+        self.z = np.array([2.0, -1.0])
+
+    def test_jac(self):
+        nlp = self.nlp
+        (irow, jcol) = nlp.jac_structure()
+        assert_equal(irow.size, 4)
+        vals = nlp.jac_values(self.x)
+        J = np.zeros((2, 3)) ; J[irow, jcol] = vals
+        expected = np.array([[self.x[1], self.x[0], 0.0],
+                             [0.0,       1.0,       1.0]])
+        assert_allclose(J, expected)
+
+    def test_hess(self):
+        nlp = self.nlp
+        (irow, jcol) = nlp.hess_structure()
+        assert_equal(irow.size, 2)
+        out = np.empty(irow.size)
+        vals = nlp.hess_values(self.x, self.z, out=out)
+        assert vals is out
+        H = np.zeros((3, 3)) ; H[irow, jcol] = vals
+        assert_allclose(H, np.tril(nlp.dense_hess(self.x, self.z)))
+
+    def test_vanishing_elements(self):
+        # (1,0) vanishes at x = (1, 1, 0) and z = (2, 0). Its value is zero.
+        nlp = self.nlp
+        (irow, jcol) = nlp.hess_structure()
+        vals = nlp.hess_values(np.array([1.0, 1.0, 0.0]),
+                               np.array([2.0, 0.0]))
+        assert_allclose(vals[(irow == 1) & (jcol == 0)], 0.0)
+
+    def test_outside_structure(self):
+        nlp = self.nlp
+        nlp.x0 = np.array([0.5, 1.0, 0.0])   # (1,0) vanishes at x0.
+        nlp._hess_pattern = None
+        assert_raises(ValueError, nlp.hess_values, self.x, self.z)
+
+
+if __name__ == '__main__':
+    run_module_suite()
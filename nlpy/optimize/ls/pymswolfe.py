@@ -43,6 +43,11 @@ class StrongWolfeLineSearch:
         :stpmin:  the initial lower bound of the bracket (1e-20)
         :stpmax:  the initial upper bound of the bracket (1e+20)
         :maxfev:  the maximum number of function evaluations permitted (20)
+        :objgrad: a function returning the pair (value, gradient) of the
+                  objective at a given point. When given, it is used instead
+                  of `obj` and `grad` so that both are obtained in a single
+                  evaluation. Since it receives the point, not the step,
+                  `nlp.obj_grad` may be passed directly.
 
     To ensure existence of a step satisfying the strong Wolfe
     conditions, d should be a descent direction for f at x and
@@ -65,6 +70,7 @@ class StrongWolfeLineSearch:
         
         self.obj  = obj   # To evaluate function value
         self.grad = grad  # To evaluate function gradient
+        self.objgrad = kwargs.get('objgrad', None)  # To evaluate both at once
         
         # Optional arguments
         self.ftol   = kwargs.get('ftol', 1.0e-4)
@@ -95,8 +101,11 @@ class StrongWolfeLineSearch:
         self.stp, info = self.context.mcsrch(self.f,self.x,self.g)
 
         while info == -1:
-            self.f = self.obj(self.x)
-            self.g = self.grad(self.x)
+            if self.objgrad is not None:
+                (self.f, self.g) = self.objgrad(self.x)
+            else:
+                self.f = self.obj(self.x)
+                self.g = self.grad(self.x)
             self.stp, info = self.context.mcsrch(self.f,self.x,self.g)
 
         if info == 1:     # Strong Wolfe conditions satisfied
@@ -38,6 +38,18 @@ class StrongWolfeLineSearch:
         :stp:     an initial step value (1.0)
         :stpmin:  the initial lower bound of the bracket
         :stpmax:  the initial upper bound of the bracket
+        :objgrad: a function returning the pair (value, gradient) of the
+                  objective at x + t d, given t. When given, it is used
+                  instead of `obj` and `grad` so that both are obtained in
+                  a single evaluation.
+
+    Like `obj` and `grad`, `objgrad` receives the step t, not a point, so that
+    :meth:`NLPModel.obj_grad` must be wrapped, e.g.,
+
+    SWLS = StrongWolfeLineSearch(f, g, d,
+                                 lambda t: nlp.obj(x + t*d),
+                                 lambda t: nlp.grad(x + t*d),
+                                 objgrad=lambda t: nlp.obj_grad(x + t*d))
 
     To ensure existence of a step satisfying the strong Wolfe
     conditions, d should be a descent direction for f at x and
@@ -61,6 +73,7 @@ class StrongWolfeLineSearch:
         
         self.obj  = obj   # To evaluate function value
         self.grad = grad  # To evaluate function gradient
+        self.objgrad = kwargs.get('objgrad', None)  # To evaluate both at once
         
         # Optional arguments
         self.ftol   = kwargs.get('ftol', 1.0e-4)
@@ -98,8 +111,11 @@ class StrongWolfeLineSearch:
 
         while task[:2] == 'FG':
             #print '  ls trying step = ', self.stp
-            self.f = self.obj(self.stp)
-            self.g = self.grad(self.stp)
+            if self.objgrad is not None:
+                (self.f, self.g) = self.objgrad(self.stp)
+            else:
+                self.f = self.obj(self.stp)
+                self.g = self.grad(self.stp)
             self.slope = numpy.dot(self.g, self.d)
             self.stp, task = self.context.csrch(self.f, self.slope)
 
@@ -127,7 +143,9 @@ if __name__ == '__main__':
                                   g,
                                   d,
                                   lambda t: nlp.obj(nlp.x0 + t * d),
-                                  lambda t: nlp.grad(nlp.x0 + t * d))
+                                  lambda t: nlp.grad(nlp.x0 + t * d),
+                                  objgrad=lambda t: nlp.obj_grad(nlp.x0 +
+                                                                 t * d))
     print ' Before search'
     print '   f = ', f
     print '   initial slope = ', SWLS.slope
@@ -9,7 +9,7 @@ def configuration(parent_package='',top_path=None):
     config.add_subpackage('ls')
     config.add_subpackage('tr')
     config.add_subpackage('solvers')
-    #config.add_data_dir('tests')
+    config.add_data_dir('tests')
 
     config.make_config_py()
     return config
@@ -0,0 +1,341 @@
+"""
+Solve collections of problems in parallel.
+
+Each problem is solved in its own worker process so that a per-problem
+wall-clock timeout and memory limit can be enforced, and so that a crash on
+one problem does not take the whole run down. Up to `nprocs` workers run
+simultaneously. The summary row of each problem is collected into a single
+table that may be written in CSV or JSON format.
+
+.. moduleauthor:: D. Orban <dominique.orban@gerad.ca>
+"""
+
+from nlpy.tools.timing import cputime
+import multiprocessing
+import time
+import os
+import sys
+
+__docformat__ = 'restructuredtext'
+
+# Columns of the summary table, in the order in which they are written.
+columns = ['name', 'iter', 'obj', 'pResid', 'dResid', 'gap',
+           'setup', 'solve', 'status']
+
+
+def problem_name(probname):
+    "Strip directory and extension from a problem name."
+    name = os.path.basename(probname)
+    if name[-3:] == '.gz': name = name[:-3]
+    for ext in ['.nl', '.mps', '.qps']:
+        if name[-len(ext):].lower() == ext: name = name[:-len(ext)]
+    return name
+
+
+def failed_row(probname, status):
+    """
+    Return a summary row for a problem that could not be solved. All numeric
+    metrics are set to -1 so that :mod:`nlpy.tools.pprof` treats the problem
+    as a failure.
+    """
+    return {'name': problem_name(probname), 'iter': -1, 'obj': -1.0,
+            'pResid': -1.0, 'dResid': -1.0, 'gap': -1.0,
+            'setup': -1.0, 'solve': -1.0, 'status': status}
+
+
+def solve_reglp(probname, **kwargs):
+    "Solve a linear program with :class:`RegLPInteriorPointSolver`."
+    from nlpy.model import slack_model
+    from nlpy.optimize.solvers.lp import RegLPInteriorPointSolver
+
+    opts_model = kwargs.get('opts_model', {})
+    opts_init = kwargs.get('opts_init', {})
+    opts_solve = kwargs.get('opts_solve', {})
+
+    t_setup = cputime()
+    lp = slack_model(probname, **opts_model)
+    t_setup = cputime() - t_setup
+
+    if not lp.islp():
+        lp.close()
+        return failed_row(probname, 'nlp')
+
+    reglp = RegLPInteriorPointSolver(lp, **opts_init)
+    reglp.solve(**opts_solve)
+    lp.close()
+
+    return {'name': problem_name(probname), 'iter': reglp.iter,
+            'obj': reglp.obj_value, 'pResid': reglp.pResid,
+            'dResid': reglp.dResid, 'gap': reglp.rgap,
+            'setup': t_setup, 'solve': reglp.solve_time,
+            'status': reglp.short_status}
+
+
+def solve_regqp(probname, **kwargs):
+    "Solve a convex quadratic program with :class:`RegQPInteriorPointSolver`."
+    from nlpy.model import slack_model
+    from nlpy.optimize.solvers.cqp import RegQPInteriorPointSolver
+
+    opts_model = kwargs.get('opts_model', {})
+    opts_init = kwargs.get('opts_init', {})
+    opts_solve = kwargs.get('opts_solve', {})
+
+    t_setup = cputime()
+    qp = slack_model(probname, **opts_model)
+    t_setup = cputime() - t_setup
+
+    regqp = RegQPInteriorPointSolver(qp, **opts_init)
+    regqp.solve(**opts_solve)
+    qp.close()
+
+    return {'name': problem_name(probname), 'iter': regqp.iter,
+            'obj': regqp.obj_value, 'pResid': regqp.pResid,
+            'dResid': regqp.dResid, 'gap': regqp.rgap,
+            'setup': t_setup, 'solve': regqp.solve_time,
+            'status': regqp.short_status}
+
+
+def solve_trunk(probname, **kwargs):
+    "Solve an unconstrained problem with :class:`TrunkFramework`."
+    from nlpy.model import AmplModel
+    from nlpy.optimize.tr.trustregion import TrustRegionFramework as TR
+    from nlpy.optimize.tr.trustregion import TrustRegionCG as TRSolver
+    from nlpy.optimize.solvers.trunk import TrunkFramework
+
+    opts_model = kwargs.get('opts_model', {})
+    opts_solve = kwargs.get('opts_solve', {})
+
+    t_setup = cputime()
+    nlp = AmplModel(probname, **opts_model)
+    if nlp.nbounds > 0 or nlp.m > 0:
+        nlp.close()
+        return failed_row(probname, 'con')
+    tr = TR(Delta=1.0, eta1=0.05, eta2=0.9, gamma1=0.25, gamma2=2.5)
+    trunk = TrunkFramework(nlp, tr, TRSolver, ny=True, inexact=True,
+                           verbose=False, **opts_solve)
+    t_setup = cputime() - t_setup
+
+    trunk.Solve()
+    nlp.close()
+
+    return {'name': problem_name(probname), 'iter': trunk.iter,
+            'obj': trunk.f, 'pResid': 0.0, 'dResid': trunk.gnorm, 'gap': 0.0,
+            'setup': t_setup, 'solve': trunk.tsolve, 'status': trunk.status}
+
+
+def solve_ldfp(probname, **kwargs):
+    "Solve an unconstrained problem with :class:`LDFPTrunkFramework`."
+    from nlpy.model import AmplModel
+    from nlpy.optimize.tr.trustregion import TrustRegionFramework as TR
+    from nlpy.optimize.tr.trustregion import TrustRegionCG as TRSolver
+    from nlpy.optimize.solvers.ldfp import LDFPTrunkFramework
+
+    opts_model = kwargs.get('opts_model', {})
+    opts_solve = kwargs.get('opts_solve', {})
+
+    t_setup = cputime()
+    nlp = AmplModel(probname, **opts_model)
+    if nlp.nbounds > 0 or nlp.m > 0:
+        nlp.close()
+        return failed_row(probname, 'con')
+    tr = TR(Delta=1.0, eta1=0.05, eta2=0.9, gamma1=0.25, gamma2=2.5)
+    ldfp = LDFPTrunkFramework(nlp, tr, TRSolver, verbose=False, **opts_solve)
+    ldfp.TR.Delta = 0.1 * ldfp.gnorm
+    t_setup = cputime() - t_setup
+
+    ldfp.Solve()
+    nlp.close()
+
+    return {'name': problem_name(probname), 'iter': ldfp.iter,
+            'obj': ldfp.f, 'pResid': 0.0, 'dResid': ldfp.gnorm, 'gap': 0.0,
+            'setup': t_setup, 'solve': ldfp.tsolve, 'status': ldfp.status}
+
+
+def solve_lbfgs(probname, **kwargs):
+    "Solve an unconstrained problem with :class:`LBFGSFramework`."
+    from nlpy.model import AmplModel
+    from nlpy.optimize.solvers.lbfgs import LBFGSFramework
+
+    opts_model = kwargs.get('opts_model', {})
+    opts_init = kwargs.get('opts_init', {})
+
+    t_setup = cputime()
+    nlp = AmplModel(probname, **opts_model)
+    if nlp.nbounds > 0 or nlp.m > 0:
+        nlp.close()
+        return failed_row(probname, 'con')
+    lbfgs = LBFGSFramework(nlp, silent=True, **opts_init)
+    t_setup = cputime() - t_setup
+
+    lbfgs.solve()
+    nlp.close()
+
+    status = 'opt' if lbfgs.converged else 'itr'
+    return {'name': problem_name(probname), 'iter': lbfgs.iter,
+            'obj': lbfgs.f, 'pResid': 0.0, 'dResid': lbfgs.gnorm, 'gap': 0.0,
+            'setup': t_setup, 'solve': lbfgs.tsolve, 'status': status}
+
+
+# Registry of solvers that may be run in batch mode.
+solvers = {'reglp': solve_reglp,
+           'regqp': solve_regqp,
+           'trunk': solve_trunk,
+           'ldfp':  solve_ldfp,
+           'lbfgs': solve_lbfgs}
+
+
+def _worker(solver, probname, opts, memlimit, conn):
+    """
+    Solve a single problem in a child process and send its summary row back
+    through `conn`. The address space of the child is capped at `memlimit`
+    megabytes when specified.
+    """
+    if memlimit is not None:
+        import resource
+        nbytes = int(memlimit * 1024 * 1024)
+        resource.setrlimit(resource.RLIMIT_AS, (nbytes, nbytes))
+    try:
+        row = solvers[solver](probname, **opts)
+    except MemoryError:
+        row = failed_row(probname, 'mem')
+    except Exception:
+        row = failed_row(probname, 'fail')
+    conn.send(row)
+    conn.close()
+    return
+
+
+class BatchDriver:
+    """
+    Fan a collection of problems out to a pool of worker processes. Instantiate
+    using
+
+    `batch = BatchDriver('reglp', problems, nprocs=4, timeout=60)`
+
+    :parameters:
+
+        :solver:   name of a solver registered in :data:`solvers`,
+        :problems: list of problem names (`.nl` stubs or MPS/QPS files).
+
+    :keywords:
+
+        :nprocs:   number of simultaneous workers (default: number of cores)
+        :timeout:  per-problem wall-clock limit in seconds (default: None)
+        :memlimit: per-problem memory limit in megabytes (default: None)
+        :opts:     dictionary of keyword arguments passed to the solver
+                   function, e.g., `{'opts_solve': {'itermax': 100}}`.
+                   Keyword arguments for the model constructor may be
+                   given in `opts_model`, e.g., `{'snapshot': True}`.
+        :poll:     interval between checks on running workers, in seconds
+                   (default: 0.05).
+
+    Call :meth:`solve` to solve all problems. The summary rows are then found
+    in :attr:`results`, in the order in which problems were given. Problems
+    that exceed the time limit are reported with status `time`, those that
+    run out of memory with status `mem`, and those that fail otherwise with
+    status `fail`.
+    """
+
+    def __init__(self, solver, problems, **kwargs):
+
+        if solver not in solvers:
+            raise ValueError, 'Unknown solver %s' % solver
+        self.solver = solver
+        self.problems = problems
+        self.nprocs = kwargs.get('nprocs', multiprocessing.cpu_count())
+        self.timeout = kwargs.get('timeout', None)
+        self.memlimit = kwargs.get('memlimit', None)
+        self.opts = kwargs.get('opts', {})
+        self.poll = kwargs.get('poll', 0.05)
+        self.results = []
+        self.wall_time = 0.0
+
+    def _start(self, k):
+        "Start a worker for problem number `k`."
+        recv_conn, send_conn = multiprocessing.Pipe(duplex=False)
+        proc = multiprocessing.Process(target=_worker,
+                                       args=(self.solver, self.problems[k],
+                                             self.opts, self.memlimit,
+                                             send_conn))
+        proc.start()
+        send_conn.close()   # Only the child writes into the pipe.
+        return (proc, recv_conn, time.time())
+
+    def solve(self, **kwargs):
+        """
+        Solve all problems. If the keyword `callback` is given, it is called
+        with each summary row as soon as it becomes available.
+        """
+        callback = kwargs.get('callback', None)
+        nprobs = len(self.problems)
+        results = [None] * nprobs
+        pending = range(nprobs)
+        pending.reverse()
+        running = {}
+
+        t0 = time.time()
+        while pending or running:
+
+            # Keep all workers busy.
+            while pending and len(running) < self.nprocs:
+                k = pending.pop()
+                running[k] = self._start(k)
+
+            time.sleep(self.poll)
+
+            for k in running.keys():
+                (proc, conn, tstart) = running[k]
+                row = None
+                if conn.poll():
+                    try:
+                        row = conn.recv()
+                    except EOFError:
+                        row = failed_row(self.problems[k], 'fail')
+                elif not proc.is_alive():
+                    # The worker may have reported just before exiting.
+                    proc.join()
+                    if conn.poll():
+                        try:
+                            row = conn.recv()
+                        except EOFError:
+                            pass
+                    if row is None:
+                        # Worker died without reporting, e.g., killed by
+                        # the OS.
+                        status = 'mem' if self.memlimit is not None \
+                                 else 'fail'
+                        row = failed_row(self.problems[k], status)
+                elif self.timeout is not None and \
+                        time.time() - tstart > self.timeout:
+                    proc.terminate()
+                    row = failed_row(self.problems[k], 'time')
+                if row is not None:
+                    proc.join()
+                    conn.close()
+                    del running[k]
+                    results[k] = row
+                    if callback is not None: callback(row)
+
+        self.wall_time = time.time() - t0
+        self.results = results
+        return results
+
+
+def write_csv(results, stream=sys.stdout):
+    """
+    Write summary rows as comma-separated values. The header line starts with
+    `#` so that the output may be fed directly to `nlpy_pprof.py --sep ,`.
+    """
+    stream.write('#' + ','.join(columns) + '\n')
+    for row in results:
+        stream.write('%s,%d,%.15e,%.6e,%.6e,%.6e,%.4f,%.4f,%s\n' % \
+                     tuple([row[col] for col in columns]))
+    return
+
+
+def write_json(results, stream=sys.stdout):
+    "Write summary rows as a JSON list of dictionaries."
+    import json
+    json.dump(results, stream, indent=1)
+    stream.write('\n')
+    return
@@ -184,8 +184,7 @@ class LBFGSFramework:
         self.lbfgs = InverseLBFGS(self.nlp.n, **kwargs)
 
         self.x = kwargs.get('x0', self.nlp.x0)
-        self.f = self.nlp.obj(self.x)
-        self.g = self.nlp.grad(self.x)
+        (self.f, self.g) = self.nlp.obj_grad(self.x)
         self.gnorm = norms.norm2(self.g)
         self.f0 = self.f
         self.g0 = self.gnorm
@@ -224,6 +223,7 @@ class LBFGSFramework:
                                          d,
                                          lambda z: self.nlp.obj(z),
                                          lambda z: self.nlp.grad(z),
+                                         objgrad=self.nlp.obj_grad,
                                          stp = stp0)
             # Perform linesearch
             SWLS.search()
@@ -3,16 +3,17 @@
 # From Algorithm IPF on p.110 of Stephen J. Wright's book
 # "Primal-Dual Interior-Point Methods", SIAM ed., 1997.
 # The method uses the augmented system formulation. These systems
-# are solved using PyMa27 or PyMa57.
+# are solved with the factorization chosen by nlpy.linalg.backends.
 #
 # D. Orban, Montreal 2004. Revised September 2009.
 
-from nlpy.model import SlackFramework
-try:                            # To solve augmented systems
-    from nlpy.linalg.pyma57 import PyMa57Context as LBLContext
-except:
-    from nlpy.linalg.pyma27 import PyMa27Context as LBLContext
-from nlpy.linalg.scaling import mc29ad
+from nlpy.model import SlackFormulation
+from nlpy.linalg.backends import LBLContext  # To solve augmented systems
+from nlpy.linalg.cache import cached_factorization
+from nlpy.linalg.cache import release_factorization
+from nlpy.linalg.sils import FactorizationMemoryError
+from nlpy.krylov.minres import MinresContext
+from nlpy.linalg.scaling import equilibrate, apply_scaling
 from nlpy.tools.norms import norm2, norm_infty
 from nlpy.tools import sparse_vector_class as sv
 from nlpy.tools.timing import cputime
@@ -35,8 +36,10 @@ class RegLPInteriorPointSolver:
 
         where the variables x are the original problem variables and s are
         slack variables. Any linear program may be converted to the above form
-        by instantiation of the `SlackFramework` class. The conversion to the
-        slack formulation is mandatory in this implementation.
+        by instantiation of the `SlackFramework` class, or of the
+        `SlackQPModel` class for problems held in NumPy arrays or read from an
+        MPS file. The conversion to the slack formulation is mandatory in this
+        implementation.
 
         The method is a variant of Mehrotra's predictor-corrector method where
         steps are computed by solving the primal-dual system in augmented form.
@@ -62,6 +65,9 @@ class RegLPInteriorPointSolver:
         :keywords:
             :scale: Perform row and column equilibration of the constraint
                     matrix [A1 A2] prior to solution (default: `True`).
+                    May also be the name of a scaling method of
+                    :mod:`nlpy.linalg.scaling`: 'max' (same as `True`),
+                    'ruiz' or 'geometric'.
 
             :stabilize: Scale the linear system to be solved at each iteration
                         (default: `True`).
@@ -72,15 +78,27 @@ class RegLPInteriorPointSolver:
             :regdu: Initial value of dual regularization parameter
                     (default: `1.0`).
 
+            :memory_limit: Storage allowed for the factors of the augmented
+                    matrix, in megabytes (default: `None`, i.e., no limit).
+                    The storage is forecast before factorizing.
+
+            :iterative_fallback: If the factors would exceed `memory_limit`,
+                    solve the augmented systems with Minres instead of
+                    raising `FactorizationMemoryError` (default: `False`).
+
             :verbose: Turn on verbose mode (default `False`).
         """
 
-        if not isinstance(lp, SlackFramework):
-            msg = 'Input problem must be an instance of SlackFramework'
+        if not isinstance(lp, SlackFormulation):
+            msg = 'Input problem must be in slack form, e.g., an instance'
+            msg += ' of SlackFramework or SlackQPModel'
             raise ValueError, msg
 
         scale = kwargs.get('scale', True)
+        self.scaling = scale if isinstance(scale, str) else 'max'
         self.verbose = kwargs.get('verbose', True)
+        self.memory_limit = kwargs.get('memory_limit', None)
+        self.iterative_fallback = kwargs.get('iterative_fallback', False)
         self.stabilize = kwargs.get('stabilize', True)
 
         self.lp = lp
@@ -175,10 +193,13 @@ class RegLPInteriorPointSolver:
 
     def scale(self, **kwargs):
         """
-        Equilibrate the constraint matrix of the linear program. Equilibration
-        is done by first dividing every row by its largest element in absolute
-        value and then by dividing every column by its largest element in
-        absolute value. In effect the original problem::
+        Equilibrate the constraint matrix of the linear program. By default,
+        equilibration is done by first dividing every row by its largest
+        element in absolute value and then by dividing every column by its
+        largest element in absolute value. The keyword `method` selects
+        another method of :mod:`nlpy.linalg.scaling`: 'ruiz' or 'geometric'.
+        The default is the method given to the constructor. In effect the
+        original problem::
 
             minimize c'x  subject to  A1 x + A2 s = b, x >= 0
 
@@ -200,40 +221,23 @@ class RegLPInteriorPointSolver:
         """
         w = sys.stdout.write
         m, n = self.A.shape
-        row_scale = np.zeros(m)
-        col_scale = np.zeros(n)
         (values,irow,jcol) = self.A.find()
+        method = kwargs.get('method', self.scaling)
 
         if self.verbose:
             w('Smallest and largest elements of A prior to scaling: ')
             w('%8.2e %8.2e\n' % (np.min(np.abs(values)),np.max(np.abs(values))))
 
-        # Find row scaling.
-        for k in range(len(values)):
-            row = irow[k]
-            val = abs(values[k])
-            row_scale[row] = max(row_scale[row], val)
-        row_scale[row_scale == 0.0] = 1.0
+        # Find row and column scaling.
+        (row_scale, col_scale) = equilibrate(method, m, n, values, irow, jcol)
 
         if self.verbose:
             w('Largest row scaling factor = %8.2e\n' % np.max(row_scale))
-
-        # Apply row scaling to A and b.
-        values /= row_scale[irow]
-        self.b /= row_scale
-
-        # Find column scaling.
-        for k in range(len(values)):
-            col = jcol[k]
-            val = abs(values[k])
-            col_scale[col] = max(col_scale[col], val)
-        col_scale[col_scale == 0.0] = 1.0
-
-        if self.verbose:
             w('Largest column scaling factor = %8.2e\n' % np.max(col_scale))
 
-        # Apply column scaling to A and c.
-        values /= col_scale[jcol]
+        # Apply row and column scaling to A, b and c.
+        values = apply_scaling(values, irow, jcol, row_scale, col_scale)
+        self.b /= row_scale
         self.c[:self.lp.original_n] /= col_scale[:self.lp.original_n]
 
         if self.verbose:
@@ -490,7 +494,16 @@ class RegLPInteriorPointSolver:
                 nb_bump = 0
                 while not factorized and nb_bump < 5:
 
-                    if self.stabilize:
+                    if self.stabilize and self.kkt_pos is not None:
+                        col_scale[:on] = sqrt(regpr)
+                        col_scale[on:] = np.sqrt(z/s + regpr)
+                        kkt_val = self.kkt_val
+                        kkt_val[:n] = -sqrt(regdu)
+                        kkt_val[n:n+m] = sqrt(regdu)
+                        np.divide(self.A_val, col_scale[self.A_jcol],
+                                  kkt_val[n+m:])
+                        self.LBL.factorize_elements(self.kkt_pos, kkt_val)
+                    elif self.stabilize:
                         col_scale[:on] = sqrt(regpr)
                         col_scale[on:] = np.sqrt(z/s + regpr)
                         H.put(-sqrt(regdu), range(n))
@@ -498,10 +511,18 @@ class RegLPInteriorPointSolver:
                         AA = self.A.copy()
                         AA.col_scale(1/col_scale)
                         H[n:,:n] = AA
+                        self.LBL.factorize(H)
+                    elif self.diag_pos is not None:
+                        diagH = self.diagH
+                        if regpr > 0: diagH[:on] = -regpr
+                        diagH[on:n] = -z/s - regpr
+                        if regdu > 0: diagH[n:] = regdu
+                        self.LBL.factorize_diagonal(self.diag_pos, diagH)
                     else:
                         if regpr > 0: H.put(-regpr,       range(on))
                         H.put(-z/s - regpr, range(on,n))
                         if regdu > 0: H.put(regdu,        range(n,n+m))
+                        self.LBL.factorize(H)
 
                     #if iter == 5:
                     #    # Export current matrix to file for futher inspection.
@@ -510,7 +531,6 @@ class RegLPInteriorPointSolver:
                     #    fname = '.'.join(name.split('.')[:-1]) + '.mtx'
                     #    H.exportMmf(fname)
 
-                    self.LBL.factorize(H)
                     factorized = True
 
                     # If the augmented matrix does not have full rank, bump up
@@ -694,6 +714,10 @@ class RegLPInteriorPointSolver:
         self.status = status
         self.short_status = short_status
 
+        # Hand the factorization back to the cache.
+        release_factorization(self.LBL)
+        self.LBL = None
+
         # Unscale problem if applicable.
         if self.prob_scaled: self.unscale()
 
@@ -734,27 +758,51 @@ class RegLPInteriorPointSolver:
         """
         n = lp.n ; m = lp.m ; ns = self.nSlacks ; on = lp.original_n
 
-        # Set up augmented system matrix and factorize it.
+        # Set up augmented system matrix and factorize it. If caching is
+        # enabled, the factorization is reused if the same problem was solved
+        # before in this process. It is released at the end of solve().
         self.H.put(1.0e-4, range(on))
         self.H.put(1.0, range(on,n))
         self.H.put(-1.0e-4, range(n,n+m))
         self.H[n:,:n] = self.A
-        self.LBL = LBLContext(self.H, sqd=True)  # Perform analyze and factorize
-
-        # Assemble first right-hand side and solve.
-        rhs = np.zeros(n+m)
-        rhs[n:] = self.b
-        (step, nres, neig) = self.solveSystem(rhs)
-        x = step[:n].copy()
+        try:
+            self.LBL = cached_factorization(self.H, factory=LBLContext,
+                                            sqd=True,
+                                            memory_limit=self.memory_limit)
+        except FactorizationMemoryError:
+            if not self.iterative_fallback: raise
+            if self.verbose:
+                sys.stderr.write('Factors exceed memory limit')
+                sys.stderr.write('... solving systems with Minres\n')
+            self.LBL = MinresContext(self.H, sqd=True)
+
+        # When possible, only the diagonal of the augmented matrix is updated
+        # in the factorization context from one iteration to the next. In
+        # the stabilized formulation, the scaled A block is also written in
+        # place, at positions found once.
+        self.diagH = np.empty(n+m)
+        self.diagH[:on] = 1.0e-4 ; self.diagH[on:n] = 1.0
+        self.diagH[n:] = -1.0e-4
+        self.diag_pos = None ; self.kkt_pos = None
+        if hasattr(self.LBL, 'factorize_elements'):
+            self.diag_pos = self.LBL.diagonal_positions(np.arange(n+m))
+            if self.stabilize:
+                (self.A_val, A_irow, self.A_jcol) = self.A.find()
+                A_pos = self.LBL.element_positions(A_irow + n, self.A_jcol)
+                self.kkt_pos = np.concatenate((self.diag_pos, A_pos),
+                                              axis=-1)
+                self.kkt_val = np.empty(n + m + self.A_val.size)
+
+        # Assemble both right-hand sides and solve with a single call.
+        rhs = np.zeros((n+m, 2))
+        rhs[n:,0] = self.b
+        rhs[:on,1] = self.c
+        step = self.LBL.solve(rhs, nitref=3, tol=1.0e-5)
+
+        x = step[:n,0].copy()
         s = x[on:]  # Slack variables. Must be positive.
-
-        # Assemble second right-hand side and solve.
-        rhs[:on] = self.c
-        rhs[on:] = 0.0
-
-        (step, nres, neig) = self.solveSystem(rhs)
-        y = step[n:].copy()
-        z = step[on:n].copy()
+        y = step[n:,1].copy()
+        z = step[on:n,1].copy()
 
         # Use Mehrotra's heuristic to ensure (s,z) > 0.
         if np.all(s >= 0):
@@ -817,6 +865,7 @@ class RegLPInteriorPointSolver29(RegLPInteriorPointSolver):
         Scale the constraint matrix of the linear program. The scaling is done
         so that the scaled matrix has all its entries near 1.0 in the sense that
         the square of the sum of the logarithms of the entries is minimized.
+        If MC29 is not available, geometric scaling is used instead.
 
         In effect the original problem::
 
@@ -842,12 +891,24 @@ class RegLPInteriorPointSolver29(RegLPInteriorPointSolver):
         m, n = self.A.shape
 
         # Obtain row and column scaling
-        row_scale, col_scale, ifail = mc29ad(m, n, values, irow, jcol)
-
-        # row_scale and col_scale contain in fact the logarithms of the
-        # scaling factors.
-        row_scale = np.exp(row_scale)
-        col_scale = np.exp(col_scale)
+        try:
+            from nlpy.linalg.scaling import mc29ad
+        except ImportError:
+            mc29ad = None
+
+        if mc29ad is not None:
+            row_scale, col_scale, ifail = mc29ad(m, n, values, irow, jcol)
+
+            # row_scale and col_scale contain in fact the logarithms of the
+            # scaling factors.
+            row_scale = np.exp(row_scale)
+            col_scale = np.exp(col_scale)
+        else:
+            # Without MC29, use geometric scaling, whose factors are divisors.
+            (row_scale, col_scale) = equilibrate('geometric', m, n,
+                                                 values, irow, jcol)
+            row_scale = 1/row_scale
+            col_scale = 1/col_scale
 
         # Apply row and column scaling to constraint matrix A.
         values *= row_scale[irow]
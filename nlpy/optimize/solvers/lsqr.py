@@ -11,6 +11,7 @@ Dominique Orban, Ecole Polytechnique de Montreal
 """
 
 from nlpy.tools.utils import roots_quadratic
+from nlpy.krylov.workspace import KrylovWorkspace, axpy, matvec
 from numpy import zeros, dot, inf
 from numpy.linalg import norm
 from math import sqrt
@@ -46,9 +47,19 @@ class LSQRFramework:
        problems, ACM TOMS 8(2), 195-209.
     3. M. A. Saunders (1995).  Solution of sparse rectangular systems using
        LSQR and CRAIG, BIT 35, 588-604.
+
+    The keyword `workspace` may give a `KrylovWorkspace` holding the vectors
+    of the method, to be reused by successive solves. Products with `A` and
+    `A.T` are stored into work vectors and the bidiagonalization vectors are
+    updated in place, so that iterations allocate no vector, except for
+    products with operators that do not support an output argument and for
+    the variance estimates if `wantvar` is set. The solution `x` then is a
+    work vector, overwritten by the next solve that uses the same workspace.
+    Without a workspace, a private one is used and `x` is a copy, left
+    unchanged by subsequent solves.
     """
 
-    def __init__(self, A):
+    def __init__(self, A, **kwargs):
 
         # Initialize.
 
@@ -64,6 +75,8 @@ class LSQRFramework:
 
         self.A = A
         self.x = None ; self.var = None
+        self.workspace = kwargs.get('workspace', None)
+        self._own_workspace = self.workspace is None
 
         self.itn = 0; self.istop = 0; self.nstop = 0
         self.anorm = 0.; self.acond = 0. ; self.arnorm = 0.
@@ -157,15 +170,20 @@ class LSQRFramework:
         # Set up the first vectors u and v for the bidiagonalization.
         # These satisfy  beta*u = b,  alfa*v = A'u.
 
-        x = zeros(n)
-        u = rhs[:m].copy()
+        if self.workspace is None: self.workspace = KrylovWorkspace(n)
+        ws = self.workspace
+        x = ws.zeros('x', n)
+        u = ws.get('u', m) ; u[:] = rhs[:m]
+        v = ws.get('v', n) ; w = ws.get('w', n)
+        Av = ws.get('Av', m) ; ATu = ws.get('ATu', n)
+        work = ws.get('work', n)
         alfa = 0. ; beta = norm(u)
         if beta > 0:
-            u /= beta; v = A.T * u
+            u /= beta; matvec(A.T, u, v)
             alfa = norm(v)
 
         if alfa > 0:
-            v /= alfa; w = v.copy()
+            v /= alfa; w[:] = v
 
         x_is_zero = False   # Is x=0 the solution to the least-squares prob?
         arnorm = alfa * beta
@@ -201,12 +219,14 @@ class LSQRFramework:
             #              beta*u  =  a*v   -  alfa*u,
             #              alfa*v  =  A'*u  -  beta*v.
 
-            u    = A * v  -  alfa * u
+            u    *= -alfa
+            u    += matvec(A, v, Av)        # u = A * v  -  alfa * u
             beta = norm(u)
             if beta > 0:
                 u    /= beta
                 anorm = normof4(anorm, alfa, beta, damp)
-                v     = A.T * u - beta * v
+                v    *= -beta
+                v    += matvec(A.T, u, ATu)  # v = A.T * u - beta * v
                 alfa  = norm(v)
                 if alfa > 0:  v /= alfa
 
@@ -235,7 +255,8 @@ class LSQRFramework:
 
             t1      =   phi  /rho;
             t2      = - theta/rho;
-            dk      =   (1.0/rho)*w;
+            dknorm2 =   dot(w,w) / (rho*rho)  # dk = (1.0/rho)*w
+            if wantvar: dk = (1.0/rho)*w
 
             if radius is not None:
                 # Calculate distance to trust-region boundary from x along w.
@@ -251,16 +272,16 @@ class LSQRFramework:
                 stepMax = max([abs(r) for r in roots if r*t1 > 0])
 
                 if abs(t1) > abs(stepMax):
-                    x += stepMax * w
+                    axpy(stepMax, w, x, work)
                     xnorm = radius
                     r1norm = normof2(rho*stepMax*sn, rho*stepMax*cs - phibar)
                     tr_active = True
                     istop = 8
 
             if not tr_active:
-                x      += t1*w
+                axpy(t1, w, x, work)
                 w      *= t2 ; w += v
-                ddnorm  = ddnorm + norm(dk)**2
+                ddnorm  = ddnorm + dknorm2
                 if wantvar: var += dk*dk
 
                 # Use a plane rotation on the right to eliminate the
@@ -376,7 +397,8 @@ class LSQRFramework:
         if istop == 7: self.status = 'max iterations'
         if istop == 8: self.status = 'trust-region boundary active'
         self.onBoundary = tr_active
-        self.x = x
+        # A private workspace is reused by the next solve: copy the solution.
+        self.x = x.copy() if self._own_workspace else x
         self.istop = istop
         self.itn = itn
         self.r1norm = r1norm
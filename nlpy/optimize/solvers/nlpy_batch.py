@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+
+from nlpy import __version__
+from nlpy.optimize.solvers.batch import BatchDriver, solvers, columns
+from nlpy.optimize.solvers.batch import write_csv, write_json
+from optparse import OptionParser
+import sys
+
+usage_msg = """%prog [options] problem1 [... problemN]
+where problem1 through problemN are solved in parallel by the selected solver.
+Available solvers: """ + ', '.join(sorted(solvers.keys()))
+
+# Define formats for progress output.
+hdrfmt = '%-15s  %5s  %15s  %7s  %7s  %7s  %6s  %6s  %4s'
+hdr = hdrfmt % ('Name', 'Iter', 'Objective', 'pResid', 'dResid',
+                'Gap', 'Setup', 'Solve', 'Stat')
+fmt = '%-15s  %5d  %15.8e  %7.1e  %7.1e  %7.1e  %6.2f  %6.2f  %4s'
+
+# Define allowed command-line options
+parser = OptionParser(usage=usage_msg, version='%prog version ' + __version__)
+
+parser.add_option("-s", "--solver", action="store", type="string",
+        default="reglp", dest="solver", help="Specify solver")
+parser.add_option("-j", "--jobs", action="store", type="int", default=None,
+        dest="nprocs", help="Number of simultaneous workers")
+parser.add_option("-T", "--timeout", action="store", type="float",
+        default=None, dest="timeout",
+        help="Wall-clock limit per problem, in seconds")
+parser.add_option("-M", "--memlimit", action="store", type="float",
+        default=None, dest="memlimit",
+        help="Memory limit per problem, in megabytes")
+parser.add_option("-i", "--iter", action="store", type="int", default=None,
+        dest="maxiter",  help="Specify maximum number of iterations")
+parser.add_option("-t", "--tol", action="store", type="float", default=None,
+        dest="tol", help="Specify relative stopping tolerance")
+parser.add_option("-f", "--format", action="store", type="choice",
+        choices=['csv', 'json'], default='csv', dest="format",
+        help="Output format of the summary table (csv or json)")
+parser.add_option("-o", "--output", action="store", type="string",
+        default=None, dest="output",
+        help="Write summary table to file instead of stdout")
+parser.add_option("-S", "--snapshot", action="store_true", default=False,
+        dest="snapshot", help="Load static model data from snapshots")
+parser.add_option("-q", "--quiet", action="store_true", default=False,
+        dest="quiet", help="Do not report progress on stderr")
+
+# Parse command-line options
+(options, args) = parser.parse_args()
+
+if options.solver not in solvers:
+    parser.error('unknown solver %s' % options.solver)
+
+# Translate options to solver arguments.
+opts_init = {} ; opts_solve = {}
+if options.solver in ['reglp', 'regqp']:
+    if options.maxiter is not None:
+        opts_solve['itermax'] = options.maxiter
+    if options.tol is not None:
+        opts_solve['tolerance'] = options.tol
+elif options.solver == 'lbfgs':
+    if options.maxiter is not None:
+        opts_init['maxiter'] = options.maxiter
+    if options.tol is not None:
+        opts_init['reltol'] = options.tol
+else:
+    if options.maxiter is not None:
+        opts_solve['maxiter'] = options.maxiter
+    if options.tol is not None:
+        opts_solve['reltol'] = options.tol
+
+opts_model = {}
+if options.snapshot:
+    opts_model['snapshot'] = True
+
+batch_opts = {'opts': {'opts_model': opts_model,
+                       'opts_init': opts_init, 'opts_solve': opts_solve},
+              'timeout': options.timeout,
+              'memlimit': options.memlimit}
+if options.nprocs is not None:
+    batch_opts['nprocs'] = options.nprocs
+
+def report(row):
+    sys.stderr.write(fmt % tuple([row[col] for col in columns]))
+    sys.stderr.write('\n')
+
+if not options.quiet:
+    sys.stderr.write(hdr + '\n' + '-'*len(hdr) + '\n')
+
+batch = BatchDriver(options.solver, args, **batch_opts)
+results = batch.solve(callback=None if options.quiet else report)
+
+if not options.quiet:
+    sys.stderr.write('-'*len(hdr) + '\n')
+    sys.stderr.write('%d problems solved in %6.2fs\n' % (len(args),
+                                                       batch.wall_time))
+
+# Write summary table.
+stream = sys.stdout if options.output is None else open(options.output, 'w')
+if options.format == 'json':
+    write_json(results, stream)
+else:
+    write_csv(results, stream)
+if options.output is not None:
+    stream.close()
@@ -1,7 +1,7 @@
 #!/usr/bin/env python
 
 from nlpy import __version__
-from nlpy.model import SlackFramework
+from nlpy.model import slack_model
 from nlpy.optimize.solvers.lp import RegLPInteriorPointSolver
 from nlpy.tools.norms import norm2
 from nlpy.tools.timing import cputime
@@ -67,7 +67,7 @@ if not options.verbose:
 for probname in args:
 
     t_setup = cputime()
-    lp = SlackFramework(probname)
+    lp = slack_model(probname)
     t_setup = cputime() - t_setup
 
     islp = True
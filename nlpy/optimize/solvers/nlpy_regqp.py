@@ -1,7 +1,7 @@
 #!/usr/bin/env python
 
 from nlpy import __version__
-from nlpy.model import SlackFramework
+from nlpy.model import slack_model
 from nlpy.optimize.solvers.cqp import RegQPInteriorPointSolver
 from nlpy.tools.norms import norm2
 from nlpy.tools.timing import cputime
@@ -65,7 +65,7 @@ if not options.verbose:
 for probname in args:
 
     t_setup = cputime()
-    qp = SlackFramework(probname)
+    qp = slack_model(probname)
     t_setup = cputime() - t_setup
 
     # isqp() should be implemented in the near future.
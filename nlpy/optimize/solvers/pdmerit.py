@@ -46,9 +46,9 @@ class PrimalDualMeritFunction(NLPModel):
         self.mu = kwargs.get('mu', 1.0)
 
         # Shortcuts for convenience.
-        self.lowerB = np.array(nlp.lowerB)
-        self.upperB = np.array(nlp.upperB)
-        self.rangeB = np.array(nlp.rangeB)
+        self.lowerB = nlp.lowerB
+        self.upperB = nlp.upperB
+        self.rangeB = nlp.rangeB
         self.rlB = np.arange(nlp.nlowerB)
         self.ruB = nlp.nlowerB + np.arange(nlp.nupperB)
         self.rrB = nlp.nlowerB + nlp.nupperB + np.arange(nlp.nrangeB)
@@ -59,6 +59,12 @@ class PrimalDualMeritFunction(NLPModel):
         # Total number of variables.
         self.n = self.nlp.n + self.nz
 
+        # Storage for the values of the Hessian of the Lagrangian and for the
+        # Hessian matrices of the merit function, reused across calls.
+        self._hvals = None
+        self._hpattern = None
+        self._hmatrix = {}
+
         # The multipliers z associated to bound constraints are ordered as
         # follows:
         #
@@ -191,6 +197,8 @@ class PrimalDualMeritFunction(NLPModel):
 
         [ H + 2 mu X^{-2}      I     ]
         [      I           mu Z^{-2} ].
+
+        The matrix returned is overwritten by the next call.
         """
         mu = kwargs.get('mu', self.mu)
 
@@ -206,29 +214,14 @@ class PrimalDualMeritFunction(NLPModel):
         srlB = x[rB] - Lvar[rB] ; zrlB = z[nlB+nuB:nlB+nuB+nrB]
         sruB = Uvar[rB] - x[rB] ; zruB = z[nlB+nuB+nrB:]
 
-        H = sp(nrow=nx+nz, ncol=nx+nz,
-               sizeHint=self.nlp.nnzh+3*nz, symmetric=True)
-
         # Leading block: H + 2 * mu X^{-2}.
-        H[:nx,:nx] = self.nlp.hess(x, self.nlp.pi0)
-        H.addAt(2 * mu/slB**2,  lB, lB)
-        H.addAt(2 * mu/suB**2,  uB, uB)
-        H.addAt(2 * mu/srlB**2, rB, rB)
-        H.addAt(2 * mu/sruB**2, rB, rB)
-
-        # Bottom left block: identity-ish.
-        n1 = nx + rlB       ; H.put( 1, n1, lB)
-        n2 = nx + ruB       ; H.put(-1, n2, uB)
-        n3 = nx + rrB       ; H.put( 1, n3, rB)
-        n4 = nx + nrB + rrB ; H.put(-1, n4, rB)
+        dx = np.concatenate((2 * mu/slB**2, 2 * mu/suB**2,
+                             2 * mu/srlB**2 + 2 * mu/sruB**2))
 
         # Bottom right block: mu * Z^{-2}.
-        H.put(mu/zlB**2,  n1, n1)
-        H.put(mu/zuB**2,  n2, n2)
-        H.put(mu/zrlB**2, n3, n3)
-        H.put(mu/zruB**2, n4, n4)
+        dz = np.concatenate((mu/zlB**2, mu/zuB**2, mu/zrlB**2, mu/zruB**2))
 
-        return H
+        return self._assemble_hess('primal', x, dx, dz)
 
 
     def primal_hprod(self, x, z, p, **kwargs):
@@ -281,6 +274,8 @@ class PrimalDualMeritFunction(NLPModel):
 
         [ H + 2 X^{-1} Z     I     ]
         [      I          Z^{-1} X ].
+
+        The matrix returned is overwritten by the next call.
         """
         mu = kwargs.get('mu', self.mu)
 
@@ -296,28 +291,85 @@ class PrimalDualMeritFunction(NLPModel):
         srlB = x[rB] - Lvar[rB] ; zrlB = z[nlB+nuB:nlB+nuB+nrB]
         sruB = Uvar[rB] - x[rB] ; zruB = z[nlB+nuB+nrB:]
 
-        H = sp(nrow=nx+nz, ncol=nx+nz,
-               sizeHint=self.nlp.nnzh+3*nz, symmetric=True)
+        # Leading block: H + 2 X^{-1} Z.
+        dx = np.concatenate((2 * zlB / slB, 2 * zuB / suB,
+                             2 * zrlB/srlB + 2 * zruB/sruB))
 
-        # Leading block: H + 2 * mu X^{-2}.
-        H[:nx,:nx] = self.nlp.hess(x, self.nlp.pi0)
-        H.addAt(2 * zlB / slB, lB, lB)
-        H.addAt(2 * zuB / suB, uB, uB)
-        H.addAt(2 * zrlB/srlB, rB, rB)
-        H.addAt(2 * zruB/sruB, rB, rB)
+        # Bottom right block: Z^{-1} X.
+        dz = np.concatenate((slB / zlB, suB / zuB, srlB/zrlB, sruB/zruB))
 
-        # Bottom left block: identity-ish.
-        n1 = nx + rlB       ; H.put( 1, n1, lB)
-        n2 = nx + ruB       ; H.put(-1, n2, uB)
-        n3 = nx + rrB       ; H.put( 1, n3, rB)
-        n4 = nx + nrB + rrB ; H.put(-1, n4, rB)
+        return self._assemble_hess('primal-dual', x, dx, dz)
 
-        # Bottom right block: mu * Z^{-2}.
-        H.put(slB / zlB, n1, n1)
-        H.put(suB / zuB, n2, n2)
-        H.put(srlB/zrlB, n3, n3)
-        H.put(sruB/zruB, n4, n4)
 
+    def _hess_pattern(self):
+        """
+        Return the pattern of the lower triangle of the Hessian matrices of
+        the merit function, computed on the first call. It is the tuple
+        `(irow, jcol, hpos, dpos, vals)`, where `irow` and `jcol` are the
+        coordinates of the elements, without duplicates, `hpos` and `dpos`
+        are the positions of the elements of the Hessian of the Lagrangian
+        and of the diagonal elements (i,i) of the leading block, for i in
+        lowerB, upperB and rangeB, and `vals` is storage for the values of
+        the elements. The values of the bottom left block are constant and
+        are set once.
+        """
+        if self._hpattern is not None: return self._hpattern
+
+        nlp = self.nlp ; nx = nlp.n ; nz = self.nz ; N = nx + nz
+        lB = nlp.lowerB ; uB = nlp.upperB ; rB = nlp.rangeB
+        nlB = nlp.nlowerB ; nuB = nlp.nupperB ; nrB = nlp.nrangeB
+
+        # Leading block: merge the diagonal elements added to H with those
+        # of H, if any.
+        (hrow, hcol) = nlp.hess_structure()
+        hrow = np.asarray(hrow, dtype=np.intp)
+        hcol = np.asarray(hcol, dtype=np.intp)
+        bnd = np.concatenate((lB, uB, rB)).astype(np.intp)
+        lead = np.concatenate((hrow * N + hcol, bnd * N + bnd))
+        (keys, pos) = np.unique(lead, return_inverse=True)
+        hpos = pos[:hrow.size] ; dpos = pos[hrow.size:]
+        nlead = keys.size
+
+        # Bottom left block, whose row k is that of multiplier k, followed by
+        # the bottom right block, which is diagonal.
+        zrow = nx + np.arange(nz)
+        irow = np.concatenate((keys // N, zrow, zrow))
+        jcol = np.concatenate((keys % N, np.concatenate((lB, uB, rB, rB)),
+                               zrow))
+
+        vals = np.zeros(nlead + 2 * nz)
+        vals[nlead:nlead+nz] = np.concatenate((np.ones(nlB), -np.ones(nuB),
+                                               np.ones(nrB), -np.ones(nrB)))
+        self._hpattern = (irow, jcol, hpos, dpos, vals)
+        return self._hpattern
+
+
+    def _assemble_hess(self, kind, x, dx, dz):
+        """
+        Assemble the Hessian matrix `kind` of the merit function, whose
+        leading block is the Hessian of the Lagrangian at `x` plus the
+        diagonal `dx`, given for the variables in lowerB, upperB and rangeB,
+        and whose bottom right block is the diagonal `dz`. The values are
+        computed into storage reused across calls and stored in a matrix of
+        fixed pattern, allocated on the first call for each `kind`. This
+        matrix is overwritten by the next call for the same `kind`.
+        """
+        nlp = self.nlp ; nz = self.nz
+        (irow, jcol, hpos, dpos, vals) = self._hess_pattern()
+        nlead = vals.size - 2 * nz
+
+        self._hvals = nlp.hess_values(x, nlp.pi0, out=self._hvals)
+        vals[:nlead] = 0.0
+        vals[hpos] = self._hvals
+        vals[dpos] += dx
+        vals[nlead+nz:] = dz
+
+        H = self._hmatrix.get(kind, None)
+        if H is None:
+            H = sp(nrow=nlp.n+nz, ncol=nlp.n+nz, sizeHint=vals.size,
+                   symmetric=True)
+            self._hmatrix[kind] = H
+        H.put(vals, irow, jcol)
         return H
 
 
@@ -400,6 +452,17 @@ class PrimalDualInteriorPointFramework:
         The method is based on the primal-dual merit function of
         Forsgren and Gill (1998). For now, only bound-constrained problems are
         supported.
+
+        If the keyword `reuse_path` is `True` (default: `False`) and
+        `TrSolver` has a `resolve` method, such as :class:`TrustRegionCG` and
+        :class:`TrustRegionGLTR`, the subproblem that follows a rejected step
+        is solved again with the smaller radius from the data kept by the
+        previous solve instead of from scratch. This is only done if the
+        preconditioner and the stopping tolerance of the subproblem solver
+        are those of the previous solve. :meth:`SetupPrecon` and
+        :meth:`UpdatePrecon` must therefore return `True` whenever they
+        change the preconditioner. With `inexact`, the tolerance is tightened
+        at every iteration, so that the path is rarely reused.
         """
 
         self.merit = merit
@@ -417,6 +480,7 @@ class PrimalDualInteriorPointFramework:
         self.nyMax         = kwargs.get('nyMax',   5)
         self.opportunistic = kwargs.get('opportunistic', True)
         self.muerrfact     = kwargs.get('muerrfact', 10)
+        self.reuse_path    = kwargs.get('reuse_path', False)
         self.mu_min = 1.0e-09
 
         # Assemble the part of the primal-dual Hessian matrix that is constant.
@@ -539,7 +603,8 @@ class PrimalDualInteriorPointFramework:
 
     def SetupPrecon(self, **kwargs):
         """
-        Construct or set up the preconditioner---must be overridden.
+        Construct or set up the preconditioner---must be overridden. Return
+        `True` if the preconditioner changed.
         """
         return None
 
@@ -554,7 +619,8 @@ class PrimalDualInteriorPointFramework:
     def UpdatePrecon(self, **kwargs):
         """
         Override this method for preconditioners that need updating,
-        e.g., a limited-memory BFGS preconditioner.
+        e.g., a limited-memory BFGS preconditioner. Return `True` if the
+        preconditioner changed.
         """
         return None
 
@@ -578,6 +644,8 @@ class PrimalDualInteriorPointFramework:
         else:
             cgtol = -1.0
         inner_iter = 0           # Inner iteration counter
+        path_cgtol = None        # Tolerance of the last subproblem solve
+        precon_changed = False   # Preconditioner changed since that solve
 
         # Obtain starting point.
         (x,z) = (self.x, self.z)
@@ -640,24 +708,36 @@ class PrimalDualInteriorPointFramework:
                 self._debugMsg('optimal = ' + str(self.optimal))
 
             # Set up the preconditioner if applicable.
-            self.SetupPrecon()
+            if self.SetupPrecon(): precon_changed = True
 
             # Iteratively minimize the quadratic model in the trust region
             # m(s) = <g, s> + 1/2 <s, Hs>
             # Note that m(s) does not include f(x): m(0) = 0.
-            H = SimpleLinearOperator(nx+nz, nx+nz, lambda v: merit.hprod(v),
-                                     symmetric=True)
-            subsolver = self.TrSolver(g, H,
-                                   prec = self.Precon,
-                                   radius = self.TR.Delta,
-                                   reltol = cgtol,
-                                   #fraction = 0.5,
-                                   itmax = 2*(n+nz),
-                                   #debug=True,
-                                   #btol=.9,
-                                   #cur_iter=np.concatenate((x,z))
-                                   )
-            subsolver.Solve()
+            # After a rejected step, the iterate is unchanged and the new
+            # step may be recovered from the previous solve, provided the
+            # subproblem is otherwise that of the previous solve.
+            recovered = False
+            if self.reuse_path and status == 'Rej' and \
+                    cgtol == path_cgtol and not precon_changed and \
+                    hasattr(subsolver, 'resolve'):
+                recovered = subsolver.resolve(self.TR.Delta)
+
+            if not recovered:
+                H = SimpleLinearOperator(nx+nz, nx+nz,
+                                         lambda v: merit.hprod(v),
+                                         symmetric=True)
+                subsolver = self.TrSolver(g, H,
+                                       prec = self.Precon,
+                                       radius = self.TR.Delta,
+                                       reltol = cgtol,
+                                       #fraction = 0.5,
+                                       itmax = 2*(n+nz),
+                                       #debug=True,
+                                       #btol=.9,
+                                       #cur_iter=np.concatenate((x,z))
+                                       )
+                subsolver.Solve(store_path=self.reuse_path)
+                path_cgtol = cgtol ; precon_changed = False
 
             if self.debug:
                 self._debugMsg('x = ' + np.str(x))
@@ -739,7 +819,7 @@ class PrimalDualInteriorPointFramework:
                 else:
                     self.TR.UpdateRadius(rho, solver.stepNorm)
 
-            self.UpdatePrecon()
+            if self.UpdatePrecon(): precon_changed = True
             self.iter += 1
             inner_iter += 1
             finished = (gNorm <= stopTol) or (self.iter >= self.maxiter)
@@ -8,6 +8,7 @@
 """
 from nlpy.optimize.solvers import lbfgs    # For preconditioning
 from nlpy.krylov.linop import SimpleLinearOperator
+from nlpy.krylov.workspace import KrylovWorkspace
 from nlpy.tools import norms
 from nlpy.tools.timing import cputime
 import numpy
@@ -44,6 +45,9 @@ class TrunkFramework:
         :monotone:     use monotone descent strategy     (default False)
         :nIterNonMono: number of iterations for which non-strict descent can
                        be tolerated if monotone=False    (default 25)
+        :reuse_path:   after a rejected step, recover the step for the new
+                       radius from the path of the previous subproblem
+                       solve instead of solving again    (default False)
         :logger:       a logger object that can be used in the post
                        iteration                         (default None)
         :verbose:      print log if True                 (default True)
@@ -55,6 +59,23 @@ class TrunkFramework:
         ``max(abstol, reltol * g0)``
 
     where ``g0`` is the Euclidian norm of the gradient at the initial point.
+
+    The vectors of the subproblem solver are held in the
+    :class:`KrylovWorkspace` `self.workspace`, allocated once and given to the
+    solver of each subproblem. The step of the solver is therefore
+    overwritten at the next iteration.
+
+    Since the gradient and the Hessian do not change after a rejected step,
+    the subproblem with the reduced radius is that of the previous
+    iteration. If `reuse_path` is set and the subproblem solver has a
+    `resolve` method, such as :class:`TrustRegionCG`, the solver stores its
+    path and the new step is recovered from it without any Hessian-vector
+    product. Storing the path costs up to `max_path` vectors of size n, as
+    documented in :meth:`TruncatedCG.Solve`. The path is not stored with
+    the Nocedal-Yuan linesearch, which moves to a new point after a
+    rejected step. With `inexact`, the path is only reused while the
+    stopping tolerance of the subproblem solver is unchanged, since the step
+    recovered is that of the tolerance of the solve that stored the path.
     """
 
     def __init__(self, nlp, TR, TrSolver, **kwargs):
@@ -63,6 +84,7 @@ class TrunkFramework:
         self.TR     = TR
         self.TrSolver = TrSolver
         self.solver   = None    # Will point to solver data in Solve()
+        self.workspace = KrylovWorkspace(nlp.n)  # Vectors of the solver
         self.iter   = 0         # Iteration counter
         self.total_cgiter = 0
         self.x      = kwargs.get('x0', self.nlp.x0)
@@ -85,6 +107,7 @@ class TrunkFramework:
         self.inexact = kwargs.get('inexact', False)
         self.monotone = kwargs.get('monotone', False)
         self.nIterNonMono = kwargs.get('nIterNonMono', 25)
+        self.reuse_path = kwargs.get('reuse_path', False) and not self.ny
         self.logger = kwargs.get('logger', None)
 
         self.hformat = '%-5s  %8s  %7s  %5s  %8s  %8s  %4s'
@@ -142,6 +165,7 @@ class TrunkFramework:
             cgtol = 1.0
         else:
             cgtol = -1.0
+        path_cgtol = None     # Tolerance of the path of the last solve
         stoptol = max(self.abstol, self.reltol * self.g0)
         step_status = None
         exitOptimal = exitIter = exitUser = False
@@ -179,16 +203,29 @@ class TrunkFramework:
             if self.inexact:
                 cgtol = max(1.0e-6, min(0.5 * cgtol, sqrt(self.gnorm)))
 
-            H = SimpleLinearOperator(nlp.n, nlp.n,
-                                     lambda v: self.hprod(v),
-                                     symmetric=True)
-
-            self.solver = self.TrSolver(self.g, H)
-            self.solver.Solve(prec=self.precon,
-                              radius=self.TR.Delta,
-                              reltol=cgtol,
-                              #debug=True
-                              )
+            # After a rejected step, try to recover the new step from the
+            # path of the previous solve. The path was computed with the
+            # tolerance of that solve: it is not reused if the inexact
+            # Newton tolerance has been tightened since.
+            recovered = False
+            if self.reuse_path and step_status == 'Rej' and \
+                    cgtol == path_cgtol and hasattr(self.solver, 'resolve'):
+                recovered = self.solver.resolve(self.TR.Delta)
+
+            if not recovered:
+                H = SimpleLinearOperator(nlp.n, nlp.n,
+                                         lambda v: self.hprod(v),
+                                         symmetric=True)
+
+                self.solver = self.TrSolver(self.g, H,
+                                            workspace=self.workspace)
+                self.solver.Solve(prec=self.precon,
+                                  radius=self.TR.Delta,
+                                  reltol=cgtol,
+                                  store_path=self.reuse_path,
+                                  #debug=True
+                                  )
+                path_cgtol = cgtol
 
             step = self.solver.step
             snorm = self.solver.stepNorm
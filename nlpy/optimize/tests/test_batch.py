@@ -0,0 +1,111 @@
+"""
+Tests of the batch driver, with stand-in solvers that return normally, fail,
+run out of memory or time, or die without reporting.
+"""
+
+import numpy as np
+from numpy.testing import TestCase, assert_, assert_equal, run_module_suite
+from nlpy.optimize.solvers import batch
+from StringIO import StringIO
+import json
+import os
+import time
+
+
+def solve_ok(probname, **kwargs):
+    scale = kwargs.get('scale', 1.0)
+    return {'name': batch.problem_name(probname), 'iter': 3,
+            'obj': -1.5 * scale, 'pResid': 1.0e-9, 'dResid': 2.0e-9,
+            'gap': 3.0e-9, 'setup': 0.01, 'solve': 0.02, 'status': 'opt'}
+
+
+def solve_sleep(probname, **kwargs):
+    time.sleep(60)
+    return solve_ok(probname)
+
+
+def solve_raise(probname, **kwargs):
+    raise RuntimeError, 'stand-in failure'
+
+
+def solve_alloc(probname, **kwargs):
+    x = np.ones(1 << 28)    # 2 GB
+    return solve_ok(probname)
+
+
+def solve_exit(probname, **kwargs):
+    os._exit(1)
+
+
+# The stand-in is chosen from the prefix of the problem name.
+def solve_any(probname, **kwargs):
+    solve = {'ok': solve_ok, 'sleep': solve_sleep, 'raise': solve_raise,
+             'alloc': solve_alloc, 'exit': solve_exit}
+    return solve[batch.problem_name(probname).split('_')[0]](probname,
+                                                             **kwargs)
+
+
+class TestBatchDriver(TestCase):
+
+    def setUp(self):
+        # Workers are forked, and see the stand-ins registered here.
+        batch.solvers['test'] = solve_any
+
+    def tearDown(self):
+        del batch.solvers['test']
+
+    def test_statuses(self):
+        problems = ['/tmp/ok_1.nl', 'sleep_2', 'raise_3.mps', 'exit_4',
+                    'ok_5.qps.gz']
+        rows = []
+        driver = batch.BatchDriver('test', problems, nprocs=3, timeout=1.0,
+                                   opts={'scale': 2.0})
+        t0 = time.time()
+        results = driver.solve(callback=rows.append)
+        assert_(time.time() - t0 < 30)
+        assert_equal([row['name'] for row in results],
+                     ['ok_1', 'sleep_2', 'raise_3', 'exit_4', 'ok_5'])
+        assert_equal([row['status'] for row in results],
+                     ['opt', 'time', 'fail', 'fail', 'opt'])
+        assert_equal(results[0], solve_ok('ok_1', scale=2.0))
+        for row in results[1:4]:
+            assert_equal(row, batch.failed_row(row['name'], row['status']))
+        assert_equal(sorted([row['name'] for row in rows]),
+                     sorted([row['name'] for row in results]))
+
+    def test_memory_limit(self):
+        driver = batch.BatchDriver('test', ['alloc_1', 'ok_2'], nprocs=2,
+                                   memlimit=512)
+        results = driver.solve()
+        assert_equal([row['status'] for row in results], ['mem', 'opt'])
+
+    def test_unknown_solver(self):
+        try:
+            batch.BatchDriver('none', ['ok_1'])
+        except ValueError:
+            pass
+        else:
+            raise AssertionError, 'BatchDriver did not raise ValueError'
+
+    def test_csv(self):
+        results = [solve_ok('ok_1'), batch.failed_row('time_2', 'time')]
+        stream = StringIO()
+        batch.write_csv(results, stream=stream)
+        lines = stream.getvalue().splitlines()
+        assert_equal(lines[0], '#' + ','.join(batch.columns))
+        assert_equal(lines[1], 'ok_1,3,-1.500000000000000e+00,1.000000e-09,'
+                     '2.000000e-09,3.000000e-09,0.0100,0.0200,opt')
+        assert_equal(lines[2], 'time_2,-1,-1.000000000000000e+00,'
+                     '-1.000000e+00,-1.000000e+00,-1.000000e+00,-1.0000,'
+                     '-1.0000,time')
+        assert_equal(len(lines), 3)
+
+    def test_json(self):
+        results = [solve_ok('ok_1'), batch.failed_row('fail_2', 'fail')]
+        stream = StringIO()
+        batch.write_json(results, stream=stream)
+        assert_equal(json.loads(stream.getvalue()), results)
+
+
+if __name__ == '__main__':
+    run_module_suite()
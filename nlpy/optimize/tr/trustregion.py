@@ -162,6 +162,23 @@ class TrustRegionCG(TrustRegionSolver):
         self.m += 0.5 * np.dot(self.step, self.cgSolver.H * self.step)
         return
 
+    def resolve(self, radius):
+        """
+        Recover the solution of the subproblem with the smaller radius
+        `radius` from the path stored by the last call to :meth:`Solve` with
+        the keyword `store_path=True`, without products with the Hessian.
+        See :meth:`TruncatedCG.resolve`. Return `True` on success and `False`
+        if :meth:`Solve` must be called again. On success, :attr:`niter` is
+        0 since no new conjugate gradient iteration was performed.
+        """
+        if not self.cgSolver.resolve(radius):
+            return False
+        self.niter = 0
+        self.stepNorm = self.cgSolver.stepNorm
+        self.step = self.cgSolver.step
+        self.m = self.cgSolver.m
+        return True
+
 
 class TrustRegionPCG(TrustRegionSolver):
     """
@@ -226,25 +243,77 @@ try:
         Instantiate a trust-region subproblem solver based on the Generalized
         Lanczos iterative method of Gould, Lucidi, Roma and Toint.
         See :mod:`pygltr` for more information.
+
+        The Hessian `H` may be given as the second argument or as the
+        keyword `H`, either as a function returning products with a vector
+        or as a linear operator. Keyword arguments of :meth:`Solve`, such as
+        `radius`, `reltol` or `prec`, override those of the constructor, so
+        that this class may be used as the subproblem solver of
+        :class:`TrunkFramework`.
+
+        The :class:`PyGltrContext` is created by the first call to
+        :meth:`Solve`, with the options of that call, and only created again
+        when a later call changes the options. Otherwise, the subproblem is
+        that of the last solve and its solution is kept.
         """
 
-        def __init__(self, g, **kwargs):
+        def __init__(self, g, H=None, **kwargs):
 
             TrustRegionSolver.__init__(self, g, **kwargs)
-            self.gltrSolver = pygltr.PyGltrContext(g, **kwargs)
+            self.kwargs = kwargs
+            self.gltrSolver = None   # Created by Solve()
+            self._options = None     # Options of self.gltrSolver
             self.niter = 0
             self.stepNorm = 0.0
             self.step = None
             self.hprod = kwargs.get('matvec', None)
-            self.H = kwargs.get('H', None)
+            self.H = H if H is not None else kwargs.get('H', None)
             self.m = None
 
-        def Solve(self):
+        def Solve(self, **kwargs):
             """
             Solve the trust-region subproblem using the generalized Lanczos
             method.
             """
-            self.gltrSolver.implicit_solve(self.H)
+            options = self.kwargs.copy()
+            options.update(kwargs)
+            if not self._changed(options):
+                return
+            self.gltrSolver = pygltr.PyGltrContext(self.g, **options)
+            self._options = options
+            if callable(self.H):
+                hprod = self.H
+            else:
+                hprod = lambda v: self.H * v
+            self.gltrSolver.implicit_solve(hprod)
+            self._collect()
+            return
+
+        def resolve(self, radius):
+            """
+            Solve the subproblem again with the smaller radius `radius` from
+            the Lanczos tridiagonal of the last solve, without generating it
+            again. See :meth:`PyGltrContext.resolve`. Return `True` on success
+            and `False` if :meth:`Solve` must be called again.
+            """
+            if self.gltrSolver is None or \
+                    not self.gltrSolver.resolve(radius):
+                return False
+            self._options['radius'] = radius
+            self._collect()
+            return True
+
+        def _changed(self, options):
+            "Return `True` unless `options` are those of the last solve."
+            if self._options is None or set(options) != set(self._options):
+                return True
+            for (key, value) in options.items():
+                old = self._options[key]
+                if value is not old and value != old:
+                    return True
+            return False
+
+        def _collect(self):
             self.niter = self.gltrSolver.niter
             self.stepNorm = self.gltrSolver.snorm
             self.step = self.gltrSolver.step
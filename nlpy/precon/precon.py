@@ -15,10 +15,8 @@ D. Orban                             Montreal, March 2007
 
 import numpy as np
 from pysparse.sparse import spmatrix
-try:     # To solve symmetric linear systems
-        from nlpy.linalg.pyma57 import PyMa57Context as LBLContext
-except:
-        from nlpy.linalg.pyma27 import PyMa27Context as LBLContext
+from nlpy.linalg.backends import LBLContext  # To solve symmetric systems
+from nlpy.linalg.cache import cached_factorization, release_factorization
 
 
 class GenericPreconditioner:
@@ -89,8 +87,9 @@ class BandedPreconditioner(GenericPreconditioner):
                 if A[j+i+1,j] != 0.0:
                     M[j+i+1,j] = A[j+i+1,j]
 
-        # Factorize preconditioner
-        self.lbl = LBLContext(M)
+        # Factorize preconditioner. The factorization is checked out of the
+        # cache for the exclusive use of this preconditioner until release().
+        self.lbl = cached_factorization(M, factory=LBLContext)
 
         # Only need factors of M --- can discard M itself
         del M
@@ -99,4 +98,16 @@ class BandedPreconditioner(GenericPreconditioner):
         self.lbl.solve(x)
         return self.lbl.x.copy()
 
+    def release(self):
+        """
+        Hand the factorization back to the cache of factorizations once the
+        preconditioner is no longer needed, so that a preconditioner built
+        later from the same matrix may skip the factorization. The
+        preconditioner must no longer be used afterwards.
+        """
+        if self.lbl is not None:
+            release_factorization(self.lbl)
+            self.lbl = None
+        return
+
 # For a LBFGS preconditioner, see class LbfgsUpdate
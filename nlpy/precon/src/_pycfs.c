@@ -161,8 +161,10 @@ static PyObject *NewPycfsObject( LLMatObject *llmat, int p ) {
 
     /* Reorder matrix in sparse compressed column format and
      * obtain diagonal in separate array as a dense vector. */
+    Py_BEGIN_ALLOW_THREADS
     SRTDAT2( &(self->n), &(self->nnz), self->val, self->diag, self->rowind,
 	     self->colind, self->colptr, iwa );
+    Py_END_ALLOW_THREADS
 
     free( iwa );
 
@@ -194,9 +196,11 @@ static PyObject *NewPycfsObject( LLMatObject *llmat, int p ) {
       self->lcolptr[n] = 1;
     } else {
       /* Obtain incomplete Cholesky factor L */
+      Py_BEGIN_ALLOW_THREADS
       DICFS( &(self->n), &(self->nnz), self->val, self->diag, self->colptr,
              self->rowind, self->l, self->ldiag, self->lcolptr, self->lrowind,
              &(self->p), &(self->shift), iwa, wa1, wa2 );
+      Py_END_ALLOW_THREADS
     }
 
     free( self->colind );
@@ -266,7 +270,9 @@ static PyObject *Pycfs_pcg( PycfsObject *self, PyObject *args ) {
 
     iters = 0; info = 0;
 
-    /* Solve */
+    /* Solve. All data is held in the context and the arrays passed as
+     * arguments, so other threads may run in the meantime. */
+    Py_BEGIN_ALLOW_THREADS
     t_solve = clock();
     DPCG( &(self->n), self->val, self->diag, self->colptr, self->rowind, self->l,
 	  self->ldiag, self->lcolptr, self->lrowind, pb, &rtol, &maxiter, x,
@@ -292,6 +298,7 @@ static PyObject *Pycfs_pcg( PycfsObject *self, PyObject *args ) {
     if( normb > ZERO ) relres = relres/normb;
 
     free( wa4 );
+    Py_END_ALLOW_THREADS
 
     return Py_BuildValue("iiddd", iters, info, relres, self->nc, etime);
 }